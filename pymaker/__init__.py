@@ -16,8 +16,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import importlib
 import json
 import logging
+import math
+import os
 import re
 import sys
 import time
@@ -27,7 +30,6 @@ from threading import Lock
 from typing import Optional
 
 import eth_utils
-import pkg_resources
 from hexbytes import HexBytes
 
 from web3 import Web3
@@ -39,8 +41,9 @@ from eth_abi.codec import ABICodec
 from eth_abi.registry import registry as default_registry
 
 from pymaker.gas import DefaultGasPrice, GasPrice
+from pymaker.metrics import get_metrics
 from pymaker.numeric import Wad
-from pymaker.util import synchronize, bytes_to_hexstring, is_contract_at, get_provider_for_filter
+from pymaker.util import synchronize, bytes_to_hexstring, get_provider_for_filter, is_infura, ContractCache
 
 filter_threads = []
 node_is_parity = None
@@ -133,7 +136,17 @@ class Address:
 
 
 class Contract:
+    """Base class of all contract wrappers.
+
+    Attributes:
+        contract_cache: :py:class:`pymaker.util.ContractCache` instance remembering addresses which
+            contracts have already been found at. Can be replaced i.e. with one persisted to a file.
+        lazy_verification: If `True`, wrappers get constructed without checking whether the contract
+            exists. The check happens the first time the underlying contract gets used instead.
+    """
     logger = logging.getLogger()
+    contract_cache = ContractCache()
+    lazy_verification = False
 
     @staticmethod
     def _deploy(web3: Web3, abi: list, bytecode: str, args: list) -> Address:
@@ -154,7 +167,10 @@ class Contract:
         assert(isinstance(abi, list))
         assert(isinstance(address, Address))
 
-        if not is_contract_at(web3, address):
+        if Contract.lazy_verification and not Contract.contract_cache.is_verified(web3, address):
+            return LazyContract(web3, abi, address)
+
+        if not Contract.contract_cache.exists(web3, address):
             raise Exception(f"No contract found at {address}")
 
         return web3.eth.contract(abi=abi)(address=address.address)
@@ -181,21 +197,107 @@ class Contract:
 
             return callback
 
+        metrics = get_metrics()
+
         _web3 = contract.events[event].web3
         contract.events[event].web3 = get_provider_for_filter(_web3)
-        result = contract.events[event].createFilter(fromBlock=from_block, toBlock=to_block,
-                                                     argument_filters=event_filter).get_all_entries()
+        with metrics.timer("pymaker_past_events_fetch_seconds", {"event": event}):
+            result = contract.events[event].createFilter(fromBlock=from_block, toBlock=to_block,
+                                                         argument_filters=event_filter).get_all_entries()
         contract.events[event].web3 = _web3
 
-        return list(map(_event_callback(cls, True), result))
+        with metrics.timer("pymaker_past_events_decode_seconds", {"event": event}):
+            events = list(map(_event_callback(cls, True), result))
+        metrics.increment("pymaker_past_events_decoded_total", len(events), {"event": event})
+
+        return events
 
     @staticmethod
     def _load_abi(package, resource) -> list:
-        return json.loads(pkg_resources.resource_string(package, resource))
+        return json.loads(_resource_string(package, resource))
 
     @staticmethod
     def _load_bin(package, resource) -> str:
-        return str(pkg_resources.resource_string(package, resource), "utf-8")
+        return str(_resource_string(package, resource), "utf-8")
+
+    @staticmethod
+    def _lazy_abi(package, resource):
+        """Class attribute equivalent of `_load_abi`, deferring the loading until first access."""
+        return LazyResource(Contract._load_abi, package, resource)
+
+    @staticmethod
+    def _lazy_bin(package, resource):
+        """Class attribute equivalent of `_load_bin`, deferring the loading until first access."""
+        return LazyResource(Contract._load_bin, package, resource)
+
+
+class LazyContract:
+    """Handle of a web3.py contract, checking that the contract exists the first time it gets used.
+
+    Returned by `Contract._get_contract` if `Contract.lazy_verification` is enabled, so
+    constructing wrappers does not cost any JSON-RPC requests. Accessing any attribute
+    (i.e. `functions` or `events`) raises an exception if there is no contract at the address.
+    """
+    def __init__(self, web3: Web3, abi: list, address: Address):
+        self._web3 = web3
+        self._abi = abi
+        self._address = address
+        self._contract = None
+
+    def _resolve(self):
+        if self._contract is None:
+            if not Contract.contract_cache.exists(self._web3, self._address):
+                raise Exception(f"No contract found at {self._address}")
+
+            self._contract = self._web3.eth.contract(abi=self._abi)(address=self._address.address)
+
+        return self._contract
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __repr__(self):
+        return f"LazyContract('{self._address}')"
+
+
+def _resource_string(package: str, resource: str) -> bytes:
+    # Resources are read directly from next to the module, as it's much cheaper than
+    # importing `pkg_resources`. Note that `abi/` is not a package on its own, so
+    # `importlib.resources` can not be used to read from it either.
+    module = sys.modules.get(package) or importlib.import_module(package)
+    with open(os.path.join(os.path.dirname(module.__file__), resource), 'rb') as resource_file:
+        return resource_file.read()
+
+
+class LazyResource:
+    """Contract ABI or bytecode, loaded the first time it gets accessed.
+
+    Meant to be used as a class attribute (see `Contract._lazy_abi` and `Contract._lazy_bin`)
+    so importing a module does not parse ABIs of all contracts it wraps. On first access
+    the loaded value replaces the descriptor in the owning class, so subsequent accesses
+    cost as much as reading a regular class attribute.
+    """
+    def __init__(self, loader, package: str, resource: str):
+        assert(callable(loader))
+        assert(isinstance(package, str))
+        assert(isinstance(resource, str))
+
+        self.loader = loader
+        self.package = package
+        self.resource = resource
+        self.owner = None
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.loader(self.package, self.resource)
+        if self.owner is not None:
+            setattr(self.owner, self.name, value)
+
+        return value
 
 
 class Calldata:
@@ -351,6 +453,8 @@ class Transact:
 
     logger = logging.getLogger()
     gas_estimate_for_bad_txs = None
+    gas_estimate_cache = None
+    presign_depth = 16
 
     def __init__(self,
                  origin: Optional[object],
@@ -384,7 +488,7 @@ class Transact:
         self.status = TransactStatus.NEW
         self.nonce = None
         self.replaced = False
-        self.use_infura = False if "infura" not in self.web3.provider.endpoint_uri else True
+        self.use_infura = is_infura(self.web3)
 
     def _is_parity(self) -> bool:
         global node_is_parity
@@ -423,12 +527,14 @@ class Transact:
         else:
             return gas_estimate + 100000
 
-    def _func(self, from_account: str, gas: int, gas_price: Optional[int], nonce: Optional[int]):
-        gas_price_dict = {'gasPrice': gas_price} if gas_price is not None else {}
+    def _func(self, from_account: str, gas: int, gas_fees: dict, nonce: Optional[int]):
+        if 'maxFeePerGas' in gas_fees:
+            return self._send_typed_transaction(from_account, gas, gas_fees, nonce)
+
         nonce_dict = {'nonce': nonce} if nonce is not None else {}
 
         transaction_params = {**{'from': from_account, 'gas': gas},
-                              **gas_price_dict,
+                              **gas_fees,
                               **nonce_dict,
                               **self._as_dict(self.extra)}
 
@@ -443,6 +549,135 @@ class Transact:
         else:
             return self.web3.eth.sendTransaction({**transaction_params, **{'to': self.address.address}})
 
+    def _data(self) -> HexBytes:
+        if self.contract is None:
+            return HexBytes(b'')
+        elif self.function_name is None:
+            return HexBytes(self.parameters[0])
+        else:
+            return HexBytes(self._contract_function()._encode_transaction_data())
+
+    def _transaction(self, gas: int, gas_fees: dict, nonce: int) -> dict:
+        return {'chainId': int(Contract.contract_cache.chain_id(self.web3)),
+                'nonce': nonce,
+                'gas': gas,
+                'to': self.address.address,
+                'value': self._as_dict(self.extra).get('value', 0),
+                'data': self._data(),
+                **gas_fees}
+
+    def _sign(self, account, gas: int, gas_fees: dict, nonce: int) -> bytes:
+        from pymaker.sign import sign_typed_transaction
+
+        transaction = self._transaction(gas, gas_fees, nonce)
+        if 'maxFeePerGas' in gas_fees:
+            return sign_typed_transaction(account, transaction)
+
+        else:
+            return bytes(account.sign_transaction(transaction).rawTransaction)
+
+    def _send_typed_transaction(self, from_account: str, gas: int, gas_fees: dict, nonce: int):
+        # web3.py and eth_account versions supported by pymaker are not aware of type-2 transactions,
+        # so they get signed by pymaker itself for local accounts, and sent bypassing web3.py
+        # request formatters otherwise.
+        from pymaker.keys import _registered_accounts
+
+        account = _registered_accounts.get((self.web3, Address(from_account)))
+        if account is not None:
+            return self.web3.eth.sendRawTransaction(self._sign(account, gas, gas_fees, nonce))
+
+        else:
+            # `request_blocking` returns the hash as a hex string, `eth.sendTransaction` would return bytes
+            transaction = self._transaction(gas, gas_fees, nonce)
+            return HexBytes(self.web3.manager.request_blocking("eth_sendTransaction", [{
+                'type': '0x2',
+                'from': from_account,
+                'to': transaction['to'],
+                'data': transaction['data'].hex(),
+                **{key: hex(transaction[key]) for key in ['chainId', 'nonce', 'gas', 'value',
+                                                          'maxFeePerGas', 'maxPriorityFeePerGas']}
+            }]))
+
+    def _presign(self, from_account: str, gas: int, gas_price: GasPrice, gas_fees_last: dict,
+                 time_elapsed: int, nonce: int) -> list:
+        # Walks through the gas prices the strategy will ask for in the future, applying the same
+        # replacement rules as `transact_async` does, and signs all the replacement transactions
+        # up front. Only possible for local accounts and for strategies which report when
+        # the gas price is going to change next.
+        from pymaker.keys import _registered_accounts
+
+        account = _registered_accounts.get((self.web3, Address(from_account)))
+        if account is None or not gas_fees_last:
+            return []
+
+        ladder = []
+        next_change = gas_price.get_next_scheduled_change(time_elapsed)
+        while next_change is not None and next_change > time_elapsed and len(ladder) < Transact.presign_depth:
+            time_elapsed = next_change
+            gas_fees = self._gas_fees(gas_price, time_elapsed)
+            if self._should_replace(gas_fees_last, gas_fees):
+                replacement_fees = self._replacement_fees(gas_fees_last, gas_fees, gas_price)
+                if replacement_fees is not None:
+                    gas_fees_last = replacement_fees
+                    ladder.append((time_elapsed, gas_fees_last, self._sign(account, gas, gas_fees_last, nonce)))
+
+            next_change = gas_price.get_next_scheduled_change(time_elapsed)
+
+        return ladder
+
+    @staticmethod
+    def _gas_fees(gas_price: GasPrice, time_elapsed: int) -> dict:
+        fees = gas_price.get_gas_fees(time_elapsed)
+        if fees is not None:
+            return {'maxFeePerGas': fees[0], 'maxPriorityFeePerGas': fees[1]}
+
+        value = gas_price.get_gas_price(time_elapsed)
+        return {'gasPrice': value} if value is not None else {}
+
+    @staticmethod
+    def _should_replace(gas_fees_last: dict, gas_fees: dict) -> bool:
+        if 'gasPrice' in gas_fees and 'gasPrice' in gas_fees_last:
+            return gas_fees['gasPrice'] > gas_fees_last['gasPrice'] * 1.125
+
+        if 'maxFeePerGas' in gas_fees and 'maxFeePerGas' in gas_fees_last:
+            return gas_fees['maxPriorityFeePerGas'] > gas_fees_last['maxPriorityFeePerGas'] * 1.125 or \
+                   gas_fees['maxFeePerGas'] > gas_fees_last['maxFeePerGas'] * 1.125
+
+        return False
+
+    @staticmethod
+    def _replacement_fees(gas_fees_last: dict, gas_fees: dict, gas_price: GasPrice) -> Optional[dict]:
+        # Nodes only accept a type-2 replacement if both the fee cap and the priority fee go up
+        # by at least 10%. The priority fee is what actually gets paid, so it is never raised above
+        # what the gas price strategy asks for. The fee cap gets raised (by 12.5%, as in the legacy
+        # replacements) up to the limit allowed by the strategy. If that is still not enough
+        # for the node to accept the replacement, `None` is returned and nothing gets sent.
+        if 'maxFeePerGas' not in gas_fees or 'maxFeePerGas' not in gas_fees_last:
+            return gas_fees
+
+        def minimum(value: int) -> int:
+            return (value * 11 + 9) // 10
+
+        tip = gas_fees['maxPriorityFeePerGas']
+        if tip < minimum(gas_fees_last['maxPriorityFeePerGas']):
+            return None
+
+        max_fee = max(gas_fees['maxFeePerGas'], math.ceil(gas_fees_last['maxFeePerGas'] * 1.125))
+        max_fee_limit = gas_price.get_max_fee_limit(gas_fees['maxFeePerGas'])
+        if max_fee_limit is not None:
+            max_fee = min(max_fee, max(max_fee_limit, gas_fees['maxFeePerGas']))
+        if max_fee < minimum(gas_fees_last['maxFeePerGas']):
+            return None
+
+        return {'maxFeePerGas': max_fee, 'maxPriorityFeePerGas': tip}
+
+    @staticmethod
+    def _format_gas_fees(gas_fees: dict) -> str:
+        if 'maxFeePerGas' in gas_fees:
+            return f"max_fee={gas_fees['maxFeePerGas']}, max_priority_fee={gas_fees['maxPriorityFeePerGas']}"
+
+        return f"gas_price={gas_fees.get('gasPrice', 'default')}"
+
     def _contract_function(self):
         if '(' in self.function_name:
             function_factory = self.contract.get_function_by_signature(self.function_name)
@@ -510,8 +745,11 @@ class Transact:
 
         Out-of-gas exceptions are automatically recognized as transaction failures.
 
-        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`.
+        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`, `presign`.
         `gas_price` needs to be an instance of a class inheriting from :py:class:`pymaker.gas.GasPrice`.
+        If it returns EIP-1559 fee parameters from `get_gas_fees`, a type-2 transaction gets sent.
+        If `presign` is `True` and the transaction is being sent from a local account, all the
+        replacement transactions the gas price strategy will lead to get signed up front.
         `from_address` needs to be an instance of :py:class:`pymaker.Address`.
 
         The `gas` keyword argument is the gas limit for the transaction, whereas `gas_buffer`
@@ -534,8 +772,11 @@ class Transact:
 
         Out-of-gas exceptions are automatically recognized as transaction failures.
 
-        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`.
+        Allowed keyword arguments are: `from_address`, `replace`, `gas`, `gas_buffer`, `gas_price`, `presign`.
         `gas_price` needs to be an instance of a class inheriting from :py:class:`pymaker.gas.GasPrice`.
+        If it returns EIP-1559 fee parameters from `get_gas_fees`, a type-2 transaction gets sent.
+        If `presign` is `True` and the transaction is being sent from a local account, all the
+        replacement transactions the gas price strategy will lead to get signed up front.
 
         The `gas` keyword argument is the gas limit for the transaction, whereas `gas_buffer`
         specifies how much gas should be added to the estimate. They can not be present
@@ -546,7 +787,7 @@ class Transact:
             invocation was successful, or `None` if it failed.
         """
 
-        unknown_kwargs = set(kwargs.keys()) - {'from_address', 'replace', 'gas', 'gas_buffer', 'gas_price'}
+        unknown_kwargs = set(kwargs.keys()) - {'from_address', 'replace', 'gas', 'gas_buffer', 'gas_price', 'presign'}
         if len(unknown_kwargs) > 0:
             raise Exception(f"Unknown kwargs: {unknown_kwargs}")
 
@@ -558,16 +799,40 @@ class Transact:
         # do not increment the nonce. If the estimation is successful, we pass the calculated
         # gas value (plus some `gas_buffer`) to the subsequent `transact` calls so it does not
         # try to estimate it again.
-        try:
-            gas_estimate = self.estimated_gas(Address(from_account))
-            # gas_estimate = 300000
-        except:
-            if Transact.gas_estimate_for_bad_txs:
-                self.logger.warning(f"Transaction {self.name()} will fail, submitting anyway")
-                gas_estimate = Transact.gas_estimate_for_bad_txs
-            else:
-                self.logger.warning(f"Transaction {self.name()} will fail, refusing to send ({sys.exc_info()[1]})")
-                return None
+        #
+        # If a gas estimate cache has been installed, estimates for calls of the same shape are reused
+        # (see :py:class:`pymaker.gas.GasEstimateCache`), in which case the estimation is either skipped
+        # altogether or happens concurrently with sending the transaction.
+        metrics = get_metrics()
+        cache = Transact.gas_estimate_cache
+        cache_key = cache.key(self.address, self.function_name, self.parameters, self.extra, Address(from_account)) \
+            if cache is not None and self.contract is not None else None
+        cached_estimate, fresh = cache.get(cache_key) if cache_key is not None else (None, False)
+
+        if cached_estimate is not None and (fresh or cache.concurrent):
+            metrics.increment("pymaker_transact_gas_estimate_cache_total", labels={"result": "hit" if fresh else "stale"})
+            gas_estimate = cached_estimate
+            if not fresh:
+                self._refresh_gas_estimate(cache, cache_key, Address(from_account))
+
+        else:
+            try:
+                with metrics.timer("pymaker_transact_gas_estimation_seconds"):
+                    gas_estimate = self.estimated_gas(Address(from_account))
+                # gas_estimate = 300000
+                if cache_key is not None:
+                    metrics.increment("pymaker_transact_gas_estimate_cache_total", labels={"result": "miss"})
+                    cache.put(cache_key, gas_estimate)
+            except:
+                metrics.increment("pymaker_transact_estimation_failures_total")
+                if cache_key is not None:
+                    cache.invalidate(cache_key)
+                if Transact.gas_estimate_for_bad_txs:
+                    self.logger.warning(f"Transaction {self.name()} will fail, submitting anyway")
+                    gas_estimate = Transact.gas_estimate_for_bad_txs
+                else:
+                    self.logger.warning(f"Transaction {self.name()} will fail, refusing to send ({sys.exc_info()[1]})")
+                    return None
 
         # Get or calculate `gas`. Get `gas_price`, which in fact refers to a gas pricing algorithm.
         gas = self._gas(gas_estimate, **kwargs)
@@ -587,7 +852,12 @@ class Transact:
         # Initialize variables which will be used in the main loop.
         tx_hashes = []
         initial_time = time.time()
-        gas_price_last = 0
+        gas_fees_last = {}
+        gas_fees = {}
+        gas_price_next_change = 0
+        presign = kwargs.get('presign', False)
+        presigned = None
+        first_sent_time = None
 
         while True:
             seconds_elapsed = int(time.time() - initial_time)
@@ -603,12 +873,17 @@ class Transact:
                     for tx_hash in tx_hashes:
                         receipt = self._get_receipt(tx_hash)
                         if receipt:
+                            metrics.observe("pymaker_transact_receipt_wait_seconds", time.time() - first_sent_time)
+                            metrics.increment("pymaker_transact_mined_total",
+                                              labels={"successful": str(receipt.successful).lower()})
                             if receipt.successful:
                                 self.logger.info(f"Transaction {self.name()} was successful (tx_hash={bytes_to_hexstring(tx_hash)})")
                                 return receipt
                             else:
                                 self.logger.warning(f"Transaction {self.name()} mined successfully but generated no single"
                                                     f" log entry, assuming it has failed (tx_hash={bytes_to_hexstring(tx_hash)})")
+                                if cache_key is not None:
+                                    cache.invalidate(cache_key)
                                 return None
 
                     self.logger.debug(f"No receipt found in attempt #{attempt}/10 (nonce={self.nonce},"
@@ -618,6 +893,7 @@ class Transact:
 
                 # If we can not find a mined receipt but at the same time we know last used nonce
                 # has increased, then it means that the transaction we tried to send failed.
+                metrics.increment("pymaker_transact_overridden_total")
                 self.logger.debug(f"Transaction {self.name()} has been overridden by another transaction"
                                     f" with the same nonce, which means it has failed")
                 return None
@@ -625,10 +901,29 @@ class Transact:
             # Send a transaction if:
             # - no transaction has been sent yet, or
             # - the requested gas price has changed enough since the last transaction has been sent
-            gas_price_value = gas_price.get_gas_price(seconds_elapsed)
-            if len(tx_hashes) == 0 or ((gas_price_value is not None) and (gas_price_last is not None) and
-                                           (gas_price_value > gas_price_last * 1.125)):
-                gas_price_last = gas_price_value
+            # The gas price strategy only gets asked again once the gas price may have changed.
+            # Pre-signed replacements, if there are any, are sent as they become due instead.
+            raw_transaction = None
+            if presigned:
+                if presigned[0][0] <= seconds_elapsed:
+                    while len(presigned) > 1 and presigned[1][0] <= seconds_elapsed:
+                        presigned.pop(0)
+                    _, gas_fees, raw_transaction = presigned.pop(0)
+
+            elif gas_price_next_change is not None and seconds_elapsed >= gas_price_next_change:
+                gas_fees = self._gas_fees(gas_price, seconds_elapsed)
+                gas_price_next_change = gas_price.get_next_change(seconds_elapsed)
+
+            # Replacements the node would not accept within the limits of the gas price strategy are skipped.
+            if len(tx_hashes) == 0 or raw_transaction is not None:
+                replacement_fees = gas_fees
+            elif self._should_replace(gas_fees_last, gas_fees):
+                replacement_fees = self._replacement_fees(gas_fees_last, gas_fees, gas_price)
+            else:
+                replacement_fees = None
+
+            if replacement_fees is not None:
+                gas_fees_last = replacement_fees
 
                 try:
                     # We need the lock in order to not try to send two transactions with the same nonce.
@@ -641,22 +936,56 @@ class Transact:
                             else:
                                 self.nonce = self.web3.eth.getTransactionCount(from_account, block_identifier='pending')
 
-                        tx_hash = self._func(from_account, gas, gas_price_value, self.nonce)
+                        with metrics.timer("pymaker_transact_send_seconds"):
+                            if raw_transaction is not None:
+                                tx_hash = self.web3.eth.sendRawTransaction(raw_transaction)
+                            else:
+                                tx_hash = self._func(from_account, gas, gas_fees_last, self.nonce)
                         tx_hashes.append(tx_hash)
 
+                    metrics.increment("pymaker_transact_sent_total",
+                                      labels={"replacement": str(len(tx_hashes) > 1).lower()})
+                    if first_sent_time is None:
+                        first_sent_time = time.time()
+
                     self.logger.info(f"Sent transaction {self.name()} with nonce={self.nonce}, gas={gas},"
-                                     f" gas_price={gas_price_value if gas_price_value is not None else 'default'}"
+                                     f" {self._format_gas_fees(gas_fees_last)}"
                                      f" (tx_hash={bytes_to_hexstring(tx_hash)})")
                 except Exception as e:
                     self.logger.warning(f"Failed to send transaction {self.name()} with nonce={self.nonce}, gas={gas},"
-                                        f" gas_price={gas_price_value if gas_price_value is not None else 'default'}"
+                                        f" {self._format_gas_fees(gas_fees_last)}"
                                         f" ({e})")
 
                     if len(tx_hashes) == 0:
                         raise
 
+                # Replacement transactions get signed once the first one has been sent,
+                # so signing does not delay any of the broadcasts.
+                if presign and presigned is None:
+                    try:
+                        presigned = self._presign(from_account, gas, gas_price, gas_fees_last, seconds_elapsed,
+                                                  self.nonce)
+                        self.logger.debug(f"Pre-signed {len(presigned)} replacement(s) of transaction {self.name()}")
+                    except Exception as e:
+                        presigned = []
+                        self.logger.warning(f"Failed to sign replacements of transaction {self.name()} up front,"
+                                            f" they will be signed when sent ({e})")
+
+                    gas_price_next_change = presigned[-1][0] if presigned else gas_price_next_change
+
             await asyncio.sleep(0.25)
 
+    def _refresh_gas_estimate(self, cache, cache_key: tuple, from_address: Address):
+        def refresh():
+            try:
+                cache.put(cache_key, self.estimated_gas(from_address))
+            except Exception as e:
+                cache.invalidate(cache_key)
+                self.logger.warning(f"Transaction {self.name()} has been sent with a cached gas estimate,"
+                                    f" but estimating it again has failed ({e})")
+
+        asyncio.get_event_loop().run_in_executor(None, refresh)
+
     def invocation(self) -> Invocation:
         """Returns the `Invocation` object for this pending Ethereum transaction.
 
@@ -188,8 +188,8 @@ class Flipper(AuctionContract):
         0xc959c42b: deal
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Flipper.abi')
-    bin = Contract._load_bin(__name__, 'abi/Flipper.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Flipper.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Flipper.bin')
 
     class Bid:
         def __init__(self, id: int, bid: Rad, lot: Wad, guy: Address, tic: int, end: int,
@@ -360,8 +360,8 @@ class Flapper(AuctionContract):
         0xc959c42b: deal
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Flapper.abi')
-    bin = Contract._load_bin(__name__, 'abi/Flapper.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Flapper.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Flapper.bin')
 
     class Bid:
         def __init__(self, id: int, bid: Wad, lot: Rad, guy: Address, tic: int, end: int):
@@ -507,8 +507,8 @@ class Flopper(AuctionContract):
         0xc959c42b: deal
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Flopper.abi')
-    bin = Contract._load_bin(__name__, 'abi/Flopper.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Flopper.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Flopper.bin')
 
     class Bid:
         def __init__(self, id: int, bid: Rad, lot: Wad, guy: Address, tic: int, end: int):
@@ -32,8 +32,8 @@ class DSGuard(Contract):
         address: Ethereum address of the `DSGuard` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSGuard.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSGuard.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSGuard.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSGuard.bin')
 
     ANY = int_to_bytes32(2 ** 256 - 1)
 
@@ -81,8 +81,8 @@ class DSGuard(Contract):
 # TODO: Complete implementation and unit test
 class DSAuth(Contract):
 
-    abi = Contract._load_abi(__name__, 'abi/DSAuth.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSAuth.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSAuth.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSAuth.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
@@ -29,8 +29,8 @@ class CdpManager(Contract):
     Ref. <https://github.com/makerdao/dss-cdp-manager/blob/master/src/DssCdpManager.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DssCdpManager.abi')
-    bin = Contract._load_bin(__name__, 'abi/DssCdpManager.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DssCdpManager.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DssCdpManager.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -39,7 +39,14 @@ class CdpManager(Contract):
         self.web3 = web3
         self.address = address
         self._contract = self._get_contract(web3, self.abi, address)
-        self.vat = Vat(self.web3, Address(self._contract.functions.vat().call()))
+        self._vat = None
+
+    @property
+    def vat(self) -> Vat:
+        if self._vat is None:
+            self._vat = Vat(self.web3, Address(self._contract.functions.vat().call()))
+
+        return self._vat
 
     def open(self, ilk: Ilk, address: Address) -> Transact:
         assert isinstance(ilk, Ilk)
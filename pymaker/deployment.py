@@ -20,11 +20,10 @@ import os
 import re
 from typing import Dict, List, Optional
 
-import pkg_resources
 from pymaker.auctions import Flapper, Flopper, Flipper
 from web3 import Web3, HTTPProvider
 
-from pymaker import Address
+from pymaker import Address, Contract
 from pymaker.approval import directly, hope_directly
 from pymaker.auth import DSGuard
 from pymaker.etherdelta import EtherDelta
@@ -59,8 +58,8 @@ def deploy_contract(web3: Web3, contract_name: str, args: Optional[list] = None)
     assert(isinstance(contract_name, str))
     assert(isinstance(args, list) or (args is None))
 
-    abi = json.loads(pkg_resources.resource_string('pymaker.deployment', f'abi/{contract_name}.abi'))
-    bytecode = str(pkg_resources.resource_string('pymaker.deployment', f'abi/{contract_name}.bin'), 'utf-8')
+    abi = Contract._load_abi(__name__, f'abi/{contract_name}.abi')
+    bytecode = Contract._load_bin(__name__, f'abi/{contract_name}.bin')
     if args is not None:
         tx_hash = web3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact()
     else:
@@ -189,8 +188,26 @@ class DssDeployment:
             self.collaterals = collaterals or {}
 
         @staticmethod
-        def from_json(web3: Web3, conf: str):
+        def from_json(web3: Web3, conf: str, network: Optional[str] = None):
+            """Instantiate all the contracts of the deployment described by `conf`.
+
+            Existence of all the contracts gets checked up front, with JSON-RPC batches (see
+            :py:meth:`pymaker.util.ContractCache.verify`), so constructing them does not need
+            any further requests.
+
+            Args:
+                web3: An instance of `Web3` from `web3.py`.
+                conf: JSON description of all the system addresses.
+                network: Name of the network, queried from the node if not specified.
+            """
+            assert isinstance(network, str) or (network is None)
+
             conf = json.loads(conf)
+            if network is None:
+                network = DssDeployment.NETWORKS.get(web3.net.version, "testnet")
+
+            Contract.contract_cache.verify(web3, [Address(address) for address in conf.values()])
+
             pause = DSPause(web3, Address(conf['MCD_PAUSE']))
             vat = Vat(web3, Address(conf['MCD_VAT']))
             vow = Vow(web3, Address(conf['MCD_VOW']))
@@ -213,35 +230,38 @@ class DssDeployment:
 
             collaterals = {}
             for name in DssDeployment.Config._infer_collaterals_from_addresses(conf.keys()):
-                ilk = Ilk(name[0].replace('_', '-'))
-                if name[1] == "ETH":
-                    gem = DSEthToken(web3, Address(conf[name[1]]))
-                else:
-                    gem = DSToken(web3, Address(conf[name[1]]))
-
-                if name[1] in ['USDC', 'WBTC', 'TUSD']:
-                    adapter = GemJoin5(web3, Address(conf[f'MCD_JOIN_{name[0]}']))
-                else:
-                    adapter = GemJoin(web3, Address(conf[f'MCD_JOIN_{name[0]}']))
-
-                # PIP contract may be a DSValue, OSM, or bogus address.
-                pip_address = Address(conf[f'PIP_{name[1]}'])
-                network = DssDeployment.NETWORKS.get(web3.net.version, "testnet")
-                if network == "testnet":
-                    pip = DSValue(web3, pip_address)
-                else:
-                    pip = OSM(web3, pip_address)
-
-                collateral = Collateral(ilk=ilk, gem=gem, adapter=adapter,
-                                        flipper=Flipper(web3, Address(conf[f'MCD_FLIP_{name[0]}'])),
-                                        pip=pip)
-                collaterals[ilk.name] = collateral
+                collateral = DssDeployment.Config._collateral_from_json(web3, conf, name, network)
+                collaterals[collateral.ilk.name] = collateral
 
             return DssDeployment.Config(pause, vat, vow, jug, cat, flapper, flopper, pot,
                                         dai, dai_adapter, mkr, spotter, ds_chief, esm, end,
                                         proxy_registry, dss_proxy_actions, cdp_manager,
                                         dsr_manager, collaterals)
 
+        @staticmethod
+        def _collateral_from_json(web3: Web3, conf: dict, name: tuple, network: str) -> Collateral:
+            ilk = Ilk(name[0].replace('_', '-'))
+            if name[1] == "ETH":
+                gem = DSEthToken(web3, Address(conf[name[1]]))
+            else:
+                gem = DSToken(web3, Address(conf[name[1]]))
+
+            if name[1] in ['USDC', 'WBTC', 'TUSD']:
+                adapter = GemJoin5(web3, Address(conf[f'MCD_JOIN_{name[0]}']))
+            else:
+                adapter = GemJoin(web3, Address(conf[f'MCD_JOIN_{name[0]}']))
+
+            # PIP contract may be a DSValue, OSM, or bogus address.
+            pip_address = Address(conf[f'PIP_{name[1]}'])
+            if network == "testnet":
+                pip = DSValue(web3, pip_address)
+            else:
+                pip = OSM(web3, pip_address)
+
+            return Collateral(ilk=ilk, gem=gem, adapter=adapter,
+                              flipper=Flipper(web3, Address(conf[f'MCD_FLIP_{name[0]}'])),
+                              pip=pip)
+
         @staticmethod
         def _infer_collaterals_from_addresses(keys: []) -> List:
             collaterals = []
@@ -321,12 +341,44 @@ class DssDeployment:
         self.dsr_manager = config.dsr_manager
 
     @staticmethod
-    def from_json(web3: Web3, conf: str):
-        return DssDeployment(web3, DssDeployment.Config.from_json(web3, conf))
+    def from_json(web3: Web3, conf: str, network: Optional[str] = None):
+        return DssDeployment(web3, DssDeployment.Config.from_json(web3, conf, network))
 
     def to_json(self) -> str:
         return self.config.to_json()
 
+    def to_snapshot(self) -> str:
+        """Serialize the deployment, so it can be restored with `from_snapshot` on keeper restart.
+
+        Unlike `to_json`, the snapshot also records the chain it was taken on, and restoring
+        it does not check for contract existence again.
+        """
+        return json.dumps({'chain_id': Contract.contract_cache.chain_id(self.web3),
+                           'network': DssDeployment.NETWORKS.get(self.web3.net.version, "testnet"),
+                           'config': self.config.to_dict()})
+
+    @staticmethod
+    def from_snapshot(web3: Web3, snapshot: str):
+        """Restore a deployment serialized with `to_snapshot`, without querying the node for any contract.
+
+        Args:
+            web3: An instance of `Web3` from `web3.py`.
+            snapshot: The snapshot, as returned by `to_snapshot`.
+        """
+        assert isinstance(web3, Web3)
+        assert isinstance(snapshot, str)
+
+        snapshot = json.loads(snapshot)
+        chain_id = Contract.contract_cache.chain_id(web3)
+        if snapshot['chain_id'] != chain_id:
+            raise Exception(f"Deployment snapshot was taken on chain {snapshot['chain_id']}, not on chain {chain_id}")
+
+        # all contracts in the snapshot had been verified to exist before it was taken
+        conf = snapshot['config']
+        Contract.contract_cache.add(web3, [Address(address) for address in conf.values()])
+
+        return DssDeployment(web3, DssDeployment.Config.from_json(web3, json.dumps(conf), network=snapshot['network']))
+
     @staticmethod
     def from_node(web3: Web3):
         assert isinstance(web3, Web3)
@@ -343,7 +395,7 @@ class DssDeployment:
         cwd = os.path.dirname(os.path.realpath(__file__))
         addresses_path = os.path.join(cwd, "../config", f"{network}-addresses.json")
 
-        return DssDeployment.from_json(web3=web3, conf=open(addresses_path, "r").read())
+        return DssDeployment.from_json(web3=web3, conf=open(addresses_path, "r").read(), network=network)
 
     def approve_dai(self, usr: Address, **kwargs):
         """
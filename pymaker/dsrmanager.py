@@ -32,8 +32,8 @@ class DsrManager(Contract):
     Ref. <https://github.com/makerdao/dsr-manager/blob/master/src/DsrManager.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DsrManager.abi')
-    bin = Contract._load_bin(__name__, 'abi/DsrManager.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DsrManager.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DsrManager.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
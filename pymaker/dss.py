@@ -163,7 +163,6 @@ class Join(Contract):
         self.web3 = web3
         self.address = address
         self._contract = self._get_contract(web3, self.abi, address)
-        self._token: DSToken = None
 
     def approve(self, approval_function, source: Address):
         assert(callable(approval_function))
@@ -195,12 +194,20 @@ class DaiJoin(Join):
     Ref. <https://github.com/makerdao/dss/blob/master/src/join.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DaiJoin.abi')
-    bin = Contract._load_bin(__name__, 'abi/DaiJoin.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DaiJoin.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DaiJoin.bin')
 
     def __init__(self, web3: Web3, address: Address):
         super(DaiJoin, self).__init__(web3, address)
-        self._token = self.dai()
+        self._dai: Optional[DSToken] = None
+
+    @property
+    def _token(self) -> DSToken:
+        # the token is only looked up when first needed, so constructing the join costs no `eth_call`
+        if self._dai is None:
+            self._dai = self.dai()
+
+        return self._dai
 
     def dai(self) -> DSToken:
         address = Address(self._contract.functions.dai().call())
@@ -213,12 +220,20 @@ class GemJoin(Join):
     Ref. <https://github.com/makerdao/dss/blob/master/src/join.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/GemJoin.abi')
-    bin = Contract._load_bin(__name__, 'abi/GemJoin.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/GemJoin.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/GemJoin.bin')
 
     def __init__(self, web3: Web3, address: Address):
         super(GemJoin, self).__init__(web3, address)
-        self._token = self.gem()
+        self._gem: Optional[DSToken] = None
+
+    @property
+    def _token(self) -> DSToken:
+        # the token is only looked up when first needed, so constructing the join costs no `eth_call`
+        if self._gem is None:
+            self._gem = self.gem()
+
+        return self._gem
 
     def ilk(self):
         return Ilk.fromBytes(self._contract.functions.ilk().call())
@@ -236,12 +251,8 @@ class GemJoin5(GemJoin):
 
     Ref. <https://github.com/makerdao/dss-deploy/blob/master/src/join.sol#L274>
     """
-    abi = Contract._load_abi(__name__, 'abi/GemJoin5.abi')
-    bin = Contract._load_bin(__name__, 'abi/GemJoin5.bin')
-
-    def __init__(self, web3: Web3, address: Address):
-        super(GemJoin5, self).__init__(web3, address)
-        self._token = self.gem()
+    abi = Contract._lazy_abi(__name__, 'abi/GemJoin5.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/GemJoin5.bin')
 
     def dec(self) -> int:
         return int(self._contract.functions.dec().call())
@@ -302,8 +313,8 @@ class Vat(Contract):
         def __repr__(self):
             return f"LogFrob({pformat(vars(self))})"
 
-    abi = Contract._load_abi(__name__, 'abi/Vat.abi')
-    bin = Contract._load_bin(__name__, 'abi/Vat.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Vat.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Vat.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -585,8 +596,8 @@ class Spotter(Contract):
     Ref. <https://github.com/makerdao/dss-deploy/blob/master/src/poke.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Spotter.abi')
-    bin = Contract._load_bin(__name__, 'abi/Spotter.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Spotter.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Spotter.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -624,8 +635,8 @@ class Vow(Contract):
     Ref. <https://github.com/makerdao/dss/blob/master/src/heal.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Vow.abi')
-    bin = Contract._load_bin(__name__, 'abi/Vow.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Vow.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Vow.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -634,7 +645,14 @@ class Vow(Contract):
         self.web3 = web3
         self.address = address
         self._contract = self._get_contract(web3, self.abi, address)
-        self.vat = Vat(web3, Address(self._contract.functions.vat().call()))
+        self._vat = None
+
+    @property
+    def vat(self) -> Vat:
+        if self._vat is None:
+            self._vat = Vat(self.web3, Address(self._contract.functions.vat().call()))
+
+        return self._vat
 
     def rely(self, guy: Address) -> Transact:
         assert isinstance(guy, Address)
@@ -715,8 +733,8 @@ class Jug(Contract):
     Ref. <https://github.com/makerdao/dss/blob/master/src/jug.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Jug.abi')
-    bin = Contract._load_bin(__name__, 'abi/Jug.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Jug.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Jug.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -725,8 +743,22 @@ class Jug(Contract):
         self.web3 = web3
         self.address = address
         self._contract = self._get_contract(web3, self.abi, address)
-        self.vat = Vat(web3, Address(self._contract.functions.vat().call()))
-        self.vow = Vow(web3, Address(self._contract.functions.vow().call()))
+        self._vat = None
+        self._vow = None
+
+    @property
+    def vat(self) -> Vat:
+        if self._vat is None:
+            self._vat = Vat(self.web3, Address(self._contract.functions.vat().call()))
+
+        return self._vat
+
+    @property
+    def vow(self) -> Vow:
+        if self._vow is None:
+            self._vow = Vow(self.web3, Address(self._contract.functions.vow().call()))
+
+        return self._vow
 
     def init(self, ilk: Ilk) -> Transact:
         assert isinstance(ilk, Ilk)
@@ -802,8 +834,8 @@ class Cat(Contract):
         def __repr__(self):
             return pformat(vars(self))
 
-    abi = Contract._load_abi(__name__, 'abi/Cat.abi')
-    bin = Contract._load_bin(__name__, 'abi/Cat.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Cat.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Cat.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -812,8 +844,22 @@ class Cat(Contract):
         self.web3 = web3
         self.address = address
         self._contract = self._get_contract(web3, self.abi, address)
-        self.vat = Vat(web3, Address(self._contract.functions.vat().call()))
-        self.vow = Vow(web3, Address(self._contract.functions.vow().call()))
+        self._vat = None
+        self._vow = None
+
+    @property
+    def vat(self) -> Vat:
+        if self._vat is None:
+            self._vat = Vat(self.web3, Address(self._contract.functions.vat().call()))
+
+        return self._vat
+
+    @property
+    def vow(self) -> Vow:
+        if self._vow is None:
+            self._vow = Vow(self.web3, Address(self._contract.functions.vow().call()))
+
+        return self._vow
 
     def live(self) -> bool:
         return self._contract.functions.live().call() > 0
@@ -888,8 +934,8 @@ class Pot(Contract):
     Ref. <https://github.com/makerdao/dss/blob/master/src/pot.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Pot.abi')
-    bin = Contract._load_bin(__name__, 'abi/Pot.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Pot.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Pot.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -15,23 +15,29 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 import hashlib
 import json
 import logging
 import random
 import threading
+from collections import deque
+from concurrent.futures import Future
 from pprint import pformat
-from subprocess import Popen, PIPE
-from typing import List
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse
 
+import websockets
+from eth_account.messages import defunct_hash_message
 from web3 import Web3
 
 from pymaker import Contract, Address, Transact
 from pymaker.numeric import Wad
-from pymaker.sign import eth_sign, to_vrs
+from pymaker.providers import make_batch_calls
+from pymaker.sign import eth_sign, recover_message_hashes, to_vrs
 from pymaker.tightly_packed import encode_address, encode_uint256
 from pymaker.token import ERC20Token
-from pymaker.util import bytes_to_hexstring, hexstring_to_bytes
+from pymaker.util import abi_encode_single, bytes_to_hexstring, function_selector, hexstring_to_bytes
 
 
 class Order:
@@ -171,8 +177,8 @@ class EtherDelta(Contract):
         address: Ethereum address of the `EtherDelta` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/EtherDelta.abi')
-    bin = Contract._load_bin(__name__, 'abi/EtherDelta.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/EtherDelta.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/EtherDelta.bin')
 
     ETH_TOKEN = Address('0x0000000000000000000000000000000000000000')
 
@@ -416,13 +422,7 @@ class EtherDelta(Contract):
         assert(buy_amount > Wad(0))
 
         nonce = self.random_nonce()
-        order_hash = hashlib.sha256(encode_address(self.address) +
-                                    encode_address(buy_token) +
-                                    encode_uint256(buy_amount.value) +
-                                    encode_address(pay_token) +
-                                    encode_uint256(pay_amount.value) +
-                                    encode_uint256(expires) +
-                                    encode_uint256(nonce)).digest()
+        order_hash = self._order_hash(pay_token, pay_amount, buy_token, buy_amount, expires, nonce)
 
         signature = eth_sign(order_hash, self.web3)
         v, r, s = to_vrs(signature)
@@ -430,6 +430,42 @@ class EtherDelta(Contract):
         return Order(self, Address(self.web3.eth.defaultAccount), pay_token, pay_amount, buy_token, buy_amount,
                      expires, nonce, v, r, s)
 
+    def get_order_hash(self, order: Order) -> str:
+        """Calculates the hash of an order.
+
+        The hash is calculated locally, exactly the same way the EtherDelta contract calculates it.
+
+        Args:
+            order: The order you want to calculate the hash of.
+
+        Returns:
+            The order hash as a hex string starting with `0x`.
+        """
+        assert(isinstance(order, Order))
+        return bytes_to_hexstring(self._order_hash(order.pay_token, order.pay_amount, order.buy_token,
+                                                   order.buy_amount, order.expires, order.nonce))
+
+    def validate_signatures(self, orders: List[Order], processes: Optional[int] = None) -> List[bool]:
+        """Checks locally whether orders have been signed by their makers.
+
+        Orders placed on-chain (with the `order` function of the contract) do not need a valid
+        signature to be taken, :py:meth:`amounts_available` takes them into account.
+
+        Args:
+            orders: The orders you want to check the signatures of.
+            processes: Number of worker processes recovering signatures, see :py:func:`pymaker.sign.recover_message_hashes`.
+
+        Returns:
+            `True` for each order signed by its maker, `False` otherwise.
+        """
+        assert(isinstance(orders, list))
+
+        message_hashes = [bytes(defunct_hash_message(primitive=hexstring_to_bytes(self.get_order_hash(order))))
+                          for order in orders]
+        signers = recover_message_hashes(message_hashes, [(order.v, order.r, order.s) for order in orders], processes)
+
+        return [signer is not None and signer == order.maker for signer, order in zip(signers, orders)]
+
     def amount_available(self, order: Order) -> Wad:
         """Returns the amount that is still available (tradeable) for an order.
 
@@ -483,6 +519,75 @@ class EtherDelta(Contract):
                                                       order.r if hasattr(order, 'r') else bytes(),
                                                       order.s if hasattr(order, 's') else bytes()).call())
 
+    def amounts_filled(self, orders: List[Order]) -> List[Wad]:
+        """Returns the amounts that have been already filled for many orders at once.
+
+        Does the same as :py:meth:`amount_filled`, but order hashes get calculated locally and all
+        fills are queried in JSON-RPC batches instead of with one `eth_call` per order, all at
+        the same block.
+
+        Args:
+            orders: The orders you want to know the filled amounts of.
+
+        Returns:
+            The amounts already filled for the orders, in terms of `buy_token`.
+        """
+        assert(isinstance(orders, list))
+
+        if not orders:
+            return []
+
+        block_number = self.web3.eth.blockNumber
+        return list(map(Wad, self._call_many([self._order_fills_call(order) for order in orders], block_number)))
+
+    def amounts_available(self, orders: List[Order]) -> List[Wad]:
+        """Returns the amounts that are still available (tradeable) for many orders at once.
+
+        Does the same as :py:meth:`amount_available`, but the contract logic gets reproduced locally.
+        Signatures get verified with :py:meth:`validate_signatures`, then the fills of all orders,
+        the EtherDelta balances of their makers and (only for orders without a valid signature)
+        whether the orders have been placed on-chain get queried in JSON-RPC batches, all at
+        the same block.
+
+        Args:
+            orders: The orders you want to know the available amounts of.
+
+        Returns:
+            The available amounts for the orders, in terms of `buy_token`.
+        """
+        assert(isinstance(orders, list))
+
+        if not orders:
+            return []
+
+        block_number = self.web3.eth.blockNumber
+        signed = self.validate_signatures(orders)
+        balances = list(dict.fromkeys((order.pay_token.address, order.maker.address) for order in orders))
+        unsigned = [index for index, valid in enumerate(signed) if not valid]
+
+        calls = [self._order_fills_call(order) for order in orders] + \
+                [('tokens(address,address)', '(address,address)', balance) for balance in balances] + \
+                [('orders(address,bytes32)', '(address,bytes32)', self._maker_and_hash(orders[index]))
+                 for index in unsigned]
+        values = self._call_many(calls, block_number)
+
+        fills = values[:len(orders)]
+        balance_of = dict(zip(balances, values[len(orders):len(orders) + len(balances)]))
+        placed = dict(zip(unsigned, values[len(orders) + len(balances):]))
+
+        result = []
+        for index, order in enumerate(orders):
+            if not (signed[index] or placed[index]) or block_number > order.expires:
+                result.append(Wad(0))
+                continue
+
+            available1 = order.buy_amount.value - fills[index]
+            available2 = balance_of[(order.pay_token.address, order.maker.address)] * order.buy_amount.value \
+                         // order.pay_amount.value
+            result.append(Wad(min(available1, available2)))
+
+        return result
+
     def trade(self, order: Order, amount: Wad) -> Transact:
         """Takes (buys) an order.
 
@@ -569,6 +674,37 @@ class EtherDelta(Contract):
                          order.r if hasattr(order, 'r') else bytes(),
                          order.s if hasattr(order, 's') else bytes()])
 
+    def _order_hash(self, pay_token: Address, pay_amount: Wad, buy_token: Address, buy_amount: Wad,
+                    expires: int, nonce: int) -> bytes:
+        return hashlib.sha256(encode_address(self.address) +
+                              encode_address(buy_token) +
+                              encode_uint256(buy_amount.value) +
+                              encode_address(pay_token) +
+                              encode_uint256(pay_amount.value) +
+                              encode_uint256(expires) +
+                              encode_uint256(nonce)).digest()
+
+    def _maker_and_hash(self, order: Order) -> Tuple[str, bytes]:
+        return order.maker.address, hexstring_to_bytes(self.get_order_hash(order))
+
+    def _order_fills_call(self, order: Order) -> tuple:
+        return 'orderFills(address,bytes32)', '(address,bytes32)', self._maker_and_hash(order)
+
+    def _call_many(self, calls: List[tuple], block_number: int) -> List[int]:
+        results = make_batch_calls(self.web3, [(self.address, function_selector(signature) +
+                                                abi_encode_single(types, args)) for signature, types, args in calls],
+                                   block_number)
+
+        values = []
+        for (signature, _, _), result in zip(calls, results):
+            # all the functions called return a single word, no data means there is no contract to call
+            if len(result) == 0:
+                raise ValueError(f"Call to {signature} on {self} returned no data")
+
+            values.append(int.from_bytes(result, 'big'))
+
+        return values
+
     @staticmethod
     def random_nonce():
         return random.randint(1, 2**32 - 1)
@@ -577,78 +713,337 @@ class EtherDelta(Contract):
         return f"EtherDelta('{self.address}')"
 
 
-class EtherDeltaApi:
-    """A client for the EtherDelta API backend.
+class _Publication:
+    def __init__(self, order: dict, future: Future):
+        self.order = order
+        self.future = future
+        self.attempts = 0
+
+
+class EtherDeltaPublisher:
+    """Publishes orders to the EtherDelta API backend over a persistent socket.io connection.
+
+    Orders passed to :py:meth:`publish` get queued and sent by a background thread, which keeps
+    a websocket connection to the backend open and reconnects with exponential backoff if it breaks.
+    Orders queued while the connection is busy or down get sent together, without waiting for
+    the acknowledgements of each other.
+
+    The backend replies to every order with a `messageResult` event, in the same order the orders
+    have been sent in. Orders it rejects are sent again after `retry_interval` seconds, up to
+    `number_of_attempts` times. Orders which have not been accepted within `timeout` seconds
+    are considered as failed.
 
     Attributes:
-        client_tool_directory: Directory containing the `etherdelta-client` tool.
-        client_tool_command: Command for running the `etherdelta-client` tool.
         api_server: Base URL of the EtherDelta API backend server.
-        number_of_attempts: Number of attempts to run the `etherdelta-client` tool.
-        retry_interval: Interval between subsequent retries if order placement failed,
-            within one `etherdelta-client` run.
-        timeout: Timeout after which publish order is considered as failed by the
-            `etherdelta-client` tool. If number_of_attempts > 1, this tool will be
-            run several times though.
+        number_of_attempts: Number of attempts to publish each order.
+        retry_interval: Interval between subsequent attempts if order placement failed (in seconds).
+        timeout: Timeout after which publishing an order is considered as failed (in seconds).
+        max_backoff: Maximum delay before reconnecting to the backend (in seconds).
+        batch_size: Maximum number of orders sent without yielding to incoming messages.
     """
     logger = logging.getLogger()
 
-    def __init__(self,
-                 client_tool_directory: str,
-                 client_tool_command: str,
-                 api_server: str,
-                 number_of_attempts: int,
-                 retry_interval: int,
-                 timeout: int):
-        assert(isinstance(client_tool_directory, str))
-        assert(isinstance(client_tool_command, str))
+    ORDER_ACCEPTED = 'Added/updated order.'
+
+    def __init__(self, api_server: str, number_of_attempts: int = 3, retry_interval: float = 5,
+                 timeout: float = 60, max_backoff: float = 60, batch_size: int = 50):
         assert(isinstance(api_server, str))
         assert(isinstance(number_of_attempts, int))
-        assert(isinstance(retry_interval, int))
-        assert(isinstance(timeout, int))
+        assert(isinstance(retry_interval, (int, float)))
+        assert(isinstance(timeout, (int, float)))
+        assert(isinstance(max_backoff, (int, float)))
+        assert(isinstance(batch_size, int))
+        assert(number_of_attempts > 0)
+        assert(batch_size > 0)
 
-        self.client_tool_directory = client_tool_directory
-        self.client_tool_command = client_tool_command
         self.api_server = api_server
         self.number_of_attempts = number_of_attempts
         self.retry_interval = retry_interval
         self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._error = None
+        self._in_flight = deque()
+        self.connected = threading.Event()
 
-    def publish_order(self, order: Order):
-        assert(isinstance(order, Order))
+    @property
+    def url(self) -> str:
+        url = urlparse(self.api_server)
+        scheme = 'wss' if url.scheme in ('https', 'wss') else 'ws'
+        return urlunparse((scheme, url.netloc, '/socket.io/', '', 'EIO=3&transport=websocket', ''))
 
-        def _publish_order_via_client() -> bool:
-            process = Popen(self.client_tool_command.split() + ['--url', self.api_server,
-                                                                '--timeout', str(self.timeout),
-                                                                '--retry-interval', str(self.retry_interval),
-                                                                json.dumps(order.to_json())],
-                            cwd=self.client_tool_directory, stdin=PIPE, stdout=PIPE, stderr=PIPE, shell=False)
+    def publish(self, order: dict) -> Future:
+        """Queue an order for publishing.
 
-            result = process.communicate(None, timeout=self.timeout+15)
-            stdout = result[0].decode("utf-8").rstrip().replace('\n', ' -> ')
-            stderr = result[1].decode("utf-8").rstrip().replace('\n', ' -> ')
+        Args:
+            order: The order, as returned by :py:meth:`pymaker.etherdelta.Order.to_json`.
 
-            if len(stdout) > 0:
-                if process.returncode == 0:
-                    self.logger.info(f"Output from 'etherdelta-client': {stdout}")
-                else:
-                    self.logger.warning(f"Non-zero exit code output from 'etherdelta-client': {stdout}")
+        Returns:
+            A `concurrent.futures.Future` which resolves to `True` once the backend accepts the order,
+            or to `False` if it does not accept it within `timeout` seconds or `number_of_attempts` attempts.
+        """
+        assert(isinstance(order, dict))
+
+        self._start()
+
+        publication = _Publication(order, Future())
+        self._loop.call_soon_threadsafe(self._enqueue, publication)
+        return publication.future
+
+    def stop(self):
+        """Close the connection and stop the background thread. Orders still being published are failed."""
+        with self._lock:
+            if self._thread is None:
+                return
+
+            if self._thread.is_alive():
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join()
+            self._thread = None
+            self._ready.clear()
+
+    def _start(self):
+        with self._lock:
+            # start again if the background thread has failed, either at startup or later on
+            if self._thread is not None and self._ready.is_set() and \
+                    (self._queue is None or not self._thread.is_alive()):
+                self._thread.join()
+                self._thread = None
+
+            if self._thread is None:
+                self._ready.clear()
+                self._loop = asyncio.new_event_loop()
+                self._queue = None
+                self._error = None
+                self._thread = threading.Thread(target=self._main, daemon=True, name="etherdelta-publisher")
+                self._thread.start()
+
+        self._ready.wait()
+        if self._queue is None:
+            raise RuntimeError(f"Unable to start publishing to the EtherDelta backend at {self.api_server}") \
+                from self._error
+
+    def _main(self):
+        try:
+            self._task = asyncio.ensure_future(self._run(), loop=self._loop)
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._error = e
+            self.logger.exception(f"Publishing to the EtherDelta backend at {self.api_server} has failed")
+        finally:
+            # wake up callers waiting in `_start()` even if the publisher has failed to start
+            self._ready.set()
+            self._loop.close()
+
+    def _enqueue(self, publication: _Publication):
+        self._loop.call_later(self.timeout, self._finish, publication, False)
+        self._queue.put_nowait(publication)
+
+    def _finish(self, publication: _Publication, result: bool):
+        if not publication.future.done():
+            if result:
+                self.logger.info(f"Order {publication.order} published successfully")
+            else:
+                self.logger.warning(f"Failed to publish order {publication.order}")
+
+            publication.future.set_result(result)
+
+    async def _run(self):
+        self._queue = asyncio.Queue()
+        self._ready.set()
+
+        backoff = 0.5
+        try:
+            while True:
+                try:
+                    async with websockets.connect(self.url, close_timeout=1) as websocket:
+                        ping_interval = await asyncio.wait_for(self._handshake(websocket), self.timeout)
+                        self.logger.info(f"Connected to the EtherDelta backend at {self.api_server}")
+                        self.connected.set()
+                        backoff = 0.5
+
+                        await self._communicate(websocket, ping_interval)
+
+                except asyncio.CancelledError:
+                    raise
+
+                except Exception as e:
+                    self.logger.warning(f"Connection to the EtherDelta backend at {self.api_server} failed ({e}),"
+                                        f" reconnecting in {backoff:.1f}s")
+
+                finally:
+                    self.connected.clear()
+                    self._requeue_in_flight()
+
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+        finally:
+            while not self._queue.empty():
+                self._finish(self._queue.get_nowait(), False)
+            while self._in_flight:
+                self._finish(self._in_flight.popleft(), False)
+
+    async def _handshake(self, websocket) -> float:
+        # [Engine.IO `open` packet, followed by Socket.IO `connect` to the default namespace]
+        packet = await websocket.recv()
+        if not packet.startswith('0'):
+            raise ConnectionError(f"Unexpected handshake packet '{packet}'")
+
+        ping_interval = json.loads(packet[1:]).get('pingInterval', 25000) / 1000
+        while packet != '40':
+            packet = await websocket.recv()
+
+        return ping_interval
+
+    async def _communicate(self, websocket, ping_interval: float):
+        tasks = [asyncio.ensure_future(self._send(websocket)),
+                 asyncio.ensure_future(self._receive(websocket)),
+                 asyncio.ensure_future(self._ping(websocket, ping_interval))]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(self, websocket):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            for index, publication in enumerate(batch):
+                if publication.future.done():
+                    continue
+
+                publication.attempts += 1
+                self.logger.info(f"Sending order (attempt #{publication.attempts}): {publication.order}")
+
+                self._in_flight.append(publication)
+                try:
+                    await websocket.send('42' + json.dumps(['message', publication.order]))
+                except BaseException:
+                    for remaining in batch[index + 1:]:
+                        self._queue.put_nowait(remaining)
+                    raise
+
+    async def _receive(self, websocket):
+        async for packet in websocket:
+            if packet == '2':
+                await websocket.send('3')
+
+            elif packet.startswith('42'):
+                event = json.loads(packet[2:])
+                if event[0] == 'messageResult':
+                    self._acknowledge(event[1] if len(event) > 1 else None)
+
+            elif packet == '1' or packet.startswith('41'):
+                raise ConnectionError("Disconnected by the backend")
+
+        raise ConnectionError("Connection closed by the backend")
+
+    async def _ping(self, websocket, ping_interval: float):
+        while True:
+            await asyncio.sleep(ping_interval)
+            await websocket.send('2')
+
+    def _acknowledge(self, result):
+        if not self._in_flight:
+            self.logger.warning(f"Unexpected response from the EtherDelta backend: {result}")
+            return
+
+        publication = self._in_flight.popleft()
+        if publication.future.done():
+            return
+
+        if isinstance(result, list) and len(result) > 0 and result[0] == self.ORDER_ACCEPTED:
+            self._finish(publication, True)
+
+        elif publication.attempts < self.number_of_attempts:
+            self.logger.warning(f"Order placement failed ({result}), retrying in {self.retry_interval}s")
+            self._loop.call_later(self.retry_interval, self._queue.put_nowait, publication)
+
+        else:
+            self.logger.warning(f"Order placement failed ({result})")
+            self._finish(publication, False)
+
+    def _requeue_in_flight(self):
+        # [orders lost with the connection do not count as failed attempts]
+        while self._in_flight:
+            publication = self._in_flight.popleft()
+            if not publication.future.done():
+                publication.attempts -= 1
+                self._queue.put_nowait(publication)
+
+    def __repr__(self):
+        return f"EtherDeltaPublisher('{self.api_server}')"
 
-            if len(stderr) > 0:
-                self.logger.fatal(f"Error from 'etherdelta-client': {stderr}")
 
-            return process.returncode == 0
+class EtherDeltaApi:
+    """A client for the EtherDelta API backend.
 
-        def _run():
-            for attempt in range(self.number_of_attempts):
-                self.logger.info(f"Sending order (attempt #{attempt+1}): {order}")
-                if _publish_order_via_client():
-                    self.logger.info(f"Order {order} sent successfully")
-                    return
+    Orders get published through a single :py:class:`EtherDeltaPublisher`, which keeps
+    a persistent socket.io connection to the backend.
 
-            self.logger.warning(f"Failed to send order {order}")
+    The `client_tool_directory` and `client_tool_command` arguments are kept first, so existing
+    callers passing all the arguments positionally keep working, but are ignored. All the other
+    arguments are required.
+
+    Attributes:
+        client_tool_directory: Ignored, the `etherdelta-client` tool is not used anymore.
+        client_tool_command: Ignored, the `etherdelta-client` tool is not used anymore.
+        api_server: Base URL of the EtherDelta API backend server.
+        number_of_attempts: Number of attempts to publish each order.
+        retry_interval: Interval between subsequent attempts if order placement failed (in seconds).
+        timeout: Timeout after which publishing an order is considered as failed (in seconds).
+    """
+    logger = logging.getLogger()
+
+    def __init__(self,
+                 client_tool_directory: Optional[str] = None,
+                 client_tool_command: Optional[str] = None,
+                 api_server: Optional[str] = None,
+                 number_of_attempts: Optional[int] = None,
+                 retry_interval: Optional[int] = None,
+                 timeout: Optional[int] = None):
+        assert(isinstance(client_tool_directory, str) or (client_tool_directory is None))
+        assert(isinstance(client_tool_command, str) or (client_tool_command is None))
+        assert(isinstance(api_server, str))
+        assert(isinstance(number_of_attempts, int))
+        assert(isinstance(retry_interval, int))
+        assert(isinstance(timeout, int))
+
+        self.api_server = api_server
+        self.number_of_attempts = number_of_attempts
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.publisher = EtherDeltaPublisher(api_server=api_server,
+                                             number_of_attempts=number_of_attempts,
+                                             retry_interval=retry_interval,
+                                             timeout=timeout)
+
+    def publish_order(self, order: Order) -> Future:
+        """Publish an order asynchronously.
+
+        Returns:
+            A `concurrent.futures.Future` resolving to `True` once the backend accepts the order,
+            or to `False` if publishing it has failed.
+        """
+        assert(isinstance(order, Order))
 
-        threading.Thread(target=_run, daemon=True).start()
+        return self.publisher.publish(order.to_json())
 
     def __repr__(self):
         return f"EtherDeltaApi()"
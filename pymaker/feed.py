@@ -45,8 +45,8 @@ class DSValue(DSAuth):
         address: Ethereum address of the `DSValue` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSValue.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSValue.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSValue.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSValue.bin')
 
     @staticmethod
     def deploy(web3: Web3):
@@ -16,7 +16,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
-from typing import Optional
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from typing import Optional, Tuple
+
+from web3 import Web3
 
 
 class GasPrice(object):
@@ -54,6 +60,80 @@ class GasPrice(object):
         """
         raise NotImplementedError("Please implement this method")
 
+    def get_next_change(self, time_elapsed: int) -> Optional[int]:
+        """Return the point in time at which the gas price may change next.
+
+        Used by :py:class:`pymaker.Transact` to avoid asking for the gas price again while it
+        is known not to change. The default implementation returns `time_elapsed` itself,
+        which means the gas price may change at any moment and has to be queried every time.
+
+        Args:
+            time_elapsed: Number of seconds since this specific Ethereum transaction
+                has been originally sent for the first time.
+
+        Returns:
+            The lowest number of seconds elapsed, for which `get_gas_price` may return a different
+            value than for `time_elapsed`, or `None` if the gas price will never change again.
+        """
+        return time_elapsed
+
+    def get_next_scheduled_change(self, time_elapsed: int) -> Optional[int]:
+        """Return the point in time at which the strategy is scheduled to change the gas price next.
+
+        Used by :py:class:`pymaker.Transact` to sign replacement transactions up front. Unlike
+        :py:meth:`get_next_change`, it may ignore changes driven by the market (i.e. by the base fee
+        of new blocks), as these get followed once all the pre-signed replacements have been sent.
+        The default implementation returns the same as :py:meth:`get_next_change`.
+
+        Args:
+            time_elapsed: Number of seconds since this specific Ethereum transaction
+                has been originally sent for the first time.
+
+        Returns:
+            The lowest number of seconds elapsed, for which the strategy is going to ask for
+            a different gas price, or `None` if it is not going to change it again.
+        """
+        return self.get_next_change(time_elapsed)
+
+    def get_gas_fees(self, time_elapsed: int) -> Optional[Tuple[int, int]]:
+        """Return EIP-1559 fee parameters applicable for a given point in time.
+
+        Strategies which return a value here make :py:class:`pymaker.Transact` send type-2
+        transactions, in which case `get_gas_price` does not get called at all. The default
+        implementation returns `None`, which means a legacy transaction with the gas price
+        returned by `get_gas_price` will be sent.
+
+        When replacing a type-2 transaction, both fee parameters have to go up by at least 10%.
+        :py:class:`pymaker.Transact` never raises the priority fee above the value returned here,
+        but it may raise the fee cap up to the limit returned by :py:meth:`get_max_fee_limit`.
+        If the minimum increase can not be met that way, the transaction does not get replaced.
+
+        Args:
+            time_elapsed: Number of seconds since this specific Ethereum transaction
+                has been originally sent for the first time.
+
+        Returns:
+            A `(max_fee_per_gas, max_priority_fee_per_gas)` tuple (both in Wei),
+            or `None` if a legacy transaction should be sent.
+        """
+        return None
+
+    def get_max_fee_limit(self, max_fee: int) -> Optional[int]:
+        """Return the highest fee cap :py:class:`pymaker.Transact` may use when replacing a type-2 transaction.
+
+        Unlike the priority fee, the fee cap is only an upper limit of what gets paid, so strategies
+        which only bump the priority fee may let the fee cap be raised above the value they ask for,
+        making the replacement acceptable to the node. The default implementation returns `max_fee`,
+        which means the fee cap never goes above the one returned by :py:meth:`get_gas_fees`.
+
+        Args:
+            max_fee: The fee cap currently returned by :py:meth:`get_gas_fees` (in Wei).
+
+        Returns:
+            The highest fee cap in Wei, or `None` if it is not limited.
+        """
+        return max_fee
+
 
 class DefaultGasPrice(GasPrice):
     """Default gas price.
@@ -65,6 +145,9 @@ class DefaultGasPrice(GasPrice):
     def get_gas_price(self, time_elapsed: int) -> Optional[int]:
         return None
 
+    def get_next_change(self, time_elapsed: int) -> Optional[int]:
+        return None
+
 
 class FixedGasPrice(GasPrice):
     """Fixed gas price.
@@ -140,6 +223,14 @@ class IncreasingGasPrice(GasPrice):
 
         return result
 
+    def get_next_change(self, time_elapsed: int) -> Optional[int]:
+        assert(isinstance(time_elapsed, int))
+
+        if self.max_price is not None and self.get_gas_price(time_elapsed) >= self.max_price:
+            return None
+
+        return (time_elapsed // self.every_secs + 1) * self.every_secs
+
 
 class GeometricGasPrice(GasPrice):
     """Geometrically increasing gas price.
@@ -169,15 +260,400 @@ class GeometricGasPrice(GasPrice):
         self.coefficient = coefficient
         self.max_price = max_price
 
+        # Gas prices for subsequent steps are computed once and reused, so asking for the gas price
+        # costs O(1) no matter how long the transaction has been pending. They are computed by repeated
+        # multiplication rather than `coefficient ** step` so the results stay exactly the same.
+        self._steps = [initial_price]
+        self._max_step = None
+        self._lock = threading.Lock()
+
+    def _step(self, time_elapsed: int) -> int:
+        step = time_elapsed // self.every_secs
+        if self._max_step is not None:
+            return min(step, self._max_step)
+
+        if step >= len(self._steps):
+            with self._lock:
+                while len(self._steps) <= step and self._max_step is None:
+                    self._steps.append(self._steps[-1] * self.coefficient)
+                    if self.max_price is not None and self._steps[-1] >= self.max_price:
+                        self._max_step = len(self._steps) - 1
+
+            if self._max_step is not None:
+                return min(step, self._max_step)
+
+        return step
+
     def get_gas_price(self, time_elapsed: int) -> Optional[int]:
         assert(isinstance(time_elapsed, int))
 
         if time_elapsed < self.every_secs:
             return self.initial_price
-        result = self.initial_price
-        for second in range(math.floor(time_elapsed/self.every_secs)):
-            result *= self.coefficient
+        result = self._steps[self._step(time_elapsed)]
         if self.max_price is not None:
             result = min(result, self.max_price)
 
         return math.ceil(result)
+
+    def get_next_change(self, time_elapsed: int) -> Optional[int]:
+        assert(isinstance(time_elapsed, int))
+
+        step = self._step(time_elapsed)
+        if step == self._max_step:
+            return None
+
+        return (time_elapsed // self.every_secs + 1) * self.every_secs
+
+
+class GasEstimateCache:
+    """Cache of gas estimates, keyed by sender, contract address, function name and shape of call arguments.
+
+    Gas used by repetitive keeper calls (i.e. `Flipper.tend`, `Vow.flog` or `Jug.drip`) hardly
+    depends on the actual argument values, so once it has been estimated there is no need
+    to make an `eth_estimateGas` round trip again before every transaction. The cache is opt-in,
+    it gets used by :py:class:`pymaker.Transact` once installed:
+
+        Transact.gas_estimate_cache = GasEstimateCache()
+
+    Estimates are served with `margin` added and get refreshed once they are older than
+    `refresh_interval` seconds. By default the refresh happens before sending the transaction.
+    In `concurrent` mode the transaction gets signed and sent with the previous estimate
+    straight away, while the new estimate is being obtained in the background.
+
+    Bear in mind that sending a transaction without estimating it first means it may fail
+    on-chain, where otherwise pymaker would refuse to send it. Entries of failed transactions
+    get evicted from the cache.
+
+    Attributes:
+        margin: Safety margin added to cached estimates, as a fraction (0.1 means 10%).
+        refresh_interval: Number of seconds after which an estimate needs to be refreshed.
+        concurrent: Whether stale estimates get refreshed concurrently with sending the transaction.
+    """
+    def __init__(self, margin: float = 0.1, refresh_interval: int = 600, concurrent: bool = False):
+        assert(isinstance(margin, (int, float)))
+        assert(isinstance(refresh_interval, int))
+        assert(isinstance(concurrent, bool))
+        assert(margin >= 0)
+        assert(refresh_interval > 0)
+
+        self.margin = margin
+        self.refresh_interval = refresh_interval
+        self.concurrent = concurrent
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def shape(value) -> object:
+        """Return the shape of a call argument, i.e. its type and, for variable-size values, the length.
+
+        Values of the same shape are expected to cost roughly the same amount of gas.
+        """
+        if isinstance(value, (list, tuple)):
+            return tuple(GasEstimateCache.shape(item) for item in value)
+        elif isinstance(value, (bytes, bytearray, str)):
+            return type(value).__name__, len(value)
+        else:
+            return type(value).__name__
+
+    def key(self, address, function_name: Optional[str], parameters: Optional[list], extra: Optional[dict],
+            from_address=None) -> tuple:
+        """Return the key estimates of a call get cached under.
+
+        The sender is part of the key, as its balances and allowances may make the same call
+        take a different path (and use a different amount of gas) than for other accounts.
+        """
+        extra = extra or {}
+        return (from_address, address, function_name, self.shape(parameters or []),
+                tuple(sorted((name, bool(value)) for name, value in extra.items())))
+
+    def get(self, key: tuple) -> Tuple[Optional[int], bool]:
+        """Return the cached estimate (with the margin added) and whether it is still fresh.
+
+        Returns:
+            A `(gas, fresh)` tuple, where `gas` is `None` if nothing has been cached under `key`.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+
+        if entry is None:
+            return None, False
+
+        estimate, timestamp = entry
+        return estimate + int(estimate * self.margin), time.time() - timestamp < self.refresh_interval
+
+    def put(self, key: tuple, estimate: int):
+        assert(isinstance(estimate, int))
+
+        with self._lock:
+            self.entries[key] = (estimate, time.time())
+
+    def invalidate(self, key: tuple):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries = {}
+
+
+class BlockFeeHistory:
+    """Rolling window of gas prices paid in recent blocks, shared by all `AdaptiveGasPrice` instances.
+
+    For each block the base fee (if the node reports one) and the gas prices of all transactions
+    included in it get recorded. Blocks are sampled once, no matter how many transactions
+    are pending, either by calling `update` directly (i.e. from a `Lifecycle.on_block` callback)
+    or implicitly by `AdaptiveGasPrice`, which asks for an update no more often than every
+    `refresh_interval` seconds.
+
+    Percentiles are computed once per new block and cached, so answering a query
+    costs O(1) until the next block gets recorded.
+
+    Attributes:
+        web3: An instance of `Web3` from `web3.py`, or `None` if blocks will only be added with `add_block`.
+        window: Number of most recent blocks taken into account.
+        refresh_interval: Minimum number of seconds between two subsequent node queries made by `refresh`.
+    """
+    def __init__(self, web3: Optional[Web3], window: int = 20, refresh_interval: float = 1.0):
+        assert(isinstance(web3, Web3) or (web3 is None))
+        assert(isinstance(window, int))
+        assert(isinstance(refresh_interval, (int, float)))
+        assert(window > 0)
+
+        self.web3 = web3
+        self.window = window
+        self.refresh_interval = refresh_interval
+        self.blocks = deque(maxlen=window)
+        self._last_refresh = None
+        self._percentiles = {}
+        self._lock = threading.RLock()
+
+    @property
+    def last_block_number(self) -> Optional[int]:
+        return self.blocks[-1][0] if len(self.blocks) > 0 else None
+
+    @property
+    def base_fee(self) -> Optional[int]:
+        """Base fee of the most recent block, or `None` if the node does not report base fees."""
+        return self.blocks[-1][1] if len(self.blocks) > 0 else None
+
+    def add_block(self, block: dict):
+        """Record a single block, as returned by `web3.eth.getBlock(..., full_transactions=True)`.
+
+        Blocks which are not newer than the most recent block recorded so far are ignored.
+        """
+        assert(isinstance(block, Mapping))
+
+        number = block['number']
+        with self._lock:
+            if self.last_block_number is not None and number <= self.last_block_number:
+                return
+
+            prices = sorted(tx['gasPrice'] for tx in block.get('transactions', []) if isinstance(tx, Mapping))
+            self.blocks.append((number, block.get('baseFeePerGas'), prices))
+            self._percentiles = {}
+
+    def update(self):
+        """Fetch and record all the blocks mined since the last update, up to `window` of them."""
+        assert(self.web3 is not None)
+
+        with self._lock:
+            latest = self.web3.eth.blockNumber
+            first = latest - self.window + 1
+            if self.last_block_number is not None:
+                first = max(first, self.last_block_number + 1)
+
+            for number in range(max(first, 0), latest + 1):
+                self.add_block(self.web3.eth.getBlock(number, full_transactions=True))
+
+            self._last_refresh = time.monotonic()
+
+    def refresh(self):
+        """Call `update`, unless it has been called less than `refresh_interval` seconds ago."""
+        if self.web3 is None:
+            return
+
+        with self._lock:
+            if self._last_refresh is None or time.monotonic() - self._last_refresh >= self.refresh_interval:
+                self.update()
+
+    def percentile(self, percentile: float) -> Optional[int]:
+        """Return the median over the window of the `percentile`-th gas price paid in each block.
+
+        Taking the median over blocks rather than a percentile of all transactions pooled together
+        means a single block full of overpriced transactions does not skew the result.
+
+        Args:
+            percentile: Percentile (0-100) of transaction gas prices to look at in each block.
+
+        Returns:
+            Gas price in Wei, or `None` if no transactions have been seen yet.
+        """
+        assert(isinstance(percentile, (int, float)))
+        assert(0 <= percentile <= 100)
+
+        with self._lock:
+            if percentile not in self._percentiles:
+                per_block = sorted(prices[min(len(prices) - 1, math.floor(len(prices) * percentile / 100))]
+                                   for _, _, prices in self.blocks if len(prices) > 0)
+                self._percentiles[percentile] = per_block[(len(per_block) - 1) // 2] if len(per_block) > 0 else None
+
+            return self._percentiles[percentile]
+
+
+class AdaptiveGasPrice(GasPrice):
+    """Gas price following the gas prices recently paid for getting included in a block.
+
+    The gas price is the `percentile`-th gas price paid in recent blocks (see
+    :py:meth:`BlockFeeHistory.percentile`), but never lower than the maximum base fee
+    the next block can have (12.5% above the base fee of the most recent block),
+    as a transaction paying less would not get included in it. If no transactions have
+    been seen yet, the base fee or the gas price suggested by the node is used instead.
+
+    As the gas price follows the market, a transaction which has not been mined gets
+    replaced as soon as the recent gas prices go up enough for the replacement to be accepted.
+
+    Attributes:
+        history: Shared :py:class:`BlockFeeHistory` instance.
+        percentile: Percentile (0-100) of gas prices paid in recent blocks to target.
+        min_price: Optional lower limit, defaults to None.
+        max_price: Optional upper limit, defaults to None.
+    """
+    def __init__(self, history: BlockFeeHistory, percentile: float = 50,
+                 min_price: Optional[int] = None, max_price: Optional[int] = None):
+        assert(isinstance(history, BlockFeeHistory))
+        assert(isinstance(percentile, (int, float)))
+        assert(isinstance(min_price, int) or min_price is None)
+        assert(isinstance(max_price, int) or max_price is None)
+        assert(0 <= percentile <= 100)
+        if min_price is not None and max_price is not None:
+            assert(min_price <= max_price)
+
+        self.history = history
+        self.percentile = percentile
+        self.min_price = min_price
+        self.max_price = max_price
+
+    def get_gas_price(self, time_elapsed: int) -> Optional[int]:
+        assert(isinstance(time_elapsed, int))
+
+        self.history.refresh()
+
+        result = self.history.percentile(self.percentile)
+        base_fee = self.history.base_fee
+        if base_fee is not None:
+            result = max(result or 0, math.ceil(base_fee * 1.125))
+        if result is None and self.history.web3 is not None:
+            result = self.history.web3.eth.gasPrice
+        if result is None:
+            result = self.min_price
+
+        if result is not None and self.min_price is not None:
+            result = max(result, self.min_price)
+        if result is not None and self.max_price is not None:
+            result = min(result, self.max_price)
+
+        return result
+
+
+class FixedGasFees(GasPrice):
+    """Fixed EIP-1559 fee parameters.
+
+    Sends type-2 transactions with the specified fee cap and priority fee. Similarly to
+    :py:class:`FixedGasPrice`, both may be later changed (while the transaction is still
+    in progress) by calling the `update_gas_fees` method.
+
+    Attributes:
+        max_fee: Maximum fee per gas to be used (in Wei).
+        max_priority_fee: Maximum priority fee per gas, i.e. the miner tip (in Wei).
+    """
+    def __init__(self, max_fee: int, max_priority_fee: int):
+        assert(isinstance(max_fee, int))
+        assert(isinstance(max_priority_fee, int))
+        assert(max_fee >= max_priority_fee)
+
+        self.max_fee = max_fee
+        self.max_priority_fee = max_priority_fee
+
+    def update_gas_fees(self, new_max_fee: int, new_max_priority_fee: int):
+        """Changes the fee parameters, preferably to higher values.
+
+        Args:
+            new_max_fee: New maximum fee per gas to be set (in Wei).
+            new_max_priority_fee: New maximum priority fee per gas to be set (in Wei).
+        """
+        assert(isinstance(new_max_fee, int))
+        assert(isinstance(new_max_priority_fee, int))
+        assert(new_max_fee >= new_max_priority_fee)
+
+        self.max_fee = new_max_fee
+        self.max_priority_fee = new_max_priority_fee
+
+    def get_gas_price(self, time_elapsed: int) -> Optional[int]:
+        return self.max_fee
+
+    def get_gas_fees(self, time_elapsed: int) -> Optional[Tuple[int, int]]:
+        return self.max_fee, self.max_priority_fee
+
+
+class GeometricTipGasPrice(GasPrice):
+    """Geometrically increasing EIP-1559 priority fee.
+
+    Sends type-2 transactions, starting with `initial_tip` as the priority fee and increasing
+    it every `every_secs` seconds by a fixed coefficient, up to an optional upper limit.
+    Only the priority fee is bumped, the fee cap stays at `base_fee_multiplier` times the base fee
+    of the most recent block (taken from a shared :py:class:`BlockFeeHistory`) plus the tip,
+    so the transaction remains includable while the base fee keeps rising for a few blocks.
+    When replacing the transaction, the fee cap may be raised up to `max_fee` (if set) for
+    the replacement to be accepted.
+
+    Attributes:
+        history: Shared :py:class:`BlockFeeHistory` instance.
+        initial_tip: The initial priority fee in Wei.
+        every_secs: Priority fee increase interval (in seconds).
+        coefficient: Priority fee multiplier, defaults to 1.125.
+        max_tip: Optional upper limit of the priority fee, defaults to None.
+        base_fee_multiplier: Multiplier of the base fee included in the fee cap, defaults to 2.
+        max_fee: Optional upper limit of the fee cap, defaults to None.
+    """
+    def __init__(self, history: BlockFeeHistory, initial_tip: int, every_secs: int, coefficient=1.125,
+                 max_tip: Optional[int] = None, base_fee_multiplier=2, max_fee: Optional[int] = None):
+        assert(isinstance(history, BlockFeeHistory))
+        assert(isinstance(max_fee, int) or max_fee is None)
+        assert(base_fee_multiplier >= 1)
+
+        self.history = history
+        self.tip = GeometricGasPrice(initial_tip, every_secs, coefficient, max_tip)
+        self.base_fee_multiplier = base_fee_multiplier
+        self.max_fee = max_fee
+
+    def get_gas_price(self, time_elapsed: int) -> Optional[int]:
+        fees = self.get_gas_fees(time_elapsed)
+        return fees[0] if fees is not None else None
+
+    def get_next_change(self, time_elapsed: int) -> Optional[int]:
+        # The fee cap follows the base fee of every new block, also once the tip has stopped growing.
+        return time_elapsed
+
+    def get_next_scheduled_change(self, time_elapsed: int) -> Optional[int]:
+        # Only the tip is bumped on a schedule, which makes replacement transactions predictable
+        # enough to be signed up front. Their fee caps use the base fee known when signing them.
+        return self.tip.get_next_change(time_elapsed)
+
+    def get_max_fee_limit(self, max_fee: int) -> Optional[int]:
+        return self.max_fee
+
+    def get_gas_fees(self, time_elapsed: int) -> Optional[Tuple[int, int]]:
+        assert(isinstance(time_elapsed, int))
+
+        self.history.refresh()
+        base_fee = self.history.base_fee
+        if base_fee is None:
+            return None
+
+        tip = self.tip.get_gas_price(time_elapsed)
+        max_fee = math.ceil(base_fee * self.base_fee_multiplier) + tip
+        if self.max_fee is not None:
+            max_fee = min(max_fee, self.max_fee)
+            tip = min(tip, max_fee)
+
+        return max_fee, tip
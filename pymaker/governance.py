@@ -54,8 +54,8 @@ class DSPause(Contract):
             self.fax = fax
             self.eta = eta.timestamp()
 
-    abi = Contract._load_abi(__name__, 'abi/DSPause.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSPause.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSPause.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSPause.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
@@ -100,8 +100,8 @@ class DSRoles(Contract):
         address: Ethereum address of the `DSRoles` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSRoles.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSRoles.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSRoles.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSRoles.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
@@ -161,8 +161,8 @@ class DSChief(Contract):
         address: Ethereum address of the `DSChief` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSChief.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSChief.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSChief.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSChief.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
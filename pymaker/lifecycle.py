@@ -26,6 +26,8 @@ from pymaker.sign import eth_sign
 from web3 import Web3
 
 from pymaker import register_filter_thread, any_filter_thread_present, stop_all_filter_threads, all_filter_threads_alive
+from pymaker.metrics import get_metrics
+from pymaker.tracing import RpcTracer
 from pymaker.util import AsyncCallback, get_provider_for_filter
 
 
@@ -35,6 +37,17 @@ def trigger_event(event: threading.Event):
     event.set()
 
 
+def _timed_callback(callback, kind: str):
+    assert(callable(callback))
+    assert(isinstance(kind, str))
+
+    def func():
+        with get_metrics().timer("pymaker_lifecycle_callback_seconds", {"kind": kind}):
+            callback()
+
+    return func
+
+
 class Lifecycle:
     """Main keeper lifecycle controller.
 
@@ -59,7 +72,8 @@ class Lifecycle:
     - checking if the keeper account (`web3.eth.defaultAccount`) is unlocked.
 
     Also, once the lifecycle is initialized, keeper starts listening for SIGINT/SIGTERM
-    signals and starts a graceful shutdown if it receives any of them.
+    signals and starts a graceful shutdown if it receives any of them. If JSON-RPC tracing
+    has been enabled with `trace_rpc_calls`, a SIGUSR1 signal dumps the trace summary to the log.
 
     The typical usage pattern is as follows:
 
@@ -89,6 +103,7 @@ class Lifecycle:
         self.block_function = None
         self.every_timers = []
         self.event_timers = []
+        self.rpc_tracer = None
 
         self.terminated_internally = False
         self.terminated_externally = False
@@ -148,7 +163,7 @@ class Lifecycle:
         # Startup phase
         if self.startup_function:
             self.logger.info("Executing keeper startup logic")
-            self.startup_function()
+            _timed_callback(self.startup_function, "startup")()
 
         # Bind `on_block`, bind `every`
         # Enter the main loop
@@ -184,7 +199,7 @@ class Lifecycle:
         # Shutdown phase
         if self.shutdown_function:
             self.logger.info("Executing keeper shutdown logic...")
-            self.shutdown_function()
+            _timed_callback(self.shutdown_function, "shutdown")()
             self.logger.info("Shutdown logic finished")
         self.logger.info("Keeper terminated")
         exit(10 if self.fatal_termination else 0)
@@ -251,6 +266,21 @@ class Lifecycle:
 
         self.wait_for_functions.append((initial_check, max_wait))
 
+    def trace_rpc_calls(self, tracer: RpcTracer):
+        """Record all JSON-RPC requests and dump their summary to the log on SIGUSR1.
+
+        The tracer gets installed as a middleware of `web3`, if the lifecycle has one.
+
+        Args:
+            tracer: An instance of :py:class:`pymaker.tracing.RpcTracer`.
+        """
+        assert(isinstance(tracer, RpcTracer))
+
+        assert(self.rpc_tracer is None)
+        self.rpc_tracer = tracer
+        if self.web3 is not None:
+            tracer.install(self.web3)
+
     def on_startup(self, callback):
         """Register the specified callback to be run on keeper startup.
 
@@ -305,7 +335,7 @@ class Lifecycle:
         assert(isinstance(min_frequency_in_seconds, int))
         assert(callable(callback))
 
-        self.event_timers.append((event, min_frequency_in_seconds, AsyncCallback(callback)))
+        self.event_timers.append((event, min_frequency_in_seconds, AsyncCallback(_timed_callback(callback, "event"))))
 
     def every(self, frequency_in_seconds: int, callback):
         """Register the specified callback to be called by a timer.
@@ -314,7 +344,7 @@ class Lifecycle:
             frequency_in_seconds: Execution frequency (in seconds).
             callback: Function to be called by the timer.
         """
-        self.every_timers.append((frequency_in_seconds, AsyncCallback(callback)))
+        self.every_timers.append((frequency_in_seconds, AsyncCallback(_timed_callback(callback, "every"))))
 
     def _sigint_sigterm_handler(self, sig, frame):
         if self.terminated_externally:
@@ -323,6 +353,10 @@ class Lifecycle:
             self.logger.warning("Keeper received SIGINT/SIGTERM signal, will terminate gracefully")
             self.terminated_externally = True
 
+    def _sigusr1_handler(self, sig, frame):
+        # dumping is done in a separate thread as the handler may interrupt the tracer holding its lock
+        threading.Thread(target=self.rpc_tracer.dump, daemon=True).start()
+
     def _start_watching_blocks(self):
         def new_block_callback(block_hash):
             self._last_block_time = datetime.datetime.now(tz=pytz.UTC)
@@ -339,6 +373,7 @@ class Lifecycle:
 
                     if not self.terminated_internally and not self.terminated_externally and not self.fatal_termination:
                         if not self._on_block_callback.trigger(on_start, on_finish):
+                            get_metrics().increment("pymaker_lifecycle_skipped_total", labels={"kind": "block"})
                             self.logger.debug(f"Ignoring block #{block_number} ({block_hash.hex()}),"
                                               f" as previous callback is still running")
                     else:
@@ -367,7 +402,7 @@ class Lifecycle:
                     time.sleep(1)
 
         if self.block_function:
-            self._on_block_callback = AsyncCallback(self.block_function)
+            self._on_block_callback = AsyncCallback(_timed_callback(self.block_function, "block"))
 
             block_filter = threading.Thread(target=new_block_watch, daemon=True)
             block_filter.start()
@@ -416,6 +451,7 @@ class Lifecycle:
                         self.logger.debug(f"Finished processing the timer #{idx}")
 
                     if not callback.trigger(on_start, on_finish):
+                        get_metrics().increment("pymaker_lifecycle_skipped_total", labels={"kind": "every"})
                         self.logger.debug(f"Ignoring timer #{idx} as previous one is already running")
                 else:
                     self.logger.debug(f"Ignoring timer #{idx} as keeper is already terminating")
@@ -466,6 +502,10 @@ class Lifecycle:
         signal.signal(signal.SIGINT, self._sigint_sigterm_handler)
         signal.signal(signal.SIGTERM, self._sigint_sigterm_handler)
 
+        # dump the RPC trace on SIGUSR1, if requested
+        if self.rpc_tracer is not None and hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self._sigusr1_handler)
+
         # in case at least one filter has been set up, we enter an infinite loop and let
         # the callbacks do the job. in case of no filters, we will not enter this loop
         # and the keeper will terminate soon after it started
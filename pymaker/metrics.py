@@ -0,0 +1,288 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Optional, Tuple
+
+
+class Metrics:
+    """Pluggable metrics sink, which does nothing by default.
+
+    Hot paths of pymaker (`Transact`, event retrieval, `Lifecycle` callbacks and every JSON-RPC
+    request going through :py:func:`metrics_middleware`) report counters and durations to the
+    sink returned by :py:func:`get_metrics`. Unless another sink has been installed with
+    :py:func:`set_metrics`, it is an instance of this class, so instrumentation costs
+    no more than an empty method call.
+
+    Custom sinks (i.e. forwarding to statsd) can be built by inheriting from this class
+    and overriding `increment` and `observe`.
+    """
+
+    def increment(self, name: str, value: float = 1, labels: Optional[dict] = None):
+        """Increment the counter `name` by `value`.
+
+        Args:
+            name: Name of the counter.
+            value: Amount to increment the counter by.
+            labels: Optional dictionary of label names and values.
+        """
+        pass
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None):
+        """Record a single observation (i.e. a duration in seconds) in the histogram `name`.
+
+        Args:
+            name: Name of the histogram.
+            value: Observed value.
+            labels: Optional dictionary of label names and values.
+        """
+        pass
+
+    def timer(self, name: str, labels: Optional[dict] = None):
+        """Return a context manager measuring the time spent inside it.
+
+        The elapsed time (in seconds) gets recorded in the histogram `name` on exit.
+
+        Args:
+            name: Name of the histogram.
+            labels: Optional dictionary of label names and values.
+        """
+        return _NULL_TIMER
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Timer:
+    """Context manager reporting the time spent inside it to a :py:class:`Metrics` sink."""
+
+    def __init__(self, metrics: Metrics, name: str, labels: Optional[dict] = None):
+        assert(isinstance(metrics, Metrics))
+        assert(isinstance(name, str))
+        assert(isinstance(labels, dict) or (labels is None))
+
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class PrometheusMetrics(Metrics):
+    """In-memory metrics sink, which can be exported in the Prometheus text exposition format.
+
+    All histograms share the same set of buckets, which by default is suitable for
+    measuring durations in seconds.
+
+    Attributes:
+        buckets: Upper bounds of histogram buckets.
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        assert(isinstance(buckets, tuple))
+        assert(len(buckets) > 0)
+        assert(list(buckets) == sorted(buckets))
+
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Optional[dict]) -> tuple:
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def increment(self, name: str, value: float = 1, labels: Optional[dict] = None):
+        key = self._key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[dict] = None):
+        key = self._key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = [[0] * len(self.buckets), 0.0, 0]
+
+            histogram = series[key]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def timer(self, name: str, labels: Optional[dict] = None):
+        return Timer(self, name, labels)
+
+    def counter_value(self, name: str, labels: Optional[dict] = None) -> float:
+        """Return the current value of a counter, or zero if it has never been incremented."""
+        with self.lock:
+            return self.counters.get(name, {}).get(self._key(labels), 0)
+
+    def histogram_count(self, name: str, labels: Optional[dict] = None) -> int:
+        """Return the number of observations recorded in a histogram."""
+        with self.lock:
+            histogram = self.histograms.get(name, {}).get(self._key(labels))
+            return histogram[2] if histogram else 0
+
+    def histogram_sum(self, name: str, labels: Optional[dict] = None) -> float:
+        """Return the sum of all observations recorded in a histogram."""
+        with self.lock:
+            histogram = self.histograms.get(name, {}).get(self._key(labels))
+            return histogram[1] if histogram else 0.0
+
+    def reset(self):
+        """Forget all the values collected so far."""
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    @staticmethod
+    def _format_labels(key: tuple, extra: Optional[tuple] = None) -> str:
+        items = list(key) + ([extra] if extra else [])
+        if len(items) == 0:
+            return ""
+
+        def escape(value) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in items) + "}"
+
+    def export(self) -> str:
+        """Export all the metrics in the Prometheus text exposition format.
+
+        Returns:
+            A string which can be served as-is from a `/metrics` HTTP endpoint.
+        """
+        lines = []
+        with self.lock:
+            for name in sorted(self.counters):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+
+            for name in sorted(self.histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for key, (bucket_counts, total, count) in sorted(self.histograms[name].items()):
+                    for bound, bucket_count in zip(self.buckets, bucket_counts):
+                        lines.append(f"{name}_bucket{self._format_labels(key, ('le', bound))} {bucket_count}")
+                    lines.append(f"{name}_bucket{self._format_labels(key, ('le', '+Inf'))} {count}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {total}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, host: str = "0.0.0.0") -> HTTPServer:
+        """Serve the exported metrics over HTTP from a daemon thread.
+
+        Args:
+            port: Port number to listen on.
+            host: Interface to bind to.
+
+        Returns:
+            The running `HTTPServer` instance, which can be stopped by calling `shutdown()` on it.
+        """
+        assert(isinstance(port, int))
+        assert(isinstance(host, str))
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.export().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        logging.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Return the currently installed metrics sink."""
+    return _metrics
+
+
+def set_metrics(metrics: Metrics):
+    """Install a metrics sink, to which all pymaker instrumentation will report from now on.
+
+    Args:
+        metrics: An instance of :py:class:`Metrics` or one of its subclasses.
+    """
+    assert(isinstance(metrics, Metrics))
+
+    global _metrics
+    _metrics = metrics
+
+
+def metrics_middleware(make_request, web3):
+    """Web3 middleware counting JSON-RPC requests and measuring their latency per method.
+
+    Should be added to the middleware onion of the `Web3` instance used by the keeper:
+
+        web3.middleware_onion.add(metrics_middleware)
+
+    `eth_call` requests correspond to contract view calls made by pymaker wrappers.
+    """
+    def middleware(method, params):
+        metrics = _metrics
+        metrics.increment("pymaker_rpc_requests_total", labels={"method": method})
+        with metrics.timer("pymaker_rpc_request_seconds", {"method": method}):
+            try:
+                response = make_request(method, params)
+            except Exception:
+                metrics.increment("pymaker_rpc_failures_total", labels={"method": method})
+                raise
+
+        if isinstance(response, dict) and 'error' in response:
+            metrics.increment("pymaker_rpc_errors_total", labels={"method": method})
+
+        return response
+
+    return middleware
@@ -16,18 +16,36 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import logging
 import time
-from math import sqrt
-from typing import List, Dict
+from fractions import Fraction
+from pprint import pformat
+from typing import List, Dict, Optional, Union
 
 from attrdict import AttrDict
+from hexbytes import HexBytes
 from web3 import Web3
 
 from pymaker import Contract, Address, Transact, Wad
+from pymaker.providers import make_batch_calls, make_batch_request
 from pymaker.token import ERC20Token
+from pymaker.uniswap_v2 import get_amount_to_price
+from pymaker.util import abi_decode_single, abi_encode_single, bytes_to_hexstring, function_selector
 
 
 class MooniFactory(Contract):
-    abi = Contract._load_abi(__name__, 'abi/MooniFactory.abi')
+    abi = Contract._lazy_abi(__name__, 'abi/MooniFactory.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/MooniFactory.bin')
+
+    @staticmethod
+    def deploy(web3: Web3):
+        """Deploy a new instance of the `MooniFactory` contract.
+
+        Args:
+            web3: An instance of `Web` from `web3.py`.
+
+        Returns:
+            A `MooniFactory` class instance.
+        """
+        return MooniFactory(web3=web3, factory_address=Contract._deploy(web3, MooniFactory.abi, MooniFactory.bin, []))
 
     def __init__(self, web3: Web3, factory_address: Address):
         assert (isinstance(web3, Web3))
@@ -40,8 +58,16 @@ class MooniFactory(Contract):
     def get_pair_address(self, first_token: Address, second_token: Address) -> Address:
         return Address(self._contract.functions.pools(first_token.address, second_token.address).call())
 
-    def get_pairs_addreses(self) -> List[Address]:
-        return list(map(Address, self._contract.functions.getAllPools().call()))
+    def get_pairs_addreses(self, block_number: Optional[int] = None) -> List[Address]:
+        """Addresses of all the pools deployed by the factory, read with a single `getAllPools()` call.
+
+        Args:
+            block_number: Block to read the pools at, by default the latest one.
+        """
+        assert (isinstance(block_number, int) or (block_number is None))
+
+        block_identifier = block_number if block_number is not None else 'latest'
+        return list(map(Address, self._contract.functions.getAllPools().call(block_identifier=block_identifier)))
 
     def get_pair(self, first_token: Address, second_token: Address) -> 'Mooniswap':
         return Mooniswap(web3=self.web3, pair_address=self.get_pair_address(first_token=first_token,
@@ -59,8 +85,25 @@ class MooniFactory(Contract):
         return f"MooniFactory('{self.address}')"
 
 
+class LogSwapped:
+    def __init__(self, log):
+        self.pool = Address(log['address'])
+        self.account = Address(log['args']['account'])
+        self.src = Address(log['args']['src'])
+        self.dst = Address(log['args']['dst'])
+        self.amount = Wad(int(log['args']['amount']))
+        self.result = Wad(int(log['args']['result']))
+        self.src_balance = Wad(int(log['args']['srcBalance']))
+        self.dst_balance = Wad(int(log['args']['dstBalance']))
+        self.referral = Address(log['args']['referral'])
+        self.raw = log
+
+    def __repr__(self):
+        return pformat(vars(self))
+
+
 class Mooniswap(Contract):
-    abi = Contract._load_abi(__name__, 'abi/Mooniswap.abi')
+    abi = Contract._lazy_abi(__name__, 'abi/Mooniswap.abi')
 
     def __init__(self, web3: Web3, pair_address: Address):
         assert (isinstance(web3, Web3))
@@ -70,6 +113,7 @@ class Mooniswap(Contract):
         self.address = pair_address
         self._contract = self._get_contract(web3, self.abi, pair_address)
         self.account_address = Address(self.web3.eth.defaultAccount)
+        self._immutables = None
 
     @property
     def reserves(self) -> AttrDict:
@@ -100,6 +144,19 @@ class Mooniswap(Contract):
     def liquidity(self) -> Wad:
         return self.get_liquidity(self.account_address)
 
+    def _get_immutables(self) -> tuple:
+        # the tokens and the fee denominator of a pool never change, so they only get read once
+        if self._immutables is None:
+            results = make_batch_calls(self.web3, [
+                (self.address, function_selector('tokens(uint256)') + abi_encode_single('uint256', 0)),
+                (self.address, function_selector('tokens(uint256)') + abi_encode_single('uint256', 1)),
+                (self.address, function_selector('FEE_DENOMINATOR()'))])
+
+            self._immutables = ([Address(abi_decode_single('address', result)) for result in results[:2]],
+                                abi_decode_single('uint256', results[2]))
+
+        return self._immutables
+
     def approve(self, tokens: List[ERC20Token], approval_function):
         """Approve the Uniswap contract to fully access balances of specified tokens.
 
@@ -155,6 +212,24 @@ class Mooniswap(Contract):
     def get_return(self, src: Address, dst: Address, amount: Wad) -> Wad:
         return Wad(self._contract.functions.getReturn(src.address, dst.address, amount.value).call())
 
+    def past_swapped(self, number_of_past_blocks: int, event_filter: dict = None) -> List[LogSwapped]:
+        """Synchronously retrieve past Swapped events.
+
+        `Swapped` events are emitted by the Mooniswap contract on every swap. Apart from the amounts
+        swapped, they carry the balances of both tokens the pool had before the swap.
+
+        Args:
+            number_of_past_blocks: Number of past Ethereum blocks to retrieve the events from.
+            event_filter: Filter which will be applied to returned events.
+
+        Returns:
+            List of past `Swapped` events represented as :py:class:`pymaker.mooniswap.LogSwapped` class.
+        """
+        assert (isinstance(number_of_past_blocks, int))
+        assert (isinstance(event_filter, dict) or (event_filter is None))
+
+        return self._past_events(self._contract, 'Swapped', LogSwapped, number_of_past_blocks, event_filter)
+
     def __eq__(self, other):
         assert(isinstance(other, Mooniswap))
         return self.address == other.address
@@ -163,6 +238,295 @@ class Mooniswap(Contract):
         return f"Mooniswap('{self.address}')"
 
 
+class VirtualBalance:
+    """Virtual balance of a Mooniswap token, decaying linearly towards the real balance.
+
+    Attributes:
+        balance: Virtual balance at the time it has been set, in the smallest units of the token.
+        time: Timestamp of the block in which the virtual balance has been set, `0` if it never was.
+    """
+    def __init__(self, balance: int, time: int):
+        assert (isinstance(balance, int))
+        assert (isinstance(time, int))
+
+        self.balance = balance
+        self.time = time
+
+    def current(self, decay_period: int, real_balance: int, now: int) -> int:
+        time_passed = min(decay_period, max(now - self.time, 0))
+        time_remain = decay_period - time_passed
+
+        return (self.balance * time_remain + real_balance * time_passed) // decay_period
+
+    def __repr__(self):
+        return f"VirtualBalance({self.balance}, {self.time})"
+
+
+class MooniswapPool:
+    """Local model of a Mooniswap pool, quoting swaps without calling the chain.
+
+    Quotes depend on the virtual balances the pool keeps to protect itself from front-running,
+    so the model keeps them as well and decays them exactly the way the contract does. The same
+    integer arithmetic is used, so for the same state and block timestamp the results are identical
+    to the ones returned by `getReturn`. The model can follow the pool by applying its `Swapped`
+    events, which carry the real balances the pool had before each swap.
+
+    Attributes:
+        tokens: Addresses of both tokens of the pool.
+        fee: Swap fee, as a fraction of `fee_denominator`.
+        decay_period: Number of seconds virtual balances take to decay to the real ones.
+        fee_denominator: Denominator of the fee.
+        mooniswap: The :py:class:`pymaker.mooniswap.Mooniswap` followed by :py:meth:`sync`, if any.
+        last_block: Number of the last block whose events have been applied.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, tokens: List[Address], balances: List[Wad], virtual_balances_for_addition: List[VirtualBalance],
+                 virtual_balances_for_removal: List[VirtualBalance], fee: int, decay_period: int,
+                 fee_denominator: int = 10**18, mooniswap: Optional['Mooniswap'] = None,
+                 last_block: Optional[int] = None):
+        assert (isinstance(tokens, list) and len(tokens) == 2)
+        assert (isinstance(balances, list) and len(balances) == 2)
+        assert (isinstance(virtual_balances_for_addition, list) and len(virtual_balances_for_addition) == 2)
+        assert (isinstance(virtual_balances_for_removal, list) and len(virtual_balances_for_removal) == 2)
+        assert (isinstance(fee, int))
+        assert (isinstance(decay_period, int) and decay_period > 0)
+        assert (isinstance(fee_denominator, int) and fee_denominator > 0)
+        assert (isinstance(mooniswap, Mooniswap) or (mooniswap is None))
+        assert (isinstance(last_block, int) or (last_block is None))
+        assert (tokens[0] != tokens[1])
+
+        self.tokens = tokens
+        self.fee = fee
+        self.decay_period = decay_period
+        self.fee_denominator = fee_denominator
+        self.mooniswap = mooniswap
+        self.last_block = last_block
+        self._balances = {token: balance.value for token, balance in zip(tokens, balances)}
+        self._for_addition = dict(zip(tokens, virtual_balances_for_addition))
+        self._for_removal = dict(zip(tokens, virtual_balances_for_removal))
+
+    @staticmethod
+    def from_mooniswap(mooniswap: 'Mooniswap', block_number: Optional[int] = None) -> 'MooniswapPool':
+        """Create a model of `mooniswap` seeded with its state at `block_number` (by default the latest block).
+
+        The state gets read with a single JSON-RPC batch, all of it at `block_number`.
+        """
+        assert (isinstance(mooniswap, Mooniswap))
+        assert (isinstance(block_number, int) or (block_number is None))
+
+        if block_number is None:
+            block_number = mooniswap.web3.eth.blockNumber
+
+        tokens, fee_denominator = mooniswap._get_immutables()
+        block = hex(block_number)
+
+        def call(address: Address, data: bytes) -> tuple:
+            return 'eth_call', [{'to': address.address, 'data': bytes_to_hexstring(data)}, block]
+
+        def balance_of(token: Address) -> tuple:
+            if token == Address('0x0000000000000000000000000000000000000000'):
+                return 'eth_getBalance', [mooniswap.address.address, block]
+
+            return call(token, function_selector('balanceOf(address)')
+                        + abi_encode_single('address', mooniswap.address.address))
+
+        requests = [balance_of(token) for token in tokens] \
+            + [call(mooniswap.address, function_selector(f'{function}(address)')
+                    + abi_encode_single('address', token.address))
+               for function in ['virtualBalancesForAddition', 'virtualBalancesForRemoval'] for token in tokens] \
+            + [call(mooniswap.address, function_selector('fee()')),
+               call(mooniswap.address, function_selector('decayPeriod()'))]
+
+        results = []
+        for response in make_batch_request(mooniswap.web3, requests):
+            if response.get('result') is None:
+                raise ValueError(f"Reading the state of {mooniswap.address} failed: {response.get('error')}")
+
+            results.append(bytes(HexBytes(response['result'])))
+
+        def virtual_balances(results: List[bytes]) -> List[VirtualBalance]:
+            return [VirtualBalance(*abi_decode_single('(uint216,uint40)', result)) for result in results]
+
+        return MooniswapPool(tokens=tokens,
+                             balances=[Wad(int.from_bytes(result, 'big')) for result in results[0:2]],
+                             virtual_balances_for_addition=virtual_balances(results[2:4]),
+                             virtual_balances_for_removal=virtual_balances(results[4:6]),
+                             fee=int.from_bytes(results[6], 'big'),
+                             decay_period=int.from_bytes(results[7], 'big'),
+                             fee_denominator=fee_denominator,
+                             mooniswap=mooniswap,
+                             last_block=block_number)
+
+    @property
+    def first_token(self) -> Address:
+        return self.tokens[0]
+
+    @property
+    def second_token(self) -> Address:
+        return self.tokens[1]
+
+    def get_balance(self, token: Address) -> Wad:
+        """Real balance of `token` held by the pool."""
+        assert (token in self._balances)
+        return Wad(self._balances[token])
+
+    def get_balance_for_addition(self, token: Address, now: Optional[int] = None) -> Wad:
+        """Balance of `token` used when it gets swapped into the pool, as of the `now` timestamp."""
+        assert (token in self._balances)
+
+        balance = self._balances[token]
+        return Wad(max(self._for_addition[token].current(self.decay_period, balance, self._now(now)), balance))
+
+    def get_balance_for_removal(self, token: Address, now: Optional[int] = None) -> Wad:
+        """Balance of `token` used when it gets swapped out of the pool, as of the `now` timestamp."""
+        assert (token in self._balances)
+
+        balance = self._balances[token]
+        return Wad(min(self._for_removal[token].current(self.decay_period, balance, self._now(now)), balance))
+
+    def get_return(self, src: Address, dst: Address, amount: Wad, now: Optional[int] = None) -> Wad:
+        """Amount of `dst` a swap of `amount` of `src` would return.
+
+        Args:
+            src: Token to swap.
+            dst: Token to receive.
+            amount: Amount of `src` to swap.
+            now: Timestamp of the block the swap would be executed in, by default the current time.
+
+        Returns:
+            Amount of `dst` the swap would return, `Wad(0)` if the swap is not possible.
+        """
+        assert (isinstance(src, Address))
+        assert (isinstance(dst, Address))
+        assert (isinstance(amount, Wad))
+
+        return Wad(self._get_return(src, dst, amount.value, self.get_balance_for_addition(src, now).value,
+                                    self.get_balance_for_removal(dst, now).value))
+
+    def get_amount_output(self, token_in: Address, token_out: Address, amount_in: Wad,
+                          now: Optional[int] = None) -> Wad:
+        """Same as :py:meth:`get_return`, allows using Mooniswap pools in `pymaker.uniswap_v2.get_amounts_out`."""
+        return self.get_return(token_in, token_out, amount_in, now)
+
+    def swap(self, src: Address, dst: Address, amount: Wad, now: Optional[int] = None) -> Wad:
+        """Simulate a swap of `amount` of `src`, updating both the real and the virtual balances.
+
+        Returns:
+            Amount of `dst` the swap returned.
+        """
+        assert (isinstance(src, Address))
+        assert (isinstance(dst, Address))
+        assert (isinstance(amount, Wad))
+
+        result = self._swap(src, dst, amount.value, self._balances[src], self._balances[dst], self._now(now))
+        if result == 0:
+            raise ValueError("Mooniswap: return is not enough")
+
+        return Wad(result)
+
+    def apply(self, event: LogSwapped, timestamp: int):
+        """Apply a `Swapped` event of the pool, emitted in a block with the `timestamp` timestamp."""
+        assert (isinstance(event, LogSwapped))
+        assert (isinstance(timestamp, int))
+
+        self._swap(event.src, event.dst, event.amount.value, event.src_balance.value, event.dst_balance.value,
+                   timestamp, event.result.value)
+
+    def sync(self, to_block: Optional[int] = None) -> int:
+        """Fetch `Swapped` events emitted by the pool since the last sync and apply them.
+
+        Deposits and withdrawals rescale virtual balances in a way which can not be reproduced from
+        their events, so if there have been any, the whole state gets read again at `to_block` instead.
+
+        Args:
+            to_block: Last block to fetch the events from, by default the latest one.
+
+        Returns:
+            Number of events applied, or `0` if the state has been read again.
+        """
+        assert (isinstance(to_block, int) or (to_block is None))
+        assert (self.mooniswap is not None)
+
+        web3 = self.mooniswap.web3
+        if to_block is None:
+            to_block = web3.eth.blockNumber
+
+        from_block = self.last_block + 1 if self.last_block is not None else to_block
+        if from_block > to_block:
+            return 0
+
+        def past_events(name: str, cls) -> list:
+            return self.mooniswap._past_events_in_block_range(self.mooniswap._contract, name, cls,
+                                                              from_block, to_block, None)
+
+        if past_events('Deposited', lambda log: log) or past_events('Withdrawn', lambda log: log):
+            state = MooniswapPool.from_mooniswap(self.mooniswap, to_block)
+            self.fee, self.decay_period, self.fee_denominator = state.fee, state.decay_period, state.fee_denominator
+            self._balances, self._for_addition, self._for_removal = state._balances, state._for_addition, \
+                                                                    state._for_removal
+            self.last_block = to_block
+            self.logger.debug(f"Liquidity of {self} changed in blocks {from_block}-{to_block}, state read again")
+            return 0
+
+        events = past_events('Swapped', LogSwapped)
+        events.sort(key=lambda event: (event.raw['blockNumber'], event.raw['logIndex']))
+
+        timestamps = {}
+        for event in events:
+            block_number = event.raw['blockNumber']
+            if block_number not in timestamps:
+                timestamps[block_number] = web3.eth.getBlock(block_number)['timestamp']
+
+            self.apply(event, timestamps[block_number])
+
+        self.last_block = to_block
+        self.logger.debug(f"Applied {len(events)} Swapped event(s) from blocks {from_block}-{to_block} to {self}")
+        return len(events)
+
+    def _get_return(self, src: Address, dst: Address, amount: int, src_balance: int, dst_balance: int) -> int:
+        if src not in self._balances or dst not in self._balances or src == dst or amount <= 0:
+            return 0
+
+        taxed_amount = amount - amount * self.fee // self.fee_denominator
+        return taxed_amount * dst_balance // (src_balance + taxed_amount)
+
+    def _swap(self, src: Address, dst: Address, amount: int, src_balance: int, dst_balance: int, now: int,
+              result: Optional[int] = None) -> int:
+        src_addition_balance = max(self._for_addition[src].current(self.decay_period, src_balance, now), src_balance)
+        dst_removal_balance = min(self._for_removal[dst].current(self.decay_period, dst_balance, now), dst_balance)
+
+        if result is None:
+            result = self._get_return(src, dst, amount, src_addition_balance, dst_removal_balance)
+            if result == 0:
+                return 0
+
+        # update virtual balances to the same direction only at imbalanced state
+        if src_addition_balance != src_balance:
+            self._for_addition[src] = VirtualBalance(src_addition_balance + amount, now)
+        if dst_removal_balance != dst_balance:
+            self._for_removal[dst] = VirtualBalance(dst_removal_balance - result, now)
+
+        # update virtual balances to the opposite direction
+        for virtual_balances, token, balance in [(self._for_removal, src, src_balance),
+                                                 (self._for_addition, dst, dst_balance)]:
+            if virtual_balances[token].time > 0:
+                virtual_balances[token] = VirtualBalance(virtual_balances[token].current(self.decay_period,
+                                                                                         balance, now), now)
+
+        self._balances[src] = src_balance + amount
+        self._balances[dst] = dst_balance - result
+        return result
+
+    @staticmethod
+    def _now(now: Optional[int]) -> int:
+        assert (isinstance(now, int) or (now is None))
+        return now if now is not None else int(time.time())
+
+    def __repr__(self):
+        return f"MooniswapPool('{self.tokens[0]}', '{self.tokens[1]}')"
+
+
 class MarketMaker:
     mooniswap = None
     logger = logging.getLogger(__name__)
@@ -183,24 +547,31 @@ class MarketMaker:
             calculate_value(100, 10):   100 + 10% = 110
             calculate_value(100, -10):  100 + (-10)% = 90
         """
-        percent_value = Wad(value.value * percent / 100)
-        return value.value + percent_value.value
+        return value + Wad(value.value * Wad.from_number(percent).value // Wad.from_number(100).value)
 
     @staticmethod
-    def _get_amounts(market_price: Wad, first_token: Address, second_token: Address, reserved: AttrDict) -> AttrDict:
+    def _get_amounts(market_price: Wad, first_token: Address, second_token: Address, reserved: AttrDict,
+                     fee: Fraction = Fraction(3, 1000)) -> AttrDict:
+        """Amounts of the swap moving the price of `reserved` (first token per second token) to `market_price`.
 
-        liquidity_pool_constant = reserved[first_token] * reserved[second_token]
-        new_reserved = {
-            first_token: Wad.from_number(sqrt(liquidity_pool_constant * market_price)),
-            second_token: Wad.from_number(sqrt(liquidity_pool_constant / market_price)),
-        }
+        `reserved` holds the balances the swap gets quoted against, so for a Mooniswap pool the balance
+        for addition of the token swapped in and the balance for removal of the token swapped out.
+        The deltas are the amount swapped in and the amount returned, both positive.
+        """
+        price = Fraction(market_price.value, Wad.from_number(1).value)
 
-        if new_reserved[first_token] > reserved[first_token]:
-            first_token_delta_amount = new_reserved[first_token] - reserved[first_token]
-            second_token_delta_amount = reserved[second_token] - new_reserved[second_token]
+        if price * reserved[second_token].value > reserved[first_token].value:
+            token_in, token_out, target = first_token, second_token, price
         else:
-            first_token_delta_amount = reserved[first_token] - new_reserved[first_token]
-            second_token_delta_amount = new_reserved[second_token] - reserved[second_token]
+            token_in, token_out, target = second_token, first_token, 1 / price
+
+        amount_in = get_amount_to_price(reserved[token_in], reserved[token_out], target, fee).value
+        taxed_amount = amount_in - amount_in * fee.numerator // fee.denominator
+        amount_out = taxed_amount * reserved[token_out].value // (reserved[token_in].value + taxed_amount)
+
+        deltas = {token_in: Wad(amount_in), token_out: Wad(amount_out)}
+        first_token_delta_amount = deltas[first_token]
+        second_token_delta_amount = deltas[second_token]
 
         return AttrDict({
             'first_token_amount_delta': first_token_delta_amount,
@@ -211,33 +582,41 @@ class MarketMaker:
 
     def set_price(self, market_price: Wad, first_token: Address, second_token: Address, max_delta_on_percent: int) -> Transact:
 
-        reserves = self.mooniswap.reserves.map()
+        block = self.mooniswap.web3.eth.getBlock('latest')
+        pool = MooniswapPool.from_mooniswap(self.mooniswap, block['number'])
+        now = block['timestamp']
+        fee = Fraction(pool.fee, pool.fee_denominator)
 
-        mooniswap_price = reserves[first_token] / reserves[second_token]
-        delta = (market_price.value * 100 / mooniswap_price.value) - 100
+        delta = Fraction(market_price.value * pool.get_balance(second_token).value,
+                         pool.get_balance(first_token).value * Wad.from_number(1).value) * 100 - 100
 
-        self.logger.info(f"the price differs from the market by {delta}%")
+        self.logger.info(f"the price differs from the market by {float(delta)}%")
 
         if delta > max_delta_on_percent:
-            self.logger.debug(f"delta > max_delta ({delta} > {max_delta_on_percent})")
-            input_data = self._get_amounts(market_price=market_price, first_token=first_token, second_token=second_token, reserved=reserves)
-
-            min_amount = self.mooniswap.get_return(src=first_token, dst=second_token,
-                                                   amount=input_data.map()[first_token])
-
-            return self.mooniswap.swap(src=first_token, dst=second_token,
-                                       amount=input_data.map()[first_token], min_return=min_amount, referral=None)
+            self.logger.debug(f"delta > max_delta ({float(delta)} > {max_delta_on_percent})")
+            reserves = AttrDict({first_token: pool.get_balance_for_addition(first_token, now),
+                                 second_token: pool.get_balance_for_removal(second_token, now)})
+            input_data = self._get_amounts(market_price=market_price, first_token=first_token,
+                                           second_token=second_token, reserved=reserves, fee=fee)
+            src, dst = first_token, second_token
 
         elif delta < 0 and abs(delta) > max_delta_on_percent:
-            self.logger.debug(f"delta < max_delta ({delta} < {max_delta_on_percent})")
-            input_data = self._get_amounts(market_price=market_price, first_token=first_token, second_token=second_token, reserved=reserves)
-
-            min_amount = self.mooniswap.get_return(src=second_token, dst=first_token,
-                                                   amount=input_data.map()[second_token])
-
-            return self.mooniswap.swap(src=second_token, dst=first_token,
-                                       amount=input_data.map()[second_token], min_return=min_amount, referral=None)
+            self.logger.debug(f"delta < max_delta ({float(delta)} < {max_delta_on_percent})")
+            reserves = AttrDict({first_token: pool.get_balance_for_removal(first_token, now),
+                                 second_token: pool.get_balance_for_addition(second_token, now)})
+            input_data = self._get_amounts(market_price=market_price, first_token=first_token,
+                                           second_token=second_token, reserved=reserves, fee=fee)
+            src, dst = second_token, first_token
 
         else:
             self.logger.info(f"the price difference is within "
-                             f"the permissible (delta={delta}, max_delta={max_delta_on_percent})")
+                             f"the permissible (delta={float(delta)}, max_delta={max_delta_on_percent})")
+            return None
+
+        amount = input_data.map()[src]
+        min_amount = pool.get_return(src=src, dst=dst, amount=amount, now=now)
+        if min_amount == Wad(0):
+            self.logger.info(f"the pool is too small to correct the price")
+            return None
+
+        return self.mooniswap.swap(src=src, dst=dst, amount=amount, min_return=min_amount, referral=None)
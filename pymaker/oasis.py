@@ -214,8 +214,8 @@ class SimpleMarket(Contract):
         address: Ethereum address of the `SimpleMarket` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/SimpleMarket.abi')
-    bin = Contract._load_bin(__name__, 'abi/SimpleMarket.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/SimpleMarket.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/SimpleMarket.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
@@ -513,8 +513,8 @@ class ExpiringMarket(SimpleMarket):
         address: Ethereum address of the `ExpiringMarket` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/ExpiringMarket.abi')
-    bin = Contract._load_bin(__name__, 'abi/ExpiringMarket.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/ExpiringMarket.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/ExpiringMarket.bin')
 
     @staticmethod
     def deploy(web3: Web3, close_time: int):
@@ -554,10 +554,10 @@ class MatchingMarket(ExpiringMarket):
         support_address: Ethereum address of the `MakerOtcSupportMethods` contract (optional).
     """
 
-    abi = Contract._load_abi(__name__, 'abi/MatchingMarket.abi')
-    bin = Contract._load_bin(__name__, 'abi/MatchingMarket.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/MatchingMarket.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/MatchingMarket.bin')
 
-    abi_support = Contract._load_abi(__name__, 'abi/MakerOtcSupportMethods.abi')
+    abi_support = Contract._lazy_abi(__name__, 'abi/MakerOtcSupportMethods.abi')
 
     def __init__(self, web3: Web3, address: Address, support_address: Optional[Address] = None):
         assert (isinstance(support_address, Address) or (support_address is None))
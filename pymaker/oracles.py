@@ -33,8 +33,8 @@ class OSM(Contract):
         address: Ethereum address of the `OSM` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/OSM.abi')
-    bin = Contract._load_bin(__name__, 'abi/OSM.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/OSM.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/OSM.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
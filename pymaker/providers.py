@@ -0,0 +1,472 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from typing import List, Optional, Tuple, Union
+
+import requests
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
+from web3._utils.request import make_post_request
+from web3.providers.base import BaseProvider
+
+from pymaker import Address
+from pymaker.metrics import get_metrics
+from pymaker.sessions import create_session, get_session
+
+
+def _is_success(response) -> bool:
+    return isinstance(response, dict) and 'error' not in response
+
+
+def _error_message(response) -> str:
+    error = response.get('error') if isinstance(response, dict) else None
+    if isinstance(error, dict):
+        return str(error.get('message', error))
+
+    return str(error)
+
+
+class SessionHTTPProvider(HTTPProvider):
+    """`HTTPProvider` sending its requests through a configurable `requests.Session`.
+
+    Unless a session is passed explicitly, the one returned by :py:func:`pymaker.sessions.get_session`
+    is used, so the connection pool is shared with the 0x relayer API clients and other providers.
+
+        web3 = Web3(SessionHTTPProvider("http://localhost:8545", session=create_session(pool_size=32)))
+
+    Attributes:
+        session: The `requests.Session` used for sending requests.
+    """
+    def __init__(self, endpoint_uri: str = None, request_kwargs: dict = None, session: Optional[requests.Session] = None):
+        assert(isinstance(session, requests.Session) or (session is None))
+
+        super().__init__(endpoint_uri, request_kwargs)
+        self.session = session or get_session()
+
+    def make_request(self, method, params):
+        return self.decode_rpc_response(self.post(self.encode_rpc_request(method, params)))
+
+    def post(self, data: bytes) -> bytes:
+        kwargs = self.get_request_kwargs()
+        kwargs.setdefault('timeout', 10)
+
+        response = self.session.post(self.endpoint_uri, data=data, **kwargs)
+        response.raise_for_status()
+
+        return response.content
+
+
+def make_batch_request(web3: Web3, requests: List[Tuple[str, list]], batch_size: int = 100) -> List[dict]:
+    """Send many JSON-RPC requests at once, as JSON-RPC batches.
+
+    With an `HTTPProvider` (including :py:class:`SessionHTTPProvider`) up to `batch_size` requests
+    get sent in a single HTTP request. Other providers get the requests one by one. Either way,
+    the requests bypass `web3` middlewares.
+
+    Args:
+        web3: An instance of `Web3` from `web3.py`.
+        requests: JSON-RPC requests as (method, params) tuples.
+        batch_size: Maximum number of requests sent in a single HTTP request.
+
+    Returns:
+        Raw JSON-RPC responses, each with either `result` or `error`, in the same order as `requests`.
+    """
+    assert(isinstance(web3, Web3))
+    assert(isinstance(requests, list))
+    assert(isinstance(batch_size, int))
+    assert(batch_size > 0)
+
+    provider = web3.provider
+    if not isinstance(provider, HTTPProvider):
+        return [provider.make_request(method, params) for method, params in requests]
+
+    responses = []
+    for start in range(0, len(requests), batch_size):
+        batch = [{'jsonrpc': '2.0', 'method': method, 'params': params, 'id': start + index}
+                 for index, (method, params) in enumerate(requests[start:start + batch_size])]
+        data = json.dumps(batch).encode('utf-8')
+
+        if isinstance(provider, SessionHTTPProvider):
+            content = provider.post(data)
+        else:
+            content = make_post_request(provider.endpoint_uri, data, **provider.get_request_kwargs())
+
+        decoded = json.loads(content)
+        if not isinstance(decoded, list):
+            raise ValueError(f"Batch request to {provider.endpoint_uri} failed: {_error_message(decoded)}")
+
+        by_id = {response.get('id'): response for response in decoded if isinstance(response, dict)}
+        responses.extend(by_id.get(request['id'], {'id': request['id'], 'error': {'message': 'No response'}})
+                         for request in batch)
+
+    get_metrics().increment("pymaker_rpc_batched_requests_total", len(requests))
+    return responses
+
+
+def make_batch_calls(web3: Web3, calls: List[Tuple[Address, bytes]], block_identifier: Union[int, str] = 'latest',
+                     batch_size: int = 100) -> List[bytes]:
+    """Execute many `eth_call`s at once, in JSON-RPC batches sent with :py:func:`make_batch_request`.
+
+    Args:
+        web3: An instance of `Web3` from `web3.py`.
+        calls: Calls as (contract address, call data) tuples.
+        block_identifier: Block to execute all the calls at, either its number or i.e. `latest`.
+        batch_size: Maximum number of calls sent in a single HTTP request.
+
+    Returns:
+        Data returned by the calls, in the same order as `calls`.
+    """
+    assert(isinstance(calls, list))
+    assert(isinstance(block_identifier, (int, str)))
+
+    block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+    requests = [('eth_call', [{'to': address.address, 'data': '0x' + data.hex()}, block]) for address, data in calls]
+
+    results = []
+    for (address, _), response in zip(calls, make_batch_request(web3, requests, batch_size)):
+        if response.get('result') is None:
+            raise ValueError(f"Call to {address} failed: {_error_message(response)}")
+
+        results.append(bytes(HexBytes(response['result'])))
+
+    return results
+
+
+class BroadcastProvider(BaseProvider):
+    """Provider broadcasting signed transactions to multiple Ethereum nodes at once.
+
+    Raw transactions (`eth_sendRawTransaction`, which is what transactions sent from local accounts
+    registered with :py:mod:`pymaker.keys` end up as) get sent to all the nodes in parallel and
+    the first node accepting the transaction determines the response. Nodes rejecting it because
+    they have already seen it (i.e. received it from their peers first) count as accepting it.
+
+    Transaction receipt lookups are raced across all the nodes, so the receipt gets noticed
+    as soon as the fastest node has imported the block. All other requests, including
+    `eth_sendTransaction` for node-managed accounts, go to the first (primary) node only.
+
+        web3 = Web3(BroadcastProvider(["http://node1:8545", "https://node2:8545"]))
+
+    Attributes:
+        providers: Providers of all the nodes, the first one being the primary one.
+        timeout: Maximum number of seconds to wait for responses from the nodes.
+    """
+    logger = logging.getLogger()
+
+    BROADCAST_METHODS = ('eth_sendRawTransaction',)
+    RACED_METHODS = ('eth_getTransactionReceipt', 'eth_getTransactionByHash')
+
+    # Fragments of errors returned by Geth, Parity/OpenEthereum, Nethermind and Besu
+    # for transactions the node already has in its pool.
+    ALREADY_KNOWN_ERRORS = ('already known', 'known transaction', 'alreadyknown', 'already imported',
+                            'transaction already exists', 'already in the pool')
+
+    def __init__(self, providers: List[Union[BaseProvider, str]], timeout: float = 10.0):
+        assert(isinstance(providers, list))
+        assert(len(providers) > 0)
+        assert(isinstance(timeout, (int, float)))
+
+        super().__init__()
+        self.providers = [SessionHTTPProvider(provider) if isinstance(provider, str) else provider
+                          for provider in providers]
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix="broadcast")
+
+    @property
+    def endpoint_uri(self) -> str:
+        return getattr(self.providers[0], 'endpoint_uri', '') or ''
+
+    def make_request(self, method, params):
+        if method in self.BROADCAST_METHODS:
+            return self._broadcast(method, params)
+
+        elif method in self.RACED_METHODS and len(self.providers) > 1:
+            return self._race(method, params)
+
+        else:
+            return self.providers[0].make_request(method, params)
+
+    def isConnected(self) -> bool:
+        return any(provider.isConnected() for provider in self.providers)
+
+    def _is_already_known(self, response) -> bool:
+        message = _error_message(response).lower()
+        return any(fragment in message for fragment in self.ALREADY_KNOWN_ERRORS)
+
+    def _request(self, provider: BaseProvider, method, params):
+        try:
+            return provider.make_request(method, params)
+        except Exception as e:
+            self.logger.debug(f"Request {method} to {getattr(provider, 'endpoint_uri', provider)} failed ({e})")
+            return e
+
+    def _responses(self, method, params):
+        futures = {self.executor.submit(self._request, provider, method, params): provider
+                   for provider in self.providers}
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                yield futures[future], future.result()
+        except TimeoutError:
+            self.logger.warning(f"Not all nodes responded to {method} within {self.timeout}s")
+
+    def _broadcast(self, method, params):
+        first_failure = None
+        for provider, response in self._responses(method, params):
+            if _is_success(response):
+                return response
+
+            if self._is_already_known(response):
+                self.logger.debug(f"Transaction already known to {getattr(provider, 'endpoint_uri', provider)}")
+                return {'jsonrpc': '2.0', 'id': response.get('id'),
+                        'result': HexBytes(keccak(HexBytes(params[0]))).hex()}
+
+            self.logger.debug(f"Transaction rejected by {getattr(provider, 'endpoint_uri', provider)}"
+                              f" ({_error_message(response) if isinstance(response, dict) else response})")
+            first_failure = first_failure or response
+
+        if isinstance(first_failure, Exception) or first_failure is None:
+            raise first_failure or TimeoutError(f"No node responded to {method}")
+
+        return first_failure
+
+    def _race(self, method, params):
+        fallback = None
+        for provider, response in self._responses(method, params):
+            if _is_success(response) and response.get('result') is not None:
+                return response
+
+            fallback = fallback or (response if isinstance(response, dict) else None)
+
+        return fallback or self.providers[0].make_request(method, params)
+
+
+class Endpoint:
+    """State of a single node used by :py:class:`PooledProvider`.
+
+    Attributes:
+        provider: Provider of the node.
+        healthy: Whether the last request to the node has succeeded.
+        head: Latest block number reported by the node during the last health check.
+        latency: Exponentially weighted moving average of the response time (in seconds).
+        in_flight: Number of requests to the node currently in progress.
+        failed_at: Time of the last failure (unix timestamp).
+    """
+
+    # Weight of the most recent measurement in the moving average of latency.
+    ALPHA = 0.2
+
+    def __init__(self, provider: BaseProvider):
+        assert(isinstance(provider, BaseProvider))
+
+        self.provider = provider
+        self.healthy = True
+        self.head = None
+        self.latency = None
+        self.in_flight = 0
+        self.failed_at = None
+
+    @property
+    def endpoint_uri(self) -> str:
+        return str(getattr(self.provider, 'endpoint_uri', self.provider))
+
+    def record_success(self, latency: float):
+        self.latency = latency if self.latency is None else self.ALPHA * latency + (1 - self.ALPHA) * self.latency
+        self.healthy = True
+
+    def record_failure(self):
+        self.healthy = False
+        self.failed_at = time.time()
+
+    def cost(self) -> float:
+        """Expected time to get a response, taking the requests already in progress into account."""
+        return (self.latency if self.latency is not None else 0.0) * (self.in_flight + 1)
+
+    def __repr__(self):
+        return f"Endpoint('{self.endpoint_uri}', healthy={self.healthy}, head={self.head}, latency={self.latency})"
+
+
+class PooledProvider(BaseProvider):
+    """Provider spreading requests across a pool of Ethereum nodes, with automatic failover.
+
+    Read requests go to the node expected to respond the fastest, based on the moving average
+    of its latency and the number of its requests in progress. Nodes lagging more than `max_lag`
+    blocks behind the highest head in the pool, as well as nodes which failed, are not used
+    until a health check (run every `check_interval` seconds in the background) shows
+    they have recovered. If a request fails because of a connection problem, it gets retried
+    on the next node straight away.
+
+    Requests which have to hit the same node every time (sending transactions, nonces, gas estimates
+    and filters) go to the first healthy node in the order they have been specified. Lookups of blocks,
+    transactions and receipts which return nothing get retried on the other nodes, as the
+    node asked first may not have imported the relevant block yet.
+
+    As it is a regular provider, the pool can be used with `Lifecycle` and all `Contract` subclasses:
+
+        web3 = Web3(PooledProvider(["http://node1:8545", "http://node2:8545", "https://node3:8545"]))
+
+    Attributes:
+        endpoints: :py:class:`Endpoint` instances, one for each node.
+        max_lag: Maximum number of blocks a node can lag behind the pool to be used.
+        check_interval: Number of seconds between subsequent health checks.
+        session: The `requests.Session` used for nodes specified by their URLs. By default a session
+            which does not retry failed requests is created for each pool.
+    """
+    logger = logging.getLogger()
+
+    STICKY_METHODS = ('eth_sendTransaction', 'eth_sendRawTransaction', 'eth_sign', 'eth_accounts',
+                      'eth_newFilter', 'eth_newBlockFilter', 'eth_newPendingTransactionFilter',
+                      'eth_getFilterChanges', 'eth_getFilterLogs', 'eth_uninstallFilter', 'parity_nextNonce',
+                      'eth_getTransactionCount', 'eth_estimateGas')
+    NULLABLE_METHODS = ('eth_getBlockByHash', 'eth_getBlockByNumber', 'eth_getTransactionByHash',
+                        'eth_getTransactionReceipt')
+
+    def __init__(self, providers: List[Union[BaseProvider, str]], max_lag: int = 2, check_interval: float = 5.0,
+                 session: Optional[requests.Session] = None):
+        assert(isinstance(providers, list))
+        assert(len(providers) > 0)
+        assert(isinstance(max_lag, int))
+        assert(isinstance(check_interval, (int, float)))
+        assert(isinstance(session, requests.Session) or (session is None))
+
+        super().__init__()
+        # Retrying on the same node would only delay failing over to the next one.
+        self.session = session or create_session(max_retries=0)
+        self.endpoints = [Endpoint(SessionHTTPProvider(provider, session=self.session) if isinstance(provider, str)
+                                   else provider)
+                          for provider in providers]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self._checker = None
+
+    @property
+    def endpoint_uri(self) -> str:
+        return self.endpoints[0].endpoint_uri
+
+    def __str__(self):
+        return f"PooledProvider({', '.join(endpoint.endpoint_uri for endpoint in self.endpoints)})"
+
+    def isConnected(self) -> bool:
+        return any(endpoint.provider.isConnected() for endpoint in self.endpoints)
+
+    def check_health(self):
+        """Query the latest block number of every node, updating its health, head and latency."""
+        def check(endpoint: Endpoint):
+            start = time.perf_counter()
+            try:
+                response = endpoint.provider.make_request('eth_blockNumber', [])
+                endpoint.head = int(response['result'], 16)
+                endpoint.record_success(time.perf_counter() - start)
+            except Exception as e:
+                self.logger.warning(f"Health check of {endpoint.endpoint_uri} failed ({e})")
+                endpoint.record_failure()
+
+        threads = [threading.Thread(target=check, args=(endpoint,), daemon=True) for endpoint in self.endpoints]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        head = max((endpoint.head for endpoint in self.endpoints if endpoint.healthy and endpoint.head is not None),
+                   default=None)
+        for endpoint in self.endpoints:
+            if endpoint.healthy and head is not None and endpoint.head is not None and endpoint.head < head - self.max_lag:
+                self.logger.warning(f"{endpoint.endpoint_uri} is lagging {head - endpoint.head} block(s) behind")
+
+    def _start_health_checks(self):
+        with self.lock:
+            if self._checker is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(self.check_interval)
+                    self.check_health()
+
+            self.check_health()
+            self._checker = threading.Thread(target=run, daemon=True, name="pooled-provider-health")
+            self._checker.start()
+
+    def _usable(self) -> List[Endpoint]:
+        head = max((endpoint.head for endpoint in self.endpoints if endpoint.healthy and endpoint.head is not None),
+                   default=None)
+
+        def in_sync(endpoint: Endpoint) -> bool:
+            return head is None or endpoint.head is None or endpoint.head >= head - self.max_lag
+
+        return [endpoint for endpoint in self.endpoints if endpoint.healthy and in_sync(endpoint)]
+
+    def _order(self, method) -> List[Endpoint]:
+        usable = self._usable()
+        if method not in self.STICKY_METHODS:
+            with self.lock:
+                usable = sorted(usable, key=lambda endpoint: endpoint.cost())
+
+        # Nodes which are not usable at the moment still get a chance if all the usable ones fail.
+        return usable + [endpoint for endpoint in self.endpoints if endpoint not in usable]
+
+    def _request(self, endpoint: Endpoint, method, params):
+        with self.lock:
+            endpoint.in_flight += 1
+
+        start = time.perf_counter()
+        try:
+            response = endpoint.provider.make_request(method, params)
+            endpoint.record_success(time.perf_counter() - start)
+            return response
+        except Exception:
+            endpoint.record_failure()
+            raise
+        finally:
+            with self.lock:
+                endpoint.in_flight -= 1
+
+    def make_request(self, method, params):
+        if self._checker is None:
+            self._start_health_checks()
+
+        metrics = get_metrics()
+        last_exception = None
+        empty_response = None
+        for attempt, endpoint in enumerate(self._order(method)):
+            if attempt > 0:
+                metrics.increment("pymaker_pool_failovers_total", labels={"method": method})
+
+            try:
+                response = self._request(endpoint, method, params)
+            except Exception as e:
+                self.logger.warning(f"Request {method} to {endpoint.endpoint_uri} failed ({e}), trying another node")
+                last_exception = e
+                continue
+
+            metrics.increment("pymaker_pool_requests_total", labels={"endpoint": endpoint.endpoint_uri})
+            if method in self.NULLABLE_METHODS and isinstance(response, dict) and 'error' not in response \
+                    and response.get('result') is None:
+                empty_response = empty_response or response
+                continue
+
+            return response
+
+        if empty_response is not None:
+            return empty_response
+
+        raise last_exception
@@ -33,8 +33,8 @@ class DSProxyCache(Contract):
     Ref. <https://github.com/dapphub/ds-proxy/blob/master/src/proxy.sol#L120>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSProxyCache.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSProxyCache.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSProxyCache.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSProxyCache.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
@@ -82,8 +82,8 @@ class DSProxy(Contract):
     Ref. <https://github.com/dapphub/ds-proxy/blob/master/src/proxy.sol#L28>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSProxy.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSProxy.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSProxy.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSProxy.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
@@ -200,8 +200,8 @@ class DSProxyFactory(Contract):
     Ref. <https://github.com/dapphub/ds-proxy/blob/master/src/proxy.sol#L90>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSProxyFactory.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSProxyFactory.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSProxyFactory.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSProxyFactory.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert (isinstance(web3, Web3))
@@ -271,8 +271,8 @@ class ProxyRegistry(Contract):
     Ref. <https://github.com/makerdao/proxy-registry/blob/master/src/ProxyRegistry.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/ProxyRegistry.abi')
-    bin = Contract._load_bin(__name__, 'abi/ProxyRegistry.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/ProxyRegistry.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/ProxyRegistry.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -300,8 +300,8 @@ class DssProxyActionsDsr(Contract):
     Ref. <https://github.com/makerdao/dss-proxy-actions/blob/master/src/DssProxyActions.sol>
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DssProxyActionsDsr.abi')
-    bin = Contract._load_bin(__name__, 'abi/DssProxyActionsDsr.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DssProxyActionsDsr.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DssProxyActionsDsr.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
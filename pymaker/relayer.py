@@ -0,0 +1,131 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import requests
+
+from pymaker.util import http_response_summary
+
+
+class PageCache:
+    """Least recently used cache of pages of relayer collections, with their `ETag`s.
+
+    Every distinct combination of URL and query parameters (i.e. every token pair and page)
+    takes one entry, so the number of entries is limited and the least recently used pages
+    get evicted first. Pages are fetched from multiple threads, so all access is synchronized.
+
+    Attributes:
+        max_size: Maximum number of pages kept.
+    """
+
+    def __init__(self, max_size: int = 256):
+        assert(isinstance(max_size, int))
+        assert(max_size > 0)
+
+        self.max_size = max_size
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[tuple]:
+        with self.lock:
+            value = self.pages.get(key)
+            if value is not None:
+                self.pages.move_to_end(key)
+
+            return value
+
+    def put(self, key: tuple, value: tuple):
+        with self.lock:
+            self.pages[key] = value
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.max_size:
+                self.pages.popitem(last=False)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pages)
+
+
+def fetch_all_pages(session: requests.Session, url: str, params: dict, per_page: int, decode: Callable,
+                    timeout: float, max_workers: int = 8, cache: Optional[PageCache] = None) -> list:
+    """Fetch all the records of a paginated Standard Relayer API collection.
+
+    The first page is fetched to learn the total number of records, then all the remaining pages
+    get fetched concurrently. Records are decoded with `decode` in the thread which fetched them,
+    so decoding of one page overlaps with downloading of the others.
+
+    If `cache` is passed, `ETag` headers returned by the relayer are remembered in it, together
+    with the decoded records (see :py:class:`PageCache`). Subsequent requests for the same page are then made conditional,
+    and pages which have not changed (`304 Not Modified`) are neither downloaded nor decoded again.
+
+    Args:
+        session: The `requests.Session` to use.
+        url: URL of the collection, i.e. `https://api.relayer.com/v2/orders`.
+        params: Query parameters, except for `page` and `perPage`.
+        per_page: Number of records to request per page.
+        decode: Function decoding a single record.
+        timeout: Timeout of each request (in seconds).
+        max_workers: Maximum number of pages fetched at the same time.
+        cache: :py:class:`PageCache` keeping `ETag`s and decoded records between calls.
+
+    Returns:
+        Decoded records of all pages, in the order returned by the relayer.
+    """
+    assert(isinstance(session, requests.Session))
+    assert(isinstance(url, str))
+    assert(isinstance(params, dict))
+    assert(isinstance(per_page, int))
+    assert(callable(decode))
+    assert(isinstance(max_workers, int))
+    assert(isinstance(cache, PageCache) or (cache is None))
+    assert(per_page > 0)
+
+    def fetch(page: int) -> tuple:
+        page_params = {**params, "page": page, "perPage": per_page}
+        key = (url, tuple(sorted(page_params.items())))
+        cached = cache.get(key) if cache is not None else None
+
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = session.get(url, params=page_params, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            return cached[1]
+
+        if not response.ok:
+            raise Exception(f"Failed to fetch 0x orders from the relayer: {http_response_summary(response)}")
+
+        data = response.json()
+        records = list(map(decode, data.get('records', [])))
+        result = int(data.get('total', len(records))), int(data.get('perPage', per_page)), records
+        if cache is not None and 'ETag' in response.headers:
+            cache.put(key, (response.headers['ETag'], result))
+
+        return result
+
+    total, page_size, first_records = fetch(1)
+    records = list(first_records)
+    pages = math.ceil(total / page_size) if page_size > 0 else 1
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, pages - 1)) as executor:
+            for _, _, page_records in executor.map(fetch, range(2, pages + 1)):
+                records.extend(page_records)
+
+    return records
@@ -70,8 +70,8 @@ class Tub(Contract):
         address: Ethereum address of the `Tub` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/SaiTub.abi')
-    bin = Contract._load_bin(__name__, 'abi/SaiTub.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/SaiTub.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/SaiTub.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert(isinstance(web3, Web3))
@@ -651,8 +651,8 @@ class Tap(Contract):
         address: Ethereum address of the `Tap` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/SaiTap.abi')
-    bin = Contract._load_bin(__name__, 'abi/SaiTap.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/SaiTap.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/SaiTap.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert(isinstance(web3, Web3))
@@ -855,8 +855,8 @@ class Top(Contract):
         address: Ethereum address of the `Top` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/SaiTop.abi')
-    bin = Contract._load_bin(__name__, 'abi/SaiTop.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/SaiTop.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/SaiTop.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert(isinstance(web3, Web3))
@@ -910,8 +910,8 @@ class Vox(Contract):
         address: Ethereum address of the `Vox` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/SaiVox.abi')
-    bin = Contract._load_bin(__name__, 'abi/SaiVox.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/SaiVox.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/SaiVox.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert(isinstance(web3, Web3))
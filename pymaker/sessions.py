@@ -0,0 +1,140 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.util.retry import Retry
+
+from pymaker.metrics import get_metrics
+
+
+class _MeteredHTTPConnection(HTTPConnection):
+    def connect(self):
+        get_metrics().increment("pymaker_http_connections_total", labels={"host": self.host})
+        return super().connect()
+
+
+class _MeteredHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        get_metrics().increment("pymaker_http_connections_total", labels={"host": self.host})
+        return super().connect()
+
+
+class _MeteredHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _MeteredHTTPConnection
+
+
+class _MeteredHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _MeteredHTTPSConnection
+
+
+class MeteredHTTPAdapter(HTTPAdapter):
+    """Transport adapter reporting HTTP requests and opened connections to the metrics sink.
+
+    Every request increments `pymaker_http_requests_total` and every connection opened (or reopened
+    after the server has closed it) increments `pymaker_http_connections_total`, both labelled with
+    the host name. The difference between the two is the number of requests which reused
+    a kept-alive connection.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _MeteredHTTPConnectionPool,
+                                                   'https': _MeteredHTTPSConnectionPool}
+
+    def send(self, request, *args, **kwargs):
+        get_metrics().increment("pymaker_http_requests_total", labels={"host": urlparse(request.url).hostname})
+        return super().send(request, *args, **kwargs)
+
+
+def create_session(pool_size: int = 10,
+                   max_retries: int = 3,
+                   backoff_factor: float = 0.3,
+                   keep_alive: bool = True,
+                   gzip: bool = True) -> requests.Session:
+    """Create a `requests.Session` with a pool of persistent connections.
+
+    Connections get retried with exponential backoff if they cannot be established. Idempotent
+    requests (but not POSTs, i.e. relayer order submissions or JSON-RPC requests, which may have
+    already reached the server) are also retried on HTTP 429, 502, 503 and 504 responses.
+
+    Args:
+        pool_size: Maximum number of connections kept open to each host.
+        max_retries: Maximum number of retries of each request.
+        backoff_factor: Delay before the `n`-th retry is `backoff_factor * 2^(n-1)` seconds.
+        keep_alive: Whether connections should be kept open between requests.
+        gzip: Whether to ask servers for gzip-compressed responses.
+
+    Returns:
+        A new `requests.Session` instance.
+    """
+    assert(isinstance(pool_size, int))
+    assert(isinstance(max_retries, int))
+    assert(isinstance(backoff_factor, (int, float)))
+    assert(isinstance(keep_alive, bool))
+    assert(isinstance(gzip, bool))
+    assert(pool_size > 0)
+
+    retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=(429, 502, 503, 504),
+                  raise_on_status=False)
+    adapter = MeteredHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate' if gzip else 'identity'
+    session.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the shared `requests.Session`, creating one with default settings on first use.
+
+    The session is used by the 0x relayer API clients and by
+    :py:class:`pymaker.providers.SessionHTTPProvider`, so all of them share the same connection pool.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+
+        return _session
+
+
+def set_session(session: Optional[requests.Session]):
+    """Install the shared `requests.Session`, i.e. one created with :py:func:`create_session`.
+
+    Only clients created after the call will use the new session.
+
+    Args:
+        session: The new session, or `None` to go back to the default one.
+    """
+    assert(isinstance(session, requests.Session) or (session is None))
+
+    global _session
+    with _session_lock:
+        _session = session
@@ -40,8 +40,8 @@ class ShutdownModule(Contract):
       web3: An instance of `Web` from `web3.py`.
       address: Ethereum address of the `ESM` contract."""
 
-    abi = Contract._load_abi(__name__, 'abi/ESM.abi')
-    bin = Contract._load_bin(__name__, 'abi/ESM.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/ESM.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/ESM.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
@@ -89,8 +89,8 @@ class End(Contract):
       web3: An instance of `Web` from `web3.py`.
       address: Ethereum address of the `ESM` contract."""
 
-    abi = Contract._load_abi(__name__, 'abi/End.abi')
-    bin = Contract._load_bin(__name__, 'abi/End.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/End.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/End.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert isinstance(web3, Web3)
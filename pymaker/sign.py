@@ -16,11 +16,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import math
+import os
+import threading
 import time
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 
+import rlp
 from eth_account.messages import defunct_hash_message
-from eth_utils import encode_hex
+from eth_keys import keys
+from eth_utils import encode_hex, keccak
+from hexbytes import HexBytes
 from web3 import Web3
 
 from pymaker import Address
@@ -82,3 +89,217 @@ def to_vrs(signature: str) -> Tuple[int, bytes, bytes]:
     v = ord(bytes.fromhex(signature_hex[128:130]))
 
     return v, r, s
+
+
+# Batches smaller than this get signed or verified in the calling process, as handing them
+# over to worker processes would take longer than processing them in place.
+PARALLEL_BATCH_THRESHOLD = 32
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(processes: int) -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=processes)
+
+        return _process_pool
+
+
+def _in_chunks(function, items: list, processes: Optional[int]) -> list:
+    processes = processes if processes is not None else os.cpu_count() or 1
+    if processes <= 1 or len(items) < PARALLEL_BATCH_THRESHOLD:
+        return function(items)
+
+    size = math.ceil(len(items) / processes)
+    chunks = [items[index:index + size] for index in range(0, len(items), size)]
+    return [result for chunk in _get_process_pool(processes).map(function, chunks) for result in chunk]
+
+
+def _sign_chunk(items: list) -> list:
+    private_keys = {}
+
+    def sign(private_key: bytes, message_hash: bytes) -> str:
+        if private_key not in private_keys:
+            private_keys[private_key] = keys.PrivateKey(private_key)
+
+        signature = private_keys[private_key].sign_msg_hash(message_hash)
+        return bytes_to_hexstring(signature.to_bytes()[:64] + bytes([signature.v + 27]))
+
+    return [sign(*item) for item in items]
+
+
+def _recover_chunk(items: list) -> list:
+    def recover(message_hash: bytes, v: int, r: bytes, s: bytes) -> Optional[Address]:
+        try:
+            signature = keys.Signature(vrs=(v - 27, int.from_bytes(r, 'big'), int.from_bytes(s, 'big')))
+            return Address(signature.recover_public_key_from_msg_hash(message_hash).to_checksum_address())
+        except Exception:
+            return None
+
+    return [recover(*item) for item in items]
+
+
+def sign_message_hashes(private_key: bytes, message_hashes: List[bytes], processes: Optional[int] = None) -> List[str]:
+    """Sign many 32-byte message hashes with the same private key.
+
+    Large batches are split between worker processes, as signing is CPU-bound.
+
+    Args:
+        private_key: The private key to sign with.
+        message_hashes: Hashes to sign.
+        processes: Number of worker processes to use, by default the number of CPUs. `1` disables them.
+
+    Returns:
+        Signatures as hex strings, in the same format as returned by :py:func:`eth_sign` (`r`, `s` and `v`).
+    """
+    assert(isinstance(private_key, bytes))
+    assert(isinstance(message_hashes, list))
+    assert(isinstance(processes, int) or (processes is None))
+
+    return _in_chunks(_sign_chunk, [(private_key, message_hash) for message_hash in message_hashes], processes)
+
+
+def recover_message_hashes(message_hashes: List[bytes], signatures: List[Tuple[int, bytes, bytes]],
+                           processes: Optional[int] = None) -> List[Optional[Address]]:
+    """Recover the signers of many 32-byte message hashes.
+
+    Large batches are split between worker processes, as recovery is CPU-bound.
+
+    Args:
+        message_hashes: Hashes which have been signed.
+        signatures: Signatures of the hashes, as `(v, r, s)` tuples like the ones returned by :py:func:`to_vrs`.
+        processes: Number of worker processes to use, by default the number of CPUs. `1` disables them.
+
+    Returns:
+        Addresses of the signers, or `None` for signatures which are malformed.
+    """
+    assert(isinstance(message_hashes, list))
+    assert(isinstance(signatures, list))
+    assert(len(message_hashes) == len(signatures))
+    assert(isinstance(processes, int) or (processes is None))
+
+    return _in_chunks(_recover_chunk, [(message_hash, v, r, s) for message_hash, (v, r, s)
+                                       in zip(message_hashes, signatures)], processes)
+
+
+def eth_sign_batch(messages: List[bytes], web3: Web3, processes: Optional[int] = None) -> List[str]:
+    """Sign many messages the same way as :py:func:`eth_sign` does.
+
+    If a local key has been registered for `web3.eth.defaultAccount`, messages get signed
+    with :py:func:`sign_message_hashes`. Otherwise the node gets asked to sign each of them.
+    """
+    assert(isinstance(messages, list))
+    assert(isinstance(web3, Web3))
+
+    local_account = _registered_accounts.get((web3, Address(web3.eth.defaultAccount)))
+    if local_account is None:
+        return [eth_sign(message, web3) for message in messages]
+
+    start_time = time.time()
+    start_clock = time.process_time()
+    try:
+        return sign_message_hashes(bytes(HexBytes(local_account.key)),
+                                   [bytes(defunct_hash_message(primitive=message)) for message in messages],
+                                   processes)
+    finally:
+        logging.debug(f"Local signing of {len(messages)} message(s) took {time.time() - start_time:.3f}s time,"
+                      f" {time.process_time() - start_clock:.3f}s clock")
+
+
+def _typed_transaction_fields(transaction: dict) -> list:
+    return [transaction['chainId'],
+            transaction['nonce'],
+            transaction['maxPriorityFeePerGas'],
+            transaction['maxFeePerGas'],
+            transaction['gas'],
+            HexBytes(transaction['to']) if transaction.get('to') else b'',
+            transaction.get('value', 0),
+            HexBytes(transaction.get('data', b'')),
+            []]
+
+
+def sign_typed_transaction(account, transaction: dict) -> bytes:
+    """Sign an EIP-1559 (type-2) transaction with a local account.
+
+    `eth_account` versions supported by pymaker can only sign legacy transactions,
+    so the typed transaction envelope gets built here.
+
+    Args:
+        account: Local account, as registered with :py:func:`pymaker.keys.register_private_key`.
+        transaction: Transaction dictionary with `chainId`, `nonce`, `maxPriorityFeePerGas`,
+            `maxFeePerGas`, `gas`, `to`, `value` and `data` keys.
+
+    Returns:
+        Raw signed transaction, which can be sent with `eth_sendRawTransaction`.
+    """
+    assert(isinstance(transaction, dict))
+
+    fields = _typed_transaction_fields(transaction)
+    signature = keys.PrivateKey(HexBytes(account.key)).sign_msg_hash(keccak(b'\x02' + rlp.encode(fields)))
+
+    return b'\x02' + rlp.encode(fields + [signature.v, signature.r, signature.s])
+
+
+def recover_typed_transaction(raw_transaction: bytes) -> Address:
+    """Recover the sender of a signed EIP-1559 (type-2) transaction.
+
+    Args:
+        raw_transaction: Raw signed transaction, as returned by :py:func:`sign_typed_transaction`.
+
+    Returns:
+        Address of the transaction sender.
+    """
+    assert(isinstance(raw_transaction, bytes))
+    assert(raw_transaction[0] == 2)
+
+    fields = rlp.decode(raw_transaction[1:])
+    v, r, s = (int.from_bytes(value, 'big') for value in fields[9:12])
+    signature = keys.Signature(vrs=(v, r, s))
+    public_key = signature.recover_public_key_from_msg_hash(keccak(b'\x02' + rlp.encode(fields[:9])))
+
+    return Address(public_key.to_checksum_address())
+
+
+_EIP712_DOMAIN_TYPEHASH = keccak(text="EIP712Domain(string name,string version,address verifyingContract)")
+_EIP712_DOMAIN_WITH_CHAIN_ID_TYPEHASH = keccak(
+    text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+
+
+def eip712_word(value) -> bytes:
+    """Encode an `address`, `uint256` or `bytes32` value as a single 32-byte EIP-712 word."""
+    if isinstance(value, Address):
+        return bytes(12) + bytes.fromhex(value.address[2:])
+    elif isinstance(value, int):
+        return value.to_bytes(32, 'big')
+    else:
+        assert(isinstance(value, bytes) and len(value) == 32)
+        return value
+
+
+def eip712_domain_separator(name: str, version: str, verifying_contract: Address, chain_id: Optional[int] = None) -> bytes:
+    """Calculate the EIP-712 domain separator.
+
+    The `chainId` field is only part of the domain if `chain_id` is specified.
+    """
+    assert(isinstance(name, str))
+    assert(isinstance(version, str))
+    assert(isinstance(verifying_contract, Address))
+    assert(isinstance(chain_id, int) or (chain_id is None))
+
+    if chain_id is None:
+        return keccak(_EIP712_DOMAIN_TYPEHASH + keccak(text=name) + keccak(text=version)
+                      + eip712_word(verifying_contract))
+    else:
+        return keccak(_EIP712_DOMAIN_WITH_CHAIN_ID_TYPEHASH + keccak(text=name) + keccak(text=version)
+                      + eip712_word(chain_id) + eip712_word(verifying_contract))
+
+
+def eip712_hash(domain_separator: bytes, struct_hash: bytes) -> bytes:
+    """Calculate the EIP-712 hash of a struct, given its `hashStruct` and the domain separator."""
+    assert(isinstance(domain_separator, bytes))
+    assert(isinstance(struct_hash, bytes))
+
+    return keccak(b"\x19\x01" + domain_separator + struct_hash)
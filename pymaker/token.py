@@ -31,7 +31,7 @@ class ERC20Token(Contract):
         address: Ethereum address of the ERC20 token.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/ERC20Token.abi')
+    abi = Contract._lazy_abi(__name__, 'abi/ERC20Token.abi')
     registry = {}
 
     def __init__(self, web3: Web3, address: Address):
@@ -186,8 +186,8 @@ class DSToken(ERC20Token):
         address: Ethereum address of the `DSToken` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSToken.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSToken.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSToken.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSToken.bin')
 
     @staticmethod
     def deploy(web3: Web3, symbol: str):
@@ -295,8 +295,8 @@ class DSEthToken(ERC20Token):
         address: Ethereum address of the `DSEthToken` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSEthToken.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSEthToken.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSEthToken.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSEthToken.bin')
 
     @staticmethod
     def deploy(web3: Web3):
@@ -0,0 +1,227 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from web3 import Web3
+
+
+# Frames from these modules are never reported as callers, as they belong either to
+# web3.py and its dependencies or to the Python runtime machinery sitting in between.
+_IGNORED_MODULES = ('pymaker.tracing', 'pymaker.metrics', 'web3', 'eth_', 'hexbytes', 'requests', 'urllib3',
+                    'websockets', 'asyncio', 'threading', 'concurrent', 'functools', 'contextlib', 'toolz', 'cytoolz')
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    instance = frame.f_locals.get('self')
+    if instance is not None:
+        return f"{type(instance).__name__}.{code.co_name}"
+
+    cls = frame.f_locals.get('cls')
+    if isinstance(cls, type):
+        return f"{cls.__name__}.{code.co_name}"
+
+    return f"{frame.f_globals.get('__name__', '?')}.{code.co_name}"
+
+
+def _json_size(value) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class RpcCall:
+    """Single JSON-RPC request recorded by :py:class:`RpcTracer`.
+
+    Attributes:
+        method: JSON-RPC method name, i.e. `eth_call`.
+        params_size: Size of JSON-encoded request parameters (in bytes).
+        response_size: Size of JSON-encoded response (in bytes).
+        latency: Time it took to get the response (in seconds).
+        caller: Name of the innermost pymaker frame which triggered the request, i.e. `Vat.ilk`.
+        stack: Names of calling frames, outermost first.
+        timestamp: Unix timestamp of the request.
+    """
+    def __init__(self, method: str, params_size: int, response_size: int, latency: float,
+                 caller: str, stack: tuple, timestamp: float):
+        self.method = method
+        self.params_size = params_size
+        self.response_size = response_size
+        self.latency = latency
+        self.caller = caller
+        self.stack = stack
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return f"RpcCall('{self.method}', caller='{self.caller}', latency={self.latency:.4f}," \
+               f" params_size={self.params_size}, response_size={self.response_size})"
+
+
+class RpcTracer:
+    """Records every JSON-RPC request made through a `Web3` instance into a ring buffer.
+
+    For every request the method name, request and response sizes, latency and the calling
+    frames are recorded. The calling pymaker frame (i.e. `Vat.ilk` or `SimpleMarket.get_order`)
+    makes it easy to find redundant calls made by keepers.
+
+    The tracer has to be installed as a middleware:
+
+        tracer = RpcTracer()
+        tracer.install(web3)
+
+    and the collected data can be dumped with `summary()` or `folded_stacks()`. The latter
+    produces the folded stack format accepted by `flamegraph.pl` and speedscope.
+    See also :py:meth:`pymaker.lifecycle.Lifecycle.trace_rpc_calls`.
+
+    Attributes:
+        capacity: Maximum number of requests kept in the ring buffer.
+        max_depth: Maximum number of calling frames recorded for each request.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, capacity: int = 10000, max_depth: int = 16):
+        assert(isinstance(capacity, int))
+        assert(isinstance(max_depth, int))
+        assert(capacity > 0)
+        assert(max_depth > 0)
+
+        self.capacity = capacity
+        self.max_depth = max_depth
+        self.calls = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+
+    def install(self, web3: Web3):
+        """Inject the tracing middleware into `web3`, as close to the provider as possible.
+
+        Injecting it at the innermost layer means the raw JSON-RPC responses are measured and
+        requests served by caching middlewares are not recorded.
+
+        Args:
+            web3: An instance of `Web3` from `web3.py`.
+        """
+        assert(isinstance(web3, Web3))
+
+        web3.middleware_onion.inject(self.middleware, layer=0)
+
+    def middleware(self, make_request, web3):
+        def middleware(method, params):
+            caller, stack = self._callers()
+            start = time.perf_counter()
+            response = None
+            try:
+                response = make_request(method, params)
+                return response
+            finally:
+                self.record(RpcCall(method=method,
+                                    params_size=_json_size(params),
+                                    response_size=_json_size(response),
+                                    latency=time.perf_counter() - start,
+                                    caller=caller,
+                                    stack=stack,
+                                    timestamp=time.time()))
+
+        return middleware
+
+    def _callers(self):
+        caller = None
+        stack = []
+        frame = sys._getframe(2)
+        while frame is not None and len(stack) < self.max_depth:
+            module = frame.f_globals.get('__name__', '')
+            if not module.startswith(_IGNORED_MODULES):
+                name = _frame_name(frame)
+                stack.append(name)
+                if caller is None and module.startswith('pymaker'):
+                    caller = name
+            frame = frame.f_back
+
+        return caller or (stack[0] if stack else '?'), tuple(reversed(stack))
+
+    def record(self, call: RpcCall):
+        assert(isinstance(call, RpcCall))
+
+        with self.lock:
+            self.calls.append(call)
+
+    def snapshot(self) -> List[RpcCall]:
+        """Return a copy of the requests currently kept in the ring buffer, oldest first."""
+        with self.lock:
+            return list(self.calls)
+
+    def clear(self):
+        with self.lock:
+            self.calls.clear()
+
+    def summary(self, limit: Optional[int] = 50) -> str:
+        """Aggregate the recorded requests per calling frame and method.
+
+        Args:
+            limit: Maximum number of rows to return, most time-consuming first.
+
+        Returns:
+            A human-readable table with request count, total and average latency,
+            and total request and response sizes.
+        """
+        assert(isinstance(limit, int) or (limit is None))
+
+        totals = {}
+        for call in self.snapshot():
+            entry = totals.setdefault((call.caller, call.method), [0, 0.0, 0, 0])
+            entry[0] += 1
+            entry[1] += call.latency
+            entry[2] += call.params_size
+            entry[3] += call.response_size
+
+        rows = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        lines = [f"{'caller':<48} {'method':<28} {'count':>8} {'total_s':>10} {'avg_ms':>9} {'sent':>10} {'received':>12}"]
+        for (caller, method), (count, latency, sent, received) in rows:
+            lines.append(f"{caller:<48} {method:<28} {count:>8} {latency:>10.3f} {latency/count*1000:>9.2f}"
+                         f" {sent:>10} {received:>12}")
+
+        return "\n".join(lines)
+
+    def folded_stacks(self, weight: str = 'latency') -> str:
+        """Aggregate the recorded requests into the folded stack format used by flame graph tools.
+
+        Args:
+            weight: Either `latency` (microseconds spent) or `count` (number of requests).
+
+        Returns:
+            One `frame;frame;...;method value` line per distinct call stack.
+        """
+        assert(weight in ('latency', 'count'))
+
+        totals = {}
+        for call in self.snapshot():
+            key = ";".join(call.stack + (call.method,))
+            totals[key] = totals.get(key, 0) + (call.latency * 1000000 if weight == 'latency' else 1)
+
+        return "\n".join(f"{key} {int(value)}" for key, value in sorted(totals.items()))
+
+    def dump(self):
+        """Log the summary of recorded requests."""
+        calls = self.snapshot()
+        total = sum(call.latency for call in calls)
+        self.logger.info(f"RPC trace of last {len(calls)} request(s), {total:.3f}s in total:\n{self.summary()}")
@@ -15,14 +15,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import operator
-from functools import reduce
-from typing import List
+from typing import List, Optional, Union
 
 from web3 import Web3
 
-from pymaker import Contract, Address, Invocation, Transact
+from pymaker import Contract, Address, Invocation, Receipt, Transact
 from pymaker.token import ERC20Token
+from pymaker.util import synchronize
 
 
 class TxManager(Contract):
@@ -46,8 +45,8 @@ class TxManager(Contract):
         address: Ethereum address of the `TxManager` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/TxManager.abi')
-    bin = Contract._load_bin(__name__, 'abi/TxManager.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/TxManager.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/TxManager.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert(isinstance(web3, Web3))
@@ -93,19 +92,162 @@ class TxManager(Contract):
         def token_addresses() -> list:
             return list(map(lambda address: address.address, tokens))
 
-        def script() -> bytes:
-            return reduce(operator.add, map(lambda invocation: script_entry(invocation), invocations), bytes())
+        assert(isinstance(tokens, list))
+        assert(isinstance(invocations, list))
 
-        def script_entry(invocation: Invocation) -> bytes:
-            address = invocation.address.as_bytes()
-            calldata = invocation.calldata.as_bytes()
-            calldata_length = len(calldata).to_bytes(32, byteorder='big')
-            return address + calldata_length + calldata
+        return Transact(self, self.web3, self.abi, self.address, self._contract, 'execute',
+                        [token_addresses(), self.script(invocations)])
 
-        assert(isinstance(tokens, list))
+    @staticmethod
+    def script(invocations: List[Invocation]) -> bytes:
+        """Encode invocations as the script understood by the `execute` method of the `TxManager` contract.
+
+        Each entry consists of the target address (20 bytes), calldata length (32 bytes) and calldata.
+        """
         assert(isinstance(invocations, list))
 
-        return Transact(self, self.web3, self.abi, self.address, self._contract, 'execute', [token_addresses(), script()])
+        parts = []
+        for invocation in invocations:
+            calldata = invocation.calldata.as_bytes()
+            parts.append(invocation.address.as_bytes())
+            parts.append(len(calldata).to_bytes(32, byteorder='big'))
+            parts.append(calldata)
+
+        return b''.join(parts)
 
     def __repr__(self):
         return f"TxManager('{self.address}')"
+
+
+class TxBatch:
+    """Collects contract invocations and executes them in as few `TxManager` transactions as possible.
+
+    Invocations (or :py:class:`pymaker.Transact` instances, which get converted with `invocation()`)
+    are split into bundles, each of them executed with a single `TxManager.execute` call and
+    consuming no more than `max_gas` gas. Useful for repetitive keeper actions like calling
+    `Vow.flog` for dozens of eras or `Jug.drip` for every ilk:
+
+        batch = TxBatch(tx_manager)
+        for ilk in ilks:
+            batch.add(mcd.jug.drip(ilk))
+        receipts = batch.transact()
+
+    Bear in mind that the calls are made by the `TxManager` contract, so only methods
+    callable by anyone (or by the `TxManager` itself) can be batched this way. As `TxManager`
+    reverts the whole transaction if any of the invocations fails, the outcome of each invocation
+    is the outcome of the bundle it has been put in.
+
+    Attributes:
+        tx_manager: The :py:class:`TxManager` to execute bundles with.
+        max_gas: Maximum amount of gas a single bundle is allowed to consume.
+        tokens: Addresses of ERC20 tokens the invocations should be able to access.
+    """
+
+    # Gas spent by `TxManager.execute` itself and by each script entry on top of the invoked method.
+    BUNDLE_GAS_OVERHEAD = 50000
+    ENTRY_GAS_OVERHEAD = 10000
+
+    def __init__(self, tx_manager: TxManager, max_gas: int = 5000000, tokens: Optional[List[Address]] = None):
+        assert(isinstance(tx_manager, TxManager))
+        assert(isinstance(max_gas, int))
+        assert(isinstance(tokens, list) or (tokens is None))
+        assert(max_gas > self.BUNDLE_GAS_OVERHEAD)
+
+        self.tx_manager = tx_manager
+        self.max_gas = max_gas
+        self.tokens = tokens or []
+        self.invocations = []
+        self.gas_estimates = []
+
+    def add(self, invocation: Union[Invocation, Transact], gas: Optional[int] = None) -> int:
+        """Add an invocation to the batch.
+
+        Args:
+            invocation: Either an :py:class:`pymaker.Invocation` or a :py:class:`pymaker.Transact`.
+            gas: Amount of gas the invocation is expected to consume. If not specified,
+                it will be estimated once the batch gets split into bundles.
+
+        Returns:
+            Index of the invocation, which is also its index in the list returned by `transact`.
+        """
+        if isinstance(invocation, Transact):
+            invocation = invocation.invocation()
+
+        assert(isinstance(invocation, Invocation))
+        assert(isinstance(gas, int) or (gas is None))
+
+        self.invocations.append(invocation)
+        self.gas_estimates.append(gas)
+        return len(self.invocations) - 1
+
+    def _estimate_gas(self, invocation: Invocation) -> int:
+        return self.tx_manager.web3.eth.estimateGas({'from': self.tx_manager.address.address,
+                                                     'to': invocation.address.address,
+                                                     'data': invocation.calldata.value})
+
+    @staticmethod
+    def split(gas_estimates: List[int], max_gas: int) -> List[List[int]]:
+        """Split invocations into bundles, keeping their order and the gas consumed by each bundle under `max_gas`.
+
+        Args:
+            gas_estimates: Gas expected to be consumed by each invocation.
+            max_gas: Maximum amount of gas a single bundle is allowed to consume.
+
+        Returns:
+            A list of bundles, each being a list of invocation indices. Invocations which would exceed
+            `max_gas` on their own end up in a bundle of their own.
+        """
+        assert(isinstance(gas_estimates, list))
+        assert(isinstance(max_gas, int))
+
+        bundles = []
+        bundle = []
+        bundle_gas = TxBatch.BUNDLE_GAS_OVERHEAD
+        for index, gas in enumerate(gas_estimates):
+            entry_gas = gas + TxBatch.ENTRY_GAS_OVERHEAD
+            if len(bundle) > 0 and bundle_gas + entry_gas > max_gas:
+                bundles.append(bundle)
+                bundle = []
+                bundle_gas = TxBatch.BUNDLE_GAS_OVERHEAD
+
+            bundle.append(index)
+            bundle_gas += entry_gas
+
+        if len(bundle) > 0:
+            bundles.append(bundle)
+
+        return bundles
+
+    def bundles(self) -> List[List[int]]:
+        """Estimate gas for invocations which do not have it specified, and split them into bundles.
+
+        Returns:
+            A list of bundles, each being a list of invocation indices.
+        """
+        for index, invocation in enumerate(self.invocations):
+            if self.gas_estimates[index] is None:
+                self.gas_estimates[index] = self._estimate_gas(invocation)
+
+        return self.split(self.gas_estimates, self.max_gas)
+
+    def transact(self, **kwargs) -> List[Optional[Receipt]]:
+        """Execute all the bundles, sending them concurrently.
+
+        Accepts the same keyword arguments as :py:meth:`pymaker.Transact.transact`.
+
+        Returns:
+            A list with the outcome of each invocation, in the order they have been added: the
+            :py:class:`pymaker.Receipt` of the bundle the invocation has been executed in,
+            or `None` if that bundle has failed.
+        """
+        bundles = self.bundles()
+        transacts = [self.tx_manager.execute(self.tokens, [self.invocations[index] for index in bundle])
+                     for bundle in bundles]
+        receipts = synchronize([transact.transact_async(**kwargs) for transact in transacts])
+
+        outcomes = [None] * len(self.invocations)
+        for bundle, receipt in zip(bundles, receipts):
+            for index in bundle:
+                outcomes[index] = receipt
+
+        return outcomes
@@ -15,20 +15,118 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
+import os
+import threading
 import time
 import logging
-from math import sqrt
-from typing import List
+from collections import OrderedDict
+from fractions import Fraction
+from pprint import pformat
+from typing import List, Optional
 
 from attrdict import AttrDict
+from hexbytes import HexBytes
 from web3 import Web3
 
 from pymaker import Contract, Address, Transact, Wad
+from pymaker.providers import make_batch_calls
 from pymaker.token import ERC20Token
+from pymaker.util import abi_decode_single, abi_encode_single, function_selector, isqrt
+
+
+class PairCache:
+    """Remembers data of Uniswap pairs which never changes, separately for each chain.
+
+    Addresses of the pairs created by each factory (pairs only ever get appended to `allPairs`),
+    the tokens of each pair and the decimals of each token get read from the node only once.
+    If `path` is specified, they are persisted in a JSON file so they survive keeper restarts.
+
+    Attributes:
+        path: Optional path of the JSON file the data is persisted in.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, path: Optional[str] = None):
+        assert (isinstance(path, str) or (path is None))
+
+        self.path = path
+        self.data = {}
+        self.lock = threading.Lock()
+
+        if path is not None and os.path.isfile(path):
+            try:
+                with open(path, "r") as file:
+                    self.data = json.load(file)
+            except Exception as e:
+                self.logger.warning(f"Unable to read pair cache from {path} ({e}), starting with an empty one")
+
+    def get(self, web3: Web3, section: str, key: Address):
+        """Value cached under `key` in `section` (`pairs`, `tokens` or `decimals`), `None` if not cached."""
+        assert (isinstance(section, str))
+        assert (isinstance(key, Address))
+
+        chain_id = Contract.contract_cache.chain_id(web3)
+        with self.lock:
+            return self.data.get(chain_id, {}).get(section, {}).get(key.address)
+
+    def update(self, web3: Web3, section: str, values: dict):
+        """Cache `values`, a dictionary of JSON-serializable values keyed by `Address`, in `section`."""
+        assert (isinstance(section, str))
+        assert (isinstance(values, dict))
+
+        if not values:
+            return
+
+        chain_id = Contract.contract_cache.chain_id(web3)
+        with self.lock:
+            self.data.setdefault(chain_id, {}).setdefault(section, {}).update(
+                {key.address: value for key, value in values.items()})
+            self._save()
+
+    def clear(self):
+        with self.lock:
+            self.data = {}
+            self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+
+        try:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(self.data, file)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            self.logger.warning(f"Unable to write pair cache to {self.path} ({e})")
 
 
 class UniswapFactory(Contract):
-    abi = Contract._load_abi(__name__, 'abi/UniswapV2Factory.abi')
+    """A client for the Uniswap V2 factory contract.
+
+    Attributes:
+        pair_cache: :py:class:`pymaker.uniswap_v2.PairCache` instance remembering pair addresses, pair tokens
+            and token decimals. Can be replaced i.e. with one persisted to a file.
+    """
+    abi = Contract._lazy_abi(__name__, 'abi/UniswapV2Factory.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/UniswapV2Factory.bin')
+    pair_cache = PairCache()
+
+    @staticmethod
+    def deploy(web3: Web3, fee_to_setter: Address):
+        """Deploy a new instance of the `UniswapV2Factory` contract.
+
+        Args:
+            web3: An instance of `Web` from `web3.py`.
+            fee_to_setter: Address allowed to set the protocol fee recipient.
+
+        Returns:
+            A `UniswapFactory` class instance.
+        """
+        assert (isinstance(fee_to_setter, Address))
+        return UniswapFactory(web3=web3, factory_address=Contract._deploy(web3, UniswapFactory.abi, UniswapFactory.bin,
+                                                                          [fee_to_setter.address]))
 
     def __init__(self, web3: Web3, factory_address: Address):
         assert (isinstance(web3, Web3))
@@ -41,10 +139,118 @@ class UniswapFactory(Contract):
     def get_pair_address(self, first_token: Address, second_token: Address) -> Address:
         return Address(self._contract.functions.getPair(first_token.address, second_token.address).call())
 
-    def get_pairs_addreses(self) -> List[Address]:
-        all_pairs_length = self._contract.functions.allPairsLength().call()
-        return [Address(self._contract.functions.allPairs(address_index).call()) for address_index in
-                range(all_pairs_length)]
+    def get_pairs_addreses(self, block_number: Optional[int] = None, batch_size: int = 100) -> List[Address]:
+        """Addresses of all the pairs created by the factory, in the order they have been created.
+
+        Only the pairs created since the last call get read (in JSON-RPC batches of `allPairs(i)` calls),
+        the ones read before come from :py:attr:`pair_cache`.
+
+        Args:
+            block_number: Block to read the pairs at, by default the latest one.
+            batch_size: Maximum number of calls sent in a single HTTP request.
+        """
+        assert (isinstance(block_number, int) or (block_number is None))
+
+        block_identifier = block_number if block_number is not None else 'latest'
+        all_pairs_length = abi_decode_single('uint256', make_batch_calls(
+            self.web3, [(self.address, function_selector('allPairsLength()'))], block_identifier)[0])
+
+        known_pairs = self.pair_cache.get(self.web3, 'pairs', self.address) or []
+        if len(known_pairs) < all_pairs_length:
+            results = make_batch_calls(self.web3, [(self.address, function_selector('allPairs(uint256)') +
+                                                    abi_encode_single('uint256', index))
+                                                   for index in range(len(known_pairs), all_pairs_length)],
+                                       block_identifier, batch_size)
+
+            known_pairs = known_pairs + [abi_decode_single('address', result) for result in results]
+            self.pair_cache.update(self.web3, 'pairs', {self.address: known_pairs})
+
+        return [Address(pair) for pair in known_pairs[:all_pairs_length]]
+
+    def get_pair_tokens(self, pairs: List[Address], batch_size: int = 100) -> List[List[Address]]:
+        """Tokens (`token0` and `token1`) of each of `pairs`, read only if not in :py:attr:`pair_cache` yet."""
+        return self._get_pair_tokens(pairs, 'latest', batch_size)
+
+    def get_reserves(self, pairs: List[Address], block_number: Optional[int] = None,
+                     batch_size: int = 100) -> List[AttrDict]:
+        """Reserves of each of `pairs`, all read at the same block in JSON-RPC batches.
+
+        Args:
+            pairs: Addresses of the pairs.
+            block_number: Block to read the reserves at, by default the latest one.
+            batch_size: Maximum number of calls sent in a single HTTP request.
+
+        Returns:
+            Reserves of the pairs, in the same format as :py:attr:`pymaker.uniswap_v2.UniswapPair.reserves`.
+        """
+        assert (isinstance(pairs, list))
+        assert (isinstance(block_number, int) or (block_number is None))
+
+        if block_number is None:
+            block_number = self.web3.eth.blockNumber
+
+        tokens = self._get_pair_tokens(pairs, block_number, batch_size)
+        results = make_batch_calls(self.web3, [(pair, function_selector('getReserves()')) for pair in pairs],
+                                   block_number, batch_size)
+
+        return [_reserves(first_token, second_token, *abi_decode_single('(uint112,uint112,uint32)', result)[:2])
+                for (first_token, second_token), result in zip(tokens, results)]
+
+    def get_decimals(self, tokens: List[Address], batch_size: int = 100) -> List[int]:
+        """Decimals of each of `tokens`, read only if not in :py:attr:`pair_cache` yet."""
+        assert (isinstance(tokens, list))
+
+        decimals = {token: self.pair_cache.get(self.web3, 'decimals', token) for token in tokens}
+        missing = list(dict.fromkeys(token for token, value in decimals.items() if value is None))
+
+        results = make_batch_calls(self.web3, [(token, function_selector('decimals()')) for token in missing],
+                                   'latest', batch_size)
+        read = {token: abi_decode_single('uint256', result) for token, result in zip(missing, results)}
+        self.pair_cache.update(self.web3, 'decimals', read)
+        decimals.update(read)
+
+        return [decimals[token] for token in tokens]
+
+    def get_pools(self, block_number: Optional[int] = None, batch_size: int = 100) -> List['UniswapV2Pool']:
+        """Read all the pairs created by the factory, with their tokens and reserves, as local pool models.
+
+        All the reads happen at the same block and are sent in JSON-RPC batches, so even thousands
+        of pairs take only a few requests. Pair addresses and tokens read before come from
+        :py:attr:`pair_cache`, so subsequent calls only read the reserves.
+
+        Args:
+            block_number: Block to read the pairs at, by default the latest one.
+            batch_size: Maximum number of calls sent in a single HTTP request.
+
+        Returns:
+            List of :py:class:`pymaker.uniswap_v2.UniswapV2Pool`, in the order the pairs have been created.
+        """
+        assert (isinstance(block_number, int) or (block_number is None))
+
+        if block_number is None:
+            block_number = self.web3.eth.blockNumber
+
+        pairs = self.get_pairs_addreses(block_number, batch_size)
+        return [UniswapV2Pool(reserves.first_token, reserves.second_token,
+                              reserves.first_token_amount, reserves.second_token_amount,
+                              last_block=block_number, address=pair)
+                for pair, reserves in zip(pairs, self.get_reserves(pairs, block_number, batch_size))]
+
+    def _get_pair_tokens(self, pairs: List[Address], block_identifier, batch_size: int) -> List[List[Address]]:
+        assert (isinstance(pairs, list))
+
+        tokens = {pair: self.pair_cache.get(self.web3, 'tokens', pair) for pair in pairs}
+        missing = list(dict.fromkeys(pair for pair, value in tokens.items() if value is None))
+
+        results = make_batch_calls(self.web3, [(pair, function_selector(signature)) for pair in missing
+                                               for signature in ['token0()', 'token1()']],
+                                   block_identifier, batch_size)
+        read = {pair: [abi_decode_single('address', results[2 * index]),
+                       abi_decode_single('address', results[2 * index + 1])] for index, pair in enumerate(missing)}
+        self.pair_cache.update(self.web3, 'tokens', read)
+        tokens.update(read)
+
+        return [[Address(token) for token in tokens[pair]] for pair in pairs]
 
     def create_pair(self, first_token: Address, second_token: Address) -> Transact:
         return Transact(self, self.web3, self.abi, self.address, self._contract,
@@ -58,8 +264,31 @@ class UniswapFactory(Contract):
         return f"UniswapFactory('{self.address}')"
 
 
+def _reserves(first_token: Address, second_token: Address, first_token_amount: int,
+              second_token_amount: int) -> AttrDict:
+    return AttrDict({
+        'first_token': first_token,
+        'first_token_amount': Wad(first_token_amount),
+        'second_token': second_token,
+        'second_token_amount': Wad(second_token_amount),
+
+        'map': lambda: AttrDict({first_token: Wad(first_token_amount), second_token: Wad(second_token_amount)})
+    })
+
+
+class LogSync:
+    def __init__(self, log):
+        self.pair = Address(log['address'])
+        self.first_token_amount = Wad(int(log['args']['reserve0']))
+        self.second_token_amount = Wad(int(log['args']['reserve1']))
+        self.raw = log
+
+    def __repr__(self):
+        return pformat(vars(self))
+
+
 class UniswapPair(Contract):
-    abi = Contract._load_abi(__name__, 'abi/UniswapV2Pair.abi')
+    abi = Contract._lazy_abi(__name__, 'abi/UniswapV2Pair.abi')
     logger = logging.getLogger(__name__)
 
     def __init__(self, web3: Web3, pair_address: Address):
@@ -73,23 +302,16 @@ class UniswapPair(Contract):
 
     @property
     def reserves(self) -> AttrDict:
-        _reserves = self._contract.functions.getReserves().call()
-        return AttrDict({
-            'first_token': self.first_token,
-            'first_token_amount': Wad(_reserves[0]),
-            'second_token': self.second_token,
-            'second_token_amount': Wad(_reserves[1]),
-
-            'map': lambda: AttrDict({self.first_token: Wad(_reserves[0]), self.second_token: Wad(_reserves[1])})
-        })
+        reserves = self._contract.functions.getReserves().call()
+        return _reserves(self.first_token, self.second_token, reserves[0], reserves[1])
 
     @property
     def first_token(self) -> Address:
-        return Address(self._contract.functions.token0().call())
+        return self._tokens()[0]
 
     @property
     def second_token(self) -> Address:
-        return Address(self._contract.functions.token1().call())
+        return self._tokens()[1]
 
     @property
     def liquidity(self) -> Wad:
@@ -115,6 +337,32 @@ class UniswapPair(Contract):
     def get_liquidity(self, address: Address) -> Wad:
         return Wad(self._contract.functions.balanceOf(address.address).call())
 
+    def past_sync(self, number_of_past_blocks: int, event_filter: dict = None) -> List[LogSync]:
+        """Synchronously retrieve past Sync events.
+
+        `Sync` events are emitted by the pair contract every time its reserves change,
+        i.e. on every swap, liquidity deposit or withdrawal.
+
+        Args:
+            number_of_past_blocks: Number of past Ethereum blocks to retrieve the events from.
+            event_filter: Filter which will be applied to returned events.
+
+        Returns:
+            List of past `Sync` events represented as :py:class:`pymaker.uniswap_v2.LogSync` class.
+        """
+        assert (isinstance(number_of_past_blocks, int))
+        assert (isinstance(event_filter, dict) or (event_filter is None))
+
+        return self._past_events(self._contract, 'Sync', LogSync, number_of_past_blocks, event_filter)
+
+    def _tokens(self) -> List[Address]:
+        tokens = UniswapFactory.pair_cache.get(self.web3, 'tokens', self.address)
+        if tokens is None:
+            tokens = [self._contract.functions.token0().call(), self._contract.functions.token1().call()]
+            UniswapFactory.pair_cache.update(self.web3, 'tokens', {self.address: tokens})
+
+        return [Address(token) for token in tokens]
+
     def __eq__(self, other):
         assert (isinstance(other, UniswapPair))
         return self.address == other.address
@@ -123,11 +371,500 @@ class UniswapPair(Contract):
         return f"UniswapPair('{self.address}')"
 
 
+class UniswapV2Pool:
+    """Local model of a Uniswap V2 pair, quoting swaps without calling the chain.
+
+    Amounts are calculated with the same integer arithmetic `UniswapV2Library` uses (0.3% fee,
+    rounding down outputs and rounding up inputs), so for the same reserves they are identical
+    to the ones returned by the router. The model can follow the pair by applying its `Sync`
+    events, which get emitted every time its reserves change.
+
+    Attributes:
+        first_token: Address of `token0` of the pair.
+        second_token: Address of `token1` of the pair.
+        pair: The :py:class:`pymaker.uniswap_v2.UniswapPair` followed by :py:meth:`sync`, if any.
+        last_block: Number of the last block whose events have been applied.
+        address: Address of the pair, if known.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, first_token: Address, second_token: Address, first_token_amount: Wad,
+                 second_token_amount: Wad, pair: Optional[UniswapPair] = None, last_block: Optional[int] = None,
+                 address: Optional[Address] = None):
+        assert (isinstance(first_token, Address))
+        assert (isinstance(second_token, Address))
+        assert (isinstance(first_token_amount, Wad))
+        assert (isinstance(second_token_amount, Wad))
+        assert (isinstance(pair, UniswapPair) or (pair is None))
+        assert (isinstance(last_block, int) or (last_block is None))
+        assert (isinstance(address, Address) or (address is None))
+        assert (first_token != second_token)
+
+        self.first_token = first_token
+        self.second_token = second_token
+        self.pair = pair
+        self.last_block = last_block
+        self.address = address if address is not None or pair is None else pair.address
+        self._reserves = {first_token: first_token_amount.value, second_token: second_token_amount.value}
+
+    @staticmethod
+    def from_pair(pair: UniswapPair) -> 'UniswapV2Pool':
+        """Create a model of `pair` seeded with its current reserves."""
+        assert (isinstance(pair, UniswapPair))
+
+        # `Sync` events carry absolute reserves, so applying one already reflected here does no harm
+        last_block = pair.web3.eth.blockNumber
+        reserves = pair.reserves
+        return UniswapV2Pool(reserves.first_token, reserves.second_token, reserves.first_token_amount,
+                             reserves.second_token_amount, pair, last_block)
+
+    @property
+    def tokens(self) -> List[Address]:
+        return [self.first_token, self.second_token]
+
+    @property
+    def reserves(self) -> AttrDict:
+        return AttrDict({
+            'first_token': self.first_token,
+            'first_token_amount': Wad(self._reserves[self.first_token]),
+            'second_token': self.second_token,
+            'second_token_amount': Wad(self._reserves[self.second_token]),
+
+            'map': lambda: AttrDict({token: Wad(amount) for token, amount in self._reserves.items()})
+        })
+
+    def quote(self, token_in: Address, token_out: Address, amount_in: Wad) -> Wad:
+        """Equivalent amount of `token_out` at the current price, without the fee and the price impact."""
+        assert (isinstance(amount_in, Wad))
+
+        reserve_in, reserve_out = self._reserves_of(token_in, token_out)
+        if amount_in.value <= 0:
+            raise ValueError("UniswapV2Library: INSUFFICIENT_AMOUNT")
+        if reserve_in <= 0 or reserve_out <= 0:
+            raise ValueError("UniswapV2Library: INSUFFICIENT_LIQUIDITY")
+
+        return Wad(amount_in.value * reserve_out // reserve_in)
+
+    def get_amount_output(self, token_in: Address, token_out: Address, amount_in: Wad) -> Wad:
+        """Amount of `token_out` a swap of exactly `amount_in` of `token_in` would return."""
+        assert (isinstance(amount_in, Wad))
+
+        reserve_in, reserve_out = self._reserves_of(token_in, token_out)
+        return Wad(_get_amount_out(amount_in.value, reserve_in, reserve_out))
+
+    def get_amount_input(self, token_in: Address, token_out: Address, amount_out: Wad) -> Wad:
+        """Amount of `token_in` a swap returning exactly `amount_out` of `token_out` would take."""
+        assert (isinstance(amount_out, Wad))
+
+        reserve_in, reserve_out = self._reserves_of(token_in, token_out)
+        return Wad(_get_amount_in(amount_out.value, reserve_in, reserve_out))
+
+    def swap(self, token_in: Address, token_out: Address, amount_in: Wad) -> Wad:
+        """Simulate a swap of exactly `amount_in` of `token_in`, updating the reserves.
+
+        Returns:
+            Amount of `token_out` the swap returned.
+        """
+        amount_out = self.get_amount_output(token_in, token_out, amount_in)
+        self._reserves[token_in] += amount_in.value
+        self._reserves[token_out] -= amount_out.value
+
+        return amount_out
+
+    def apply(self, event: LogSync):
+        """Set the reserves to the ones carried by a `Sync` event of the pair."""
+        assert (isinstance(event, LogSync))
+
+        self._reserves[self.first_token] = event.first_token_amount.value
+        self._reserves[self.second_token] = event.second_token_amount.value
+
+    def sync(self, to_block: Optional[int] = None) -> int:
+        """Fetch `Sync` events emitted by the pair since the last sync and apply them.
+
+        Args:
+            to_block: Last block to fetch the events from, by default the latest one.
+
+        Returns:
+            Number of events applied.
+        """
+        assert (isinstance(to_block, int) or (to_block is None))
+        assert (self.pair is not None)
+
+        if to_block is None:
+            to_block = self.pair.web3.eth.blockNumber
+
+        from_block = self.last_block + 1 if self.last_block is not None else to_block
+        if from_block > to_block:
+            return 0
+
+        events = self.pair._past_events_in_block_range(self.pair._contract, 'Sync', LogSync,
+                                                       from_block, to_block, None)
+        events.sort(key=lambda event: (event.raw['blockNumber'], event.raw['logIndex']))
+        for event in events:
+            self.apply(event)
+
+        self.last_block = to_block
+        self.logger.debug(f"Applied {len(events)} Sync event(s) from blocks {from_block}-{to_block} to {self}")
+        return len(events)
+
+    def _reserves_of(self, token_in: Address, token_out: Address) -> tuple:
+        assert (isinstance(token_in, Address))
+        assert (isinstance(token_out, Address))
+        assert (token_in in self._reserves)
+        assert (token_out in self._reserves)
+        assert (token_in != token_out)
+
+        return self._reserves[token_in], self._reserves[token_out]
+
+    def __repr__(self):
+        return f"UniswapV2Pool('{self.first_token}', '{self.second_token}')"
+
+
+def _get_amount_out(amount_in: int, reserve_in: int, reserve_out: int) -> int:
+    if amount_in <= 0:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_LIQUIDITY")
+
+    amount_in_with_fee = amount_in * 997
+    return amount_in_with_fee * reserve_out // (reserve_in * 1000 + amount_in_with_fee)
+
+
+def _get_amount_in(amount_out: int, reserve_in: int, reserve_out: int) -> int:
+    if amount_out <= 0:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_OUTPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= amount_out:
+        raise ValueError("UniswapV2Library: INSUFFICIENT_LIQUIDITY")
+
+    return reserve_in * amount_out * 1000 // ((reserve_out - amount_out) * 997) + 1
+
+
+def get_amount_to_price(reserve_in: Wad, reserve_out: Wad, price: Fraction, fee: Fraction = Fraction(3, 1000)) -> Wad:
+    """Amount to swap into a constant product pool to move its price to `price`.
+
+    The price is the ratio of the reserves, `reserve_in / reserve_out`, so it grows when tokens get
+    swapped in. Swapping `dx` in with a fee of `fee` (`g = 1 - fee`) takes `y * g * dx / (x + g * dx)`
+    out, so the swap reaches the price when `g * dx^2 + (1 + g) * x * dx + x^2 - price * x * y = 0`.
+    The positive root is calculated with integer arithmetic only and rounded down, so the price
+    after the swap never goes beyond `price`.
+
+    Works for Uniswap V2 pairs and for Mooniswap pools (with their own fee and balances).
+
+    Args:
+        reserve_in: Reserve of the token to be swapped in.
+        reserve_out: Reserve of the token to be received.
+        price: Target price, in `reserve_in` units per `reserve_out` unit.
+        fee: Swap fee, `0.3%` by default.
+
+    Returns:
+        Amount to swap in, `Wad(0)` if the price is already at or above `price`.
+    """
+    assert (isinstance(reserve_in, Wad))
+    assert (isinstance(reserve_out, Wad))
+    assert (isinstance(price, Fraction))
+    assert (isinstance(fee, Fraction) and 0 <= fee < 1)
+
+    x, y = reserve_in.value, reserve_out.value
+    if x <= 0 or y <= 0 or price * y <= x:
+        return Wad(0)
+
+    # with g = num / den, after multiplying by den: num * dx^2 + (num + den) * x * dx + den * (x^2 - price * x * y) = 0
+    num, den = (1 - fee).numerator, (1 - fee).denominator
+    discriminant = ((den - num) ** 2 * x * x * price.denominator + 4 * num * den * x * y * price.numerator) \
+                   // price.denominator
+
+    return Wad(max((isqrt(discriminant) - (num + den) * x) // (2 * num), 0))
+
+
+def get_amounts_out(pools: list, amount_in: Wad, path: List[Address]) -> List[Wad]:
+    """Local equivalent of `UniswapRouter.get_amounts_out`, with pools given explicitly.
+
+    Args:
+        pools: Local pool models, `pools[i]` swapping `path[i]` for `path[i+1]`. Any model with
+            a `get_amount_output` method can be used, i.e. :py:class:`pymaker.mooniswap.MooniswapPool`.
+        amount_in: Amount of `path[0]` to swap.
+        path: Tokens to swap through.
+
+    Returns:
+        Amounts of all the tokens in `path`, starting with `amount_in`.
+    """
+    assert (isinstance(pools, list))
+    assert (isinstance(amount_in, Wad))
+    assert (isinstance(path, list))
+    assert (len(path) >= 2)
+    assert (len(pools) == len(path) - 1)
+
+    amounts = [amount_in]
+    for pool, token_in, token_out in zip(pools, path, path[1:]):
+        amounts.append(pool.get_amount_output(token_in, token_out, amounts[-1]))
+
+    return amounts
+
+
+def get_amounts_in(pools: list, amount_out: Wad, path: List[Address]) -> List[Wad]:
+    """Local equivalent of `UniswapRouter.get_amounts_in`, with pools given explicitly.
+
+    Args:
+        pools: Local pool models, `pools[i]` swapping `path[i]` for `path[i+1]`.
+        amount_out: Amount of `path[-1]` to receive.
+        path: Tokens to swap through.
+
+    Returns:
+        Amounts of all the tokens in `path`, ending with `amount_out`.
+    """
+    assert (isinstance(pools, list))
+    assert (isinstance(amount_out, Wad))
+    assert (isinstance(path, list))
+    assert (len(path) >= 2)
+    assert (len(pools) == len(path) - 1)
+
+    amounts = [amount_out]
+    for pool, token_in, token_out in reversed(list(zip(pools, path, path[1:]))):
+        amounts.insert(0, pool.get_amount_input(token_in, token_out, amounts[0]))
+
+    return amounts
+
+
+class UniswapRoute:
+    """Path for a swap through Uniswap V2 pairs, as found by :py:class:`UniswapRouteFinder`.
+
+    Attributes:
+        path: Tokens to swap through, to be passed to :py:meth:`UniswapRouter.swap_from_exact_amount`.
+        pools: Local models of the pairs, `pools[i]` swapping `path[i]` for `path[i+1]`.
+        amounts: Amounts of all the tokens in `path`, as returned by :py:func:`get_amounts_out`.
+    """
+    def __init__(self, path: List[Address], pools: List[UniswapV2Pool], amounts: List[Wad]):
+        assert (isinstance(path, list))
+        assert (isinstance(pools, list))
+        assert (isinstance(amounts, list))
+
+        self.path = path
+        self.pools = pools
+        self.amounts = amounts
+
+    def __repr__(self):
+        return pformat(vars(self))
+
+
+class UniswapRouteFinder:
+    """Finds the best paths for swaps through Uniswap V2 pairs, using local pool models.
+
+    Paths of up to `max_hops` pairs get searched hop by hop. As the output of a pair only grows
+    with its input, a path reaching some token with less than another path which has reached
+    it in the same number of hops or fewer is not followed. This is a heuristic, as the path
+    not followed may avoid a token the other one has already gone through, so in rare cases
+    a better path may be missed.
+
+    Results of the `max_results` most recently used searches are cached until one of the pairs looked
+    at while searching for them changes, so after :py:meth:`refresh` only searches affected by the new
+    `Sync` events get evaluated again. If `factory` is known, pairs created by it after the route
+    finder are added by :py:meth:`refresh` as well.
+
+    Attributes:
+        web3: An instance of `Web` from `web3.py`, used by :py:meth:`refresh`.
+        max_hops: Default maximum number of pairs in a path.
+        last_block: Number of the last block whose events have been applied.
+        factory: The :py:class:`UniswapFactory` new pairs get followed of, if any.
+        max_results: Maximum number of search results cached.
+    """
+    logger = logging.getLogger(__name__)
+    SYNC_TOPIC = Web3.keccak(text='Sync(uint112,uint112)').hex()
+    PAIR_CREATED_TOPIC = Web3.keccak(text='PairCreated(address,address,address,uint256)').hex()
+
+    def __init__(self, web3: Web3, pools: List[UniswapV2Pool], max_hops: int = 3, last_block: Optional[int] = None,
+                 factory: Optional[UniswapFactory] = None, max_results: int = 1024):
+        assert (isinstance(web3, Web3))
+        assert (isinstance(pools, list))
+        assert (isinstance(max_hops, int) and max_hops > 0)
+        assert (isinstance(last_block, int) or (last_block is None))
+        assert (isinstance(factory, UniswapFactory) or (factory is None))
+        assert (isinstance(max_results, int) and max_results > 0)
+        assert (all(pool.address is not None for pool in pools))
+
+        self.web3 = web3
+        self.max_hops = max_hops
+        self.last_block = last_block
+        self.factory = factory
+        self.max_results = max_results
+        self._pools = {}
+        self._pools_by_token = {}
+        self._results = OrderedDict()
+
+        for pool in pools:
+            self._add(pool)
+
+    @staticmethod
+    def from_factory(factory: UniswapFactory, max_hops: int = 3) -> 'UniswapRouteFinder':
+        """Create a route finder over all the pairs of `factory`, read at the latest block."""
+        assert (isinstance(factory, UniswapFactory))
+
+        block_number = factory.web3.eth.blockNumber
+        return UniswapRouteFinder(factory.web3, factory.get_pools(block_number), max_hops, block_number, factory)
+
+    def get_pool(self, address: Address) -> Optional[UniswapV2Pool]:
+        return self._pools.get(address)
+
+    def get_best_path(self, token_in: Address, token_out: Address, amount_in: Wad,
+                      max_hops: Optional[int] = None) -> Optional[UniswapRoute]:
+        """Find the path returning the most of `token_out` for exactly `amount_in` of `token_in`.
+
+        Args:
+            token_in: Token to swap.
+            token_out: Token to receive.
+            amount_in: Amount of `token_in` to swap.
+            max_hops: Maximum number of pairs in the path, by default `max_hops` of the route finder.
+
+        Returns:
+            The best path found as :py:class:`UniswapRoute`, or `None` if `token_out` can not be reached.
+        """
+        assert (isinstance(token_in, Address))
+        assert (isinstance(token_out, Address))
+        assert (isinstance(amount_in, Wad))
+        assert (isinstance(max_hops, int) or (max_hops is None))
+        assert (token_in != token_out)
+
+        max_hops = max_hops if max_hops is not None else self.max_hops
+        key = (token_in, token_out, amount_in.value, max_hops)
+        if key in self._results:
+            self._results.move_to_end(key)
+        else:
+            self._results[key] = self._search(token_in, token_out, amount_in.value, max_hops)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+        best, _ = self._results[key]
+        if best is None:
+            return None
+
+        path, pools = best
+        return UniswapRoute(path, pools, get_amounts_out(pools, amount_in, path))
+
+    def apply(self, event: LogSync) -> bool:
+        """Apply a `Sync` event, if it has been emitted by one of the pairs.
+
+        Returns:
+            `True` if the event has been applied, `False` if the pair is not known.
+        """
+        assert (isinstance(event, LogSync))
+
+        pool = self._pools.get(event.pair)
+        if pool is None:
+            return False
+
+        pool.apply(event)
+        self._results = OrderedDict((key, result) for key, result in self._results.items()
+                                    if event.pair not in result[1])
+        return True
+
+    def refresh(self, to_block: Optional[int] = None) -> int:
+        """Fetch `Sync` events emitted since the last refresh and apply the ones of known pairs.
+
+        If `factory` is known, pairs it has created in the meantime get added first, so the `Sync`
+        events of their initial deposits get applied as well. All the events get fetched with
+        a single `eth_getLogs` request.
+
+        Args:
+            to_block: Last block to fetch the events from, by default the latest one.
+
+        Returns:
+            Number of events applied.
+        """
+        assert (isinstance(to_block, int) or (to_block is None))
+
+        if to_block is None:
+            to_block = self.web3.eth.blockNumber
+
+        from_block = self.last_block + 1 if self.last_block is not None else to_block
+        if from_block > to_block:
+            return 0
+
+        topics = [self.SYNC_TOPIC] if self.factory is None else [[self.SYNC_TOPIC, self.PAIR_CREATED_TOPIC]]
+        logs = self.web3.eth.getLogs({'fromBlock': from_block, 'toBlock': to_block, 'topics': topics})
+        applied = 0
+        for log in sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex'])):
+            topic = HexBytes(log['topics'][0]).hex()
+            if topic == self.PAIR_CREATED_TOPIC and Address(log['address']) == self.factory.address:
+                first_token, second_token = (Address(abi_decode_single('address', bytes(HexBytes(log_topic))))
+                                             for log_topic in log['topics'][1:3])
+                pair_address = Address(abi_decode_single('(address,uint256)', bytes(HexBytes(log['data'])))[0])
+                self._add(UniswapV2Pool(first_token, second_token, Wad(0), Wad(0), address=pair_address))
+                # any of the cached paths may be beaten by one going through the new pair
+                self._results.clear()
+
+            elif topic == self.SYNC_TOPIC and Address(log['address']) in self._pools:
+                reserve0, reserve1 = abi_decode_single('(uint112,uint112)', bytes(HexBytes(log['data'])))
+                applied += self.apply(LogSync({**log, 'args': {'reserve0': reserve0, 'reserve1': reserve1}}))
+
+        self.last_block = to_block
+        self.logger.debug(f"Applied {applied} Sync event(s) from blocks {from_block}-{to_block} to the route finder")
+        return applied
+
+    def _add(self, pool: UniswapV2Pool):
+        self._pools[pool.address] = pool
+        for token in pool.tokens:
+            self._pools_by_token.setdefault(token, []).append(pool)
+
+    def _search(self, token_in: Address, token_out: Address, amount_in: int, max_hops: int) -> tuple:
+        looked_at = set()
+        best = None
+        best_amount = 0
+        best_amounts = {token_in: amount_in}
+        frontier = [(token_in, amount_in, [token_in], [])]
+
+        for _ in range(max_hops):
+            reached = {}
+            for token, amount, path, pools in frontier:
+                for pool in self._pools_by_token.get(token, []):
+                    other_token = pool.second_token if pool.first_token == token else pool.first_token
+                    if other_token in path:
+                        continue
+
+                    looked_at.add(pool.address)
+                    try:
+                        amount_out = pool.get_amount_output(token, other_token, Wad(amount)).value
+                    except ValueError:
+                        continue
+
+                    if other_token == token_out:
+                        if amount_out > best_amount:
+                            best, best_amount = (path + [other_token], pools + [pool]), amount_out
+                    elif amount_out > best_amounts.get(other_token, 0):
+                        best_amounts[other_token] = amount_out
+                        reached[other_token] = (other_token, amount_out, path + [other_token], pools + [pool])
+
+            frontier = list(reached.values())
+            if not frontier:
+                break
+
+        return best, looked_at
+
+    def __repr__(self):
+        return f"UniswapRouteFinder({len(self._pools)} pairs)"
+
+
 class UniswapRouter(Contract):
     logger = logging.getLogger(__name__)
-    abi = Contract._load_abi(__name__, 'abi/UniswapV2Router02.abi')
+    abi = Contract._lazy_abi(__name__, 'abi/UniswapV2Router02.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/UniswapV2Router02.bin')
     zero_address = Address('0x0000000000000000000000000000000000000000')
 
+    @staticmethod
+    def deploy(web3: Web3, factory: Address, weth: Address):
+        """Deploy a new instance of the `UniswapV2Router02` contract.
+
+        Args:
+            web3: An instance of `Web` from `web3.py`.
+            factory: Address of the `UniswapV2Factory` contract.
+            weth: Address of the WETH token.
+
+        Returns:
+            A `UniswapRouter` class instance.
+        """
+        assert (isinstance(factory, Address))
+        assert (isinstance(weth, Address))
+        return UniswapRouter(web3=web3, router=Contract._deploy(web3, UniswapRouter.abi, UniswapRouter.bin,
+                                                                [factory.address, weth.address]))
+
     def __init__(self, web3: Web3, router: Address):
         assert (isinstance(web3, Web3))
         assert (isinstance(router, Address))
@@ -368,62 +1105,79 @@ class MarketMaker:
             calculate_value(100, 10):   100 + 10% = 110
             calculate_value(100, -10):  100 + (-10)% = 90
         """
-        percent_value = Wad(value.value * percent / 100)
-        return value.value + percent_value.value
+        return value + Wad(value.value * Wad.from_number(percent).value // Wad.from_number(100).value)
 
     @staticmethod
     def _get_amounts(market_price: Wad, first_token_liquidity_pool_amount: Wad,
                      second_token_liquidity_pool_amount: Wad):
-        liquidity_pool_constant = first_token_liquidity_pool_amount * second_token_liquidity_pool_amount
+        """Amounts of the swap moving the pool price (first token per second token) to `market_price`.
 
-        new_first_token_liquidity_pool_amount = sqrt(liquidity_pool_constant * market_price)
-        new_second_token_liquidity_pool_amount = sqrt(liquidity_pool_constant / market_price)
+        `exact_value` is the decrease of the first token reserve and `limit` the increase of the second
+        token reserve the swap causes, both negative if the first token is the one swapped in.
+        """
+        price = Fraction(market_price.value, Wad.from_number(1).value)
 
-        return AttrDict({
-            'exact_value': first_token_liquidity_pool_amount - Wad.from_number(new_first_token_liquidity_pool_amount),
-            'limit': Wad.from_number(new_second_token_liquidity_pool_amount) - second_token_liquidity_pool_amount,
-        })
+        amount_in = get_amount_to_price(first_token_liquidity_pool_amount, second_token_liquidity_pool_amount, price)
+        if amount_in > Wad(0):
+            amount_out = _get_amount_out(amount_in.value, first_token_liquidity_pool_amount.value,
+                                         second_token_liquidity_pool_amount.value)
+            return AttrDict({'exact_value': Wad(-amount_in.value), 'limit': Wad(-amount_out)})
+
+        amount_in = get_amount_to_price(second_token_liquidity_pool_amount, first_token_liquidity_pool_amount, 1 / price)
+        amount_out = _get_amount_out(amount_in.value, second_token_liquidity_pool_amount.value,
+                                     first_token_liquidity_pool_amount.value) if amount_in > Wad(0) else 0
+        return AttrDict({'exact_value': Wad(amount_out), 'limit': amount_in})
 
     def set_price(self, market_price: Wad, first_token: Address, second_token: Address,
                   max_delta_on_percent: int) -> Transact:
         pair = self.router.get_pair(first_token=first_token, second_token=second_token)
 
-        reserves = pair.reserves.map()
+        # quotes get calculated locally from the same reserves, exactly like the router would do it
+        pair_reserves = pair.reserves
+        pool = UniswapV2Pool(pair_reserves.first_token, pair_reserves.second_token,
+                             pair_reserves.first_token_amount, pair_reserves.second_token_amount)
+        reserves = pool.reserves.map()
 
-        uniswap_price = reserves[first_token] / reserves[second_token]
-        delta = (market_price.value * 100 / uniswap_price.value) - 100
+        delta = Fraction(market_price.value * reserves[second_token].value,
+                         reserves[first_token].value * Wad.from_number(1).value) * 100 - 100
 
-        self.logger.info(f"the price differs from the market by {delta}%")
+        self.logger.info(f"the price differs from the market by {float(delta)}%")
 
         if delta > max_delta_on_percent:
-            self.logger.debug(f"delta > max_delta ({delta} > {max_delta_on_percent})")
+            self.logger.debug(f"delta > max_delta ({float(delta)} > {max_delta_on_percent})")
             input_data = self._get_amounts(market_price=market_price,
                                            first_token_liquidity_pool_amount=reserves[first_token],
                                            second_token_liquidity_pool_amount=reserves[second_token])
 
-            amounts = self.router.get_amounts_out(amount_in=abs(input_data.exact_value), path=[first_token, second_token])
+            if input_data.exact_value == Wad(0):
+                self.logger.info(f"the pool is too small to correct the price")
+                return None
 
             self.logger.info(f"To correct the price {abs(input_data.exact_value)} {first_token} will be exchanged "
-                             f"for at least {amounts[-1]} {second_token}")
+                             f"for at least {abs(input_data.limit)} {second_token}")
 
             return self.router.swap_from_exact_amount(amount_in=abs(input_data.exact_value),
-                                                      min_amount_out=amounts[-1],
+                                                      min_amount_out=abs(input_data.limit),
                                                       path=[first_token, second_token])
 
         elif delta < 0 and abs(delta) > max_delta_on_percent:
-            self.logger.debug(f"delta < max_delta ({delta} < {max_delta_on_percent})")
+            self.logger.debug(f"delta < max_delta ({float(delta)} < {max_delta_on_percent})")
             input_data = self._get_amounts(market_price=market_price,
                                            first_token_liquidity_pool_amount=reserves[first_token],
                                            second_token_liquidity_pool_amount=reserves[second_token])
 
-            amounts = self.router.get_amounts_in(amount_out=abs(input_data.exact_value), path=[second_token, first_token])
+            if input_data.exact_value == Wad(0):
+                self.logger.info(f"the pool is too small to correct the price")
+                return None
+
+            amounts = get_amounts_in([pool], amount_out=input_data.exact_value, path=[second_token, first_token])
 
-            self.logger.info(f"To fixed the price, you need to get {abs(input_data.exact_value)} {second_token} by "
-                             f"exchanging at more {amounts[0]} {first_token}")
+            self.logger.info(f"To fixed the price, you need to get {input_data.exact_value} {first_token} by "
+                             f"exchanging at more {amounts[0]} {second_token}")
 
-            return self.router.swap_to_exact_amount(amount_out=abs(input_data.exact_value),
+            return self.router.swap_to_exact_amount(amount_out=input_data.exact_value,
                                                     max_amount_in=amounts[0],
                                                     path=[second_token, first_token])
         else:
             self.logger.info(f"the price difference is within "
-                             f"the permissible (delta={delta}, max_delta={max_delta_on_percent})")
+                             f"the permissible (delta={float(delta)}, max_delta={max_delta_on_percent})")
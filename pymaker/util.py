@@ -16,10 +16,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import asyncio
+import functools
+import json
 import logging
+import os
 import threading
+import weakref
+from typing import Optional
+from urllib.parse import urlparse
 
-from web3 import Web3, WebsocketProvider
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_abi.registry import registry as default_registry
+from eth_utils import keccak
+from web3 import Web3, HTTPProvider, WebsocketProvider
 
 from pymaker.numeric import Wad
 
@@ -64,11 +73,230 @@ def is_contract_at(web3: Web3, address):
     return (code is not None) and (code != "0x") and (code != "0x0") and (code != b"\x00") and (code != b"")
 
 
+# keccak256 of empty bytecode, which is the code hash of every account without a contract
+EMPTY_CODE_HASH = "0xc5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+
+
+class ContractCache:
+    """Remembers the addresses contracts have already been found at, separately for each chain.
+
+    Checking whether a contract exists with `eth_getCode` means downloading its entire bytecode.
+    This cache makes sure it happens at most once per address, and if `path` is specified, the
+    verified addresses are persisted in a JSON file so they survive keeper restarts. Instead of
+    `eth_getCode`, the cache uses `eth_getProof` to only fetch the code hash of the account
+    if the node supports it.
+
+    Only positive results are cached, as a contract may get deployed at an address later on.
+
+    Attributes:
+        path: Optional path of the JSON file the verified addresses are persisted in.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, path: Optional[str] = None):
+        assert(isinstance(path, str) or (path is None))
+
+        self.path = path
+        self.verified = {}
+        self.lock = threading.Lock()
+        self._chain_ids = weakref.WeakKeyDictionary()
+        self._proof_unsupported = weakref.WeakKeyDictionary()
+
+        if path is not None and os.path.isfile(path):
+            try:
+                with open(path, "r") as file:
+                    self.verified = {chain_id: set(addresses) for chain_id, addresses in json.load(file).items()}
+            except Exception as e:
+                self.logger.warning(f"Unable to read contract cache from {path} ({e}), starting with an empty one")
+
+    def chain_id(self, web3: Web3) -> str:
+        """Return the id of the chain `web3` is connected to, only querying the node once."""
+        assert(isinstance(web3, Web3))
+
+        chain_id = self._chain_ids.get(web3)
+        if chain_id is None:
+            try:
+                chain_id = str(web3.eth.chainId)
+            except Exception:
+                chain_id = str(web3.net.version)
+            self._chain_ids[web3] = chain_id
+
+        return chain_id
+
+    def is_verified(self, web3: Web3, address) -> bool:
+        chain_id = self.chain_id(web3)
+        with self.lock:
+            return address.address in self.verified.get(chain_id, ())
+
+    def exists(self, web3: Web3, address) -> bool:
+        """Check if there is a contract at `address`, querying the node only if not verified before.
+
+        Args:
+            web3: An instance of `Web3` from `web3.py`.
+            address: Address to check, an instance of :py:class:`pymaker.Address`.
+
+        Returns:
+            `True` if there is a contract at `address`, `False` otherwise.
+        """
+        if self.is_verified(web3, address):
+            return True
+
+        if not has_code_at(web3, address, self._proof_unsupported):
+            return False
+
+        chain_id = self.chain_id(web3)
+        with self.lock:
+            self.verified.setdefault(chain_id, set()).add(address.address)
+            self._save()
+
+        return True
+
+    def verify(self, web3: Web3, addresses: list, batch_size: int = 100) -> list:
+        """Check if there are contracts at all of `addresses` at once, i.e. when bootstrapping a deployment.
+
+        Addresses not verified before get checked with JSON-RPC batches of `eth_getProof` requests
+        (or `eth_getCode` ones if the node does not support it), and all the newly verified ones get
+        persisted with a single write. Addresses the node has returned an error for are left unverified,
+        so they get checked again (and the error reported) when a contract gets created for them.
+
+        Args:
+            web3: An instance of `Web3` from `web3.py`.
+            addresses: Addresses to check, instances of :py:class:`pymaker.Address`.
+            batch_size: Maximum number of requests sent in a single HTTP request.
+
+        Returns:
+            List of booleans, `True` for each of `addresses` there is a contract at.
+        """
+        assert(isinstance(addresses, list))
+
+        chain_id = self.chain_id(web3)
+        with self.lock:
+            verified = self.verified.get(chain_id, set())
+            unknown = list(dict.fromkeys(address.address for address in addresses if address.address not in verified))
+
+        if len(unknown) > 0:
+            found = self._batch_has_code(web3, unknown, batch_size)
+            if len(found) > 0:
+                with self.lock:
+                    self.verified.setdefault(chain_id, set()).update(found)
+                    self._save()
+
+        with self.lock:
+            verified = self.verified.get(chain_id, set())
+            return [address.address in verified for address in addresses]
+
+    def _batch_has_code(self, web3: Web3, addresses: list, batch_size: int) -> set:
+        from pymaker.providers import make_batch_request
+
+        if web3 not in self._proof_unsupported:
+            responses = make_batch_request(web3, [("eth_getProof", [address, [], "latest"]) for address in addresses],
+                                           batch_size)
+            if not any(is_unsupported_method_error(ValueError(response['error']))
+                       for response in responses if 'error' in response):
+                return {address for address, response in zip(addresses, responses)
+                        if response.get('result') and _is_code_hash(response['result']['codeHash'])}
+
+            self._proof_unsupported[web3] = True
+
+        responses = make_batch_request(web3, [("eth_getCode", [address, "latest"]) for address in addresses],
+                                       batch_size)
+        return {address for address, response in zip(addresses, responses)
+                if response.get('result') not in (None, "0x", "0x0")}
+
+    def add(self, web3: Web3, addresses: list):
+        """Mark `addresses` as verified without querying the node, i.e. when restoring a snapshot."""
+        assert(isinstance(addresses, list))
+
+        chain_id = self.chain_id(web3)
+        with self.lock:
+            self.verified.setdefault(chain_id, set()).update(address.address for address in addresses)
+            self._save()
+
+    def clear(self):
+        with self.lock:
+            self.verified = {}
+            self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+
+        try:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump({chain_id: sorted(addresses) for chain_id, addresses in self.verified.items()}, file)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            self.logger.warning(f"Unable to write contract cache to {self.path} ({e})")
+
+
+def has_code_at(web3: Web3, address, proof_unsupported: Optional[weakref.WeakKeyDictionary] = None) -> bool:
+    """Lightweight equivalent of `is_contract_at`.
+
+    Fetches only the code hash of the account with `eth_getProof`, falling back to downloading
+    the entire bytecode with `eth_getCode` if the node does not support it.
+
+    Args:
+        web3: An instance of `Web3` from `web3.py`.
+        address: Address to check, an instance of :py:class:`pymaker.Address`.
+        proof_unsupported: Optional dictionary to remember `Web3` instances not supporting `eth_getProof` in.
+    """
+    if proof_unsupported is None or web3 not in proof_unsupported:
+        try:
+            proof = web3.manager.request_blocking("eth_getProof", [address.address, [], "latest"])
+            return _is_code_hash(proof['codeHash'])
+        except ValueError as e:
+            # Only remember the node does not support `eth_getProof` if it says so. Other errors
+            # returned by the node make us fall back to `eth_getCode` for this address only,
+            # while connection errors and timeouts get raised.
+            if proof_unsupported is not None and is_unsupported_method_error(e):
+                proof_unsupported[web3] = True
+
+    return is_contract_at(web3, address)
+
+
+def _is_code_hash(code_hash) -> bool:
+    # accounts without a contract have either the hash of empty bytecode or, if they do not exist, zero
+    code_hash = code_hash if isinstance(code_hash, str) else bytes_to_hexstring(code_hash)
+    return int(code_hash, 16) != 0 and code_hash.lower() != EMPTY_CODE_HASH
+
+
+UNSUPPORTED_METHOD_ERRORS = ('method not found', 'not available', 'does not exist', 'not supported',
+                             'unsupported', 'unknown method')
+
+
+def is_unsupported_method_error(error: Exception) -> bool:
+    """Check if `error`, raised by `web3.manager.request_blocking`, means the node does not support the method."""
+    details = error.args[0] if isinstance(error, ValueError) and len(error.args) > 0 else None
+    if isinstance(details, dict):
+        if details.get('code') == -32601:
+            return True
+        details = details.get('message')
+
+    return isinstance(details, str) and any(fragment in details.lower() for fragment in UNSUPPORTED_METHOD_ERRORS)
+
+
 def int_to_bytes32(value: int) -> bytes:
     assert(isinstance(value, int))
     return value.to_bytes(32, byteorder='big')
 
 
+def isqrt(value: int) -> int:
+    """Integer square root, the largest integer whose square does not exceed `value` (`math.isqrt` of Python 3.8)."""
+    assert(isinstance(value, int))
+    assert(value >= 0)
+
+    if value < 2:
+        return value
+
+    result = 1 << ((value.bit_length() + 1) // 2)
+    while True:
+        better = (result + value // result) // 2
+        if better >= result:
+            return result
+        result = better
+
+
 def bytes_to_int(value) -> int:
     if isinstance(value, bytes) or isinstance(value, bytearray):
         return int.from_bytes(value, byteorder='big')
@@ -82,11 +310,11 @@ def bytes_to_int(value) -> int:
 
 def bytes_to_hexstring(value) -> str:
     if isinstance(value, bytes) or isinstance(value, bytearray):
-        return "0x" + "".join(map(lambda b: format(b, "02x"), value))
+        return "0x" + value.hex()
     elif isinstance(value, str):
         b = bytearray()
         b.extend(map(ord, value))
-        return "0x" + "".join(map(lambda b: format(b, "02x"), b))
+        return "0x" + b.hex()
     else:
         raise AssertionError
 
@@ -97,10 +325,45 @@ def hexstring_to_bytes(value: str) -> bytes:
     return Web3.toBytes(hexstr=value)
 
 
+@functools.lru_cache(maxsize=None)
+def function_selector(signature: str) -> bytes:
+    """Return the 4-byte selector of a function signature, i.e. `getOrderInfo((address,...))`."""
+    assert(isinstance(signature, str))
+    return keccak(text=signature)[0:4]
+
+
+def abi_encode_single(type_str: str, value) -> bytes:
+    """Encode `value` as the ABI type `type_str`, i.e. `(uint256,bytes)`.
+
+    Does the same as `eth_abi.encode_single`, using the encoders cached by the default `eth_abi` registry
+    directly, so the type string gets parsed only once and no API deprecated in later `eth_abi` versions is used.
+    """
+    return default_registry.get_encoder(type_str)(value)
+
+
+def abi_decode_single(type_str: str, data: bytes):
+    """Decode `data` as the ABI type `type_str`, the counterpart of :py:func:`abi_encode_single`."""
+    assert(isinstance(data, (bytes, bytearray)))
+    return default_registry.get_decoder(type_str)(ContextFramesBytesIO(bytes(data)))
+
+
+def is_infura(web3: Web3) -> bool:
+    """Check whether `web3` is connected to Infura over HTTP, which does not support stateful methods like filters."""
+    if not isinstance(web3.provider, HTTPProvider):
+        return False
+
+    hostname = urlparse(web3.provider.endpoint_uri or '').hostname or ''
+    return hostname == 'infura.io' or hostname.endswith('.infura.io')
+
+
 def get_provider_for_filter(web3: Web3):
-    use_infura = False if "infura" not in web3.provider.endpoint_uri else True
+    """Return a `Web3` instance which filters can be installed with.
 
-    if use_infura:
+    Filters only work if all the requests related to them hit the same node. For Infura, which
+    load-balances HTTP requests, a websocket connection to the same project is returned. Pooled
+    providers (see :py:class:`pymaker.providers.PooledProvider`) take care of that themselves.
+    """
+    if is_infura(web3):
         wss_url = f"wss://{'/ws/'.join(web3.provider.endpoint_uri.split('://')[1].split('/', 1))}"
         return Web3(WebsocketProvider(wss_url))
     else:
@@ -31,8 +31,8 @@ class DSVault(Contract):
         address: Ethereum address of the `DSVault` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/DSVault.abi')
-    bin = Contract._load_bin(__name__, 'abi/DSVault.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/DSVault.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/DSVault.bin')
 
     def __init__(self, web3: Web3, address: Address):
         assert(isinstance(web3, Web3))
@@ -23,6 +23,7 @@ from pprint import pformat
 from typing import List, Optional
 
 import requests
+from eth_utils import keccak
 from hexbytes import HexBytes
 from web3 import Web3
 from web3._utils.events import get_event_data
@@ -32,6 +33,7 @@ from eth_abi.registry import registry as default_registry
 
 from pymaker import Contract, Address, Transact
 from pymaker.numeric import Wad
+from pymaker.sessions import get_session
 from pymaker.sign import eth_sign, to_vrs
 from pymaker.token import ERC20Token
 from pymaker.util import bytes_to_hexstring, hexstring_to_bytes, http_response_summary
@@ -262,8 +264,8 @@ class ZrxExchange(Contract):
         address: Ethereum address of the _0x_ `Exchange` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/Exchange.abi')
-    bin = Contract._load_bin(__name__, 'abi/Exchange.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/Exchange.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/Exchange.bin')
 
     _ZERO_ADDRESS = Address("0x0000000000000000000000000000000000000000")
 
@@ -423,8 +425,10 @@ class ZrxExchange(Contract):
         # the hash depends on the exchange contract address as well
         assert(order.exchange_contract_address == self.address)
 
-        result = self._contract.functions.getOrderHash(self._order_addresses(order), self._order_values(order)).call()
-        return bytes_to_hexstring(result)
+        # same as `getOrderHash` of the contract, i.e. keccak256 of all the fields tightly packed
+        return bytes_to_hexstring(keccak(bytes.fromhex(self.address.address[2:])
+                                         + b''.join(bytes.fromhex(address[2:]) for address in self._order_addresses(order))
+                                         + b''.join(value.to_bytes(32, 'big') for value in self._order_values(order))))
 
     def get_unavailable_buy_amount(self, order: Order) -> Wad:
         """Return the order amount which was either taken or cancelled.
@@ -530,16 +534,20 @@ class ZrxRelayerApi:
     Attributes:
         exchange: The 0x Exchange contract.
         api_server: Base URL of the Standard Relayer API server.
+        session: The `requests.Session` used for talking to the relayer, by default the shared one
+            returned by :py:func:`pymaker.sessions.get_session`.
     """
     logger = logging.getLogger()
     timeout = 15.5
 
-    def __init__(self, exchange: ZrxExchange, api_server: str):
+    def __init__(self, exchange: ZrxExchange, api_server: str, session: Optional[requests.Session] = None):
         assert(isinstance(exchange, ZrxExchange))
         assert(isinstance(api_server, str))
+        assert(isinstance(session, requests.Session) or (session is None))
 
         self.exchange = exchange
         self.api_server = api_server
+        self.session = session or get_session()
 
     def get_orders(self, pay_token: Address, buy_token: Address, per_page: int = 100) -> List[Order]:
         """Returns active orders filtered by token pair (one side).
@@ -563,7 +571,7 @@ class ZrxRelayerApi:
               f"takerTokenAddress={str(buy_token.address).lower()}&" \
               f"per_page={per_page}"
 
-        response = requests.get(url, timeout=self.timeout)
+        response = self.session.get(url, timeout=self.timeout)
         if not response.ok:
             raise Exception(f"Failed to fetch 0x orders from the relayer: {http_response_summary(response)}")
 
@@ -590,7 +598,7 @@ class ZrxRelayerApi:
               f"maker={str(maker.address).lower()}&" \
               f"per_page={per_page}"
 
-        response = requests.get(url, timeout=self.timeout)
+        response = self.session.get(url, timeout=self.timeout)
         if not response.ok:
             raise Exception(f"Failed to fetch 0x orders from the relayer: {http_response_summary(response)}")
 
@@ -618,7 +626,7 @@ class ZrxRelayerApi:
         """
         assert(isinstance(order, Order))
 
-        response = requests.post(f"{self.api_server}/v0/fees", json=order.to_json_without_fees(), timeout=self.timeout)
+        response = self.session.post(f"{self.api_server}/v0/fees", json=order.to_json_without_fees(), timeout=self.timeout)
         if response.status_code == 200:
             data = response.json()
 
@@ -643,7 +651,7 @@ class ZrxRelayerApi:
         """
         assert(isinstance(order, Order))
 
-        response = requests.post(f"{self.api_server}/v0/order", json=order.to_json(), timeout=self.timeout)
+        response = self.session.post(f"{self.api_server}/v0/order", json=order.to_json(), timeout=self.timeout)
         if response.status_code in [200, 201]:
             self.logger.info(f"Placed 0x order: {order}")
             return True
@@ -0,0 +1,424 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import logging
+import threading
+import time
+from fractions import Fraction
+from typing import Hashable, List, Optional
+
+from pymaker import Address, zrxv2, zrxv3
+from pymaker.numeric import Wad
+
+
+class TimerWheel:
+    """Hashed timing wheel keeping track of deadlines (unix timestamps) of many items.
+
+    Items are put into one of `slots` buckets by their deadline, each bucket covering `resolution`
+    seconds. Adding and removing an item takes constant time and advancing the wheel only visits
+    the buckets whose time has come, so expired items can be found without scanning all of them.
+    Items with deadlines more than one rotation (`slots * resolution` seconds) ahead stay in their
+    bucket until the wheel gets there in the right rotation.
+
+    Attributes:
+        resolution: Number of seconds covered by each bucket.
+        slots: Number of buckets.
+    """
+    def __init__(self, now: int, resolution: int = 1, slots: int = 3600):
+        assert(isinstance(now, int))
+        assert(isinstance(resolution, int))
+        assert(isinstance(slots, int))
+        assert(resolution > 0)
+        assert(slots > 0)
+
+        self.resolution = resolution
+        self.slots = slots
+        self._tick = now // resolution
+        self._buckets = [{} for _ in range(slots)]
+        self._items = {}
+
+    def add(self, item: Hashable, deadline: int):
+        """Schedule `item` to expire at `deadline`, replacing its previous deadline if there was one."""
+        assert(isinstance(deadline, int))
+
+        self.remove(item)
+
+        # deadlines the wheel has already passed go to the current bucket, so the next `advance` finds them
+        slot = max(deadline // self.resolution, self._tick) % self.slots
+        self._buckets[slot][item] = deadline
+        self._items[item] = slot
+
+    def remove(self, item: Hashable):
+        slot = self._items.pop(item, None)
+        if slot is not None:
+            del self._buckets[slot][item]
+
+    def advance(self, now: int) -> list:
+        """Move the wheel forward to `now`.
+
+        Returns:
+            Items whose deadline is at or before `now`. They are no longer kept in the wheel.
+        """
+        assert(isinstance(now, int))
+
+        expired = []
+        target = now // self.resolution
+
+        # after a full rotation all the buckets have been visited, there is no need to visit them again
+        for tick in range(max(self._tick, target - self.slots + 1), target + 1):
+            bucket = self._buckets[tick % self.slots]
+            for item in [item for item, deadline in bucket.items() if deadline <= now]:
+                del bucket[item]
+                del self._items[item]
+                expired.append(item)
+
+        self._tick = max(self._tick, target)
+        return expired
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+
+class BookOrder:
+    """Order kept in :py:class:`ZrxOrderBook`, together with the amount of it which has been filled so far.
+
+    Attributes:
+        order: The order, either a :py:class:`pymaker.zrxv2.Order` or a :py:class:`pymaker.zrxv3.Order`.
+        order_hash: Hash of the order as a hex string starting with `0x`.
+        filled_buy_amount: Amount of the order which has been taken, expressed in terms of the `buy_token` token.
+    """
+    def __init__(self, order, order_hash: str, filled_buy_amount: Wad):
+        assert(isinstance(order, (zrxv2.Order, zrxv3.Order)))
+        assert(isinstance(order_hash, str))
+        assert(isinstance(filled_buy_amount, Wad))
+
+        self.order = order
+        self.order_hash = order_hash
+        self.filled_buy_amount = filled_buy_amount
+        self.price = Fraction(order.buy_amount.value, order.pay_amount.value)
+
+    @property
+    def remaining_buy_amount(self) -> Wad:
+        return Wad.max(self.order.buy_amount - self.filled_buy_amount, Wad(0))
+
+    @property
+    def remaining_sell_amount(self) -> Wad:
+        if self.filled_buy_amount >= self.order.buy_amount:
+            return Wad(0)
+
+        return Wad(self.order.pay_amount.value -
+                   self.filled_buy_amount.value * self.order.pay_amount.value // self.order.buy_amount.value)
+
+    def __repr__(self):
+        return f"BookOrder('{self.order_hash}', filled_buy_amount={self.filled_buy_amount})"
+
+
+class PriceLevel:
+    """Orders of :py:class:`ZrxOrderBook` offering the same price.
+
+    Attributes:
+        price: Price of the level, i.e. the amount of `buy_token` a taker pays for one `pay_token`.
+        pay_amount: Remaining amount of `pay_token` offered by all the orders at this price.
+        buy_amount: Remaining amount of `buy_token` wanted by all the orders at this price.
+        orders: Orders at this price, in the order they have been added to the book.
+    """
+    def __init__(self, price: Wad, pay_amount: Wad, buy_amount: Wad, orders: List[BookOrder]):
+        assert(isinstance(price, Wad))
+        assert(isinstance(pay_amount, Wad))
+        assert(isinstance(buy_amount, Wad))
+        assert(isinstance(orders, list))
+
+        self.price = price
+        self.pay_amount = pay_amount
+        self.buy_amount = buy_amount
+        self.orders = orders
+
+    def __repr__(self):
+        return f"PriceLevel(price={self.price}, pay_amount={self.pay_amount}, buy_amount={self.buy_amount}," \
+               f" orders={len(self.orders)})"
+
+
+class _BookSide:
+    def __init__(self):
+        self.prices = []
+        self.levels = {}
+
+    def add(self, entry: BookOrder):
+        level = self.levels.get(entry.price)
+        if level is None:
+            level = self.levels[entry.price] = {}
+            bisect.insort(self.prices, entry.price)
+
+        level[entry.order_hash] = entry
+
+    def remove(self, entry: BookOrder):
+        level = self.levels[entry.price]
+        del level[entry.order_hash]
+
+        if not level:
+            del self.levels[entry.price]
+            del self.prices[bisect.bisect_left(self.prices, entry.price)]
+
+
+class ZrxOrderBook:
+    """In-memory book of 0x V2 or V3 orders, kept up to date with exchange events.
+
+    Orders come from relayer snapshots passed to :py:meth:`ingest`. Fills and cancellations are then
+    followed incrementally from `Fill`, `Cancel` and `CancelUpTo` events, which are either fetched
+    by :py:meth:`sync` or passed to :py:meth:`apply` as they arrive. Orders get dropped from the book
+    as soon as they get fully filled, cancelled or expired. Expiration is tracked with a :py:class:`TimerWheel`.
+
+    Reading the book (:py:meth:`get_order`, :py:meth:`get_orders` and :py:meth:`get_levels`) never makes
+    any RPC calls. Orders on each side of each asset pair are kept sorted by price.
+
+    Attributes:
+        exchange: The :py:class:`pymaker.zrxv2.ZrxExchangeV2` or :py:class:`pymaker.zrxv3.ZrxExchangeV3` exchange.
+        last_block: Number of the last block events have been applied from by :py:meth:`sync`.
+    """
+    logger = logging.getLogger()
+
+    def __init__(self, exchange, from_block: Optional[int] = None, resolution: int = 1, slots: int = 3600):
+        assert(isinstance(exchange, (zrxv2.ZrxExchangeV2, zrxv3.ZrxExchangeV3)))
+        assert(isinstance(from_block, int) or (from_block is None))
+
+        self.exchange = exchange
+        self.last_block = from_block - 1 if from_block is not None else None
+
+        self._module = zrxv2 if isinstance(exchange, zrxv2.ZrxExchangeV2) else zrxv3
+        self._orders = {}
+        self._sides = {}
+        self._makers = {}
+        self._epochs = {}
+        self._wheel = TimerWheel(int(time.time()), resolution, slots)
+        self._lock = threading.RLock()
+
+    def ingest(self, orders: list, orders_info: Optional[list] = None) -> int:
+        """Add orders from a relayer snapshot to the book.
+
+        Orders which are already in the book keep the filled amount tracked so far. Orders which have
+        already expired or been cancelled with `CancelUpTo` are skipped.
+
+        Args:
+            orders: Orders to add, i.e. the result of `ZrxRelayerApiV2.get_orders`.
+            orders_info: Optional states of `orders` as returned by `get_orders_info` of the exchange,
+                used to learn how much of each order has been filled before the snapshot.
+                Orders which are not fillable are skipped.
+
+        Returns:
+            Number of orders added to the book.
+        """
+        assert(isinstance(orders, list))
+        assert(isinstance(orders_info, list) or (orders_info is None))
+        assert(orders_info is None or len(orders_info) == len(orders))
+
+        now = int(time.time())
+        added = 0
+        with self._lock:
+            for index, order in enumerate(orders):
+                assert(isinstance(order, self._module.Order))
+
+                if order.expiration <= now or order.pay_amount <= Wad(0) or order.buy_amount <= Wad(0):
+                    continue
+
+                if order.salt < self._epochs.get((order.maker, order.sender), 0):
+                    continue
+
+                if orders_info is not None:
+                    order_info = orders_info[index]
+                    if not order_info.is_fillable:
+                        continue
+
+                    order_hash = order_info.order_hash
+                    filled_buy_amount = order_info.filled_buy_amount
+
+                else:
+                    order_hash = self.exchange.get_order_hash(order)
+                    filled_buy_amount = Wad(0)
+
+                if order_hash in self._orders:
+                    continue
+
+                entry = BookOrder(order, order_hash, filled_buy_amount)
+                self._orders[order_hash] = entry
+                self._sides.setdefault((order.pay_asset, order.buy_asset), _BookSide()).add(entry)
+                self._makers.setdefault((order.maker, order.sender), set()).add(order_hash)
+                self._wheel.add(order_hash, order.expiration)
+                added += 1
+
+        return added
+
+    def remove(self, order_hash: str) -> Optional[BookOrder]:
+        """Remove an order from the book.
+
+        Returns:
+            The removed order, or `None` if there was no such order in the book.
+        """
+        assert(isinstance(order_hash, str))
+
+        with self._lock:
+            entry = self._orders.pop(order_hash, None)
+            if entry is None:
+                return None
+
+            pair = (entry.order.pay_asset, entry.order.buy_asset)
+            self._sides[pair].remove(entry)
+            if not self._sides[pair].levels:
+                del self._sides[pair]
+
+            maker = (entry.order.maker, entry.order.sender)
+            self._makers[maker].discard(order_hash)
+            if not self._makers[maker]:
+                del self._makers[maker]
+
+            self._wheel.remove(order_hash)
+            return entry
+
+    def apply(self, event):
+        """Update the book with a `LogFill`, `LogCancel` or `LogCancelUpTo` event of the exchange.
+
+        Events have to be applied in the order they have been emitted in.
+        """
+        with self._lock:
+            if isinstance(event, self._module.LogFill):
+                entry = self._orders.get(event.order_hash)
+                if entry is not None:
+                    entry.filled_buy_amount += event.filled_buy_amount
+                    if entry.remaining_buy_amount == Wad(0):
+                        self.remove(event.order_hash)
+
+            elif isinstance(event, self._module.LogCancel):
+                self.remove(event.order_hash)
+
+            elif isinstance(event, self._module.LogCancelUpTo):
+                maker = (event.maker, event.sender)
+                self._epochs[maker] = max(self._epochs.get(maker, 0), event.order_epoch)
+                for order_hash in list(self._makers.get(maker, [])):
+                    if self._orders[order_hash].order.salt < event.order_epoch:
+                        self.remove(order_hash)
+
+            else:
+                raise ValueError(f"Unsupported event: {event}")
+
+    def sync(self, to_block: Optional[int] = None) -> int:
+        """Fetch `Fill`, `Cancel` and `CancelUpTo` events emitted since the last sync and apply them.
+
+        The first sync of a book created without `from_block` only looks at the `to_block` block.
+
+        Args:
+            to_block: Last block to fetch the events from, by default the latest one.
+
+        Returns:
+            Number of events applied.
+        """
+        assert(isinstance(to_block, int) or (to_block is None))
+
+        if to_block is None:
+            to_block = self.exchange.web3.eth.blockNumber
+
+        from_block = self.last_block + 1 if self.last_block is not None else to_block
+        if from_block > to_block:
+            return 0
+
+        events = []
+        for name, cls in [('Fill', self._module.LogFill),
+                          ('Cancel', self._module.LogCancel),
+                          ('CancelUpTo', self._module.LogCancelUpTo)]:
+            events.extend(self.exchange._past_events_in_block_range(self.exchange._contract, name, cls,
+                                                                    from_block, to_block, None))
+
+        events.sort(key=lambda event: (event.raw['blockNumber'], event.raw['logIndex']))
+
+        with self._lock:
+            for event in events:
+                self.apply(event)
+
+            self.last_block = to_block
+
+        self.logger.debug(f"Applied {len(events)} 0x event(s) from blocks {from_block}-{to_block} to the order book")
+        return len(events)
+
+    def expire(self, now: Optional[int] = None) -> int:
+        """Remove orders which have expired by `now` (by default the current time).
+
+        Returns:
+            Number of orders removed.
+        """
+        assert(isinstance(now, int) or (now is None))
+
+        with self._lock:
+            expired = self._wheel.advance(now if now is not None else int(time.time()))
+            for order_hash in expired:
+                self.remove(order_hash)
+
+            return len(expired)
+
+    def get_order(self, order_hash: str) -> Optional[BookOrder]:
+        assert(isinstance(order_hash, str))
+
+        with self._lock:
+            self.expire()
+            return self._orders.get(order_hash)
+
+    def get_orders(self, pay_token: Address, buy_token: Address) -> List[BookOrder]:
+        """Return orders selling `pay_token` for `buy_token`, best (lowest) price first.
+
+        Args:
+            pay_token: Address of the token the orders sell.
+            buy_token: Address of the token the orders buy.
+        """
+        return [entry for level in self.get_levels(pay_token, buy_token) for entry in level.orders]
+
+    def get_levels(self, pay_token: Address, buy_token: Address, depth: Optional[int] = None) -> List[PriceLevel]:
+        """Return price levels of orders selling `pay_token` for `buy_token`, best (lowest) price first.
+
+        Args:
+            pay_token: Address of the token the orders sell.
+            buy_token: Address of the token the orders buy.
+            depth: Maximum number of levels to return.
+        """
+        assert(isinstance(pay_token, Address))
+        assert(isinstance(buy_token, Address))
+        assert(isinstance(depth, int) or (depth is None))
+
+        pair = (self._module.ERC20Asset(pay_token), self._module.ERC20Asset(buy_token))
+        with self._lock:
+            self.expire()
+
+            side = self._sides.get(pair)
+            if side is None:
+                return []
+
+            levels = []
+            for price in side.prices[:depth]:
+                entries = list(side.levels[price].values())
+                levels.append(PriceLevel(price=Wad(price.numerator * 10**18 // price.denominator),
+                                         pay_amount=Wad(sum(entry.remaining_sell_amount.value for entry in entries)),
+                                         buy_amount=Wad(sum(entry.remaining_buy_amount.value for entry in entries)),
+                                         orders=entries))
+
+            return levels
+
+    def __len__(self):
+        with self._lock:
+            return len(self._orders)
+
+    def __repr__(self):
+        return f"ZrxOrderBook({self.exchange}, orders={len(self)})"
@@ -24,7 +24,9 @@ from pprint import pformat
 from typing import List, Optional, Tuple
 
 import requests
-from eth_abi import encode_single, encode_abi, decode_single
+from eth_abi import encode_single, encode_abi
+from eth_account.messages import defunct_hash_message
+from eth_utils import keccak
 from hexbytes import HexBytes
 from web3 import Web3
 from web3._utils.events import get_event_data
@@ -34,9 +36,13 @@ from eth_abi.registry import registry as default_registry
 
 from pymaker import Contract, Address, Transact
 from pymaker.numeric import Wad
-from pymaker.sign import eth_sign, to_vrs
+from pymaker.relayer import PageCache, fetch_all_pages
+from pymaker.sessions import get_session
+from pymaker.sign import eth_sign, eth_sign_batch, to_vrs, eip712_domain_separator, eip712_hash, eip712_word, \
+    recover_message_hashes
 from pymaker.token import ERC20Token
-from pymaker.util import bytes_to_hexstring, hexstring_to_bytes, http_response_summary
+from pymaker.util import bytes_to_hexstring, hexstring_to_bytes, http_response_summary, function_selector, \
+    abi_encode_single, abi_decode_single
 
 
 class Asset:
@@ -260,6 +266,17 @@ class LogCancel:
         return pformat(vars(self))
 
 
+class LogCancelUpTo:
+    def __init__(self, log):
+        self.maker = Address(log['args']['makerAddress'])
+        self.sender = Address(log['args']['senderAddress'])
+        self.order_epoch = int(log['args']['orderEpoch'])
+        self.raw = log
+
+    def __repr__(self):
+        return pformat(vars(self))
+
+
 class LogFill:
     def __init__(self, log):
         self.sender = Address(log['args']['senderAddress'])
@@ -295,6 +312,71 @@ class LogFill:
         return pformat(vars(self))
 
 
+class OrderInfo:
+    """State of an order, as reported by the `getOrderInfo` and `getOrdersInfo` exchange methods.
+
+    Attributes:
+        order: The order this state is of.
+        status: Order status, one of the `INVALID`...`CANCELLED` constants.
+        order_hash: Hash of the order as a hex string starting with `0x`.
+        filled_buy_amount: Amount of the order which has been taken, expressed in terms of the `buy_token` token.
+    """
+
+    INVALID = 0
+    INVALID_MAKER_ASSET_AMOUNT = 1
+    INVALID_TAKER_ASSET_AMOUNT = 2
+    FILLABLE = 3
+    EXPIRED = 4
+    FULLY_FILLED = 5
+    CANCELLED = 6
+
+    def __init__(self, order: Order, status: int, order_hash: str, filled_buy_amount: Wad):
+        assert(isinstance(order, Order))
+        assert(isinstance(status, int))
+        assert(isinstance(order_hash, str))
+        assert(isinstance(filled_buy_amount, Wad))
+
+        self.order = order
+        self.status = status
+        self.order_hash = order_hash
+        self.filled_buy_amount = filled_buy_amount
+
+    @property
+    def is_fillable(self) -> bool:
+        return self.status == self.FILLABLE
+
+    @property
+    def unavailable_buy_amount(self) -> Wad:
+        if self.status in [self.INVALID,
+                           self.INVALID_MAKER_ASSET_AMOUNT,
+                           self.INVALID_TAKER_ASSET_AMOUNT,
+                           self.EXPIRED,
+                           self.FULLY_FILLED,
+                           self.CANCELLED]:
+            return self.order.buy_amount
+
+        else:
+            return self.filled_buy_amount
+
+    @property
+    def remaining_buy_amount(self) -> Wad:
+        return Wad.max(self.order.buy_amount - self.unavailable_buy_amount, Wad(0))
+
+    @property
+    def remaining_sell_amount(self) -> Wad:
+        unavailable_buy_amount = self.unavailable_buy_amount
+
+        if unavailable_buy_amount >= self.order.buy_amount:
+            return Wad(0)
+
+        else:
+            return Wad.max(self.order.pay_amount - (unavailable_buy_amount * self.order.pay_amount /
+                                                    self.order.buy_amount), Wad(0))
+
+    def __repr__(self):
+        return pformat(vars(self))
+
+
 class ZrxExchangeV2(Contract):
     """A client for the 0x V2 exchange contract.
 
@@ -306,13 +388,23 @@ class ZrxExchangeV2(Contract):
         address: Ethereum address of the _0x_ `Exchange` contract.
     """
 
-    abi = Contract._load_abi(__name__, 'abi/ExchangeV2.abi')
-    bin = Contract._load_bin(__name__, 'abi/ExchangeV2.bin')
+    abi = Contract._lazy_abi(__name__, 'abi/ExchangeV2.abi')
+    bin = Contract._lazy_bin(__name__, 'abi/ExchangeV2.bin')
 
     _ZERO_ADDRESS = Address("0x0000000000000000000000000000000000000000")
 
+    # Maximum number of orders queried with a single `getOrdersInfo` call.
+    orders_info_batch_size = 100
+
     ORDER_INFO_TYPE = '(address,address,address,address,uint256,uint256,uint256,uint256,uint256,uint256,bytes,bytes)'
 
+    EIP712_DOMAIN_NAME = "0x Protocol"
+    EIP712_DOMAIN_VERSION = "2"
+    EIP712_ORDER_TYPEHASH = keccak(text="Order(address makerAddress,address takerAddress,address feeRecipientAddress,"
+                                        "address senderAddress,uint256 makerAssetAmount,uint256 takerAssetAmount,"
+                                        "uint256 makerFee,uint256 takerFee,uint256 expirationTimeSeconds,uint256 salt,"
+                                        "bytes makerAssetData,bytes takerAssetData)")
+
     @staticmethod
     def deploy(web3: Web3, zrx_asset: str):
         """Deploy a new instance of the 0x `Exchange` contract.
@@ -334,6 +426,7 @@ class ZrxExchangeV2(Contract):
         self.web3 = web3
         self.address = address
         self._contract = self._get_contract(web3, self.abi, address)
+        self._domain_separator = None
 
     def zrx_asset(self) -> str:
         """Get the asset data of the ZRX token contract associated with this `ExchangeV2` contract.
@@ -416,6 +509,24 @@ class ZrxExchangeV2(Contract):
 
         return self._past_events(self._contract, 'Cancel', LogCancel, number_of_past_blocks, event_filter)
 
+    def past_cancel_up_to(self, number_of_past_blocks: int, event_filter: dict = None) -> List[LogCancelUpTo]:
+        """Synchronously retrieve past LogCancelUpTo events.
+
+        `LogCancelUpTo` events are emitted by the 0x contract every time someone cancels all their orders
+        with a salt lower than the new order epoch.
+
+        Args:
+            number_of_past_blocks: Number of past Ethereum blocks to retrieve the events from.
+            event_filter: Filter which will be applied to returned events.
+
+        Returns:
+            List of past `LogCancelUpTo` events represented as :py:class:`pymaker.zrxv2.LogCancelUpTo` class.
+        """
+        assert(isinstance(number_of_past_blocks, int))
+        assert(isinstance(event_filter, dict) or (event_filter is None))
+
+        return self._past_events(self._contract, 'CancelUpTo', LogCancelUpTo, number_of_past_blocks, event_filter)
+
     def create_order(self,
                      pay_asset: Asset,
                      pay_amount: Wad,
@@ -463,15 +574,46 @@ class ZrxExchangeV2(Contract):
     def _get_order_info(self, order):
         assert(isinstance(order, Order))
 
-        method_signature = self.web3.keccak(text=f"getOrderInfo({self.ORDER_INFO_TYPE})")[0:4]
-        method_parameters = encode_single(f"({self.ORDER_INFO_TYPE})", [self._order_tuple(order)])
+        method_signature = function_selector(f"getOrderInfo({self.ORDER_INFO_TYPE})")
+        method_parameters = abi_encode_single(f"({self.ORDER_INFO_TYPE})", [self._order_tuple(order)])
 
         request = bytes_to_hexstring(method_signature + method_parameters)
         response = self.web3.eth.call({'to': self.address.address, 'data': request})
-        response_decoded = decode_single("((uint8,bytes32,uint256))", response)
+        response_decoded = abi_decode_single("((uint8,bytes32,uint256))", response)
 
         return response_decoded
 
+    def get_orders_info(self, orders: List[Order]) -> List[OrderInfo]:
+        """Returns the state of many orders at once.
+
+        Orders get queried with the `getOrdersInfo` method of the exchange, `orders_info_batch_size`
+        orders per `eth_call`, so even a large order book can be checked with a couple of calls.
+
+        Args:
+            orders: Orders you want to get the state of.
+
+        Returns:
+            States of the orders, in the same order as `orders`.
+        """
+        assert(isinstance(orders, list))
+
+        method_signature = function_selector(f"getOrdersInfo({self.ORDER_INFO_TYPE}[])")
+
+        result = []
+        for index in range(0, len(orders), self.orders_info_batch_size):
+            batch = orders[index:index + self.orders_info_batch_size]
+            method_parameters = abi_encode_single(f"({self.ORDER_INFO_TYPE}[])",
+                                                  [list(map(self._order_tuple, batch))])
+
+            request = bytes_to_hexstring(method_signature + method_parameters)
+            response = self.web3.eth.call({'to': self.address.address, 'data': request})
+            response_decoded = abi_decode_single("((uint8,bytes32,uint256)[])", response)[0]
+
+            for order, (status, order_hash, filled_buy_amount) in zip(batch, response_decoded):
+                result.append(OrderInfo(order, status, bytes_to_hexstring(order_hash), Wad(filled_buy_amount)))
+
+        return result
+
     def get_order_hash(self, order: Order) -> str:
         """Calculates hash of an order.
 
@@ -486,7 +628,31 @@ class ZrxExchangeV2(Contract):
         # the hash depends on the exchange contract address as well
         assert(order.exchange_contract_address == self.address)
 
-        return bytes_to_hexstring(self._get_order_info(order)[0][1])
+        return bytes_to_hexstring(eip712_hash(self.domain_separator(), self._order_struct_hash(order)))
+
+    def domain_separator(self) -> bytes:
+        """Returns the EIP-712 domain separator of this exchange, as used by the contract for order hashing."""
+        if self._domain_separator is None:
+            self._domain_separator = eip712_domain_separator(self.EIP712_DOMAIN_NAME, self.EIP712_DOMAIN_VERSION,
+                                                             self.address)
+
+        return self._domain_separator
+
+    @classmethod
+    def _order_struct_hash(cls, order: Order) -> bytes:
+        return keccak(cls.EIP712_ORDER_TYPEHASH
+                      + eip712_word(order.maker)
+                      + eip712_word(order.taker)
+                      + eip712_word(order.fee_recipient)
+                      + eip712_word(order.sender)
+                      + eip712_word(order.pay_amount.value)
+                      + eip712_word(order.buy_amount.value)
+                      + eip712_word(order.maker_fee.value)
+                      + eip712_word(order.taker_fee.value)
+                      + eip712_word(order.expiration)
+                      + eip712_word(order.salt)
+                      + keccak(bytes.fromhex(order.pay_asset.serialize()[2:]))
+                      + keccak(bytes.fromhex(order.buy_asset.serialize()[2:])))
 
     def get_unavailable_buy_amount(self, order: Order) -> Wad:
         """Return the order amount which was either taken or cancelled.
@@ -500,18 +666,7 @@ class ZrxExchangeV2(Contract):
         """
         assert(isinstance(order, Order))
 
-        order_info = self._get_order_info(order)[0]
-
-        if order_info[0] in [0,         # INVALID,                     // Default value
-                             1,         # INVALID_MAKER_ASSET_AMOUNT,  // Order does not have a valid maker asset amount
-                             2,         # INVALID_TAKER_ASSET_AMOUNT,  // Order does not have a valid taker asset amount
-                             4,         # EXPIRED,                     // Order has already expired
-                             5,         # FULLY_FILLED,                // Order is fully filled
-                             6]:        # CANCELLED                    // Order has been cancelled
-            return order.buy_amount
-
-        else:
-            return Wad(order_info[2])
+        return self.get_orders_info([order])[0].unavailable_buy_amount
 
     def sign_order(self, order: Order) -> Order:
         """Signs an order so it can be submitted to the relayer.
@@ -526,7 +681,30 @@ class ZrxExchangeV2(Contract):
         """
         assert(isinstance(order, Order))
 
-        signature = eth_sign(hexstring_to_bytes(self.get_order_hash(order)), self.web3)
+        return self._signed_order(order, eth_sign(hexstring_to_bytes(self.get_order_hash(order)), self.web3))
+
+    def sign_orders(self, orders: List[Order], processes: Optional[int] = None) -> List[Order]:
+        """Signs many orders at once, so they can be submitted to the relayer.
+
+        Orders will be signed by the `web3.eth.defaultAccount` account. If a local key has been
+        registered for it, large batches get signed by multiple worker processes.
+
+        Args:
+            orders: Orders you want to sign.
+            processes: Number of worker processes to use, by default the number of CPUs.
+
+        Returns:
+            Signed orders, in the same order as `orders`.
+        """
+        assert(isinstance(orders, list))
+
+        signatures = eth_sign_batch([hexstring_to_bytes(self.get_order_hash(order)) for order in orders],
+                                    self.web3, processes)
+
+        return [self._signed_order(order, signature) for order, signature in zip(orders, signatures)]
+
+    @staticmethod
+    def _signed_order(order: Order, signature: str) -> Order:
         v, r, s = to_vrs(signature)
 
         signed_order = copy.copy(order)
@@ -536,6 +714,49 @@ class ZrxExchangeV2(Contract):
                                  "03"  # EthSign
         return signed_order
 
+    def validate_signatures(self, orders: List[Order], processes: Optional[int] = None) -> List[Optional[bool]]:
+        """Checks signatures of many orders, i.e. received from the relayer, without calling the exchange.
+
+        Only `EIP712` and `EthSign` signatures can be checked this way. Other signature types
+        (`Wallet`, `Validator`, `PreSigned` etc.) can only be checked by the exchange contract.
+
+        Args:
+            orders: Orders you want to check.
+            processes: Number of worker processes to use, by default the number of CPUs.
+
+        Returns:
+            For each order, `True` if it has been signed by its maker, `False` if its signature
+            is missing, malformed or has been made by someone else, and `None` if its signature
+            type can not be checked locally.
+        """
+        assert(isinstance(orders, list))
+
+        results = [None] * len(orders)
+        indices, message_hashes, signatures = [], [], []
+        for index, order in enumerate(orders):
+            try:
+                signature = bytes.fromhex(order.signature[2:]) if order.signature else b''
+            except ValueError:
+                signature = b''
+
+            if order.exchange_contract_address != self.address:
+                results[index] = False
+            elif len(signature) == 0 or signature[-1] in (0x00, 0x01):  # Illegal, Invalid
+                results[index] = False
+            elif signature[-1] in (0x02, 0x03) and len(signature) != 66:  # EIP712, EthSign
+                results[index] = False
+            elif signature[-1] in (0x02, 0x03):
+                order_hash = hexstring_to_bytes(self.get_order_hash(order))
+                indices.append(index)
+                message_hashes.append(order_hash if signature[-1] == 0x02
+                                      else bytes(defunct_hash_message(primitive=order_hash)))
+                signatures.append((signature[0], signature[1:33], signature[33:65]))
+
+        for index, signer in zip(indices, recover_message_hashes(message_hashes, signatures, processes)):
+            results[index] = signer is not None and signer == orders[index].maker
+
+        return results
+
     def fill_order(self, order: Order, fill_buy_amount: Wad) -> Transact:
         """Fills an order.
 
@@ -609,16 +830,22 @@ class ZrxRelayerApiV2:
     Attributes:
         exchange: The 0x Exchange V2 contract.
         api_server: Base URL of the Standard Relayer API server.
+        session: The `requests.Session` used for talking to the relayer, by default the shared one
+            returned by :py:func:`pymaker.sessions.get_session`.
     """
     logger = logging.getLogger()
     timeout = 15.5
+    max_workers = 8
 
-    def __init__(self, exchange: ZrxExchangeV2, api_server: str):
+    def __init__(self, exchange: ZrxExchangeV2, api_server: str, session: Optional[requests.Session] = None):
         assert(isinstance(exchange, ZrxExchangeV2))
         assert(isinstance(api_server, str))
+        assert(isinstance(session, requests.Session) or (session is None))
 
         self.exchange = exchange
         self.api_server = api_server
+        self.session = session or get_session()
+        self._page_cache = PageCache()
 
     def get_book(self, pay_token: Address, buy_token: Address, depth: int = 100) -> Tuple[List[Order], List[Order]]:
         assert(isinstance(pay_token, Address))
@@ -629,7 +856,7 @@ class ZrxRelayerApiV2:
                   "quoteAssetData": ERC20Asset(buy_token).serialize(),
                   "perPage": depth}
 
-        response = requests.get(f"{self.api_server}/v2/orderbook", params, timeout=self.timeout)
+        response = self.session.get(f"{self.api_server}/v2/orderbook", params, timeout=self.timeout)
         if not response.ok:
             raise Exception(f"Failed to fetch 0x orderbook from the relayer: {http_response_summary(response)}")
 
@@ -641,7 +868,8 @@ class ZrxRelayerApiV2:
     def get_orders(self, pay_token: Address, buy_token: Address, per_page: int = 100) -> List[Order]:
         """Returns active orders filtered by token pair (one side).
 
-        In order to get them, issues a `/v2/orders` call to the Standard Relayer API.
+        In order to get them, issues `/v2/orders` calls to the Standard Relayer API, fetching
+        all the pages. Pages after the first one are fetched concurrently.
 
         Args:
             per_page: Maximum number of orders to be downloaded per page. 0x Standard Relayer API
@@ -657,23 +885,14 @@ class ZrxRelayerApiV2:
         params = { "exchangeAddress": self.exchange.address.address.lower(),
                    "makerAssetData": ERC20Asset(pay_token).serialize(),
                    "takerAssetData": ERC20Asset(buy_token).serialize(),
-                   "per_page": per_page,
                  }
 
-        response = requests.get(f"{self.api_server}/v2/orders", params=params, timeout=self.timeout)
-        if not response.ok:
-            raise Exception(f"Failed to fetch 0x orders from the relayer: {http_response_summary(response)}")
-
-        data = response.json()
-        if 'records' in data:
-            return list(map(lambda item: Order.from_json(self.exchange, item['order']), data['records']))
-        else:
-            return []
+        return self._get_all_orders(params, per_page)
 
     def get_order(self, order_hash: str) -> Order:
         assert(isinstance(order_hash, str))
 
-        response = requests.get(f"{self.api_server}/v2/order/{order_hash}", timeout=self.timeout)
+        response = self.session.get(f"{self.api_server}/v2/order/{order_hash}", timeout=self.timeout)
         if not response.ok:
             raise Exception(f"Failed to 0x order from the relayer: {http_response_summary(response)}")
 
@@ -682,7 +901,8 @@ class ZrxRelayerApiV2:
     def get_orders_by_maker(self, maker: Address, per_page: int = 100) -> List[Order]:
         """Returns all active orders created by `maker`.
 
-        In order to get them, issues a `/v2/orders` call to the Standard Relayer API.
+        In order to get them, issues `/v2/orders` calls to the Standard Relayer API, fetching
+        all the pages. Pages after the first one are fetched concurrently.
 
         Args:
             maker: Address of the `maker` to filter the orders by.
@@ -697,18 +917,27 @@ class ZrxRelayerApiV2:
 
         params = { "exchangeAddress": self.exchange.address.address.lower(),
                    "makerAddress": str(maker).lower(),
-                   "per_page": per_page,
                  }
 
-        response = requests.get(f"{self.api_server}/v2/orders", params=params, timeout=self.timeout)
-        if not response.ok:
-            raise Exception(f"Failed to fetch 0x orders from the relayer: {http_response_summary(response)}")
+        return self._get_all_orders(params, per_page)
 
-        data = response.json()
-        if 'records' in data:
-            return list(map(lambda item: Order.from_json(self.exchange, item['order']), data['records']))
-        else:
-            return []
+    def _get_all_orders(self, params: dict, per_page: int) -> List[Order]:
+        orders = fetch_all_pages(session=self.session,
+                                 url=f"{self.api_server}/v2/orders",
+                                 params=params,
+                                 per_page=per_page,
+                                 decode=lambda item: Order.from_json(self.exchange, item['order']),
+                                 timeout=self.timeout,
+                                 max_workers=self.max_workers,
+                                 cache=self._page_cache)
+
+        # Orders placed or removed while pages were being fetched can make other orders
+        # shift between pages, so some of them may have been returned twice.
+        unique = {}
+        for order in orders:
+            unique.setdefault((order.maker, order.salt, order.signature), order)
+
+        return list(unique.values())
 
     def configure_order(self, order: Order) -> Order:
         """Takes a partial order and  receive information required to complete the order:
@@ -733,7 +962,7 @@ class ZrxRelayerApiV2:
         """
         assert(isinstance(order, Order))
 
-        response = requests.get(f"{self.api_server}/v2/order_config", params=order.to_json_without_fees(), timeout=self.timeout)
+        response = self.session.get(f"{self.api_server}/v2/order_config", params=order.to_json_without_fees(), timeout=self.timeout)
         if response.status_code == 200:
             data = response.json()
             #{"senderAddress":"0xc8924d8cd9a758a4150afe7cc7030effaff1aecc","feeRecipientAddress":"0xc8924d8cd9a758a4150afe7cc7030effaff1aecc","makerFee":"0","takerFee":"0"}
@@ -760,7 +989,7 @@ class ZrxRelayerApiV2:
         """
         assert(isinstance(order, Order))
 
-        response = requests.post(f"{self.api_server}/v2/order", json=order.to_json(), timeout=self.timeout)
+        response = self.session.post(f"{self.api_server}/v2/order", json=order.to_json(), timeout=self.timeout)
         if response.status_code in [200, 201]:
             self.logger.info(f"Placed 0x order: {order}")
             return True
@@ -50,6 +50,7 @@ setup(
         'pytz==2017.3',
         'web3==5.6.0',
         'requests==2.22.0',
+        'websockets==8.1',
         'eth-keys<0.3.0,>=0.2.1'
         ],
 )
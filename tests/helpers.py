@@ -15,11 +15,25 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import json
+import socketserver
+import threading
 import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from unittest.mock import Mock
+from urllib.parse import urlparse, parse_qs
 
+import websockets
 from web3 import Web3
 
+from pymaker.util import EMPTY_CODE_HASH
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """Equivalent of `http.server.ThreadingHTTPServer`, which is not available before Python 3.7."""
+    daemon_threads = True
+
 
 def is_hashable(v):
     """Determine whether `v` can be hashed."""
@@ -30,6 +44,39 @@ def is_hashable(v):
     return True
 
 
+def mocked_web3_code(code_hashes: dict, proof_supported: bool = True, proof_error: Exception = None) -> Web3:
+    def request_blocking(method, params):
+        assert method == "eth_getProof"
+        if not proof_supported:
+            raise ValueError({'code': -32601, 'message': 'Method not found'})
+        if proof_error is not None:
+            raise proof_error
+        return {'codeHash': code_hashes.get(params[0], "0x" + "00" * 32)}
+
+    def get_code(address):
+        return "0x6080" if code_hashes.get(address, EMPTY_CODE_HASH) != EMPTY_CODE_HASH else "0x"
+
+    web3 = Mock(Web3)
+    web3.eth = Mock()
+    web3.eth.chainId = 1
+    web3.eth.getCode = Mock(side_effect=get_code)
+    web3.manager = Mock()
+    web3.manager.request_blocking = Mock(side_effect=request_blocking)
+    return web3
+
+
+def offline_web3(chain_id: int = 1) -> Web3:
+    """Mocked `Web3` of the chain `chain_id`, failing on any request which would reach the node."""
+    web3 = Mock(Web3)
+    web3.eth = Mock()
+    web3.eth.chainId = chain_id
+    web3.net = Mock()
+    web3.net.version = str(chain_id)
+    web3.manager = Mock()
+    web3.manager.request_blocking = Mock(side_effect=Exception("No requests expected"))
+    return web3
+
+
 def wait_until_mock_called(mock: Mock):
     while not mock.called:
         pass
@@ -58,3 +105,191 @@ def reset(web3: Web3, snap_id):
     assert(isinstance(web3, Web3))
 
     return web3.manager.request_blocking("evm_revert", [snap_id])
+
+
+class StandInNode:
+    """Local HTTP JSON-RPC server standing in for an Ethereum node.
+
+    Each entry of `handlers` maps a JSON-RPC method to a function taking the request parameters
+    and returning the result, or raising a `ValueError` with the error message to be returned.
+    All requests received are recorded in `requests`, and sizes of JSON-RPC batches in `batches`.
+    If `keep_alive` is set, connections are kept open between requests (HTTP/1.1), otherwise each
+    of them gets closed after the response.
+    """
+    def __init__(self, handlers: dict, delay: float = 0.0, keep_alive: bool = False):
+        self.handlers = handlers
+        self.delay = delay
+        self.requests = []
+        self.batches = []
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" if keep_alive else "HTTP/1.0"
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if isinstance(request, list):
+                    node.batches.append(len(request))
+                    response = list(map(self.respond, request))
+                else:
+                    response = self.respond(request)
+
+                body = json.dumps(response).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            @staticmethod
+            def respond(request: dict) -> dict:
+                node.requests.append((request['method'], request['params']))
+                time.sleep(node.delay)
+
+                response = {'jsonrpc': '2.0', 'id': request['id']}
+                try:
+                    if request['method'] not in node.handlers:
+                        raise ValueError(f"the method {request['method']} does not exist/is not available")
+                    response['result'] = node.handlers[request['method']](request['params'])
+                except ValueError as e:
+                    response['error'] = {'code': -32000, 'message': str(e)}
+
+                return response
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.block_on_close = False
+        self.endpoint_uri = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def methods(self) -> list:
+        return [method for method, _ in self.requests]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StandInRelayer:
+    """Local HTTP server standing in for a 0x Standard Relayer API `/orders` endpoint.
+
+    Serves `orders` (JSON order records) page by page, following the `page` and `perPage`
+    query parameters. Unless `etags` is `False`, each page carries an `ETag` header and
+    `If-None-Match` requests for unchanged pages get a `304 Not Modified` response.
+    All requests received are recorded in `requests` as (page, status code) tuples.
+    """
+    def __init__(self, orders: list, etags: bool = True, delay: float = 0.0):
+        self.orders = orders
+        self.etags = etags
+        self.delay = delay
+        self.requests = []
+        relayer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                page = int(query.get('page', ['1'])[0])
+                per_page = int(query.get('perPage', ['100'])[0])
+                time.sleep(relayer.delay)
+
+                records = [{'order': order, 'metaData': {}}
+                           for order in relayer.orders[(page - 1) * per_page:page * per_page]]
+                body = json.dumps({'total': len(relayer.orders), 'page': page, 'perPage': per_page,
+                                   'records': records}).encode('utf-8')
+                etag = f'"{hash(body) & 0xffffffff:x}"'
+
+                if relayer.etags and self.headers.get('If-None-Match') == etag:
+                    relayer.requests.append((page, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                relayer.requests.append((page, 200))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if relayer.etags:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.block_on_close = False
+        self.api_server = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StandInSocketIOServer:
+    """Local websocket server standing in for the EtherDelta socket.io API backend.
+
+    Speaks just enough of the Engine.IO v3 / Socket.IO v2 protocol for order publishing: every
+    `message` event is recorded in `messages` and answered with a `messageResult` event carrying
+    the result of `respond(order)`. `pings` counts Engine.IO pings and `connections` counts
+    accepted connections. :py:meth:`disconnect` drops all the connections currently open.
+    """
+    def __init__(self, respond=None, ping_interval: int = 25000):
+        self.respond = respond or (lambda order: ['Added/updated order.', order])
+        self.ping_interval = ping_interval
+        self.messages = []
+        self.pings = 0
+        self.connections = 0
+        self.websockets = set()
+
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(websockets.serve(self.handle, "127.0.0.1", 0, loop=self.loop))
+        self.api_server = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    async def handle(self, websocket, path):
+        self.connections += 1
+        self.websockets.add(websocket)
+        try:
+            await websocket.send('0' + json.dumps({'sid': str(self.connections), 'upgrades': [],
+                                                   'pingInterval': self.ping_interval, 'pingTimeout': 60000}))
+            await websocket.send('40')
+
+            async for packet in websocket:
+                if packet == '2':
+                    self.pings += 1
+                    await websocket.send('3')
+
+                elif packet.startswith('42'):
+                    event, order = json.loads(packet[2:])
+                    self.messages.append(order)
+                    await websocket.send('42' + json.dumps(['messageResult', self.respond(order)]))
+
+        except websockets.ConnectionClosed:
+            pass
+
+        finally:
+            self.websockets.discard(websocket)
+
+    def disconnect(self):
+        async def close_all():
+            for websocket in list(self.websockets):
+                await websocket.close()
+
+        asyncio.run_coroutine_threadsafe(close_all(), self.loop).result()
+
+    def stop(self):
+        async def shutdown():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
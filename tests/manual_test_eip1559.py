@@ -0,0 +1,83 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Sends type-2 transactions to a post-London development chain (i.e. `geth --dev`),
+# first from a node-managed account and then from a local key, including a tip-only replacement.
+#
+# usage: PYTHONPATH=. python tests/manual_test_eip1559.py http://localhost:8545 [account key]
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+
+from web3 import Web3, HTTPProvider
+
+from pymaker import Address, eth_transfer
+from pymaker.gas import BlockFeeHistory, FixedGasFees, GeometricTipGasPrice
+from pymaker.keys import register_keys
+from pymaker.numeric import Wad
+
+logging.basicConfig(format='%(asctime)-15s %(levelname)-8s %(message)s', level=logging.DEBUG)
+# reduce logspew
+logging.getLogger('urllib3').setLevel(logging.INFO)
+logging.getLogger("web3").setLevel(logging.INFO)
+logging.getLogger("asyncio").setLevel(logging.INFO)
+logging.getLogger("requests").setLevel(logging.INFO)
+
+endpoint_uri = sys.argv[1]              # ex: http://localhost:8545
+web3 = Web3(HTTPProvider(endpoint_uri=endpoint_uri, request_kwargs={"timeout": 60}))
+if len(sys.argv) > 3:
+    web3.eth.defaultAccount = sys.argv[2]  # ex: 0x0000000000000000000000000000000aBcdef123
+    register_keys(web3, [sys.argv[3]])      # ex: key_file=~keys/default-account.json,pass_file=~keys/default-account.pass
+else:
+    web3.eth.defaultAccount = web3.eth.accounts[0]
+
+our_address = Address(web3.eth.defaultAccount)
+fee_history = BlockFeeHistory(web3)
+
+GWEI = 1000000000
+
+
+def run_future(future):
+    def worker():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            asyncio.get_event_loop().run_until_complete(future)
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+
+logging.info(f"Sending a type-2 transfer from {our_address}")
+receipt = eth_transfer(web3, our_address, Wad(1)).transact(gas_price=GeometricTipGasPrice(fee_history, 1*GWEI, 30))
+assert receipt is not None
+logging.info(f"Mined in block {receipt.block_number}")
+
+logging.info(f"Submitting a type-2 transfer with a fee cap deliberately too low")
+first_tx = eth_transfer(web3, our_address, Wad(2))
+run_future(first_tx.transact_async(gas_price=FixedGasFees(1, 1)))
+time.sleep(2)
+
+logging.info(f"Replacing it by bumping the tip only")
+second_tx = eth_transfer(web3, our_address, Wad(3))
+assert second_tx.transact(replace=first_tx, gas_price=GeometricTipGasPrice(fee_history, 2*GWEI, 30)) is not None
+assert first_tx.replaced
@@ -0,0 +1,76 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Simulates the gas price polling done by `Transact` for many pending transactions at once,
+# comparing the former iterative `GeometricGasPrice` computation with the current one.
+#
+# usage: PYTHONPATH=. python tests/manual_test_gas_benchmark.py [transactions] [pending_secs]
+
+import math
+import sys
+import time
+
+from pymaker.gas import GeometricGasPrice
+
+transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+pending_secs = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+poll_interval = 0.25
+
+
+def iterative_gas_price(strategy: GeometricGasPrice, time_elapsed: int) -> int:
+    if time_elapsed < strategy.every_secs:
+        return strategy.initial_price
+    result = strategy.initial_price
+    for second in range(math.floor(time_elapsed/strategy.every_secs)):
+        result *= strategy.coefficient
+    if strategy.max_price is not None:
+        result = min(result, strategy.max_price)
+
+    return math.ceil(result)
+
+
+def simulate_iterative(strategy: GeometricGasPrice) -> int:
+    queries = 0
+    for tick in range(int(pending_secs / poll_interval)):
+        for transaction in range(transactions):
+            iterative_gas_price(strategy, int(tick * poll_interval))
+            queries += 1
+    return queries
+
+
+def simulate_current(strategy: GeometricGasPrice) -> int:
+    queries = 0
+    next_changes = [0] * transactions
+    for tick in range(int(pending_secs / poll_interval)):
+        seconds_elapsed = int(tick * poll_interval)
+        for transaction in range(transactions):
+            next_change = next_changes[transaction]
+            if next_change is not None and seconds_elapsed >= next_change:
+                strategy.get_gas_price(seconds_elapsed)
+                next_changes[transaction] = strategy.get_next_change(seconds_elapsed)
+                queries += 1
+    return queries
+
+
+for max_price in [None, 2000 * 10**9]:
+    for name, simulate in [("iterative", simulate_iterative), ("current", simulate_current)]:
+        strategy = GeometricGasPrice(initial_price=10 * 10**9, every_secs=10, coefficient=1.01, max_price=max_price)
+        start = time.perf_counter()
+        queries = simulate(strategy)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} max_price={max_price}: {queries} gas price queries for {transactions} transactions"
+              f" pending for {pending_secs}s took {elapsed:.3f}s")
@@ -0,0 +1,81 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Measures the time it takes `Transact` to rebroadcast a replacement transaction, signing it on the spot
+# through the signing middleware set up by `pymaker.keys`, compared to sending a pre-signed one.
+# Node round trips are left out by using a provider which answers instantly, or included
+# if an endpoint is specified.
+#
+# usage: PYTHONPATH=. python tests/manual_test_presign_benchmark.py [iterations] [endpoint]
+
+import sys
+import time
+
+from eth_account import Account
+from hexbytes import HexBytes
+from web3 import Web3, HTTPProvider
+from web3.providers.base import BaseProvider
+
+from pymaker import Address, eth_transfer
+from pymaker.gas import GeometricGasPrice
+from pymaker.keys import register_private_key
+from pymaker.numeric import Wad
+
+iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+
+class InstantProvider(BaseProvider):
+    endpoint_uri = "instant"
+
+    def make_request(self, method, params):
+        if method == "eth_chainId":
+            return {'result': '0x1'}
+        elif method in ("eth_sendRawTransaction", "eth_sendTransaction"):
+            return {'result': '0x' + 'ab' * 32}
+        elif method == "eth_getTransactionCount":
+            return {'result': '0x0'}
+        elif method == "eth_gasPrice":
+            return {'result': hex(1000000000)}
+        elif method == "eth_estimateGas":
+            return {'result': hex(21000)}
+        raise ValueError(f"Unexpected request {method}")
+
+
+web3 = Web3(HTTPProvider(sys.argv[2]) if len(sys.argv) > 2 else InstantProvider())
+account = Account.create()
+register_private_key(web3, account.key)
+web3.eth.defaultAccount = account.address
+
+transact = eth_transfer(web3, Address(account.address), Wad(0))
+gas_price = GeometricGasPrice(1000000000, 1, 1.2)
+
+start = time.perf_counter()
+for iteration in range(iterations):
+    transact._func(account.address, 21000, {'gasPrice': gas_price.get_gas_price(iteration % 16)}, 0)
+lazy = (time.perf_counter() - start) / iterations
+
+ladder = []
+while len(ladder) < iterations:
+    ladder.extend(transact._presign(account.address, 21000, gas_price, {'gasPrice': 1000000000}, 0, 0))
+
+start = time.perf_counter()
+for iteration in range(iterations):
+    web3.eth.sendRawTransaction(HexBytes(ladder[iteration][2]))
+presigned = (time.perf_counter() - start) / iterations
+
+print(f"signing on rebroadcast: {lazy * 1000:.3f}ms per replacement")
+print(f"pre-signed:             {presigned * 1000:.3f}ms per replacement")
@@ -0,0 +1,74 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Measures the throughput of local 0x order hashing, which `sign_order` relies on.
+# No node is needed, as hashing no longer requires any `eth_call`.
+#
+# usage: PYTHONPATH=. python tests/manual_test_zrx_hash_benchmark.py [orders]
+
+import sys
+import time
+from unittest.mock import Mock
+
+from web3 import Web3
+
+from pymaker import Address, Contract
+from pymaker import zrx, zrxv2, zrxv3
+from pymaker.numeric import Wad
+
+orders = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+Contract.lazy_verification = True
+web3 = Mock(Web3)
+web3.eth = Mock()
+web3.eth.chainId = 1
+exchange_address = Address("0x61935cbdd02287b511119ddb11aeb42f1593b7ef")
+maker = Address("0x0046cac6668bef45b517a1b816a762f4f8add2a9")
+pay_token = Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4")
+buy_token = Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070")
+
+
+def v1_order(exchange, salt: int):
+    return zrx.Order(exchange=exchange, maker=maker, taker=Address("0x0000000000000000000000000000000000000000"),
+                     maker_fee=Wad(0), taker_fee=Wad(0), pay_token=pay_token, pay_amount=Wad(10**18 + salt),
+                     buy_token=buy_token, buy_amount=Wad(2 * 10**18), salt=salt,
+                     fee_recipient=Address("0x0000000000000000000000000000000000000000"), expiration=1763920792,
+                     exchange_contract_address=exchange_address, ec_signature_r=None, ec_signature_s=None,
+                     ec_signature_v=None)
+
+
+def order(module, exchange, salt: int):
+    return module.Order(exchange=exchange, sender=Address("0x0000000000000000000000000000000000000000"), maker=maker,
+                        taker=Address("0x0000000000000000000000000000000000000000"), maker_fee=Wad(0),
+                        taker_fee=Wad(0), pay_asset=module.ERC20Asset(pay_token), pay_amount=Wad(10**18 + salt),
+                        buy_asset=module.ERC20Asset(buy_token), buy_amount=Wad(2 * 10**18), salt=salt,
+                        fee_recipient=Address("0x0000000000000000000000000000000000000000"), expiration=1763920792,
+                        exchange_contract_address=exchange_address, signature=None)
+
+
+exchange_v1 = zrx.ZrxExchange(web3, exchange_address)
+exchange_v2 = zrxv2.ZrxExchangeV2(web3, exchange_address)
+exchange_v3 = zrxv3.ZrxExchangeV3(web3, exchange_address, chain_id=1)
+
+for name, exchange, batch in [("v1", exchange_v1, [v1_order(exchange_v1, salt) for salt in range(orders)]),
+                              ("v2", exchange_v2, [order(zrxv2, exchange_v2, salt) for salt in range(orders)]),
+                              ("v3", exchange_v3, [order(zrxv3, exchange_v3, salt) for salt in range(orders)])]:
+    start = time.perf_counter()
+    for item in batch:
+        exchange.get_order_hash(item)
+    elapsed = time.perf_counter() - start
+    print(f"{name}: hashed {orders} orders in {elapsed:.3f}s ({orders / elapsed:.0f} orders/s)")
@@ -0,0 +1,94 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+from web3 import Web3, HTTPProvider
+
+from pymaker import Address, Contract
+from pymaker.deployment import DssDeployment
+from pymaker.feed import DSValue
+from pymaker.util import ContractCache
+from tests.helpers import StandInNode, offline_web3
+
+
+class TestDssDeploymentSnapshot:
+    def setup_method(self):
+        Contract.contract_cache = ContractCache()
+
+        with open("config/testnet-addresses.json") as file:
+            self.conf = json.load(file)
+        self.snapshot = json.dumps({'chain_id': '1337', 'network': 'testnet', 'config': self.conf})
+
+    def teardown_method(self):
+        Contract.contract_cache = ContractCache()
+
+    def test_should_restore_without_querying_the_node(self):
+        # given
+        web3 = offline_web3(1337)
+
+        # when
+        mcd = DssDeployment.from_snapshot(web3, self.snapshot)
+
+        # then
+        assert mcd.vat.address == Address(self.conf['MCD_VAT'])
+        assert mcd.dai_adapter.address == Address(self.conf['MCD_JOIN_DAI'])
+        assert mcd.collaterals['ETH-A'].adapter.address == Address(self.conf['MCD_JOIN_ETH_A'])
+        assert mcd.collaterals['ETH-A'].flipper.address == Address(self.conf['MCD_FLIP_ETH_A'])
+        assert isinstance(mcd.collaterals['ETH-A'].pip, DSValue)
+        assert web3.manager.request_blocking.call_count == 0
+        assert web3.eth.contract.call_count > 0
+
+    def test_should_round_trip(self):
+        # given
+        web3 = offline_web3(1337)
+        mcd = DssDeployment.from_snapshot(web3, self.snapshot)
+
+        # when
+        snapshot = json.loads(mcd.to_snapshot())
+
+        # then
+        assert snapshot['chain_id'] == '1337'
+        assert snapshot['network'] == 'testnet'
+        assert snapshot['config'] == mcd.config.to_dict()
+        assert DssDeployment.from_snapshot(web3, mcd.to_snapshot()).to_json() == mcd.to_json()
+
+    def test_should_verify_all_contracts_in_one_batch(self):
+        # given
+        node = StandInNode({'eth_chainId': lambda params: "0x539",
+                            'eth_getProof': lambda params: {'codeHash': "0x" + "ab" * 32}})
+        web3 = Web3(HTTPProvider(node.endpoint_uri))
+
+        try:
+            # when
+            mcd = DssDeployment.from_json(web3, json.dumps(self.conf), network='testnet')
+
+            # then
+            assert mcd.config.to_dict() == DssDeployment.from_snapshot(web3, self.snapshot).config.to_dict()
+            assert node.batches == [len(set(self.conf.values()))]
+            assert node.methods() == ['eth_chainId'] + ['eth_getProof'] * len(set(self.conf.values()))
+        finally:
+            node.stop()
+
+    def test_should_refuse_snapshot_from_another_chain(self):
+        # given
+        web3 = offline_web3(42)
+
+        # expect
+        with pytest.raises(Exception, match="chain 1337"):
+            DssDeployment.from_snapshot(web3, self.snapshot)
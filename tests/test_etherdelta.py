@@ -15,16 +15,24 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import time
+
 import pytest
+from eth_account import Account
+from eth_account.messages import defunct_hash_message
 from mock import Mock
 from web3 import Web3, HTTPProvider
 
-from pymaker import Address
+from pymaker import Address, Contract
 from pymaker.approval import directly
-from pymaker.etherdelta import EtherDelta, EtherDeltaApi
+from pymaker.etherdelta import EtherDelta, EtherDeltaApi, EtherDeltaPublisher, Order
 from pymaker.numeric import Wad
+from pymaker.providers import SessionHTTPProvider
+from pymaker.sign import to_vrs
 from pymaker.token import DSToken
-from tests.helpers import is_hashable, wait_until_mock_called
+from pymaker.util import abi_decode_single, hexstring_to_bytes
+from tests.helpers import is_hashable, wait_until_mock_called, StandInNode, StandInSocketIOServer
 
 PAST_BLOCKS = 100
 
@@ -114,6 +122,9 @@ class TestEtherDelta:
         # and
         assert self.etherdelta.amount_available(order) == Wad.from_number(4)
         assert self.etherdelta.amount_filled(order) == Wad.from_number(0)
+        assert self.etherdelta.amounts_available([order]) == [Wad.from_number(4)]
+        assert self.etherdelta.amounts_filled([order]) == [Wad.from_number(0)]
+        assert self.etherdelta.validate_signatures([order]) == [True]
         assert order.remaining_sell_amount == Wad.from_number(2)
         assert order.remaining_buy_amount == Wad.from_number(4)
 
@@ -136,6 +147,8 @@ class TestEtherDelta:
         # then
         assert self.etherdelta.amount_available(order) == Wad.from_number(1.4)
         assert self.etherdelta.amount_filled(order) == Wad.from_number(1.5)
+        assert self.etherdelta.amounts_available([order]) == [Wad.from_number(1.4)]
+        assert self.etherdelta.amounts_filled([order]) == [Wad.from_number(1.5)]
 
         # when
         self.etherdelta.cancel_order(order).transact()
@@ -201,6 +214,118 @@ class TestEtherDelta:
         assert repr(self.etherdelta) == f"EtherDelta('{self.etherdelta.address}')"
 
 
+class TestEtherDeltaBatchQueries:
+    PRIVATE_KEY = "0x" + "42" * 32
+    TOKEN1 = Address('0x1111111111111111111111111111111111111111')
+    TOKEN2 = Address('0x2222222222222222222222222222222222222222')
+
+    def setup_method(self):
+        Contract.lazy_verification = True
+        self.maker = Address(Account.from_key(self.PRIVATE_KEY).address)
+        self.fills = {}
+        self.tokens = {}
+        self.placed = set()
+        self.node = StandInNode({'eth_chainId': lambda params: '0x1',
+                                 'eth_blockNumber': lambda params: hex(100),
+                                 'eth_call': self.eth_call})
+        self.web3 = Web3(SessionHTTPProvider(self.node.endpoint_uri))
+        self.etherdelta = EtherDelta(self.web3, Address('0x3333333333333333333333333333333333333333'))
+
+    def teardown_method(self):
+        self.node.stop()
+        Contract.lazy_verification = False
+
+    def eth_call(self, params):
+        data = hexstring_to_bytes(params[0]['data'])
+        if data[:4] == Web3.keccak(text='tokens(address,address)')[:4]:
+            value = self.tokens.get(abi_decode_single('(address,address)', data[4:]), 0)
+        elif data[:4] == Web3.keccak(text='orders(address,bytes32)')[:4]:
+            value = int(abi_decode_single('(address,bytes32)', data[4:]) in self.placed)
+        else:
+            value = self.fills.get(abi_decode_single('(address,bytes32)', data[4:]), 0)
+
+        return '0x' + value.to_bytes(32, 'big').hex()
+
+    def order(self, pay_amount: Wad, buy_amount: Wad, expires: int, signed: bool = True) -> Order:
+        order = Order(self.etherdelta, self.maker, self.TOKEN1, pay_amount, self.TOKEN2, buy_amount, expires,
+                      EtherDelta.random_nonce(), 0, bytes(32), bytes(32))
+        if signed:
+            message_hash = defunct_hash_message(primitive=hexstring_to_bytes(self.etherdelta.get_order_hash(order)))
+            order.v, order.r, order.s = to_vrs(Account.signHash(message_hash, self.PRIVATE_KEY).signature.hex())
+
+        return order
+
+    def key(self, order: Order) -> tuple:
+        return order.maker.address.lower(), hexstring_to_bytes(self.etherdelta.get_order_hash(order))
+
+    def test_should_calculate_order_hashes_locally(self):
+        # given
+        order = self.order(Wad.from_number(2), Wad.from_number(4), 1000)
+
+        # expect
+        assert self.etherdelta.get_order_hash(order) == self.etherdelta.get_order_hash(order)
+        assert len(hexstring_to_bytes(self.etherdelta.get_order_hash(order))) == 32
+        assert 'eth_call' not in self.node.methods()
+
+        # when
+        order.nonce += 1
+
+        # then
+        assert self.etherdelta.validate_signatures([order]) == [False]
+
+    def test_should_validate_signatures_locally(self):
+        # given
+        signed = self.order(Wad.from_number(2), Wad.from_number(4), 1000)
+        unsigned = self.order(Wad.from_number(2), Wad.from_number(4), 1000, signed=False)
+        foreign = self.order(Wad.from_number(2), Wad.from_number(4), 1000)
+        foreign.maker = self.TOKEN1
+
+        # expect
+        assert self.etherdelta.validate_signatures([signed, unsigned, foreign]) == [True, False, False]
+        assert 'eth_call' not in self.node.methods()
+
+    def test_should_query_amounts_filled_in_one_batch(self):
+        # given
+        orders = [self.order(Wad.from_number(2), Wad.from_number(4), 1000) for _ in range(3)]
+        self.fills[self.key(orders[1])] = Wad.from_number(1.5).value
+
+        # expect
+        assert self.etherdelta.amounts_filled(orders) == [Wad(0), Wad.from_number(1.5), Wad(0)]
+        assert self.node.batches == [3]
+        assert all(params[1] == hex(100) for method, params in self.node.requests if method == 'eth_call')
+
+    def test_should_not_query_the_node_for_no_orders(self):
+        # expect
+        assert self.etherdelta.amounts_filled([]) == []
+        assert self.etherdelta.amounts_available([]) == []
+        assert 'eth_blockNumber' not in self.node.methods()
+        assert self.node.batches == []
+
+    def test_should_calculate_amounts_available_like_the_contract(self):
+        # given
+        filled = self.order(Wad.from_number(2), Wad.from_number(4), 1000)
+        underfunded = self.order(Wad.from_number(20), Wad.from_number(40), 1000)
+        expired = self.order(Wad.from_number(2), Wad.from_number(4), 99)
+        unsigned = self.order(Wad.from_number(2), Wad.from_number(4), 1000, signed=False)
+        placed = self.order(Wad.from_number(2), Wad.from_number(4), 1000, signed=False)
+
+        # and
+        self.fills[self.key(filled)] = Wad.from_number(1.5).value
+        self.tokens[(self.TOKEN1.address.lower(), self.maker.address.lower())] = Wad.from_number(7).value
+        self.placed.add(self.key(placed))
+
+        # when
+        available = self.etherdelta.amounts_available([filled, underfunded, expired, unsigned, placed])
+
+        # then
+        assert available == [Wad.from_number(2.5), Wad.from_number(14), Wad(0), Wad(0), Wad.from_number(4)]
+
+        # and
+        assert self.node.methods().count('eth_blockNumber') == 1
+        assert self.node.batches == [5 + 1 + 2]
+        assert all(params[1] == hex(100) for method, params in self.node.requests if method == 'eth_call')
+
+
 class TestEtherDeltaApi:
     def setup_method(self):
         self.etherdelta_api = EtherDeltaApi(client_tool_directory='some-dir',
@@ -212,3 +337,165 @@ class TestEtherDeltaApi:
 
     def test_should_have_printable_representation(self):
         assert repr(self.etherdelta_api) == f"EtherDeltaApi()"
+
+    def test_should_accept_the_original_positional_arguments(self):
+        # when
+        etherdelta_api = EtherDeltaApi('some-dir', 'some command', 'https://127.0.0.1:66666', 1, 15, 90)
+
+        # then
+        assert etherdelta_api.api_server == 'https://127.0.0.1:66666'
+        assert (etherdelta_api.number_of_attempts, etherdelta_api.retry_interval, etherdelta_api.timeout) == \
+               (1, 15, 90)
+
+    def test_should_publish_orders(self):
+        # given
+        server = StandInSocketIOServer()
+        etherdelta_api = EtherDeltaApi(api_server=server.api_server, number_of_attempts=1, retry_interval=1, timeout=5)
+        order = Order(ether_delta=Mock(address=Address('0x8d12a197cb00d4747a1fe03395095ce2a5cc6819')),
+                      maker=Address('0x0046cac6668bef45b517a1b816a762f4f8add2a9'),
+                      pay_token=Address('0x0000000000000000000000000000000000000000'), pay_amount=Wad(10),
+                      buy_token=Address('0x2956356cd2a2bf3202f771f50d3d14a367b48070'), buy_amount=Wad(20),
+                      expires=100000000, nonce=1, v=27, r=bytes(32), s=bytes(32))
+
+        try:
+            # expect
+            assert etherdelta_api.publish_order(order).result(timeout=5) is True
+            assert server.messages == [order.to_json()]
+        finally:
+            etherdelta_api.publisher.stop()
+            server.stop()
+
+
+class TestEtherDeltaPublisher:
+    def setup_method(self):
+        self.servers = []
+        self.publishers = []
+
+    def teardown_method(self):
+        for publisher in self.publishers:
+            publisher.stop()
+        for server in self.servers:
+            server.stop()
+
+    def server(self, respond=None, ping_interval: int = 25000) -> StandInSocketIOServer:
+        server = StandInSocketIOServer(respond, ping_interval)
+        self.servers.append(server)
+        return server
+
+    def publisher(self, api_server: str, **kwargs) -> EtherDeltaPublisher:
+        publisher = EtherDeltaPublisher(api_server, **{'retry_interval': 0.1, 'timeout': 5, **kwargs})
+        self.publishers.append(publisher)
+        return publisher
+
+    @staticmethod
+    def order(nonce: int) -> dict:
+        return {'tokenGet': '0x2956356cd2a2bf3202f771f50d3d14a367b48070', 'amountGet': 20, 'nonce': nonce}
+
+    def test_should_publish_orders_over_one_connection(self):
+        # given
+        server = self.server()
+        publisher = self.publisher(server.api_server)
+
+        # when
+        futures = [publisher.publish(self.order(nonce)) for nonce in range(20)]
+
+        # then
+        assert [future.result(timeout=5) for future in futures] == [True] * 20
+        assert server.messages == [self.order(nonce) for nonce in range(20)]
+        assert server.connections == 1
+
+    def test_should_retry_rejected_orders(self):
+        # given
+        responses = [['Order rejected.'], ['Order rejected.']]
+        server = self.server(respond=lambda order: responses.pop(0) if responses else ['Added/updated order.'])
+        publisher = self.publisher(server.api_server, number_of_attempts=3)
+
+        # expect
+        assert publisher.publish(self.order(1)).result(timeout=5) is True
+        assert server.messages == [self.order(1)] * 3
+
+    def test_should_give_up_after_number_of_attempts(self):
+        # given
+        server = self.server(respond=lambda order: ['Order rejected.'])
+        publisher = self.publisher(server.api_server, number_of_attempts=2)
+
+        # expect
+        assert publisher.publish(self.order(1)).result(timeout=5) is False
+        assert server.messages == [self.order(1)] * 2
+
+    def test_should_reconnect_and_publish_orders_queued_in_the_meantime(self):
+        # given
+        server = self.server()
+        publisher = self.publisher(server.api_server, max_backoff=0.5)
+        assert publisher.publish(self.order(1)).result(timeout=5) is True
+
+        # when
+        server.disconnect()
+        future = publisher.publish(self.order(2))
+
+        # then
+        assert future.result(timeout=5) is True
+        assert server.messages[-1] == self.order(2)
+        assert server.connections == 2
+
+    def test_should_fail_orders_if_backend_is_unreachable(self):
+        # given
+        publisher = self.publisher("http://127.0.0.1:1", timeout=0.5)
+
+        # expect
+        assert publisher.publish(self.order(1)).result(timeout=5) is False
+
+    def test_should_ping_the_backend(self):
+        # given
+        server = self.server(ping_interval=50)
+        publisher = self.publisher(server.api_server)
+
+        # when
+        assert publisher.publish(self.order(1)).result(timeout=5) is True
+        time.sleep(0.3)
+
+        # then
+        assert server.pings > 0
+        assert server.connections == 1
+
+    def test_should_start_and_stop_the_background_thread(self):
+        # given
+        server = self.server()
+        publisher = self.publisher(server.api_server)
+
+        # when
+        assert publisher.publish(self.order(1)).result(timeout=5) is True
+
+        # then
+        assert publisher._thread.is_alive()
+        assert not publisher._task.done()
+
+        # when
+        publisher.stop()
+
+        # then
+        assert publisher._thread is None
+        assert publisher.publish(self.order(2)).result(timeout=5) is True
+        assert server.connections == 2
+
+    def test_should_not_hang_if_the_publisher_fails_to_start(self, monkeypatch):
+        # given
+        server = self.server()
+        publisher = self.publisher(server.api_server)
+        monkeypatch.setattr(asyncio, 'Queue', Mock(side_effect=OSError("no queue")))
+
+        # expect
+        with pytest.raises(RuntimeError, match="Unable to start publishing"):
+            publisher.publish(self.order(1))
+
+        # when
+        monkeypatch.undo()
+
+        # then
+        assert publisher.publish(self.order(1)).result(timeout=5) is True
+
+    def test_should_use_socket_io_url(self):
+        assert EtherDeltaPublisher("https://socket.etherdelta.com").url == \
+               "wss://socket.etherdelta.com/socket.io/?EIO=3&transport=websocket"
+        assert EtherDeltaPublisher("http://127.0.0.1:8080").url == \
+               "ws://127.0.0.1:8080/socket.io/?EIO=3&transport=websocket"
@@ -15,9 +15,29 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
+import math
+import os
+import time
+from unittest.mock import Mock
+
 import pytest
+from web3 import Web3
+
+from pymaker import Address
+from pymaker.gas import DefaultGasPrice, FixedGasPrice, GasPrice, GeometricGasPrice, IncreasingGasPrice, \
+    BlockFeeHistory, AdaptiveGasPrice, FixedGasFees, GeometricTipGasPrice, GasEstimateCache
+
+GWEI = 1000000000
+
+
+def recorded_blocks() -> list:
+    with open(os.path.join(os.path.dirname(__file__), "fixtures", "blocks.json")) as file:
+        return json.load(file)
+
 
-from pymaker.gas import DefaultGasPrice, FixedGasPrice, GasPrice, GeometricGasPrice, IncreasingGasPrice
+def without_base_fee(block: dict) -> dict:
+    return {key: value for key, value in block.items() if key != 'baseFeePerGas'}
 
 
 class TestGasPrice:
@@ -25,6 +45,11 @@ class TestGasPrice:
         with pytest.raises(Exception):
             GasPrice().get_gas_price(0)
 
+    def test_should_send_legacy_transactions_by_default(self):
+        assert GasPrice().get_gas_fees(0) is None
+        assert FixedGasPrice(1000).get_gas_fees(0) is None
+        assert GeometricGasPrice(1000, 60).get_gas_fees(0) is None
+
 
 class TestDefaultGasPrice:
     def test_should_always_be_default(self):
@@ -36,6 +61,9 @@ class TestDefaultGasPrice:
         assert default_gas_price.get_gas_price(1) is None
         assert default_gas_price.get_gas_price(1000000) is None
 
+    def test_should_never_change(self):
+        assert DefaultGasPrice().get_next_change(0) is None
+
 
 class TestFixedGasPrice:
     def test_gas_price_should_stay_the_same(self):
@@ -75,6 +103,14 @@ class TestFixedGasPrice:
         assert fixed_gas_price.get_gas_price(120) == value2
         assert fixed_gas_price.get_gas_price(600) == value2
 
+    def test_may_change_any_time(self):
+        # given
+        fixed_gas_price = FixedGasPrice(9000000000)
+
+        # expect
+        assert fixed_gas_price.get_next_change(0) == 0
+        assert fixed_gas_price.get_next_change(17) == 17
+
 
 class TestIncreasingGasPrice:
     def test_gas_price_should_increase_with_time(self):
@@ -105,6 +141,17 @@ class TestIncreasingGasPrice:
         assert increasing_gas_price.get_gas_price(3000) == 2500
         assert increasing_gas_price.get_gas_price(1000000) == 2500
 
+    def test_should_report_next_change(self):
+        # given
+        increasing_gas_price = IncreasingGasPrice(1000, 100, 60, 1200)
+
+        # expect
+        assert increasing_gas_price.get_next_change(0) == 60
+        assert increasing_gas_price.get_next_change(59) == 60
+        assert increasing_gas_price.get_next_change(60) == 120
+        assert increasing_gas_price.get_next_change(120) is None
+        assert increasing_gas_price.get_next_change(1000000) is None
+
     def test_should_require_positive_initial_price(self):
         with pytest.raises(Exception):
             IncreasingGasPrice(0, 1000, 60, None)
@@ -179,6 +226,51 @@ class TestGeometricGasPrice:
         assert round(geometric_gas_price.get_gas_price(30) / GWEI, 1) == 195.3
         assert round(geometric_gas_price.get_gas_price(60) / GWEI, 1) == 381.5
 
+    @staticmethod
+    def iterative_gas_price(initial_price, every_secs, coefficient, max_price, time_elapsed):
+        if time_elapsed < every_secs:
+            return initial_price
+        result = initial_price
+        for second in range(math.floor(time_elapsed/every_secs)):
+            result *= coefficient
+        if max_price is not None:
+            result = min(result, max_price)
+
+        return math.ceil(result)
+
+    @pytest.mark.parametrize('coefficient, max_price', [(1.125, None), (1.1, 10**12), (1.37, 5*10**11), (1.01, None)])
+    def test_should_match_iterative_computation(self, coefficient, max_price):
+        # given
+        initial_price = 12345678901
+        geometric_gas_price = GeometricGasPrice(initial_price, 7, coefficient, max_price)
+
+        # expect
+        for seconds in [0, 1, 6, 7, 8, 13, 14, 100, 700, 701, 1500, 999, 3]:
+            assert geometric_gas_price.get_gas_price(seconds) == \
+                   self.iterative_gas_price(initial_price, 7, coefficient, max_price, seconds)
+
+    def test_should_report_next_change(self):
+        # given
+        geometric_gas_price = GeometricGasPrice(1000, 60, 1.125, 1200)
+
+        # expect
+        assert geometric_gas_price.get_next_change(0) == 60
+        assert geometric_gas_price.get_next_change(59) == 60
+        assert geometric_gas_price.get_next_change(60) == 120
+        assert geometric_gas_price.get_next_change(119) == 120
+        assert geometric_gas_price.get_next_change(120) is None
+        assert geometric_gas_price.get_next_change(1000000) is None
+        assert geometric_gas_price.get_gas_price(119) == 1125
+        assert geometric_gas_price.get_gas_price(120) == 1200
+
+    def test_should_report_next_change_without_max_price(self):
+        # given
+        geometric_gas_price = GeometricGasPrice(1000, 60)
+
+        # expect
+        assert geometric_gas_price.get_next_change(0) == 60
+        assert geometric_gas_price.get_next_change(6000) == 6060
+
     def test_should_require_positive_initial_price(self):
         with pytest.raises(AssertionError):
             GeometricGasPrice(0, 60)
@@ -209,3 +301,308 @@ class TestGeometricGasPrice:
 
         with pytest.raises(AssertionError):
             GeometricGasPrice(1000, 60, 1.125, -1)
+
+
+class TestBlockFeeHistory:
+    def test_should_compute_percentiles_over_window(self):
+        # given
+        history = BlockFeeHistory(None, window=5)
+
+        # when
+        for block in recorded_blocks():
+            history.add_block(block)
+
+        # then
+        assert history.last_block_number == 1004
+        assert history.base_fee == 29 * GWEI
+        assert history.percentile(50) == 32 * GWEI
+        assert history.percentile(90) == 50 * GWEI
+        assert history.percentile(0) == 30 * GWEI
+        assert history.percentile(100) == 50 * GWEI
+
+    def test_should_keep_only_most_recent_blocks(self):
+        # given
+        history = BlockFeeHistory(None, window=3)
+
+        # when
+        for block in recorded_blocks():
+            history.add_block(block)
+
+        # then
+        assert [block[0] for block in history.blocks] == [1002, 1003, 1004]
+        assert history.percentile(50) == 31 * GWEI
+
+    def test_should_ignore_old_blocks(self):
+        # given
+        history = BlockFeeHistory(None, window=5)
+        blocks = recorded_blocks()
+        history.add_block(blocks[-1])
+
+        # when
+        history.add_block(blocks[0])
+
+        # then
+        assert [block[0] for block in history.blocks] == [1004]
+
+    def test_should_invalidate_cached_percentiles_on_new_block(self):
+        # given
+        history = BlockFeeHistory(None, window=5)
+        blocks = recorded_blocks()
+        history.add_block(blocks[0])
+        assert history.percentile(50) == 35 * GWEI
+
+        # when
+        history.add_block(blocks[1])
+
+        # then
+        assert history.percentile(50) == 35 * GWEI
+        assert history.percentile(90) == 50 * GWEI
+
+    def test_should_return_none_without_transactions(self):
+        # given
+        history = BlockFeeHistory(None)
+
+        # when
+        history.add_block(recorded_blocks()[2])
+
+        # then
+        assert history.percentile(50) is None
+
+    def test_should_fetch_each_block_once(self):
+        # given
+        blocks = recorded_blocks()
+        web3 = Mock(Web3)
+        web3.eth = Mock()
+        web3.eth.blockNumber = 1002
+        web3.eth.getBlock = Mock(side_effect=lambda number, full_transactions: blocks[number - 1000])
+        history = BlockFeeHistory(web3, window=2)
+
+        # when
+        history.update()
+        history.update()
+        web3.eth.blockNumber = 1004
+        history.update()
+
+        # then
+        assert [call[0][0] for call in web3.eth.getBlock.call_args_list] == [1001, 1002, 1003, 1004]
+
+    def test_should_refresh_no_more_often_than_refresh_interval(self):
+        # given
+        blocks = recorded_blocks()
+        web3 = Mock(Web3)
+        web3.eth = Mock()
+        web3.eth.blockNumber = 1004
+        web3.eth.getBlock = Mock(side_effect=lambda number, full_transactions: blocks[number - 1000])
+        history = BlockFeeHistory(web3, window=5, refresh_interval=3600)
+        strategies = [AdaptiveGasPrice(history, percentile) for percentile in range(0, 100, 10)]
+
+        # when
+        for time_elapsed in range(100):
+            for strategy in strategies:
+                strategy.get_gas_price(time_elapsed)
+
+        # then
+        assert web3.eth.getBlock.call_count == 5
+
+
+class TestAdaptiveGasPrice:
+    @staticmethod
+    def history(blocks: list) -> BlockFeeHistory:
+        history = BlockFeeHistory(None, window=len(blocks))
+        for block in blocks:
+            history.add_block(block)
+        return history
+
+    def test_should_target_percentile(self):
+        # given
+        history = self.history([without_base_fee(block) for block in recorded_blocks()])
+
+        # expect
+        assert AdaptiveGasPrice(history, 50).get_gas_price(0) == 32 * GWEI
+        assert AdaptiveGasPrice(history, 90).get_gas_price(0) == 50 * GWEI
+
+    def test_should_not_go_below_next_base_fee(self):
+        # given
+        history = self.history(recorded_blocks())
+
+        # expect
+        assert AdaptiveGasPrice(history, 50).get_gas_price(0) == math.ceil(29 * GWEI * 1.125)
+        assert AdaptiveGasPrice(history, 90).get_gas_price(0) == 50 * GWEI
+
+    def test_should_fall_back_to_base_fee_without_transactions(self):
+        # given
+        history = self.history([recorded_blocks()[2]])
+
+        # expect
+        assert AdaptiveGasPrice(history, 50).get_gas_price(0) == math.ceil(31 * GWEI * 1.125)
+
+    def test_should_respect_limits(self):
+        # given
+        history = self.history(recorded_blocks())
+
+        # expect
+        assert AdaptiveGasPrice(history, 90, max_price=40 * GWEI).get_gas_price(0) == 40 * GWEI
+        assert AdaptiveGasPrice(history, 50, min_price=45 * GWEI).get_gas_price(0) == 45 * GWEI
+        assert AdaptiveGasPrice(BlockFeeHistory(None), 50, min_price=45 * GWEI).get_gas_price(0) == 45 * GWEI
+
+    def test_should_follow_new_blocks(self):
+        # given
+        blocks = [without_base_fee(block) for block in recorded_blocks()]
+        history = BlockFeeHistory(None, window=5)
+        history.add_block(blocks[0])
+        adaptive_gas_price = AdaptiveGasPrice(history, 50)
+        assert adaptive_gas_price.get_gas_price(0) == 35 * GWEI
+
+        # when
+        history.add_block({'number': 1001, 'transactions': [{'gasPrice': 80 * GWEI}] * 3})
+
+        # then
+        assert adaptive_gas_price.get_gas_price(15) == 35 * GWEI
+        history.add_block({'number': 1002, 'transactions': [{'gasPrice': 80 * GWEI}] * 3})
+        assert adaptive_gas_price.get_gas_price(30) == 80 * GWEI
+
+    def test_should_require_valid_percentile(self):
+        with pytest.raises(AssertionError):
+            AdaptiveGasPrice(BlockFeeHistory(None), 101)
+
+
+class TestFixedGasFees:
+    def test_gas_fees_should_stay_the_same(self):
+        # given
+        fixed_gas_fees = FixedGasFees(100 * GWEI, 2 * GWEI)
+
+        # expect
+        assert fixed_gas_fees.get_gas_fees(0) == (100 * GWEI, 2 * GWEI)
+        assert fixed_gas_fees.get_gas_fees(1000000) == (100 * GWEI, 2 * GWEI)
+        assert fixed_gas_fees.get_gas_price(0) == 100 * GWEI
+
+    def test_gas_fees_should_be_updated_by_update_gas_fees_method(self):
+        # given
+        fixed_gas_fees = FixedGasFees(100 * GWEI, 2 * GWEI)
+
+        # when
+        fixed_gas_fees.update_gas_fees(120 * GWEI, 3 * GWEI)
+
+        # then
+        assert fixed_gas_fees.get_gas_fees(60) == (120 * GWEI, 3 * GWEI)
+
+    def test_should_require_max_fee_not_lower_than_priority_fee(self):
+        with pytest.raises(AssertionError):
+            FixedGasFees(1 * GWEI, 2 * GWEI)
+
+
+class TestGeometricTipGasPrice:
+    @staticmethod
+    def history() -> BlockFeeHistory:
+        history = BlockFeeHistory(None)
+        for block in recorded_blocks():
+            history.add_block(block)
+        return history
+
+    def test_should_only_increase_the_tip(self):
+        # given
+        geometric_tip_gas_price = GeometricTipGasPrice(self.history(), 2 * GWEI, 10)
+
+        # expect
+        assert geometric_tip_gas_price.get_gas_fees(0) == (60 * GWEI, 2 * GWEI)
+        assert geometric_tip_gas_price.get_gas_fees(10) == (58 * GWEI + 2250000000, 2250000000)
+        assert geometric_tip_gas_price.get_gas_fees(20) == (58 * GWEI + 2531250000, 2531250000)
+        assert geometric_tip_gas_price.get_gas_price(20) == 58 * GWEI + 2531250000
+
+    def test_should_respect_limits(self):
+        # given
+        geometric_tip_gas_price = GeometricTipGasPrice(self.history(), 2 * GWEI, 10, max_tip=3 * GWEI,
+                                                       base_fee_multiplier=1.5, max_fee=46 * GWEI)
+
+        # expect
+        assert geometric_tip_gas_price.get_gas_fees(0) == (math.ceil(29 * GWEI * 1.5) + 2 * GWEI, 2 * GWEI)
+        assert geometric_tip_gas_price.get_gas_fees(1000) == (46 * GWEI, 3 * GWEI)
+
+    def test_should_follow_the_base_fee_after_the_last_tip_bump(self):
+        # given
+        geometric_tip_gas_price = GeometricTipGasPrice(self.history(), 2 * GWEI, 10, max_tip=3 * GWEI)
+
+        # expect
+        assert geometric_tip_gas_price.get_next_change(0) == 0
+        assert geometric_tip_gas_price.get_next_change(1000) == 1000
+
+        # and
+        assert geometric_tip_gas_price.get_next_scheduled_change(0) == 10
+        assert geometric_tip_gas_price.get_next_scheduled_change(1000) is None
+
+    def test_should_fall_back_to_legacy_transactions_without_base_fee(self):
+        # given
+        history = BlockFeeHistory(None)
+        history.add_block(without_base_fee(recorded_blocks()[0]))
+
+        # when
+        geometric_tip_gas_price = GeometricTipGasPrice(history, 2 * GWEI, 10)
+
+        # then
+        assert geometric_tip_gas_price.get_gas_fees(0) is None
+        assert geometric_tip_gas_price.get_gas_price(0) is None
+
+
+class TestGasEstimateCache:
+    address = Address('0x1111111111222222222211111111112222222222')
+
+    def test_should_key_by_shape_of_arguments(self):
+        # given
+        cache = GasEstimateCache()
+
+        # expect
+        assert cache.key(self.address, 'tend', [1, 2, 3], None) == cache.key(self.address, 'tend', [4, 5, 6], None)
+        assert cache.key(self.address, 'tend', [1, 2, 3], None) != cache.key(self.address, 'dent', [1, 2, 3], None)
+        assert cache.key(self.address, 'flux', [b'\x01' * 32], None) != cache.key(self.address, 'flux', [b'\x01'], None)
+        assert cache.key(self.address, 'exec', [[1, 2]], None) != cache.key(self.address, 'exec', [[1, 2, 3]], None)
+        assert cache.key(self.address, 'join', [1], {'value': 0}) != cache.key(self.address, 'join', [1], {'value': 5})
+        assert cache.key(self.address, 'join', [1], {'value': 4}) == cache.key(self.address, 'join', [1], {'value': 5})
+
+    def test_should_key_by_sender(self):
+        # given
+        cache = GasEstimateCache()
+        first_sender = Address('0x3333333333444444444433333333334444444444')
+        second_sender = Address('0x5555555555666666666655555555556666666666')
+
+        # when
+        cache.put(cache.key(self.address, 'tend', [1, 2, 3], None, first_sender), 100000)
+
+        # then
+        assert cache.get(cache.key(self.address, 'tend', [1, 2, 3], None, first_sender))[0] == 110000
+        assert cache.get(cache.key(self.address, 'tend', [1, 2, 3], None, second_sender)) == (None, False)
+
+    def test_should_return_estimates_with_margin(self):
+        # given
+        cache = GasEstimateCache(margin=0.2)
+        key = cache.key(self.address, 'tend', [1, 2, 3], None)
+
+        # when
+        cache.put(key, 100000)
+
+        # then
+        assert cache.get(key) == (120000, True)
+        assert cache.get(cache.key(self.address, 'dent', [1, 2, 3], None)) == (None, False)
+
+    def test_should_report_stale_estimates(self):
+        # given
+        cache = GasEstimateCache(refresh_interval=60)
+        key = cache.key(self.address, 'tend', [1, 2, 3], None)
+
+        # when
+        cache.put(key, 100000)
+        cache.entries[key] = (100000, time.time() - 61)
+
+        # then
+        assert cache.get(key) == (110000, False)
+
+    def test_should_invalidate(self):
+        # given
+        cache = GasEstimateCache()
+        key = cache.key(self.address, 'tend', [1, 2, 3], None)
+        cache.put(key, 100000)
+
+        # when
+        cache.invalidate(key)
+
+        # then
+        assert cache.get(key) == (None, False)
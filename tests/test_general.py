@@ -15,12 +15,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from unittest.mock import Mock
+
 import pytest
+from eth_account import Account
 from hexbytes import HexBytes
+from web3 import Web3
 
-from pymaker import Address, Calldata, Receipt, Transfer
+import pymaker
+from pymaker import Address, Calldata, Contract, LazyContract, Receipt, Transact, Transfer, eth_transfer
+from pymaker.gas import FixedGasFees, FixedGasPrice, GeometricGasPrice, GeometricTipGasPrice, BlockFeeHistory
+from pymaker.keys import _registered_accounts
 from pymaker.numeric import Wad
-from tests.helpers import is_hashable
+from pymaker.token import ERC20Token
+from pymaker.sign import recover_typed_transaction
+from pymaker.util import ContractCache
+from tests.helpers import is_hashable, mocked_web3_code
 
 
 class TestAddress:
@@ -263,3 +273,278 @@ class TestTransfer:
         assert transfer1b != transfer2
         assert transfer2 != transfer1a
         assert transfer2 != transfer1b
+
+
+class TestLazyContract:
+    contract = Address('0x1111111111222222222211111111112222222222')
+    account = Address('0x3333333333444444444433333333334444444444')
+
+    def setup_method(self):
+        self.web3 = mocked_web3_code({self.contract.address: "0x" + "ab" * 32})
+        Contract.contract_cache = ContractCache()
+        Contract.lazy_verification = True
+
+    def teardown_method(self):
+        Contract.contract_cache = ContractCache()
+        Contract.lazy_verification = False
+
+    def test_should_not_verify_on_construction(self):
+        # when
+        token = ERC20Token(web3=self.web3, address=self.account)
+
+        # then
+        assert isinstance(token._contract, LazyContract)
+        assert self.web3.manager.request_blocking.call_count == 0
+
+    def test_should_verify_on_first_use(self):
+        # given
+        token = ERC20Token(web3=self.web3, address=self.account)
+
+        # expect
+        with pytest.raises(Exception, match="No contract found"):
+            token._contract.functions
+
+    def test_should_return_verified_contracts_directly(self):
+        # given
+        Contract.contract_cache.exists(self.web3, self.contract)
+
+        # when
+        token = ERC20Token(web3=self.web3, address=self.contract)
+
+        # then
+        assert not isinstance(token._contract, LazyContract)
+
+
+class TestTransactGasFees:
+    def test_should_use_legacy_gas_price(self):
+        assert Transact._gas_fees(FixedGasPrice(20), 0) == {'gasPrice': 20}
+        assert Transact._gas_fees(FixedGasFees(30, 2), 0) == {'maxFeePerGas': 30, 'maxPriorityFeePerGas': 2}
+
+    def test_should_replace_legacy_transactions_only_when_gas_price_goes_up_enough(self):
+        assert not Transact._should_replace({'gasPrice': 100}, {'gasPrice': 112})
+        assert Transact._should_replace({'gasPrice': 100}, {'gasPrice': 113})
+        assert not Transact._should_replace({}, {'gasPrice': 113})
+        assert not Transact._should_replace({'gasPrice': 100}, {})
+
+    def test_should_replace_typed_transactions_when_any_fee_goes_up_enough(self):
+        assert not Transact._should_replace({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                            {'maxFeePerGas': 112, 'maxPriorityFeePerGas': 11})
+        assert Transact._should_replace({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                        {'maxFeePerGas': 100, 'maxPriorityFeePerGas': 12})
+        assert Transact._should_replace({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                        {'maxFeePerGas': 113, 'maxPriorityFeePerGas': 10})
+        assert not Transact._should_replace({'gasPrice': 100}, {'maxFeePerGas': 200, 'maxPriorityFeePerGas': 20})
+
+    def test_should_raise_the_fee_cap_of_replacement_transactions_within_limits(self):
+        # given
+        history = BlockFeeHistory(None)
+        unlimited = GeometricTipGasPrice(history, 10, 10)
+        limited = GeometricTipGasPrice(history, 10, 10, max_fee=110)
+
+        # when only the tip has been bumped
+        assert Transact._replacement_fees({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                          {'maxFeePerGas': 102, 'maxPriorityFeePerGas': 12}, unlimited) == \
+               {'maxFeePerGas': 113, 'maxPriorityFeePerGas': 12}
+        assert Transact._replacement_fees({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                          {'maxFeePerGas': 102, 'maxPriorityFeePerGas': 12}, limited) == \
+               {'maxFeePerGas': 110, 'maxPriorityFeePerGas': 12}
+
+        # legacy transactions are left as they are
+        assert Transact._replacement_fees({'gasPrice': 100}, {'gasPrice': 200}, unlimited) == {'gasPrice': 200}
+
+    def test_should_not_replace_typed_transactions_beyond_the_strategy_limits(self):
+        # given
+        history = BlockFeeHistory(None)
+
+        # when only the fee cap has been bumped, the tip can not be raised for the replacement to be accepted
+        assert Transact._replacement_fees({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                          {'maxFeePerGas': 150, 'maxPriorityFeePerGas': 10},
+                                          GeometricTipGasPrice(history, 10, 10)) is None
+        assert Transact._replacement_fees({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                          {'maxFeePerGas': 150, 'maxPriorityFeePerGas': 10},
+                                          FixedGasFees(150, 10)) is None
+
+        # when the fee cap can not be raised enough
+        assert Transact._replacement_fees({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                          {'maxFeePerGas': 102, 'maxPriorityFeePerGas': 12},
+                                          GeometricTipGasPrice(history, 10, 10, max_fee=105)) is None
+        assert Transact._replacement_fees({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                          {'maxFeePerGas': 102, 'maxPriorityFeePerGas': 12},
+                                          FixedGasFees(102, 12)) is None
+
+        # but fee caps raised by the strategy itself are accepted
+        assert Transact._replacement_fees({'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                                          {'maxFeePerGas': 111, 'maxPriorityFeePerGas': 11},
+                                          FixedGasFees(111, 11)) == {'maxFeePerGas': 111, 'maxPriorityFeePerGas': 11}
+
+    def test_should_sign_typed_transactions_for_local_accounts(self):
+        # given
+        account = Account.privateKeyToAccount("0x" + "42" * 32)
+        web3 = Mock(Web3)
+        web3.eth = Mock()
+        web3.eth.chainId = 1
+        web3.eth.sendRawTransaction = Mock(return_value=HexBytes("0x" + "ab" * 32))
+        web3.provider = Mock()
+        web3.provider.endpoint_uri = "http://localhost:8545"
+        _registered_accounts[(web3, Address(account.address))] = account
+
+        try:
+            # when
+            transact = eth_transfer(web3, Address("0x" + "11" * 20), Wad(1))
+            tx_hash = transact._func(account.address, 21000, {'maxFeePerGas': 100, 'maxPriorityFeePerGas': 2}, 3)
+
+            # then
+            raw_transaction = web3.eth.sendRawTransaction.call_args[0][0]
+            assert tx_hash == HexBytes("0x" + "ab" * 32)
+            assert raw_transaction[0] == 2
+            assert recover_typed_transaction(raw_transaction) == Address(account.address)
+        finally:
+            del _registered_accounts[(web3, Address(account.address))]
+
+    def test_should_send_typed_transactions_for_node_accounts(self):
+        # given
+        web3 = Mock(Web3)
+        web3.eth = Mock()
+        web3.eth.chainId = 1
+        web3.manager = Mock()
+        web3.manager.request_blocking = Mock(return_value="0x" + "ab" * 32)
+        web3.provider = Mock()
+        web3.provider.endpoint_uri = "http://localhost:8545"
+
+        # when
+        transact = eth_transfer(web3, Address("0x" + "11" * 20), Wad(1))
+        tx_hash = transact._func("0x" + "22" * 20, 21000, {'maxFeePerGas': 100, 'maxPriorityFeePerGas': 2}, 3)
+
+        # then
+        assert tx_hash == HexBytes("0x" + "ab" * 32)
+        assert isinstance(tx_hash, HexBytes)
+
+        # and
+        method, params = web3.manager.request_blocking.call_args[0]
+        assert method == "eth_sendTransaction"
+        assert params[0]['type'] == '0x2'
+        assert params[0]['maxFeePerGas'] == '0x64'
+        assert params[0]['maxPriorityFeePerGas'] == '0x2'
+        assert params[0]['nonce'] == '0x3'
+        assert params[0]['value'] == '0x1'
+
+
+class TestTransactPresign:
+    account = Account.privateKeyToAccount("0x" + "42" * 32)
+
+    def setup_method(self):
+        self.web3 = Mock(Web3)
+        self.web3.eth = Mock()
+        self.web3.eth.chainId = 1
+        self.web3.provider = Mock()
+        self.web3.provider.endpoint_uri = "http://localhost:8545"
+        _registered_accounts[(self.web3, Address(self.account.address))] = self.account
+        self.transact = eth_transfer(self.web3, Address("0x" + "11" * 20), Wad(1))
+
+    def teardown_method(self):
+        del _registered_accounts[(self.web3, Address(self.account.address))]
+
+    def test_should_presign_replacement_ladder(self):
+        # given
+        gas_price = GeometricGasPrice(10000000000, 10, 1.2, 20000000000)
+
+        # when
+        ladder = self.transact._presign(self.account.address, 21000, gas_price, {'gasPrice': 10000000000}, 0, 7)
+
+        # then
+        assert [(time, gas_fees) for time, gas_fees, _ in ladder] == [(10, {'gasPrice': 12000000000}),
+                                                                      (20, {'gasPrice': 14400000000}),
+                                                                      (30, {'gasPrice': 17280000000}),
+                                                                      (40, {'gasPrice': 20000000000})]
+        for _, _, raw_transaction in ladder:
+            assert Account.recoverTransaction(raw_transaction) == self.account.address
+
+    def test_should_presign_typed_replacements(self):
+        # given
+        history = BlockFeeHistory(None)
+        history.add_block({'number': 1, 'baseFeePerGas': 10000000000, 'transactions': []})
+        gas_price = GeometricTipGasPrice(history, 1000000000, 10, 1.2, max_tip=2000000000)
+
+        # when
+        ladder = self.transact._presign(self.account.address, 21000, gas_price, Transact._gas_fees(gas_price, 0), 0, 7)
+
+        # then
+        assert [(time, gas_fees) for time, gas_fees, _ in ladder] == [
+            (10, {'maxFeePerGas': 23625000000, 'maxPriorityFeePerGas': 1200000000}),
+            (20, {'maxFeePerGas': 26578125000, 'maxPriorityFeePerGas': 1440000000}),
+            (30, {'maxFeePerGas': 29900390625, 'maxPriorityFeePerGas': 1728000000}),
+            (40, {'maxFeePerGas': 33637939454, 'maxPriorityFeePerGas': 2000000000})]
+        for _, _, raw_transaction in ladder:
+            assert recover_typed_transaction(raw_transaction) == Address(self.account.address)
+
+    def test_should_send_replacements_lazily_if_presigning_fails(self, caplog, monkeypatch):
+        # given
+        history = BlockFeeHistory(None)
+        history.add_block({'number': 1, 'baseFeePerGas': 10000000000, 'transactions': []})
+        sent = []
+        monkeypatch.setattr(pymaker, 'node_is_parity', False)
+        self.web3.eth.getTransactionCount = Mock(side_effect=lambda address, block_identifier='latest':
+                                                 7 + (len(sent) if block_identifier == 'latest' else 0))
+        self.web3.eth.sendRawTransaction = Mock(side_effect=lambda raw: sent.append(raw) or HexBytes("0x" + "ab" * 32))
+        self.transact.estimated_gas = Mock(return_value=21000)
+        self.transact._get_receipt = Mock(return_value=Mock(successful=True))
+        self.transact._presign = Mock(side_effect=ValueError("unable to sign"))
+
+        # when
+        receipt = self.transact.transact(from_address=Address(self.account.address), presign=True,
+                                         gas_price=GeometricTipGasPrice(history, 1000000000, 10))
+
+        # then
+        assert receipt is not None
+        assert len(sent) == 1
+        assert "Failed to sign replacements" in caplog.text
+        assert "Failed to send" not in caplog.text
+
+    def test_should_not_replace_transactions_at_the_tip_limit_when_base_fee_rises(self, monkeypatch):
+        # given
+        history = BlockFeeHistory(None)
+        history.add_block({'number': 1, 'baseFeePerGas': 10000000000, 'transactions': []})
+        gas_price = GeometricTipGasPrice(history, 1000000000, 1, max_tip=1000000000)
+        polls = []
+        sent = []
+
+        def get_transaction_count(address, block_identifier='latest'):
+            if block_identifier == 'latest':
+                polls.append(address)
+                if len(polls) == 2:
+                    history.add_block({'number': 2, 'baseFeePerGas': 15000000000, 'transactions': []})
+
+            return 7 if block_identifier == 'pending' or len(polls) < 8 else 8
+
+        monkeypatch.setattr(pymaker, 'node_is_parity', False)
+        self.web3.eth.getTransactionCount = Mock(side_effect=get_transaction_count)
+        self.web3.eth.sendRawTransaction = Mock(side_effect=lambda raw: sent.append(raw) or HexBytes("0x" + "ab" * 32))
+        self.transact.estimated_gas = Mock(return_value=21000)
+        self.transact._get_receipt = Mock(return_value=Mock(successful=True))
+
+        # when
+        receipt = self.transact.transact(from_address=Address(self.account.address), gas_price=gas_price)
+
+        # then
+        assert receipt is not None
+        assert len(sent) == 1
+        assert Transact._gas_fees(gas_price, 10) == {'maxFeePerGas': 31000000000, 'maxPriorityFeePerGas': 1000000000}
+
+    def test_should_limit_ladder_depth(self):
+        # given
+        gas_price = GeometricGasPrice(10000000000, 10)
+
+        # expect
+        assert len(self.transact._presign(self.account.address, 21000, gas_price, {'gasPrice': 10000000000}, 0, 7)) \
+               == Transact.presign_depth
+
+    def test_should_not_presign_if_gas_price_may_change_any_time(self):
+        # expect
+        assert self.transact._presign(self.account.address, 21000, FixedGasPrice(10), {'gasPrice': 10}, 0, 7) == []
+
+    def test_should_not_presign_for_node_accounts(self):
+        # given
+        gas_price = GeometricGasPrice(10000000000, 10)
+
+        # expect
+        assert self.transact._presign("0x" + "22" * 20, 21000, gas_price, {'gasPrice': 10000000000}, 0, 7) == []
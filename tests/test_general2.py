@@ -20,8 +20,9 @@ import pytest
 from mock import MagicMock
 from web3 import Web3, HTTPProvider
 
-from pymaker import Address, eth_transfer, TransactStatus, Calldata, Receipt
-from pymaker.gas import FixedGasPrice
+from pymaker import Address, eth_transfer, TransactStatus, Calldata, Receipt, Transact
+from pymaker.gas import FixedGasPrice, GasEstimateCache
+from pymaker.metrics import Metrics, PrometheusMetrics, set_metrics
 from pymaker.numeric import Wad
 from pymaker.proxy import DSProxy, DSProxyCache
 from pymaker.token import DSToken
@@ -131,6 +132,26 @@ class TestTransact:
             synchronize([self.token.transfer(self.second_address, Wad(500)).transact_async(gas=129995,
                                                                                            gas_buffer=3000000)])
 
+    def test_gas_estimate_cache(self):
+        # given
+        metrics = PrometheusMetrics()
+        set_metrics(metrics)
+        Transact.gas_estimate_cache = GasEstimateCache(margin=0.5)
+
+        try:
+            # when
+            first_receipt = self.token.transfer(self.second_address, Wad(500)).transact()
+            second_receipt = self.token.transfer(self.third_address, Wad(700)).transact()
+
+            # then
+            assert metrics.histogram_count("pymaker_transact_gas_estimation_seconds") == 1
+            assert metrics.counter_value("pymaker_transact_gas_estimate_cache_total", {"result": "hit"}) == 1
+            assert self.web3.eth.getTransaction(second_receipt.transaction_hash)['gas'] > \
+                   self.web3.eth.getTransaction(first_receipt.transaction_hash)['gas']
+        finally:
+            Transact.gas_estimate_cache = None
+            set_metrics(Metrics())
+
     def test_custom_gas_price(self):
         # given
         gas_price = FixedGasPrice(25000000100)
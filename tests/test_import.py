@@ -0,0 +1,77 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import subprocess
+import sys
+
+from pymaker import Contract, LazyResource
+from pymaker.dss import Vat
+
+# Import time (in seconds) of `pymaker.deployment` which keeper startup should stay under.
+IMPORT_TIME_TARGET = float(os.environ.get('PYMAKER_IMPORT_TIME_TARGET', '3.0'))
+
+
+def run_python(code: str) -> str:
+    return subprocess.check_output([sys.executable, "-c", code], cwd=os.path.join(os.path.dirname(__file__), ".."),
+                                   universal_newlines=True).strip()
+
+
+class TestImport:
+    def test_should_not_load_any_abi_on_import(self):
+        # when
+        output = run_python("import pymaker.deployment\n"
+                            "from pymaker import Contract, LazyResource\n"
+                            "def subclasses(cls):\n"
+                            "    for sub in cls.__subclasses__():\n"
+                            "        yield sub\n"
+                            "        yield from subclasses(sub)\n"
+                            "print(sum(1 for cls in subclasses(Contract) for name in ('abi', 'bin', 'abi_support')\n"
+                            "          if name in vars(cls) and not isinstance(vars(cls)[name], LazyResource)))")
+
+        # then
+        assert output == "0"
+
+    def test_should_import_deployment_under_target(self):
+        # when
+        elapsed = float(run_python("import time\n"
+                                   "start = time.perf_counter()\n"
+                                   "import pymaker.deployment\n"
+                                   "print(time.perf_counter() - start)"))
+
+        # then
+        assert elapsed < IMPORT_TIME_TARGET
+
+    def test_should_load_abi_on_first_access(self):
+        # when
+        abi = Vat.abi
+
+        # then
+        assert isinstance(abi, list)
+        assert any(entry.get('name') == 'ilks' for entry in abi)
+        assert Vat.__dict__['abi'] is abi
+        assert Vat.abi is abi
+
+    def test_lazy_resource_should_load_bytecode(self):
+        # given
+        class Dummy(Contract):
+            bin = Contract._lazy_bin('pymaker.dss', 'abi/Vat.bin')
+
+        # expect
+        assert isinstance(Dummy.__dict__['bin'], LazyResource)
+        assert Dummy.bin.startswith('60')
+        assert isinstance(Dummy.__dict__['bin'], str)
@@ -0,0 +1,165 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import urllib.request
+
+import pytest
+
+from pymaker.metrics import Metrics, PrometheusMetrics, get_metrics, set_metrics, metrics_middleware
+
+
+class TestMetrics:
+    def test_default_metrics_should_do_nothing(self):
+        # given
+        metrics = Metrics()
+
+        # expect
+        metrics.increment("counter")
+        metrics.observe("histogram", 1.0)
+        with metrics.timer("timer"):
+            pass
+
+    def test_should_install_metrics(self):
+        # given
+        previous = get_metrics()
+        metrics = PrometheusMetrics()
+
+        # when
+        set_metrics(metrics)
+
+        # then
+        try:
+            assert get_metrics() is metrics
+        finally:
+            set_metrics(previous)
+
+
+class TestPrometheusMetrics:
+    def setup_method(self):
+        self.metrics = PrometheusMetrics(buckets=(0.1, 1.0))
+
+    def test_should_count(self):
+        # when
+        self.metrics.increment("requests_total", labels={"method": "eth_call"})
+        self.metrics.increment("requests_total", 2, labels={"method": "eth_call"})
+        self.metrics.increment("requests_total", labels={"method": "eth_blockNumber"})
+
+        # then
+        assert self.metrics.counter_value("requests_total", {"method": "eth_call"}) == 3
+        assert self.metrics.counter_value("requests_total", {"method": "eth_blockNumber"}) == 1
+        assert self.metrics.counter_value("requests_total", {"method": "eth_getCode"}) == 0
+
+    def test_should_time(self):
+        # when
+        with self.metrics.timer("duration_seconds"):
+            time.sleep(0.01)
+
+        # then
+        assert self.metrics.histogram_count("duration_seconds") == 1
+        assert self.metrics.histogram_sum("duration_seconds") >= 0.01
+
+    def test_should_export_in_prometheus_format(self):
+        # given
+        self.metrics.increment("requests_total", labels={"method": "eth_call"})
+        self.metrics.observe("duration_seconds", 0.05)
+        self.metrics.observe("duration_seconds", 0.5)
+        self.metrics.observe("duration_seconds", 5.0)
+
+        # when
+        exported = self.metrics.export()
+
+        # then
+        assert exported == "# TYPE requests_total counter\n" \
+                           "requests_total{method=\"eth_call\"} 1\n" \
+                           "# TYPE duration_seconds histogram\n" \
+                           "duration_seconds_bucket{le=\"0.1\"} 1\n" \
+                           "duration_seconds_bucket{le=\"1.0\"} 2\n" \
+                           "duration_seconds_bucket{le=\"+Inf\"} 3\n" \
+                           "duration_seconds_sum 5.55\n" \
+                           "duration_seconds_count 3\n"
+
+    def test_should_reset(self):
+        # given
+        self.metrics.increment("requests_total")
+
+        # when
+        self.metrics.reset()
+
+        # then
+        assert self.metrics.counter_value("requests_total") == 0
+        assert self.metrics.export() == "\n"
+
+    def test_should_serve_over_http(self):
+        # given
+        self.metrics.increment("requests_total")
+
+        # when
+        server = self.metrics.start_http_server(0, "127.0.0.1")
+
+        # then
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+                assert "requests_total 1" in response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+
+
+class TestMetricsMiddleware:
+    def setup_method(self):
+        self.previous = get_metrics()
+        self.metrics = PrometheusMetrics()
+        set_metrics(self.metrics)
+
+    def teardown_method(self):
+        set_metrics(self.previous)
+
+    def test_should_count_requests_per_method(self):
+        # given
+        middleware = metrics_middleware(lambda method, params: {'result': '0x1'}, None)
+
+        # when
+        middleware("eth_call", [])
+        middleware("eth_call", [])
+        middleware("eth_blockNumber", [])
+
+        # then
+        assert self.metrics.counter_value("pymaker_rpc_requests_total", {"method": "eth_call"}) == 2
+        assert self.metrics.counter_value("pymaker_rpc_requests_total", {"method": "eth_blockNumber"}) == 1
+        assert self.metrics.histogram_count("pymaker_rpc_request_seconds", {"method": "eth_call"}) == 2
+
+    def test_should_count_errors(self):
+        # given
+        middleware = metrics_middleware(lambda method, params: {'error': {'code': -32000}}, None)
+
+        # when
+        middleware("eth_call", [])
+
+        # then
+        assert self.metrics.counter_value("pymaker_rpc_errors_total", {"method": "eth_call"}) == 1
+
+    def test_should_count_failures(self):
+        # given
+        def make_request(method, params):
+            raise ConnectionError()
+
+        middleware = metrics_middleware(make_request, None)
+
+        # expect
+        with pytest.raises(ConnectionError):
+            middleware("eth_call", [])
+        assert self.metrics.counter_value("pymaker_rpc_failures_total", {"method": "eth_call"}) == 1
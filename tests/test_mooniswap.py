@@ -0,0 +1,337 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from fractions import Fraction
+from unittest.mock import Mock
+
+import pytest
+from web3 import Web3, HTTPProvider
+
+from pymaker import Address, Contract
+from pymaker.approval import directly
+from pymaker.mooniswap import LogSwapped, MarketMaker, MooniFactory, Mooniswap, MooniswapPool, VirtualBalance
+from pymaker.numeric import Wad
+from pymaker.token import DSToken
+from pymaker.uniswap_v2 import UniswapV2Pool, get_amounts_out
+from pymaker.util import abi_decode_single, abi_encode_single, bytes_to_hexstring, function_selector, \
+    hexstring_to_bytes
+from tests.helpers import StandInNode
+
+POOL = Address('0x9999999999999999999999999999999999999999')
+TOKEN_A = Address('0x1111111111111111111111111111111111111111')
+TOKEN_B = Address('0x2222222222222222222222222222222222222222')
+TOKEN_C = Address('0x3333333333333333333333333333333333333333')
+ZERO_ADDRESS = Address('0x0000000000000000000000000000000000000000')
+
+FEE = 3 * 10**15
+DECAY_PERIOD = 300
+DEPOSITED_AT = 1_600_000_000
+
+
+def pool(first_token_amount: Wad, second_token_amount: Wad, deposited_at: int = DEPOSITED_AT) -> MooniswapPool:
+    # right after a deposit virtual balances are equal to the real ones
+    return MooniswapPool(tokens=[TOKEN_A, TOKEN_B],
+                         balances=[first_token_amount, second_token_amount],
+                         virtual_balances_for_addition=[VirtualBalance(first_token_amount.value, deposited_at),
+                                                        VirtualBalance(second_token_amount.value, deposited_at)],
+                         virtual_balances_for_removal=[VirtualBalance(first_token_amount.value, deposited_at),
+                                                       VirtualBalance(second_token_amount.value, deposited_at)],
+                         fee=FEE,
+                         decay_period=DECAY_PERIOD)
+
+
+class TestMooniswapPool:
+    def test_should_quote_like_the_contract(self):
+        # given
+        mooniswap_pool = pool(Wad.from_number(100), Wad.from_number(200))
+
+        # expect
+        assert mooniswap_pool.get_return(TOKEN_A, TOKEN_B, Wad.from_number(1), DEPOSITED_AT) == Wad(1974316068794122597)
+        assert mooniswap_pool.get_return(TOKEN_A, TOKEN_A, Wad.from_number(1), DEPOSITED_AT) == Wad(0)
+        assert mooniswap_pool.get_return(TOKEN_A, TOKEN_B, Wad(0), DEPOSITED_AT) == Wad(0)
+
+    def test_should_quote_reverse_swaps_at_the_price_before_the_swap(self):
+        # given
+        mooniswap_pool = pool(Wad.from_number(100), Wad.from_number(200))
+        untouched_pool = pool(Wad.from_number(100), Wad.from_number(200))
+
+        # when
+        result = mooniswap_pool.swap(TOKEN_A, TOKEN_B, Wad.from_number(10), DEPOSITED_AT + 10)
+
+        # then
+        assert mooniswap_pool.get_balance(TOKEN_A) == Wad.from_number(110)
+        assert mooniswap_pool.get_balance(TOKEN_B) == Wad.from_number(200) - result
+
+        # and
+        assert mooniswap_pool.get_return(TOKEN_B, TOKEN_A, Wad.from_number(1), DEPOSITED_AT + 10) == \
+               untouched_pool.get_return(TOKEN_B, TOKEN_A, Wad.from_number(1), DEPOSITED_AT + 10)
+        assert mooniswap_pool.get_return(TOKEN_B, TOKEN_A, Wad.from_number(1), DEPOSITED_AT + 10 + DECAY_PERIOD) == \
+               UniswapV2Pool(TOKEN_A, TOKEN_B, Wad.from_number(110), Wad.from_number(200) - result) \
+                   .get_amount_output(TOKEN_B, TOKEN_A, Wad.from_number(1))
+
+    def test_should_decay_virtual_balances_linearly(self):
+        # given
+        mooniswap_pool = pool(Wad.from_number(100), Wad.from_number(200))
+        result = mooniswap_pool.swap(TOKEN_A, TOKEN_B, Wad.from_number(10), DEPOSITED_AT)
+
+        # expect
+        assert mooniswap_pool.get_balance_for_addition(TOKEN_B, DEPOSITED_AT) == Wad.from_number(200)
+        assert mooniswap_pool.get_balance_for_addition(TOKEN_B, DEPOSITED_AT + DECAY_PERIOD // 2) == \
+               Wad((Wad.from_number(400) - result).value // 2)
+        assert mooniswap_pool.get_balance_for_addition(TOKEN_B, DEPOSITED_AT + DECAY_PERIOD) == \
+               Wad.from_number(200) - result
+        assert mooniswap_pool.get_balance_for_removal(TOKEN_A, DEPOSITED_AT + DECAY_PERIOD // 2) == Wad.from_number(105)
+
+    def test_should_apply_swapped_events_like_swaps(self):
+        # given
+        swapped_pool = pool(Wad.from_number(100), Wad.from_number(200))
+        following_pool = pool(Wad.from_number(100), Wad.from_number(200))
+
+        # when
+        swaps = [(TOKEN_A, TOKEN_B, Wad.from_number(10), DEPOSITED_AT + 5),
+                 (TOKEN_B, TOKEN_A, Wad.from_number(7), DEPOSITED_AT + 50),
+                 (TOKEN_A, TOKEN_B, Wad.from_number(3), DEPOSITED_AT + 500)]
+        for src, dst, amount, now in swaps:
+            src_balance, dst_balance = swapped_pool.get_balance(src), swapped_pool.get_balance(dst)
+            result = swapped_pool.swap(src, dst, amount, now)
+            following_pool.apply(LogSwapped({'address': POOL.address, 'args': {
+                'account': TOKEN_C.address, 'src': src.address, 'dst': dst.address, 'amount': amount.value,
+                'result': result.value, 'srcBalance': src_balance.value, 'dstBalance': dst_balance.value,
+                'totalSupply': 0, 'referral': ZERO_ADDRESS.address}}), now)
+
+        # then
+        for token in [TOKEN_A, TOKEN_B]:
+            assert following_pool.get_balance(token) == swapped_pool.get_balance(token)
+            for now in [DEPOSITED_AT + 500, DEPOSITED_AT + 600, DEPOSITED_AT + 1000]:
+                assert following_pool.get_balance_for_addition(token, now) == \
+                       swapped_pool.get_balance_for_addition(token, now)
+                assert following_pool.get_balance_for_removal(token, now) == \
+                       swapped_pool.get_balance_for_removal(token, now)
+
+    def test_should_reject_swaps_returning_nothing(self):
+        # given
+        mooniswap_pool = pool(Wad.from_number(100), Wad.from_number(200))
+
+        # expect
+        with pytest.raises(ValueError, match="return is not enough"):
+            mooniswap_pool.swap(TOKEN_A, TOKEN_B, Wad(0), DEPOSITED_AT)
+
+    def test_should_evaluate_paths_through_different_pools(self):
+        # given
+        mooniswap_pool = pool(Wad.from_number(100), Wad.from_number(200), deposited_at=0)
+        uniswap_pool = UniswapV2Pool(TOKEN_B, TOKEN_C, Wad.from_number(500), Wad.from_number(50))
+
+        # when
+        amounts = get_amounts_out([mooniswap_pool, uniswap_pool], Wad.from_number(1), [TOKEN_A, TOKEN_B, TOKEN_C])
+
+        # then
+        assert amounts[1] == Wad(1974316068794122597)
+        assert amounts[2] == uniswap_pool.get_amount_output(TOKEN_B, TOKEN_C, amounts[1])
+
+
+class TestMarketMaker:
+    def setup_method(self):
+        self.pool = pool(Wad.from_number(100), Wad.from_number(200))
+        self.mooniswap = Mock(Mooniswap)
+        self.mooniswap.web3 = Mock()
+        self.mooniswap.web3.eth.getBlock = Mock(return_value={'number': 10, 'timestamp': DEPOSITED_AT})
+        self.market_maker = MarketMaker(self.mooniswap)
+
+    def test_should_swap_exactly_to_the_market_price(self, monkeypatch):
+        # given
+        monkeypatch.setattr(MooniswapPool, 'from_mooniswap', Mock(return_value=self.pool))
+
+        # when
+        self.market_maker.set_price(Wad.from_number(0.6), TOKEN_A, TOKEN_B, 1)
+
+        # then
+        assert MooniswapPool.from_mooniswap.call_args[0] == (self.mooniswap, 10)
+        assert not self.mooniswap.get_return.called
+
+        # and
+        kwargs = self.mooniswap.swap.call_args[1]
+        assert (kwargs['src'], kwargs['dst']) == (TOKEN_A, TOKEN_B)
+        assert kwargs['min_return'] == self.pool.get_return(TOKEN_A, TOKEN_B, kwargs['amount'], DEPOSITED_AT)
+
+        # when
+        self.pool.swap(TOKEN_A, TOKEN_B, kwargs['amount'], DEPOSITED_AT)
+
+        # then
+        price = Fraction(self.pool.get_balance(TOKEN_A).value, self.pool.get_balance(TOKEN_B).value)
+        assert Fraction(3, 5) * Fraction(999, 1000) < price <= Fraction(3, 5)
+
+    def test_should_swap_the_second_token_to_lower_the_price(self, monkeypatch):
+        # given
+        monkeypatch.setattr(MooniswapPool, 'from_mooniswap', Mock(return_value=self.pool))
+
+        # when
+        self.market_maker.set_price(Wad.from_number(0.4), TOKEN_A, TOKEN_B, 1)
+
+        # then
+        kwargs = self.mooniswap.swap.call_args[1]
+        assert (kwargs['src'], kwargs['dst']) == (TOKEN_B, TOKEN_A)
+        assert kwargs['min_return'] == self.pool.get_return(TOKEN_B, TOKEN_A, kwargs['amount'], DEPOSITED_AT)
+
+    def test_should_not_swap_within_the_permitted_delta(self, monkeypatch):
+        # given
+        monkeypatch.setattr(MooniswapPool, 'from_mooniswap', Mock(return_value=self.pool))
+
+        # expect
+        assert self.market_maker.set_price(Wad.from_number(0.502), TOKEN_A, TOKEN_B, 1) is None
+        assert not self.mooniswap.swap.called
+
+
+class TestMooniswapPoolFromMooniswap:
+    def setup_method(self):
+        Contract.lazy_verification = True
+        self.node = StandInNode({'eth_chainId': lambda params: '0x1',
+                                 'eth_blockNumber': lambda params: hex(20),
+                                 'eth_getBalance': self.eth_get_balance,
+                                 'eth_call': self.eth_call})
+        web3 = Web3(HTTPProvider(self.node.endpoint_uri))
+        web3.eth.defaultAccount = TOKEN_C.address
+        self.mooniswap = Mooniswap(web3, POOL)
+
+    def teardown_method(self):
+        self.node.stop()
+        Contract.lazy_verification = False
+
+    def eth_get_balance(self, params):
+        assert params == [POOL.address, hex(20)]
+        return hex(1000)
+
+    def eth_call(self, params):
+        to, data = Address(params[0]['to']), hexstring_to_bytes(params[0]['data'])
+        assert params[1] in [hex(20), 'latest']
+
+        if to == TOKEN_A:
+            assert data == function_selector('balanceOf(address)') + abi_encode_single('address', POOL.address)
+            result = abi_encode_single('uint256', 2000)
+        else:
+            assert to == POOL
+            result = {
+                function_selector('tokens(uint256)') + abi_encode_single('uint256', 0):
+                    abi_encode_single('address', ZERO_ADDRESS.address),
+                function_selector('tokens(uint256)') + abi_encode_single('uint256', 1):
+                    abi_encode_single('address', TOKEN_A.address),
+                function_selector('FEE_DENOMINATOR()'): abi_encode_single('uint256', 10**18),
+                function_selector('fee()'): abi_encode_single('uint256', FEE),
+                function_selector('decayPeriod()'): abi_encode_single('uint256', DECAY_PERIOD),
+            }.get(data)
+
+            if result is None:
+                function = 'Addition' if data[:4] == function_selector('virtualBalancesForAddition(address)') \
+                    else 'Removal'
+                token = Address(abi_decode_single('address', data[4:]))
+                result = abi_encode_single('(uint216,uint40)', ((1100 if token == ZERO_ADDRESS else 1900)
+                                                                + (0 if function == 'Addition' else 1), DEPOSITED_AT))
+
+        return bytes_to_hexstring(result)
+
+    def test_should_read_the_state_in_one_batch_at_the_block(self):
+        # when
+        pool = MooniswapPool.from_mooniswap(self.mooniswap)
+
+        # then
+        assert pool.tokens == [ZERO_ADDRESS, TOKEN_A]
+        assert pool.get_balance(ZERO_ADDRESS) == Wad(1000)
+        assert pool.get_balance(TOKEN_A) == Wad(2000)
+        assert [(pool._for_addition[token].balance, pool._for_addition[token].time) for token in pool.tokens] == \
+            [(1100, DEPOSITED_AT), (1900, DEPOSITED_AT)]
+        assert [(pool._for_removal[token].balance, pool._for_removal[token].time) for token in pool.tokens] == \
+            [(1101, DEPOSITED_AT), (1901, DEPOSITED_AT)]
+        assert (pool.fee, pool.decay_period, pool.fee_denominator) == (FEE, DECAY_PERIOD, 10**18)
+        assert pool.last_block == 20
+
+        # and
+        assert self.node.batches == [3, 8]
+        assert all(params[-1] == hex(20) for method, params in self.node.requests[-8:])
+
+    def test_should_read_the_tokens_and_the_fee_denominator_only_once(self):
+        # given
+        MooniswapPool.from_mooniswap(self.mooniswap, 20)
+
+        # when
+        pool = MooniswapPool.from_mooniswap(self.mooniswap, 20)
+
+        # then
+        assert pool.tokens == [ZERO_ADDRESS, TOKEN_A]
+        assert pool.fee_denominator == 10**18
+        assert self.node.batches == [3, 8, 8]
+        assert 'eth_blockNumber' not in self.node.methods()
+
+
+class TestMooniswapPoolAgainstContract:
+    """Differential tests of the local pool model against a pool deployed to the test chain."""
+
+    def setup_method(self):
+        self.web3 = Web3(HTTPProvider("http://localhost:8555"))
+        self.web3.eth.defaultAccount = self.web3.eth.accounts[0]
+        self.factory = MooniFactory.deploy(self.web3)
+        self.token1 = DSToken.deploy(self.web3, 'AAA')
+        self.token1.mint(Wad.from_number(10**6)).transact()
+        self.token2 = DSToken.deploy(self.web3, 'BBB')
+        self.token2.mint(Wad.from_number(10**6)).transact()
+
+        assert self.factory.create_pair(self.token1.address, self.token2.address).transact()
+        self.mooniswap = self.factory.get_pair(self.token1.address, self.token2.address)
+        self.mooniswap.approve([self.token1, self.token2], directly())
+
+        amounts = {self.token1.address: Wad.from_number(100), self.token2.address: Wad.from_number(250)}
+        assert self.mooniswap.deposit(amounts[self.mooniswap.first_token], Wad(0),
+                                      amounts[self.mooniswap.second_token], Wad(0)).transact()
+
+    def swap(self):
+        for src, dst, amount in [(self.token1, self.token2, Wad.from_number(10)),
+                                 (self.token2, self.token1, Wad.from_number(3)),
+                                 (self.token1, self.token2, Wad.from_number(40))]:
+            assert self.mooniswap.swap(src.address, dst.address, amount, Wad(0)).transact()
+
+    def assert_quotes_like_the_contract(self, pool: MooniswapPool):
+        # `getReturn` gets evaluated with the timestamp of the latest block
+        now = self.web3.eth.getBlock('latest')['timestamp']
+
+        for src, dst in [(self.token1.address, self.token2.address), (self.token2.address, self.token1.address)]:
+            for amount in [Wad(1), Wad(10**6), Wad.from_number(0.5), Wad.from_number(17.3), Wad.from_number(1000)]:
+                assert pool.get_return(src, dst, amount, now) == self.mooniswap.get_return(src, dst, amount)
+
+    def test_should_quote_like_the_contract_with_virtual_balances(self):
+        # given
+        self.swap()
+
+        # when
+        pool = MooniswapPool.from_mooniswap(self.mooniswap)
+
+        # then
+        now = self.web3.eth.getBlock('latest')['timestamp']
+        assert pool.get_balance_for_removal(self.token1.address, now) != pool.get_balance(self.token1.address)
+        assert pool.get_balance_for_addition(self.token2.address, now) != pool.get_balance(self.token2.address)
+
+        # and
+        self.assert_quotes_like_the_contract(pool)
+
+    def test_should_follow_swaps_like_the_contract(self):
+        # given
+        pool = MooniswapPool.from_mooniswap(self.mooniswap)
+
+        # when
+        self.swap()
+
+        # then
+        assert pool.sync() == 3
+        self.assert_quotes_like_the_contract(pool)
+
@@ -0,0 +1,331 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+import pytest
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import Web3, HTTPProvider
+
+from pymaker.metrics import PrometheusMetrics, set_metrics, Metrics
+from pymaker.providers import BroadcastProvider, PooledProvider, SessionHTTPProvider, make_batch_request
+from tests.helpers import StandInNode
+
+RAW_TRANSACTION = "0x02f86b0103847735940085174876e800825208941111111111111111111111111111111111111111" \
+                  "0180c080a0319a4ecf76900445e475ac48c066a5c2eb2356011617672fe1da96ba3ddb4a1da01e16" \
+                  "2999490b83e17333f434145e27bb2fc973e04be5c45d6b23b0e3c7a69fb2"
+TX_HASH = HexBytes(keccak(HexBytes(RAW_TRANSACTION)))
+
+RECEIPT = {'transactionHash': TX_HASH.hex(), 'transactionIndex': '0x0', 'blockHash': '0x' + '11' * 32,
+           'blockNumber': '0x10', 'from': '0x' + '22' * 20, 'to': '0x' + '11' * 20, 'cumulativeGasUsed': '0x5208',
+           'gasUsed': '0x5208', 'contractAddress': None, 'logs': [], 'logsBloom': '0x' + '00' * 256, 'status': '0x1'}
+
+
+def accepting(params):
+    return TX_HASH.hex()
+
+
+def already_known(params):
+    raise ValueError("already known")
+
+
+def rejecting(params):
+    raise ValueError("nonce too low")
+
+
+class TestBroadcastProvider:
+    def setup_method(self):
+        self.nodes = []
+        self.providers = []
+
+    def teardown_method(self):
+        # requests to the slower nodes may still be in flight
+        for provider in self.providers:
+            provider.executor.shutdown(wait=True)
+        for node in self.nodes:
+            node.stop()
+
+    def node(self, handlers: dict, delay: float = 0.0) -> StandInNode:
+        node = StandInNode({'eth_blockNumber': lambda params: '0x10', **handlers}, delay)
+        self.nodes.append(node)
+        return node
+
+    def web3(self, *uris) -> Web3:
+        provider = BroadcastProvider(list(uris) + [node.endpoint_uri for node in self.nodes])
+        self.providers.append(provider)
+        return Web3(provider)
+
+    def test_should_broadcast_raw_transactions_to_all_nodes(self):
+        # given
+        self.node({'eth_sendRawTransaction': accepting})
+        self.node({'eth_sendRawTransaction': accepting})
+        self.node({'eth_sendRawTransaction': accepting})
+
+        # when
+        tx_hash = self.web3().eth.sendRawTransaction(RAW_TRANSACTION)
+
+        # then
+        assert tx_hash == TX_HASH
+        time.sleep(0.1)
+        assert all(node.methods() == ['eth_sendRawTransaction'] for node in self.nodes)
+
+    def test_should_return_as_soon_as_one_node_accepts(self):
+        # given
+        self.node({'eth_sendRawTransaction': accepting}, delay=1.0)
+        self.node({'eth_sendRawTransaction': accepting})
+
+        # when
+        start = time.time()
+        self.web3().eth.sendRawTransaction(RAW_TRANSACTION)
+
+        # then
+        assert time.time() - start < 0.5
+
+    def test_should_treat_already_known_as_accepted(self):
+        # given
+        self.node({'eth_sendRawTransaction': already_known})
+        self.node({'eth_sendRawTransaction': already_known})
+
+        # expect
+        assert self.web3().eth.sendRawTransaction(RAW_TRANSACTION) == TX_HASH
+
+    def test_should_succeed_if_any_node_accepts(self):
+        # given
+        self.node({'eth_sendRawTransaction': rejecting})
+        self.node({'eth_sendRawTransaction': accepting}, delay=0.1)
+
+        # expect
+        assert self.web3().eth.sendRawTransaction(RAW_TRANSACTION) == TX_HASH
+
+    def test_should_fail_if_all_nodes_reject(self):
+        # given
+        self.node({'eth_sendRawTransaction': rejecting})
+        self.node({'eth_sendRawTransaction': rejecting})
+
+        # expect
+        with pytest.raises(ValueError, match="nonce too low"):
+            self.web3().eth.sendRawTransaction(RAW_TRANSACTION)
+
+    def test_should_survive_unreachable_nodes(self):
+        # given
+        self.node({'eth_sendRawTransaction': accepting})
+        web3 = self.web3("http://127.0.0.1:1")
+
+        # expect
+        assert web3.eth.sendRawTransaction(RAW_TRANSACTION) == TX_HASH
+
+    def test_should_race_receipt_lookups(self):
+        # given
+        self.node({'eth_getTransactionReceipt': lambda params: None})
+        self.node({'eth_getTransactionReceipt': lambda params: RECEIPT}, delay=0.1)
+
+        # when
+        receipt = self.web3().eth.getTransactionReceipt(TX_HASH)
+
+        # then
+        assert receipt['blockNumber'] == 16
+        assert all(node.methods() == ['eth_getTransactionReceipt'] for node in self.nodes)
+
+    def test_should_send_other_requests_to_primary_node_only(self):
+        # given
+        self.node({})
+        self.node({})
+
+        # when
+        block_number = self.web3().eth.blockNumber
+
+        # then
+        assert block_number == 16
+        assert self.nodes[0].methods() == ['eth_blockNumber']
+        assert self.nodes[1].methods() == []
+
+
+class TestPooledProvider:
+    def setup_method(self):
+        self.nodes = []
+
+    def teardown_method(self):
+        set_metrics(Metrics())
+        for node in self.nodes:
+            node.stop()
+
+    def node(self, handlers: dict, head: int = 0x10, delay: float = 0.0) -> StandInNode:
+        node = StandInNode({'eth_blockNumber': lambda params: hex(head), 'eth_gasPrice': lambda params: '0x1', **handlers},
+                           delay)
+        self.nodes.append(node)
+        return node
+
+    def web3(self, *uris) -> Web3:
+        return Web3(PooledProvider(list(uris) + [node.endpoint_uri for node in self.nodes], check_interval=60))
+
+    def test_should_route_to_the_fastest_node(self):
+        # given
+        slow = self.node({}, delay=0.1)
+        fast = self.node({})
+        web3 = self.web3()
+
+        # when
+        for _ in range(5):
+            assert web3.eth.gasPrice == 1
+
+        # then
+        assert slow.methods() == ['eth_blockNumber']
+        assert fast.methods() == ['eth_blockNumber'] + ['eth_gasPrice'] * 5
+
+    def test_should_skip_lagging_nodes(self):
+        # given
+        lagging = self.node({}, head=0x10)
+        synced = self.node({}, head=0x20, delay=0.05)
+        web3 = self.web3()
+
+        # when
+        web3.eth.gasPrice
+
+        # then
+        assert lagging.methods() == ['eth_blockNumber']
+        assert synced.methods() == ['eth_blockNumber', 'eth_gasPrice']
+
+    def test_should_fail_over_to_another_node(self):
+        # given
+        metrics = PrometheusMetrics()
+        set_metrics(metrics)
+        down = self.node({})
+        up = self.node({})
+        web3 = self.web3()
+        web3.eth.gasPrice
+        down.stop()
+        self.nodes.remove(down)
+        web3.provider.endpoints[0].latency = 0.0
+        web3.provider.endpoints[1].latency = 1.0
+
+        # when
+        assert web3.eth.gasPrice == 1
+
+        # then
+        assert up.methods()[-1] == 'eth_gasPrice'
+        assert not web3.provider.endpoints[0].healthy
+        assert metrics.counter_value("pymaker_pool_failovers_total", {"method": "eth_gasPrice"}) == 1
+
+    def test_should_raise_if_all_nodes_are_down(self):
+        # given
+        web3 = self.web3("http://127.0.0.1:1")
+
+        # expect
+        with pytest.raises(Exception):
+            web3.eth.gasPrice
+
+    def test_should_pin_filters_to_the_first_healthy_node(self):
+        # given
+        first = self.node({'eth_newBlockFilter': lambda params: '0x1', 'eth_getFilterChanges': lambda params: []},
+                          delay=0.05)
+        second = self.node({'eth_newBlockFilter': lambda params: '0x2', 'eth_getFilterChanges': lambda params: []})
+        web3 = self.web3("http://127.0.0.1:1")
+
+        # when
+        block_filter = web3.eth.filter('latest')
+        block_filter.get_new_entries()
+
+        # then
+        assert first.methods() == ['eth_blockNumber', 'eth_newBlockFilter', 'eth_getFilterChanges']
+        assert second.methods() == ['eth_blockNumber']
+
+    def test_should_read_nonces_from_the_node_transactions_are_sent_to(self):
+        # given
+        first = self.node({'eth_getTransactionCount': lambda params: '0x5', 'eth_estimateGas': lambda params: '0x5208',
+                           'eth_sendRawTransaction': lambda params: TX_HASH.hex()}, delay=0.05)
+        second = self.node({'eth_getTransactionCount': lambda params: '0x4', 'eth_estimateGas': lambda params: '0x5208',
+                            'eth_sendRawTransaction': lambda params: TX_HASH.hex()})
+        web3 = self.web3()
+        account = '0x00a329c0648769A73afAc7F9381E08FB43dBEA72'
+
+        # when
+        assert web3.eth.getTransactionCount(account, 'pending') == 5
+        assert web3.eth.estimateGas({'from': account, 'to': account, 'value': 1}) == 21000
+        web3.eth.sendRawTransaction('0x01')
+
+        # then
+        assert first.methods() == ['eth_blockNumber', 'eth_getTransactionCount', 'eth_estimateGas',
+                                   'eth_sendRawTransaction']
+        assert second.methods() == ['eth_blockNumber']
+
+    def test_should_retry_lookups_returning_nothing_on_other_nodes(self):
+        # given
+        self.node({'eth_getTransactionReceipt': lambda params: None})
+        self.node({'eth_getTransactionReceipt': lambda params: RECEIPT}, delay=0.05)
+        web3 = self.web3()
+
+        # when
+        receipt = web3.eth.getTransactionReceipt(TX_HASH)
+
+        # then
+        assert receipt['transactionHash'] == TX_HASH
+        assert all(node.methods()[-1] == 'eth_getTransactionReceipt' for node in self.nodes)
+
+    def test_should_return_nothing_if_no_node_has_it(self):
+        # given
+        self.node({'eth_getTransactionByHash': lambda params: None})
+        self.node({'eth_getTransactionByHash': lambda params: None})
+        web3 = self.web3()
+
+        # expect
+        with pytest.raises(Exception):
+            web3.eth.getTransaction(TX_HASH)
+        assert all(node.methods()[-1] == 'eth_getTransactionByHash' for node in self.nodes)
+
+
+class TestMakeBatchRequest:
+    def setup_method(self):
+        self.node = StandInNode({'eth_getBalance': self.get_balance})
+
+    def teardown_method(self):
+        self.node.stop()
+
+    @staticmethod
+    def get_balance(params):
+        if params[0] == '0x' + '00' * 20:
+            raise ValueError("no balance")
+
+        return hex(int(params[0], 16))
+
+    @staticmethod
+    def requests(count: int) -> list:
+        return [('eth_getBalance', ['0x' + f'{index:040x}', 'latest']) for index in range(count)]
+
+    @pytest.mark.parametrize("provider", [SessionHTTPProvider, HTTPProvider])
+    def test_should_send_requests_in_batches(self, provider):
+        # given
+        web3 = Web3(provider(self.node.endpoint_uri))
+
+        # when
+        responses = make_batch_request(web3, self.requests(7), batch_size=3)
+
+        # then
+        assert self.node.batches == [3, 3, 1]
+        assert [response.get('result') for response in responses] == [None] + [hex(index) for index in range(1, 7)]
+        assert responses[0]['error']['message'] == "no balance"
+
+    def test_should_send_requests_one_by_one_with_other_providers(self):
+        # given
+        web3 = Web3(PooledProvider([self.node.endpoint_uri], check_interval=60))
+
+        # when
+        responses = make_batch_request(web3, self.requests(3))
+
+        # then
+        assert self.node.batches == []
+        assert [response.get('result') for response in responses] == [None, '0x1', '0x2']
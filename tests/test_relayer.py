@@ -0,0 +1,201 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from unittest.mock import Mock
+
+import pytest
+from web3 import Web3
+
+from pymaker import Address, Contract
+from pymaker import zrxv2, zrxv3
+from pymaker.relayer import PageCache
+from pymaker.sessions import create_session
+from tests.helpers import StandInRelayer
+
+EXCHANGE = Address('0x4f833a24e1f95d70f028921e27040ca56e09ab0b')
+MAKER = Address('0x1111111111111111111111111111111111111111')
+PAY_TOKEN = Address('0x2222222222222222222222222222222222222222')
+BUY_TOKEN = Address('0x3333333333333333333333333333333333333333')
+
+
+def order_json(module, salt: int) -> dict:
+    return {'exchangeAddress': EXCHANGE.address.lower(),
+            'senderAddress': '0x0000000000000000000000000000000000000000',
+            'makerAddress': MAKER.address.lower(),
+            'takerAddress': '0x0000000000000000000000000000000000000000',
+            'makerAssetData': module.ERC20Asset(PAY_TOKEN).serialize(),
+            'takerAssetData': module.ERC20Asset(BUY_TOKEN).serialize(),
+            'makerAssetAmount': str(10**18 + salt),
+            'takerAssetAmount': str(2 * 10**18),
+            'feeRecipientAddress': '0x0000000000000000000000000000000000000000',
+            'makerFee': '0',
+            'takerFee': '0',
+            'expirationTimeSeconds': '1700000000',
+            'salt': str(salt),
+            'signature': '0x' + f'{salt:02x}' * 65 + '03'}
+
+
+@pytest.fixture(params=[(zrxv2, zrxv2.ZrxExchangeV2, zrxv2.ZrxRelayerApiV2),
+                        (zrxv3, zrxv3.ZrxExchangeV3, zrxv3.ZrxRelayerApiV3)], ids=['v2', 'v3'])
+def api(request):
+    module, exchange_class, api_class = request.param
+    return module, exchange_class, api_class
+
+
+class TestRelayerPagination:
+    def setup_method(self):
+        Contract.lazy_verification = True
+        self.relayers = []
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+        for relayer in self.relayers:
+            relayer.stop()
+
+    def relayer_api(self, api, orders: list, etags: bool = True, delay: float = 0.0):
+        module, exchange_class, api_class = api
+        relayer = StandInRelayer(orders, etags, delay)
+        self.relayers.append(relayer)
+
+        web3 = Mock(Web3)
+        web3.eth = Mock()
+        web3.eth.chainId = 1
+        exchange = exchange_class(web3, EXCHANGE)
+        return relayer, api_class(exchange, relayer.api_server, session=create_session())
+
+    def test_should_fetch_all_pages(self, api):
+        # given
+        module = api[0]
+        relayer, relayer_api = self.relayer_api(api, [order_json(module, salt) for salt in range(1, 251)])
+
+        # when
+        orders = relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=100)
+
+        # then
+        assert [order.salt for order in orders] == list(range(1, 251))
+        assert all(isinstance(order, module.Order) for order in orders)
+        assert sorted(relayer.requests) == [(1, 200), (2, 200), (3, 200)]
+
+    def test_should_fetch_all_pages_of_orders_by_maker(self, api):
+        # given
+        module = api[0]
+        relayer, relayer_api = self.relayer_api(api, [order_json(module, salt) for salt in range(1, 6)])
+
+        # when
+        orders = relayer_api.get_orders_by_maker(MAKER, per_page=2)
+
+        # then
+        assert [order.salt for order in orders] == [1, 2, 3, 4, 5]
+        assert all(order.maker == MAKER for order in orders)
+
+    def test_should_fetch_remaining_pages_concurrently(self, api):
+        # given
+        module = api[0]
+        relayer, relayer_api = self.relayer_api(api, [order_json(module, salt) for salt in range(1, 81)], delay=0.2)
+
+        # when
+        start = time.time()
+        orders = relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=10)
+
+        # then
+        assert len(orders) == 80
+        assert time.time() - start < 0.2 * 8 / 2
+
+    def test_should_not_download_unchanged_pages_again(self, api):
+        # given
+        module = api[0]
+        relayer, relayer_api = self.relayer_api(api, [order_json(module, salt) for salt in range(1, 31)])
+        first = relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=10)
+
+        # when
+        relayer.orders[25] = order_json(module, 99)
+        second = relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=10)
+
+        # then
+        assert [order.salt for order in first] == list(range(1, 31))
+        assert [order.salt for order in second] == list(range(1, 26)) + [99] + list(range(27, 31))
+        assert sorted(relayer.requests[3:]) == [(1, 304), (2, 304), (3, 200)]
+
+    def test_should_only_keep_the_most_recently_used_pages(self, api):
+        # given
+        module = api[0]
+        relayer, relayer_api = self.relayer_api(api, [order_json(module, salt) for salt in range(1, 31)])
+        relayer_api._page_cache = PageCache(max_size=2)
+        relayer_api.max_workers = 1
+
+        # when
+        relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=10)
+        relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=10)
+
+        # then
+        assert len(relayer_api._page_cache) == 2
+        assert relayer.requests[3:] == [(1, 200), (2, 200), (3, 200)]
+
+    def test_should_work_without_etags(self, api):
+        # given
+        module = api[0]
+        relayer, relayer_api = self.relayer_api(api, [order_json(module, salt) for salt in range(1, 4)], etags=False)
+
+        # when
+        relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=2)
+        orders = relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=2)
+
+        # then
+        assert len(orders) == 3
+        assert all(status == 200 for _, status in relayer.requests)
+
+    def test_should_skip_orders_returned_twice(self, api):
+        # given
+        module = api[0]
+        orders = [order_json(module, salt) for salt in (1, 2, 2, 3)]
+        relayer, relayer_api = self.relayer_api(api, orders)
+
+        # when
+        orders = relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN, per_page=2)
+
+        # then
+        assert [order.salt for order in orders] == [1, 2, 3]
+
+    def test_should_fail_on_relayer_error(self, api):
+        # given
+        relayer, relayer_api = self.relayer_api(api, [])
+        relayer_api.session = create_session(max_retries=0)
+        relayer.stop()
+        self.relayers.remove(relayer)
+
+        # expect
+        with pytest.raises(Exception):
+            relayer_api.get_orders(PAY_TOKEN, BUY_TOKEN)
+
+
+class TestPageCache:
+    def test_should_evict_the_least_recently_used_page(self):
+        # given
+        cache = PageCache(max_size=2)
+        cache.put(('url', 1), ('etag-1', []))
+        cache.put(('url', 2), ('etag-2', []))
+
+        # when
+        assert cache.get(('url', 1)) == ('etag-1', [])
+        cache.put(('url', 3), ('etag-3', []))
+
+        # then
+        assert len(cache) == 2
+        assert cache.get(('url', 2)) is None
+        assert cache.get(('url', 1)) == ('etag-1', [])
+        assert cache.get(('url', 3)) == ('etag-3', [])
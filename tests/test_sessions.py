@@ -0,0 +1,105 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from http.server import BaseHTTPRequestHandler
+
+from web3 import Web3
+
+from pymaker.metrics import PrometheusMetrics, Metrics, set_metrics
+from pymaker.providers import SessionHTTPProvider
+from pymaker.sessions import create_session, get_session, set_session
+from tests.helpers import StandInNode, ThreadingHTTPServer
+
+
+class TestSessions:
+    def setup_method(self):
+        self.metrics = PrometheusMetrics()
+        set_metrics(self.metrics)
+        self.node = StandInNode({'eth_blockNumber': lambda params: '0x10'}, keep_alive=True)
+
+    def teardown_method(self):
+        set_metrics(Metrics())
+        set_session(None)
+        self.node.stop()
+
+    def test_should_configure_the_session(self):
+        # when
+        session = create_session(pool_size=32, max_retries=5, backoff_factor=0.5, gzip=False)
+
+        # then
+        adapter = session.get_adapter("https://api.example.com/v3/orders")
+        assert adapter._pool_maxsize == 32
+        assert adapter.max_retries.total == 5
+        assert adapter.max_retries.backoff_factor == 0.5
+        assert session.headers['Accept-Encoding'] == 'identity'
+        assert session.headers['Connection'] == 'keep-alive'
+
+    def test_should_share_the_default_session(self):
+        # expect
+        assert get_session() is get_session()
+        assert SessionHTTPProvider(self.node.endpoint_uri).session is get_session()
+
+    def test_should_reuse_connections(self):
+        # given
+        web3 = Web3(SessionHTTPProvider(self.node.endpoint_uri, session=create_session()))
+
+        # when
+        for _ in range(5):
+            assert web3.eth.blockNumber == 16
+
+        # then
+        assert self.metrics.counter_value("pymaker_http_requests_total", {"host": "127.0.0.1"}) == 5
+        assert self.metrics.counter_value("pymaker_http_connections_total", {"host": "127.0.0.1"}) == 1
+
+    def test_should_open_new_connections_without_keep_alive(self):
+        # given
+        web3 = Web3(SessionHTTPProvider(self.node.endpoint_uri, session=create_session(keep_alive=False)))
+
+        # when
+        for _ in range(3):
+            assert web3.eth.blockNumber == 16
+
+        # then
+        assert self.metrics.counter_value("pymaker_http_connections_total", {"host": "127.0.0.1"}) == 3
+
+    def test_should_retry_unavailable_responses(self):
+        # given
+        responses = [503, 503, 200]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(responses.pop(0))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            # when
+            response = create_session(backoff_factor=0.01).get(f"http://127.0.0.1:{server.server_port}/v3/orders")
+
+            # then
+            assert response.status_code == 200
+            assert responses == []
+        finally:
+            server.shutdown()
+            server.server_close()
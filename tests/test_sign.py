@@ -16,11 +16,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import pkg_resources
+from eth_account import Account
+from eth_account.messages import defunct_hash_message
 from web3 import Web3, HTTPProvider
 
 from pymaker import Address
 from pymaker.keys import register_key_file
-from pymaker.sign import eth_sign
+from pymaker.sign import eth_sign, sign_typed_transaction, recover_typed_transaction, eip712_domain_separator, \
+    eip712_hash, sign_message_hashes, recover_message_hashes, to_vrs
 
 
 def test_signing():
@@ -65,3 +68,55 @@ def test_signing_with_key_and_rpc_should_return_same_result():
 
     # then
     assert rpc_signature == local_signature
+
+
+def test_signing_typed_transaction():
+    # given
+    account = Account.privateKeyToAccount("0x" + "42" * 32)
+    transaction = {'chainId': 1, 'nonce': 3, 'maxPriorityFeePerGas': 2000000000, 'maxFeePerGas': 100000000000,
+                   'gas': 21000, 'to': "0x" + "11" * 20, 'value': 1, 'data': "0x"}
+
+    # when
+    raw_transaction = sign_typed_transaction(account, transaction)
+
+    # then
+    assert raw_transaction.hex() == "02f86b0103847735940085174876e800825208941111111111111111111111111111111111111111" \
+                                    "0180c080a0319a4ecf76900445e475ac48c066a5c2eb2356011617672fe1da96ba3ddb4a1da01e16" \
+                                    "2999490b83e17333f434145e27bb2fc973e04be5c45d6b23b0e3c7a69fb2"
+    assert recover_typed_transaction(raw_transaction) == Address(account.address)
+
+
+def test_eip712_hash():
+    # given
+    # [the `Mail` example from the EIP-712 specification]
+    mail_struct_hash = bytes.fromhex("c52c0ee5d84264471806290a3f2c4cecfc5490626bf912d01f240d7a274b371e")
+
+    # when
+    domain_separator = eip712_domain_separator("Ether Mail", "1", Address("0xCcCCccccCCCCcCCCCCCcCcCccCcCCCcCcccccccC"), 1)
+
+    # then
+    assert domain_separator.hex() == "f2cee375fa42b42143804025fc449deafd50cc031ca257e0b194a650a912090f"
+    assert eip712_hash(domain_separator, mail_struct_hash).hex() == \
+        "be609aee343fb3c4b28e1df9e632fca64fcfaede20f02e86244efddf30957bd2"
+
+
+def test_signing_and_recovering_message_hashes_in_batches():
+    # given
+    account = Account.privateKeyToAccount("0x" + "42" * 32)
+    message_hashes = [bytes(defunct_hash_message(primitive=bytes([index]) * 32)) for index in range(40)]
+
+    # when
+    signatures = sign_message_hashes(bytes(account.key), message_hashes, processes=2)
+    signers = recover_message_hashes(message_hashes, list(map(to_vrs, signatures)), processes=2)
+
+    # then
+    assert signatures == [Account.signHash(message_hash, account.key).signature.hex() for message_hash in message_hashes]
+    assert signers == [Address(account.address)] * 40
+
+
+def test_recovering_malformed_signatures():
+    # given
+    message_hash = bytes(defunct_hash_message(primitive=b"message"))
+
+    # expect
+    assert recover_message_hashes([message_hash], [(29, bytes(32), bytes(32))]) == [None]
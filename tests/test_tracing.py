@@ -0,0 +1,111 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from pymaker.tracing import RpcTracer, RpcCall
+
+
+class DummyWrapper:
+    def __init__(self, middleware):
+        self.middleware = middleware
+
+    def ilk(self, name: str):
+        return self.middleware("eth_call", [{'data': name}])
+
+
+class TestRpcTracer:
+    def setup_method(self):
+        self.tracer = RpcTracer(capacity=3)
+        self.middleware = self.tracer.middleware(lambda method, params: {'result': '0x' + '00' * 32}, None)
+
+    def test_should_record_requests(self):
+        # when
+        self.middleware("eth_blockNumber", [])
+
+        # then
+        calls = self.tracer.snapshot()
+        assert len(calls) == 1
+        assert calls[0].method == "eth_blockNumber"
+        assert calls[0].params_size == len("[]")
+        assert calls[0].response_size > 64
+        assert calls[0].latency >= 0
+
+    def test_should_record_calling_frame(self):
+        # when
+        DummyWrapper(self.middleware).ilk("ETH-A")
+
+        # then
+        call = self.tracer.snapshot()[0]
+        assert call.stack[-1] == "DummyWrapper.ilk"
+        assert call.stack[-2] == "TestRpcTracer.test_should_record_calling_frame"
+
+    def test_should_keep_only_most_recent_requests(self):
+        # when
+        for method in ["eth_call", "eth_getCode", "eth_blockNumber", "eth_gasPrice"]:
+            self.middleware(method, [])
+
+        # then
+        assert [call.method for call in self.tracer.snapshot()] == ["eth_getCode", "eth_blockNumber", "eth_gasPrice"]
+
+    def test_should_record_failed_requests(self):
+        # given
+        def make_request(method, params):
+            raise ConnectionError()
+
+        middleware = self.tracer.middleware(make_request, None)
+
+        # when
+        with pytest.raises(ConnectionError):
+            middleware("eth_call", [])
+
+        # then
+        assert self.tracer.snapshot()[0].method == "eth_call"
+
+    def test_should_clear(self):
+        # given
+        self.middleware("eth_call", [])
+
+        # when
+        self.tracer.clear()
+
+        # then
+        assert self.tracer.snapshot() == []
+
+    def test_should_summarize(self):
+        # given
+        self.tracer.record(RpcCall("eth_call", 10, 100, 0.5, "Vat.ilk", ("Keeper.main", "Vat.ilk"), 0))
+        self.tracer.record(RpcCall("eth_call", 10, 100, 0.25, "Vat.ilk", ("Keeper.main", "Vat.ilk"), 0))
+        self.tracer.record(RpcCall("eth_getCode", 10, 1000, 1.0, "Contract._get_contract",
+                                   ("Keeper.main", "Contract._get_contract"), 0))
+
+        # when
+        summary = self.tracer.summary().splitlines()
+
+        # then
+        assert len(summary) == 3
+        assert summary[1].split() == ["Contract._get_contract", "eth_getCode", "1", "1.000", "1000.00", "10", "1000"]
+        assert summary[2].split() == ["Vat.ilk", "eth_call", "2", "0.750", "375.00", "20", "200"]
+
+    def test_should_produce_folded_stacks(self):
+        # given
+        self.tracer.record(RpcCall("eth_call", 10, 100, 0.5, "Vat.ilk", ("Keeper.main", "Vat.ilk"), 0))
+        self.tracer.record(RpcCall("eth_call", 10, 100, 0.25, "Vat.ilk", ("Keeper.main", "Vat.ilk"), 0))
+
+        # expect
+        assert self.tracer.folded_stacks() == "Keeper.main;Vat.ilk;eth_call 750000"
+        assert self.tracer.folded_stacks(weight='count') == "Keeper.main;Vat.ilk;eth_call 2"
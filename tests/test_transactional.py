@@ -18,11 +18,11 @@
 import pytest
 from web3 import Web3, HTTPProvider
 
-from pymaker import Address
+from pymaker import Address, Calldata, Invocation
 from pymaker.approval import directly
 from pymaker.numeric import Wad
 from pymaker.token import DSToken
-from pymaker.transactional import TxManager
+from pymaker.transactional import TxManager, TxBatch
 
 
 class TestTxManager:
@@ -112,3 +112,49 @@ class TestTxManager:
 
     def test_should_have_printable_representation(self):
         assert repr(self.tx) == f"TxManager('{self.tx.address}')"
+
+    def test_batch(self):
+        # given
+        self.tx.approve([self.token1], directly())
+        batch = TxBatch(self.tx, max_gas=200000, tokens=[self.token1.address])
+
+        # when
+        for amount in range(1, 7):
+            batch.add(self.token1.transfer(self.other_address, Wad.from_number(amount)))
+        receipts = batch.transact()
+
+        # then
+        assert len(batch.bundles()) > 1
+        assert all(receipt is not None and receipt.successful for receipt in receipts)
+        assert len(set(receipt.transaction_hash for receipt in receipts)) == len(batch.bundles())
+        assert self.token1.balance_of(self.other_address) == Wad.from_number(21)
+
+
+class TestTxBatchSplit:
+    def test_should_keep_everything_in_one_bundle_if_possible(self):
+        assert TxBatch.split([30000, 40000, 50000], 1000000) == [[0, 1, 2]]
+
+    def test_should_split_into_gas_bounded_bundles(self):
+        # given
+        max_gas = TxBatch.BUNDLE_GAS_OVERHEAD + 2 * (50000 + TxBatch.ENTRY_GAS_OVERHEAD)
+
+        # expect
+        assert TxBatch.split([50000, 50000, 50000, 50000, 50000], max_gas) == [[0, 1], [2, 3], [4]]
+        assert TxBatch.split([50001, 50000, 50000], max_gas) == [[0], [1, 2]]
+
+    def test_should_put_oversized_invocations_in_separate_bundles(self):
+        assert TxBatch.split([10000, 5000000, 10000], 1000000) == [[0], [1], [2]]
+
+    def test_should_handle_no_invocations(self):
+        assert TxBatch.split([], 1000000) == []
+
+    def test_should_encode_script(self):
+        # given
+        invocations = [Invocation(Address('0x1111111111222222222211111111112222222222'), Calldata('0xabcdef')),
+                       Invocation(Address('0x3333333333444444444433333333334444444444'), Calldata('0x'))]
+
+        # expect
+        assert TxManager.script(invocations) == bytes.fromhex('1111111111222222222211111111112222222222'
+                                                              + '00' * 31 + '03' + 'abcdef'
+                                                              + '3333333333444444444433333333334444444444'
+                                                              + '00' * 32)
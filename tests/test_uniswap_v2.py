@@ -0,0 +1,478 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from fractions import Fraction
+from unittest.mock import Mock
+
+import pytest
+from web3 import Web3, HTTPProvider
+
+from pymaker import Address, Contract
+from pymaker.approval import directly
+from pymaker.numeric import Wad
+from pymaker.providers import SessionHTTPProvider
+from pymaker.token import DSToken
+from pymaker.uniswap_v2 import LogSync, MarketMaker, PairCache, UniswapFactory, UniswapPair, UniswapRouteFinder, UniswapV2Pool, \
+    UniswapRouter, get_amount_to_price, get_amounts_in, get_amounts_out
+from pymaker.util import abi_decode_single, abi_encode_single, bytes_to_hexstring, function_selector, \
+    hexstring_to_bytes
+from tests.helpers import StandInNode
+
+FACTORY = Address('0x8888888888888888888888888888888888888888')
+PAIR = Address('0x9999999999999999999999999999999999999999')
+TOKEN_A = Address('0x1111111111111111111111111111111111111111')
+TOKEN_B = Address('0x2222222222222222222222222222222222222222')
+TOKEN_C = Address('0x3333333333333333333333333333333333333333')
+TOKEN_D = Address('0x4444444444444444444444444444444444444444')
+TOKEN_E = Address('0x5555555555555555555555555555555555555555')
+
+
+def sync_event(block_number: int, log_index: int, first_token_amount: Wad, second_token_amount: Wad,
+               pair: Address = PAIR) -> LogSync:
+    return LogSync({'address': pair.address, 'blockNumber': block_number, 'logIndex': log_index,
+                    'args': {'reserve0': first_token_amount.value, 'reserve1': second_token_amount.value}})
+
+
+class TestUniswapV2Pool:
+    def setup_method(self):
+        self.pool = UniswapV2Pool(TOKEN_A, TOKEN_B, Wad.from_number(100), Wad.from_number(200))
+
+    def test_should_quote_like_the_router(self):
+        # expect
+        assert self.pool.get_amount_output(TOKEN_A, TOKEN_B, Wad.from_number(1)) == Wad(1974316068794122597)
+        assert self.pool.get_amount_input(TOKEN_A, TOKEN_B, Wad.from_number(1)) == Wad(504024636724243082)
+        assert self.pool.quote(TOKEN_A, TOKEN_B, Wad.from_number(1)) == Wad.from_number(2)
+
+    def test_should_round_inputs_up_and_outputs_down(self):
+        # given
+        amount_in = self.pool.get_amount_input(TOKEN_B, TOKEN_A, Wad.from_number(3))
+
+        # expect
+        assert self.pool.get_amount_output(TOKEN_B, TOKEN_A, amount_in) >= Wad.from_number(3)
+        assert self.pool.get_amount_output(TOKEN_B, TOKEN_A, amount_in - Wad(2)) < Wad.from_number(3)
+
+    def test_should_reject_swaps_the_pair_would_reject(self):
+        # expect
+        with pytest.raises(ValueError, match="INSUFFICIENT_INPUT_AMOUNT"):
+            self.pool.get_amount_output(TOKEN_A, TOKEN_B, Wad(0))
+        with pytest.raises(ValueError, match="INSUFFICIENT_LIQUIDITY"):
+            self.pool.get_amount_input(TOKEN_A, TOKEN_B, Wad.from_number(200))
+        with pytest.raises(ValueError, match="INSUFFICIENT_LIQUIDITY"):
+            UniswapV2Pool(TOKEN_A, TOKEN_B, Wad(0), Wad(0)).get_amount_output(TOKEN_A, TOKEN_B, Wad(1))
+
+    def test_should_update_reserves_on_swaps(self):
+        # when
+        amount_out = self.pool.swap(TOKEN_A, TOKEN_B, Wad.from_number(1))
+
+        # then
+        assert amount_out == Wad(1974316068794122597)
+        assert self.pool.reserves.first_token_amount == Wad.from_number(101)
+        assert self.pool.reserves.second_token_amount == Wad.from_number(200) - amount_out
+        assert self.pool.reserves.map()[TOKEN_B] == Wad.from_number(200) - amount_out
+
+    def test_should_evaluate_paths(self):
+        # given
+        other_pool = UniswapV2Pool(TOKEN_B, TOKEN_C, Wad.from_number(500), Wad.from_number(50))
+
+        # when
+        amounts = get_amounts_out([self.pool, other_pool], Wad.from_number(1), [TOKEN_A, TOKEN_B, TOKEN_C])
+
+        # then
+        assert amounts[1] == self.pool.get_amount_output(TOKEN_A, TOKEN_B, Wad.from_number(1))
+        assert amounts[2] == other_pool.get_amount_output(TOKEN_B, TOKEN_C, amounts[1])
+
+        # when
+        amounts = get_amounts_in([self.pool, other_pool], Wad.from_number(0.1), [TOKEN_A, TOKEN_B, TOKEN_C])
+
+        # then
+        assert amounts[1] == other_pool.get_amount_input(TOKEN_B, TOKEN_C, Wad.from_number(0.1))
+        assert amounts[0] == self.pool.get_amount_input(TOKEN_A, TOKEN_B, amounts[1])
+
+    def test_should_follow_sync_events(self):
+        # given
+        pair = Mock(UniswapPair)
+        pair.address = PAIR
+        pair.web3 = Mock()
+        pair._contract = Mock()
+        pair.web3.eth.blockNumber = 12
+        pair._past_events_in_block_range = Mock(return_value=[
+            sync_event(12, 3, Wad.from_number(90), Wad.from_number(230)),
+            sync_event(11, 0, Wad.from_number(110), Wad.from_number(190))
+        ])
+        pool = UniswapV2Pool(TOKEN_A, TOKEN_B, Wad.from_number(100), Wad.from_number(200), pair, last_block=10)
+
+        # when
+        assert pool.sync() == 2
+
+        # then
+        assert pair._past_events_in_block_range.call_args[0][1:5] == ('Sync', LogSync, 11, 12)
+        assert pool.reserves.first_token_amount == Wad.from_number(90)
+        assert pool.reserves.second_token_amount == Wad.from_number(230)
+        assert pool.last_block == 12
+
+        # and
+        assert pool.sync() == 0
+
+
+def price_after(reserve_in: int, reserve_out: int, amount_in: int, fee: Fraction = Fraction(3, 1000)) -> Fraction:
+    # exact price of the pool after a swap, without rounding the amount returned
+    amount_out = reserve_out * (1 - fee) * amount_in / (reserve_in + (1 - fee) * amount_in)
+    return (reserve_in + amount_in) / (reserve_out - amount_out)
+
+
+class TestPriceCorrection:
+    @pytest.mark.parametrize("reserve_in, reserve_out, price, fee", [
+        (Wad.from_number(100), Wad.from_number(200), Fraction(3, 5), Fraction(3, 1000)),
+        (Wad.from_number(1_000_000), Wad(3), Fraction(10**25), Fraction(3, 1000)),
+        (Wad(12345678901234567890123), Wad(98765432109876543210), Fraction(171, 1), Fraction(1, 400)),
+        (Wad.from_number(100), Wad.from_number(200), Fraction(1, 2) + Fraction(1, 10**18), Fraction(0))
+    ])
+    def test_should_stop_exactly_at_the_price(self, reserve_in, reserve_out, price, fee):
+        # when
+        amount_in = get_amount_to_price(reserve_in, reserve_out, price, fee).value
+
+        # then
+        assert price_after(reserve_in.value, reserve_out.value, amount_in, fee) <= price
+        assert price_after(reserve_in.value, reserve_out.value, amount_in + 1, fee) > price
+
+    def test_should_not_swap_if_the_price_is_already_there(self):
+        # expect
+        assert get_amount_to_price(Wad.from_number(100), Wad.from_number(200), Fraction(1, 2)) == Wad(0)
+        assert get_amount_to_price(Wad.from_number(100), Wad.from_number(200), Fraction(1, 4)) == Wad(0)
+        assert get_amount_to_price(Wad(0), Wad.from_number(200), Fraction(1)) == Wad(0)
+
+    def test_should_calculate_amounts_without_quoting(self):
+        # given
+        pool = UniswapV2Pool(TOKEN_A, TOKEN_B, Wad.from_number(100), Wad.from_number(200))
+
+        # when
+        raising = MarketMaker._get_amounts(Wad.from_number(0.6), Wad.from_number(100), Wad.from_number(200))
+
+        # then
+        assert raising.exact_value < Wad(0)
+        assert abs(raising.limit) == pool.get_amount_output(TOKEN_A, TOKEN_B, abs(raising.exact_value))
+
+        # when
+        lowering = MarketMaker._get_amounts(Wad.from_number(0.4), Wad.from_number(100), Wad.from_number(200))
+
+        # then
+        assert lowering.exact_value > Wad(0)
+        assert lowering.exact_value == pool.get_amount_output(TOKEN_B, TOKEN_A, lowering.limit)
+        assert price_after(Wad.from_number(200).value, Wad.from_number(100).value, lowering.limit.value) <= \
+               Fraction(5, 2)
+
+    def test_should_calculate_values_exactly(self):
+        # expect
+        assert MarketMaker.calculate_value(Wad.from_number(100), 10) == Wad.from_number(110)
+        assert MarketMaker.calculate_value(Wad.from_number(100), -10) == Wad.from_number(90)
+        assert MarketMaker.calculate_value(Wad(3), 50) == Wad(4)
+
+
+class TestUniswapRouteFinder:
+    def setup_method(self):
+        self.direct = UniswapV2Pool(TOKEN_A, TOKEN_C, Wad.from_number(10), Wad.from_number(10),
+                                    address=Address('0x000000000000000000000000000000000000000a'))
+        self.first_hop = UniswapV2Pool(TOKEN_A, TOKEN_B, Wad.from_number(1000), Wad.from_number(2000),
+                                       address=Address('0x000000000000000000000000000000000000000b'))
+        self.second_hop = UniswapV2Pool(TOKEN_B, TOKEN_C, Wad.from_number(2000), Wad.from_number(1000),
+                                        address=Address('0x000000000000000000000000000000000000000c'))
+        self.unrelated = UniswapV2Pool(TOKEN_D, TOKEN_E, Wad.from_number(10), Wad.from_number(10),
+                                       address=Address('0x000000000000000000000000000000000000000d'))
+        self.web3 = Mock(Web3)
+        self.web3.eth = Mock()
+        self.finder = UniswapRouteFinder(self.web3, [self.direct, self.first_hop, self.second_hop, self.unrelated],
+                                         last_block=10)
+
+    def test_should_find_the_best_path(self):
+        # when
+        best = self.finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+
+        # then
+        assert best.path == [TOKEN_A, TOKEN_B, TOKEN_C]
+        assert best.pools == [self.first_hop, self.second_hop]
+        assert best.amounts == get_amounts_out(best.pools, Wad.from_number(1), best.path)
+        assert best.amounts[-1] > self.direct.get_amount_output(TOKEN_A, TOKEN_C, Wad.from_number(1))
+
+    def test_should_respect_the_maximum_number_of_hops(self):
+        # when
+        best = self.finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1), max_hops=1)
+
+        # then
+        assert best.path == [TOKEN_A, TOKEN_C]
+        assert best.pools == [self.direct]
+
+        # and
+        assert self.finder.get_best_path(TOKEN_B, TOKEN_C, Wad.from_number(1), max_hops=1).path == [TOKEN_B, TOKEN_C]
+        assert self.finder.get_best_path(TOKEN_A, TOKEN_D, Wad.from_number(1)) is None
+
+    def test_should_search_again_only_if_pairs_looked_at_have_changed(self):
+        # given
+        self.finder._search = Mock(wraps=self.finder._search)
+        self.finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+
+        # when
+        assert self.finder.apply(sync_event(11, 0, Wad(1), Wad(1), self.unrelated.address))
+        self.finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+
+        # then
+        assert self.finder._search.call_count == 1
+
+        # when
+        self.web3.eth.blockNumber = 12
+        self.web3.eth.getLogs = Mock(return_value=[{
+            'address': self.direct.address.address, 'blockNumber': 12, 'logIndex': 0,
+            'topics': [UniswapRouteFinder.SYNC_TOPIC],
+            'data': '0x' + Wad.from_number(10).value.to_bytes(32, 'big').hex()
+                    + Wad.from_number(1000).value.to_bytes(32, 'big').hex()}])
+
+        # then
+        assert self.finder.refresh() == 1
+        assert self.finder.last_block == 12
+        assert self.web3.eth.getLogs.call_args[0][0] == {'fromBlock': 11, 'toBlock': 12,
+                                                         'topics': [UniswapRouteFinder.SYNC_TOPIC]}
+
+        # and
+        best = self.finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+        assert self.finder._search.call_count == 2
+        assert best.path == [TOKEN_A, TOKEN_C]
+
+    def test_should_only_cache_the_most_recently_used_results(self):
+        # given
+        finder = UniswapRouteFinder(self.web3, [self.direct, self.first_hop, self.second_hop], max_results=2)
+        finder._search = Mock(wraps=finder._search)
+
+        # when
+        finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+        finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(2))
+        finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+        finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(3))
+
+        # then
+        assert finder._search.call_count == 3
+        assert len(finder._results) == 2
+
+        # when
+        finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+        finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(2))
+
+        # then
+        assert finder._search.call_count == 4
+
+    def test_should_route_through_pairs_created_by_the_factory_since(self):
+        # given
+        factory = Mock(UniswapFactory)
+        factory.address = FACTORY
+        new_pair = Address('0x000000000000000000000000000000000000000e')
+        finder = UniswapRouteFinder(self.web3, [self.direct, self.first_hop, self.unrelated], last_block=10,
+                                    factory=factory)
+        assert finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1)).path == [TOKEN_A, TOKEN_C]
+
+        # when
+        self.web3.eth.blockNumber = 12
+        self.web3.eth.getLogs = Mock(return_value=[{
+            'address': new_pair.address, 'blockNumber': 12, 'logIndex': 2,
+            'topics': [UniswapRouteFinder.SYNC_TOPIC],
+            'data': '0x' + Wad.from_number(2000).value.to_bytes(32, 'big').hex()
+                    + Wad.from_number(1000).value.to_bytes(32, 'big').hex()
+        }, {
+            'address': FACTORY.address, 'blockNumber': 12, 'logIndex': 1,
+            'topics': [UniswapRouteFinder.PAIR_CREATED_TOPIC,
+                       '0x' + bytes(12).hex() + TOKEN_B.address[2:], '0x' + bytes(12).hex() + TOKEN_C.address[2:]],
+            'data': '0x' + bytes(12).hex() + new_pair.address[2:] + (5).to_bytes(32, 'big').hex()
+        }])
+
+        # then
+        assert finder.refresh() == 1
+        assert self.web3.eth.getLogs.call_args[0][0] == {
+            'fromBlock': 11, 'toBlock': 12,
+            'topics': [[UniswapRouteFinder.SYNC_TOPIC, UniswapRouteFinder.PAIR_CREATED_TOPIC]]}
+
+        # and
+        best = finder.get_best_path(TOKEN_A, TOKEN_C, Wad.from_number(1))
+        assert best.path == [TOKEN_A, TOKEN_B, TOKEN_C]
+        assert best.pools[1].address == new_pair
+        assert best.pools[1].get_amount_output(TOKEN_B, TOKEN_C, Wad.from_number(2)) == \
+            self.second_hop.get_amount_output(TOKEN_B, TOKEN_C, Wad.from_number(2))
+
+
+class TestUniswapFactory:
+    def setup_method(self):
+        Contract.lazy_verification = True
+        UniswapFactory.pair_cache = PairCache()
+        self.pairs = {Address('0x000000000000000000000000000000000000000a'): (TOKEN_A, TOKEN_B, 100, 200),
+                      Address('0x000000000000000000000000000000000000000b'): (TOKEN_B, TOKEN_C, 300, 400)}
+        self.node = StandInNode({'eth_chainId': lambda params: '0x1',
+                                 'eth_blockNumber': lambda params: hex(100),
+                                 'eth_call': self.eth_call})
+        self.factory = UniswapFactory(Web3(SessionHTTPProvider(self.node.endpoint_uri)), FACTORY)
+
+    def teardown_method(self):
+        self.node.stop()
+        Contract.lazy_verification = False
+        UniswapFactory.pair_cache = PairCache()
+
+    def eth_call(self, params):
+        assert params[1] in [hex(100), 'latest']
+        address, data = Address(params[0]['to']), hexstring_to_bytes(params[0]['data'])
+        pairs = list(self.pairs)
+        if data[:4] == function_selector('decimals()'):
+            return bytes_to_hexstring(abi_encode_single('uint256', {TOKEN_A: 18, TOKEN_B: 6, TOKEN_C: 8}[address]))
+        if address == FACTORY and data[:4] == function_selector('allPairsLength()'):
+            return bytes_to_hexstring(abi_encode_single('uint256', len(pairs)))
+        elif address == FACTORY and data[:4] == function_selector('allPairs(uint256)'):
+            return bytes_to_hexstring(abi_encode_single('address', pairs[abi_decode_single('uint256', data[4:])].address))
+
+        first_token, second_token, first_reserve, second_reserve = self.pairs[address]
+        return bytes_to_hexstring({function_selector('token0()'): abi_encode_single('address', first_token.address),
+                                   function_selector('token1()'): abi_encode_single('address', second_token.address),
+                                   function_selector('getReserves()'): abi_encode_single(
+                                       '(uint112,uint112,uint32)', (first_reserve, second_reserve, 0))}[data[:4]])
+
+    def test_should_read_all_pools_in_batches(self):
+        # when
+        pools = self.factory.get_pools(batch_size=4)
+
+        # then
+        assert [pool.address for pool in pools] == list(self.pairs)
+        assert [pool.tokens for pool in pools] == [[TOKEN_A, TOKEN_B], [TOKEN_B, TOKEN_C]]
+        assert [pool.reserves.second_token_amount for pool in pools] == [Wad(200), Wad(400)]
+        assert all(pool.last_block == 100 for pool in pools)
+
+        # and
+        assert self.node.batches == [1, 2, 4, 2]
+
+    def test_should_only_read_reserves_of_known_pairs(self):
+        # given
+        self.factory.get_pools(batch_size=4)
+        self.node.batches.clear()
+
+        # when
+        self.pairs[Address('0x000000000000000000000000000000000000000c')] = (TOKEN_A, TOKEN_C, 500, 600)
+        pools = self.factory.get_pools(batch_size=4)
+
+        # then
+        assert [pool.tokens for pool in pools] == [[TOKEN_A, TOKEN_B], [TOKEN_B, TOKEN_C], [TOKEN_A, TOKEN_C]]
+        assert self.node.batches == [1, 1, 2, 3]
+
+        # and
+        reserves = self.factory.get_reserves(list(self.pairs)[:1], block_number=100)
+        assert reserves[0].map() == {TOKEN_A: Wad(100), TOKEN_B: Wad(200)}
+
+    def test_should_persist_immutable_data(self, tmpdir):
+        # given
+        path = str(tmpdir.join("pairs.json"))
+        UniswapFactory.pair_cache = PairCache(path)
+
+        # when
+        assert self.factory.get_decimals([TOKEN_A, TOKEN_B, TOKEN_A]) == [18, 6, 18]
+        pairs = self.factory.get_pairs_addreses(block_number=100)
+
+        # then
+        UniswapFactory.pair_cache = PairCache(path)
+        self.node.batches.clear()
+        assert self.factory.get_decimals([TOKEN_C, TOKEN_B]) == [8, 6]
+        assert self.factory.get_pairs_addreses(block_number=100) == pairs
+        assert self.node.batches == [1, 1]
+
+
+class TestUniswapV2PoolAgainstRouter:
+    """Differential tests of the local pool model against the router deployed to the test chain."""
+
+    def setup_method(self):
+        self.web3 = Web3(HTTPProvider("http://localhost:8555"))
+        self.web3.eth.defaultAccount = self.web3.eth.accounts[0]
+        self.our_address = Address(self.web3.eth.defaultAccount)
+
+        # any token can stand in for WETH, as no ETH gets swapped
+        self.weth = DSToken.deploy(self.web3, 'WETH')
+        self.factory = UniswapFactory.deploy(self.web3, self.our_address)
+        self.router = UniswapRouter.deploy(self.web3, self.factory.address, self.weth.address)
+        UniswapFactory.pair_cache = PairCache()
+
+    def teardown_method(self):
+        UniswapFactory.pair_cache = PairCache()
+
+    def deploy_token(self, symbol: str) -> DSToken:
+        token = DSToken.deploy(self.web3, symbol)
+        token.mint(Wad.from_number(10**9)).transact()
+        self.router.approve([token], directly())
+        return token
+
+    def create_pool(self, first_token: DSToken, second_token: DSToken, first_token_amount: Wad,
+                    second_token_amount: Wad) -> UniswapV2Pool:
+        assert self.router.add_liquidity(first_token.address, second_token.address,
+                                         first_token_amount, second_token_amount).transact()
+
+        return UniswapV2Pool.from_pair(self.router.get_pair(first_token.address, second_token.address))
+
+    def assert_quotes_like_the_router(self, pools: list, path: list):
+        reserve_in = pools[0].reserves.map()[path[0]].value
+        reserve_out = pools[-1].reserves.map()[path[-1]].value
+
+        for amount_in in [Wad(1), Wad(997), Wad(reserve_in // 1000), Wad(reserve_in // 3), Wad(reserve_in * 5)]:
+            amounts = self.router.get_amounts_out(amount_in, path)
+            assert get_amounts_out(pools, amount_in, path) == amounts
+            if len(pools) == 1:
+                assert pools[0].get_amount_output(path[0], path[1], amount_in) == amounts[1]
+
+        # longer paths can only return a small part of the last reserve, as the first pairs run out of liquidity
+        amounts_out = [Wad(1), Wad(reserve_out // 1000)] + \
+                      ([Wad(reserve_out // 2), Wad(reserve_out - 1)] if len(pools) == 1 else [Wad(reserve_out // 100)])
+        for amount_out in amounts_out:
+            amounts = self.router.get_amounts_in(amount_out, path)
+            assert get_amounts_in(pools, amount_out, path) == amounts
+            if len(pools) == 1:
+                assert pools[0].get_amount_input(path[0], path[1], amount_out) == amounts[0]
+
+    @pytest.mark.parametrize("first_token_amount, second_token_amount", [
+        (Wad.from_number(100), Wad.from_number(200)),
+        (Wad.from_number(1), Wad.from_number(3000)),
+        (Wad(10**9), Wad.from_number(7.5)),
+        (Wad.from_number(12345.678), Wad(98765432109))
+    ])
+    def test_should_quote_like_the_router(self, first_token_amount, second_token_amount):
+        # given
+        token1 = self.deploy_token('AAA')
+        token2 = self.deploy_token('BBB')
+        pool = self.create_pool(token1, token2, first_token_amount, second_token_amount)
+
+        # expect
+        self.assert_quotes_like_the_router([pool], [token1.address, token2.address])
+        self.assert_quotes_like_the_router([pool], [token2.address, token1.address])
+
+    def test_should_quote_paths_like_the_router_after_swaps(self):
+        # given
+        token1 = self.deploy_token('AAA')
+        token2 = self.deploy_token('BBB')
+        token3 = self.deploy_token('CCC')
+        pools = [self.create_pool(token1, token2, Wad.from_number(100), Wad.from_number(250)),
+                 self.create_pool(token2, token3, Wad.from_number(30), Wad(7 * 10**9))]
+        path = [token1.address, token2.address, token3.address]
+
+        # expect
+        self.assert_quotes_like_the_router(pools, path)
+
+        # when
+        for amount, swap_path in [(Wad.from_number(10), path), (Wad(10**8), list(reversed(path)))]:
+            assert self.router.swap_from_exact_amount(amount, Wad(0), swap_path).transact()
+        for pool in pools:
+            assert pool.sync() > 0
+
+        # then
+        self.assert_quotes_like_the_router(pools, path)
+        self.assert_quotes_like_the_router(list(reversed(pools)), list(reversed(path)))
+
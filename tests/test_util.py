@@ -20,11 +20,14 @@ import time
 from unittest.mock import Mock, call
 
 import pytest
-from web3 import Web3
+from eth_abi import encode_single
+from web3 import Web3, HTTPProvider
 
 from pymaker import Address
 from pymaker.util import synchronize, int_to_bytes32, bytes_to_int, bytes_to_hexstring, hexstring_to_bytes, \
-    AsyncCallback, chain
+    AsyncCallback, chain, ContractCache, EMPTY_CODE_HASH, is_infura, function_selector, abi_encode_single, \
+    abi_decode_single, isqrt, is_unsupported_method_error
+from tests.helpers import StandInNode, mocked_web3_code
 
 
 async def async_return(result):
@@ -89,6 +92,159 @@ def test_chain_should_report_unknown_chains_as_unknown():
     assert chain(web3) == "unknown"
 
 
+def test_is_infura():
+    assert is_infura(Web3(HTTPProvider("https://mainnet.infura.io/v3/abcdef")))
+    assert not is_infura(Web3(HTTPProvider("https://infura.example.com/v3/abcdef")))
+    assert not is_infura(Web3(HTTPProvider("http://localhost:8545/infura")))
+
+
+class TestContractCache:
+    contract = Address('0x1111111111222222222211111111112222222222')
+    account = Address('0x3333333333444444444433333333334444444444')
+    code_hashes = {contract.address: "0x" + "ab" * 32, account.address: EMPTY_CODE_HASH}
+
+    def test_should_only_check_each_contract_once(self):
+        # given
+        web3 = mocked_web3_code(self.code_hashes)
+        cache = ContractCache()
+
+        # expect
+        assert cache.exists(web3, self.contract)
+        assert cache.exists(web3, self.contract)
+        assert web3.manager.request_blocking.call_count == 1
+        assert web3.eth.getCode.call_count == 0
+
+    def test_should_not_cache_missing_contracts(self):
+        # given
+        web3 = mocked_web3_code(self.code_hashes)
+        cache = ContractCache()
+
+        # expect
+        assert not cache.exists(web3, self.account)
+        assert not cache.exists(web3, Address('0x5555555555666666666655555555556666666666'))
+        assert not cache.exists(web3, self.account)
+        assert web3.manager.request_blocking.call_count == 3
+
+    def test_should_fall_back_to_get_code(self):
+        # given
+        web3 = mocked_web3_code(self.code_hashes, proof_supported=False)
+        cache = ContractCache()
+
+        # expect
+        assert cache.exists(web3, self.contract)
+        assert not cache.exists(web3, self.account)
+        assert web3.manager.request_blocking.call_count == 1
+        assert web3.eth.getCode.call_count == 2
+
+    def test_should_not_give_up_on_get_proof_after_transient_failures(self):
+        # given
+        web3 = mocked_web3_code(self.code_hashes, proof_error=ConnectionError("Connection reset by peer"))
+        cache = ContractCache()
+
+        # expect
+        with pytest.raises(ConnectionError):
+            cache.exists(web3, self.contract)
+
+        # when
+        web3.manager.request_blocking.side_effect = lambda method, params: {'codeHash': self.code_hashes[params[0]]}
+
+        # then
+        assert cache.exists(web3, self.contract)
+        assert web3.eth.getCode.call_count == 0
+
+    def test_should_fall_back_to_get_code_for_other_node_errors_per_address(self):
+        # given
+        web3 = mocked_web3_code(self.code_hashes, proof_error=ValueError({'code': -32000, 'message': 'missing trie node'}))
+        cache = ContractCache()
+
+        # when
+        assert cache.exists(web3, self.contract)
+        assert cache.exists(web3, Address('0x5555555555666666666655555555556666666666')) is False
+
+        # then
+        assert web3.manager.request_blocking.call_count == 2
+        assert web3.eth.getCode.call_count == 2
+
+    def test_should_recognize_unsupported_methods(self):
+        assert is_unsupported_method_error(ValueError({'code': -32601, 'message': 'Method not found'}))
+        assert is_unsupported_method_error(ValueError({'code': -32000, 'message':
+                                                       'the method eth_getProof does not exist/is not available'}))
+        assert is_unsupported_method_error(ValueError("Method not found"))
+        assert not is_unsupported_method_error(ValueError({'code': -32000, 'message': 'header not found'}))
+        assert not is_unsupported_method_error(ConnectionError("Method not found"))
+
+    def test_should_cache_per_chain(self):
+        # given
+        web3_mainnet = mocked_web3_code(self.code_hashes)
+        web3_kovan = mocked_web3_code(self.code_hashes)
+        web3_kovan.eth.chainId = 42
+        cache = ContractCache()
+
+        # when
+        cache.exists(web3_mainnet, self.contract)
+
+        # then
+        assert cache.is_verified(web3_mainnet, self.contract)
+        assert not cache.is_verified(web3_kovan, self.contract)
+
+    def test_should_verify_many_contracts_in_one_batch(self, tmpdir):
+        # given
+        other_contract = Address('0x5555555555666666666655555555556666666666')
+        code_hashes = {**self.code_hashes, other_contract.address: "0x" + "cd" * 32}
+        node = StandInNode({'eth_chainId': lambda params: "0x1",
+                            'eth_getProof': lambda params: {'codeHash': code_hashes.get(params[0], "0x" + "00" * 32)}})
+        web3 = Web3(HTTPProvider(node.endpoint_uri))
+        path = str(tmpdir.join("contracts.json"))
+        cache = ContractCache(path)
+
+        try:
+            # when
+            result = cache.verify(web3, [self.contract, self.account, other_contract, self.contract])
+
+            # then
+            assert result == [True, False, True, True]
+            assert node.batches == [3]
+
+            # and
+            assert cache.exists(web3, other_contract)
+            assert ContractCache(path).is_verified(web3, self.contract)
+            assert ContractCache(path).is_verified(web3, other_contract)
+            assert [method for method in node.methods() if method != 'eth_chainId'] == ['eth_getProof'] * 3
+        finally:
+            node.stop()
+
+    def test_should_verify_many_contracts_with_get_code(self):
+        # given
+        node = StandInNode({'eth_chainId': lambda params: "0x1",
+                            'eth_getCode': lambda params: "0x6080" if params[0] == self.contract.address else "0x"})
+        web3 = Web3(HTTPProvider(node.endpoint_uri))
+        cache = ContractCache()
+
+        try:
+            # when
+            assert cache.verify(web3, [self.contract, self.account]) == [True, False]
+            assert cache.verify(web3, [self.contract, self.account]) == [True, False]
+
+            # then
+            assert node.batches == [2, 2, 1]
+            assert node.methods() == ['eth_chainId'] + ['eth_getProof'] * 2 + ['eth_getCode'] * 2 + ['eth_getCode']
+        finally:
+            node.stop()
+
+    def test_should_persist(self, tmpdir):
+        # given
+        path = str(tmpdir.join("contracts.json"))
+        web3 = mocked_web3_code(self.code_hashes)
+
+        # when
+        ContractCache(path).exists(web3, self.contract)
+
+        # then
+        assert ContractCache(path).is_verified(web3, self.contract)
+        assert ContractCache(path).exists(web3, self.contract)
+        assert web3.manager.request_blocking.call_count == 1
+
+
 def mocked_web3_transaction_count(address: Address, latest: int, pending: int) -> Web3:
     def side_effect(param_address, param_mode):
         assert param_address == address.address
@@ -197,6 +353,26 @@ def test_hexstring_to_bytes():
     assert hexstring_to_bytes('0xffff') == bytes([0xff, 0xff])
 
 
+def test_isqrt():
+    assert [isqrt(value) for value in range(10)] == [0, 1, 1, 1, 2, 2, 2, 2, 2, 3]
+    assert isqrt(10**36) == 10**18
+    assert isqrt(10**36 - 1) == 10**18 - 1
+    assert isqrt(2**255) ** 2 <= 2**255 < (isqrt(2**255) + 1) ** 2
+
+
+def test_function_selector():
+    assert function_selector('transfer(address,uint256)') == bytes.fromhex('a9059cbb')
+
+
+def test_abi_encode_and_decode_single():
+    # given
+    encoded = abi_encode_single('(uint256,bytes)[]', [(1, b'\x01\x02'), (2, b'')])
+
+    # expect
+    assert encoded == encode_single('(uint256,bytes)[]', [(1, b'\x01\x02'), (2, b'')])
+    assert abi_decode_single('(uint256,bytes)[]', encoded) == ((1, b'\x01\x02'), (2, b''))
+
+
 class TestAsyncCallback:
     @pytest.fixture
     def callbacks(self):
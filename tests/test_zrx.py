@@ -22,13 +22,14 @@ import pytest
 from mock import Mock
 from web3 import Web3, HTTPProvider
 
-from pymaker import Address
+from pymaker import Address, Contract
 from pymaker.approval import directly
 from pymaker.deployment import deploy_contract
 from pymaker.numeric import Wad
 from pymaker.token import DSToken, ERC20Token
+from pymaker.util import bytes_to_hexstring
 from pymaker.zrx import ZrxExchange, Order, ZrxRelayerApi
-from tests.helpers import is_hashable, wait_until_mock_called
+from tests.helpers import is_hashable, offline_web3, wait_until_mock_called
 
 PAST_BLOCKS = 100
 
@@ -112,6 +113,20 @@ class TestZrx:
         assert order_hash.startswith('0x')
         assert len(order_hash) == 66
 
+    def test_get_order_hash_should_match_the_contract(self):
+        # given
+        order = self.exchange.create_order(pay_token=self.token1.address,
+                                           pay_amount=Wad.from_number(100),
+                                           buy_token=self.token2.address,
+                                           buy_amount=Wad.from_number(2.5), expiration=1763920792)
+
+        # when
+        order_hash = self.exchange.get_order_hash(order)
+
+        # then
+        assert order_hash == bytes_to_hexstring(self.exchange._contract.functions.getOrderHash(
+            self.exchange._order_addresses(order), self.exchange._order_values(order)).call())
+
     def test_sign_order(self):
         # given
         order = self.exchange.create_order(pay_token=Address("0x0202020202020202020202020202020202020202"),
@@ -246,6 +261,43 @@ class TestZrx:
         assert repr(self.exchange) == f"ZrxExchange('{self.exchange.address}')"
 
 
+class TestOrderHash:
+    def setup_method(self):
+        Contract.lazy_verification = True
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+
+    def test_should_calculate_order_hash_without_calling_the_node(self):
+        # given
+        web3 = offline_web3()
+        exchange = ZrxExchange(web3, Address("0x12459c951127e0c374ff9105dda097662a027093"))
+        order = Order(exchange=exchange,
+                      maker=Address("0x0046cac6668bef45b517a1b816a762f4f8add2a9"),
+                      taker=Address("0x0000000000000000000000000000000000000000"),
+                      maker_fee=Wad(0),
+                      taker_fee=Wad(0),
+                      pay_token=Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4"),
+                      pay_amount=Wad(11000000000000000000),
+                      buy_token=Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070"),
+                      buy_amount=Wad(30800000000000000),
+                      salt=50626048444772008084444062440502087868712695090943879708059561407114509847312,
+                      fee_recipient=Address("0xa258b39954cef5cb142fd567a46cddb31a670124"),
+                      expiration=1511988904,
+                      exchange_contract_address=Address("0x12459c951127e0c374ff9105dda097662a027093"),
+                      ec_signature_r=None,
+                      ec_signature_s=None,
+                      ec_signature_v=None)
+
+        # when
+        order_hash = exchange.get_order_hash(order)
+
+        # then
+        # [as returned by the relayer as `orderHash`]
+        assert order_hash == "0x02266a4887256fdf16b47ca13e3f2cca76f93724842f3f7ddf55d92fb6601b6f"
+        assert web3.manager.request_blocking.call_count == 0
+
+
 class TestOrder:
     def test_should_be_comparable(self):
         # given
@@ -0,0 +1,310 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from pymaker import Address, Contract
+from pymaker import zrxv2, zrxv3
+from pymaker.numeric import Wad
+from pymaker.util import hexstring_to_bytes
+from pymaker.zrxbook import TimerWheel, ZrxOrderBook
+from tests.helpers import offline_web3
+
+EXCHANGE = Address('0x4f833a24e1f95d70f028921e27040ca56e09ab0b')
+MAKER = Address('0x1111111111111111111111111111111111111111')
+OTHER_MAKER = Address('0x4444444444444444444444444444444444444444')
+PAY_TOKEN = Address('0x2222222222222222222222222222222222222222')
+BUY_TOKEN = Address('0x3333333333333333333333333333333333333333')
+ZERO_ADDRESS = Address('0x0000000000000000000000000000000000000000')
+
+
+class TestTimerWheel:
+    def test_should_expire_items_at_their_deadline(self):
+        # given
+        wheel = TimerWheel(now=1000, resolution=10, slots=8)
+        wheel.add('a', 1005)
+        wheel.add('b', 1015)
+        wheel.add('c', 1019)
+
+        # expect
+        assert wheel.advance(1004) == []
+        assert wheel.advance(1005) == ['a']
+        assert wheel.advance(1016) == ['b']
+        assert len(wheel) == 1
+        assert 'c' in wheel
+
+    def test_should_keep_items_due_in_later_rotations(self):
+        # given
+        wheel = TimerWheel(now=1000, resolution=10, slots=8)
+        wheel.add('a', 1000 + 80 * 3 + 5)
+
+        # expect
+        assert wheel.advance(1000 + 80 * 3) == []
+        assert wheel.advance(1000 + 80 * 3 + 5) == ['a']
+
+    def test_should_visit_all_buckets_after_a_long_pause(self):
+        # given
+        wheel = TimerWheel(now=1000, resolution=10, slots=8)
+        for index in range(20):
+            wheel.add(index, 1000 + index * 7)
+
+        # expect
+        assert sorted(wheel.advance(1000 + 1000)) == list(range(20))
+        assert len(wheel) == 0
+
+    def test_should_expire_items_added_with_past_deadlines(self):
+        # given
+        wheel = TimerWheel(now=1000, resolution=10, slots=8)
+        wheel.advance(1200)
+
+        # when
+        wheel.add('a', 900)
+
+        # then
+        assert wheel.advance(1200) == ['a']
+
+    def test_should_reschedule_and_remove_items(self):
+        # given
+        wheel = TimerWheel(now=1000, resolution=10, slots=8)
+        wheel.add('a', 1005)
+        wheel.add('b', 1005)
+
+        # when
+        wheel.add('a', 1050)
+        wheel.remove('b')
+
+        # then
+        assert wheel.advance(1010) == []
+        assert wheel.advance(1050) == ['a']
+
+
+@pytest.fixture(params=[(zrxv2, zrxv2.ZrxExchangeV2, {}),
+                        (zrxv3, zrxv3.ZrxExchangeV3, {'chain_id': 1})], ids=['v2', 'v3'])
+def book(request):
+    module, exchange_class, kwargs = request.param
+
+    Contract.lazy_verification = True
+    try:
+        yield module, ZrxOrderBook(exchange_class(offline_web3(), EXCHANGE, **kwargs))
+    finally:
+        Contract.lazy_verification = False
+
+
+def order(module, exchange, salt: int, pay_amount: int, buy_amount: int, maker: Address = MAKER,
+          expiration: int = None, pay_token: Address = PAY_TOKEN, buy_token: Address = BUY_TOKEN):
+    return module.Order(exchange=exchange,
+                        sender=ZERO_ADDRESS,
+                        maker=maker,
+                        taker=ZERO_ADDRESS,
+                        maker_fee=Wad(0),
+                        taker_fee=Wad(0),
+                        pay_asset=module.ERC20Asset(pay_token),
+                        pay_amount=Wad.from_number(pay_amount),
+                        buy_asset=module.ERC20Asset(buy_token),
+                        buy_amount=Wad.from_number(buy_amount),
+                        salt=salt,
+                        fee_recipient=ZERO_ADDRESS,
+                        expiration=expiration or int(time.time()) + 3600,
+                        exchange_contract_address=EXCHANGE,
+                        signature='0x' + '00' * 65 + '03')
+
+
+def log(block_number: int, log_index: int, **args) -> dict:
+    return {'args': args, 'blockNumber': block_number, 'logIndex': log_index}
+
+
+def log_fill(module, order_hash: str, filled_buy_amount: Wad, block_number: int = 1, log_index: int = 0):
+    return module.LogFill(log(block_number, log_index,
+                              makerAddress=MAKER.address, feeRecipientAddress=ZERO_ADDRESS.address,
+                              takerAddress=OTHER_MAKER.address, senderAddress=OTHER_MAKER.address,
+                              makerAssetData=hexstring_to_bytes(module.ERC20Asset(PAY_TOKEN).serialize()),
+                              takerAssetData=hexstring_to_bytes(module.ERC20Asset(BUY_TOKEN).serialize()),
+                              makerAssetFilledAmount=0, takerAssetFilledAmount=filled_buy_amount.value,
+                              makerFeePaid=0, takerFeePaid=0, orderHash=hexstring_to_bytes(order_hash)))
+
+
+def log_cancel(module, order_hash: str, block_number: int = 1, log_index: int = 0):
+    return module.LogCancel(log(block_number, log_index,
+                                makerAddress=MAKER.address, feeRecipientAddress=ZERO_ADDRESS.address,
+                                senderAddress=MAKER.address,
+                                makerAssetData=hexstring_to_bytes(module.ERC20Asset(PAY_TOKEN).serialize()),
+                                takerAssetData=hexstring_to_bytes(module.ERC20Asset(BUY_TOKEN).serialize()),
+                                orderHash=hexstring_to_bytes(order_hash)))
+
+
+def log_cancel_up_to(module, maker: Address, order_epoch: int, block_number: int = 1, log_index: int = 0):
+    return module.LogCancelUpTo(log(block_number, log_index, makerAddress=maker.address,
+                                    senderAddress=ZERO_ADDRESS.address, orderSenderAddress=ZERO_ADDRESS.address,
+                                    orderEpoch=order_epoch))
+
+
+class TestZrxOrderBook:
+    def test_should_keep_price_levels_sorted(self, book):
+        # given
+        module, book = book
+        orders = [order(module, book.exchange, 1, 10, 30),
+                  order(module, book.exchange, 2, 10, 20),
+                  order(module, book.exchange, 3, 5, 15),
+                  order(module, book.exchange, 4, 10, 25),
+                  order(module, book.exchange, 5, 10, 20, pay_token=BUY_TOKEN, buy_token=PAY_TOKEN)]
+
+        # when
+        added = book.ingest(orders)
+
+        # then
+        levels = book.get_levels(PAY_TOKEN, BUY_TOKEN)
+        assert added == 5
+        assert len(book) == 5
+        assert [level.price for level in levels] == [Wad.from_number(2), Wad.from_number(2.5), Wad.from_number(3)]
+        assert [level.pay_amount for level in levels] == [Wad.from_number(10), Wad.from_number(10), Wad.from_number(15)]
+        assert [level.buy_amount for level in levels] == [Wad.from_number(20), Wad.from_number(25), Wad.from_number(45)]
+        assert [entry.order for entry in levels[2].orders] == [orders[0], orders[2]]
+        assert [entry.order for entry in book.get_orders(PAY_TOKEN, BUY_TOKEN)] == [orders[1], orders[3], orders[0],
+                                                                                  orders[2]]
+        assert [entry.order for entry in book.get_orders(BUY_TOKEN, PAY_TOKEN)] == [orders[4]]
+        assert len(book.get_levels(PAY_TOKEN, BUY_TOKEN, depth=2)) == 2
+        assert book.exchange.web3.manager.request_blocking.call_count == 0
+
+    def test_should_not_ingest_the_same_order_twice(self, book):
+        # given
+        module, book = book
+        book.ingest([order(module, book.exchange, 1, 10, 20)])
+
+        # when
+        added = book.ingest([order(module, book.exchange, 1, 10, 20), order(module, book.exchange, 2, 10, 20)])
+
+        # then
+        assert added == 1
+        assert len(book) == 2
+
+    def test_should_track_fills(self, book):
+        # given
+        module, book = book
+        book.ingest([order(module, book.exchange, 1, 10, 20)])
+        order_hash = book.get_orders(PAY_TOKEN, BUY_TOKEN)[0].order_hash
+
+        # when
+        book.apply(log_fill(module, order_hash, Wad.from_number(5)))
+
+        # then
+        entry = book.get_order(order_hash)
+        assert entry.remaining_buy_amount == Wad.from_number(15)
+        assert entry.remaining_sell_amount == Wad.from_number(7.5)
+        assert book.get_levels(PAY_TOKEN, BUY_TOKEN)[0].pay_amount == Wad.from_number(7.5)
+
+        # when
+        book.apply(log_fill(module, order_hash, Wad.from_number(15)))
+
+        # then
+        assert book.get_order(order_hash) is None
+        assert book.get_levels(PAY_TOKEN, BUY_TOKEN) == []
+
+    def test_should_track_cancels(self, book):
+        # given
+        module, book = book
+        book.ingest([order(module, book.exchange, 1, 10, 20), order(module, book.exchange, 2, 10, 20)])
+        order_hash = book.get_orders(PAY_TOKEN, BUY_TOKEN)[0].order_hash
+
+        # when
+        book.apply(log_cancel(module, order_hash))
+
+        # then
+        assert book.get_order(order_hash) is None
+        assert [entry.order.salt for entry in book.get_orders(PAY_TOKEN, BUY_TOKEN)] == [2]
+
+    def test_should_track_cancel_up_to(self, book):
+        # given
+        module, book = book
+        book.ingest([order(module, book.exchange, 1, 10, 20),
+                     order(module, book.exchange, 5, 10, 20),
+                     order(module, book.exchange, 2, 10, 20, maker=OTHER_MAKER)])
+
+        # when
+        book.apply(log_cancel_up_to(module, MAKER, 3))
+
+        # then
+        assert sorted(entry.order.salt for entry in book.get_orders(PAY_TOKEN, BUY_TOKEN)) == [2, 5]
+
+        # when
+        added = book.ingest([order(module, book.exchange, 2, 10, 20), order(module, book.exchange, 3, 10, 20)])
+
+        # then
+        assert added == 1
+        assert sorted(entry.order.salt for entry in book.get_orders(PAY_TOKEN, BUY_TOKEN)) == [2, 3, 5]
+
+    def test_should_expire_orders(self, book):
+        # given
+        module, book = book
+        now = int(time.time())
+        book.ingest([order(module, book.exchange, 1, 10, 20, expiration=now + 60),
+                     order(module, book.exchange, 2, 10, 20, expiration=now + 120),
+                     order(module, book.exchange, 3, 10, 20, expiration=now - 1)])
+
+        # expect
+        assert len(book) == 2
+        assert book.expire(now + 59) == 0
+        assert book.expire(now + 60) == 1
+        assert [entry.order.salt for entry in book.get_orders(PAY_TOKEN, BUY_TOKEN)] == [2]
+
+    def test_should_use_orders_info(self, book):
+        # given
+        module, book = book
+        orders = [order(module, book.exchange, 1, 10, 20), order(module, book.exchange, 2, 10, 20)]
+        orders_info = [module.OrderInfo(orders[0], module.OrderInfo.FILLABLE, "0x01", Wad.from_number(4)),
+                       module.OrderInfo(orders[1], module.OrderInfo.CANCELLED, "0x02", Wad(0))]
+
+        # when
+        book.ingest(orders, orders_info)
+
+        # then
+        assert len(book) == 1
+        assert book.get_order("0x01").remaining_buy_amount == Wad.from_number(16)
+
+    def test_should_sync_events_in_order(self, book):
+        # given
+        module, book = book
+        book.ingest([order(module, book.exchange, 1, 10, 20)])
+        order_hash = book.get_orders(PAY_TOKEN, BUY_TOKEN)[0].order_hash
+
+        # and
+        events = {'Fill': [log_fill(module, order_hash, Wad.from_number(5), block_number=11, log_index=3)],
+                  'Cancel': [log_cancel(module, order_hash, block_number=11, log_index=4)],
+                  'CancelUpTo': []}
+        book.exchange._past_events_in_block_range = Mock(side_effect=lambda contract, event, cls, from_block,
+                                                                            to_block, event_filter: events[event])
+        book.apply = Mock(wraps=book.apply)
+
+        # when
+        applied = book.sync(to_block=12)
+
+        # then
+        assert applied == 2
+        assert book.last_block == 12
+        assert len(book) == 0
+        assert [call[0][0] for call in book.apply.call_args_list] == [events['Fill'][0], events['Cancel'][0]]
+        assert book.exchange._past_events_in_block_range.call_args_list[0][0][3:5] == (12, 12)
+
+        # when
+        events = {'Fill': [], 'Cancel': [], 'CancelUpTo': []}
+        book.sync(to_block=20)
+
+        # then
+        assert book.exchange._past_events_in_block_range.call_args_list[-1][0][3:5] == (13, 20)
+        assert book.sync(to_block=20) == 0
@@ -15,22 +15,27 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import copy
 import json
 
 import pkg_resources
 import pytest
-from eth_abi import encode_single
+from eth_abi import encode_abi, encode_single
+from eth_account import Account
+from eth_utils import keccak
 from mock import Mock
 from web3 import EthereumTesterProvider, Web3, HTTPProvider
 
-from pymaker import Address
+from pymaker import Address, Contract
 from pymaker.approval import directly
 from pymaker.deployment import deploy_contract
+from pymaker.keys import register_private_key
 from pymaker.numeric import Wad
 from pymaker.token import DSToken, ERC20Token
-from pymaker.util import bytes_to_hexstring
-from pymaker.zrxv2 import ZrxExchangeV2, Order, ZrxRelayerApiV2, ERC20Asset
-from tests.helpers import is_hashable, wait_until_mock_called
+from pymaker.util import bytes_to_hexstring, hexstring_to_bytes, function_selector, abi_encode_single, \
+    abi_decode_single
+from pymaker.zrxv2 import ZrxExchangeV2, Order, OrderInfo, ZrxRelayerApiV2, ERC20Asset
+from tests.helpers import is_hashable, offline_web3, wait_until_mock_called
 
 PAST_BLOCKS = 100
 
@@ -119,6 +124,20 @@ class TestZrxV2:
         assert order_hash.startswith('0x')
         assert len(order_hash) == 66
 
+    def test_get_order_hash_should_match_the_contract(self):
+        # given
+        order = self.exchange.create_order(pay_asset=ERC20Asset(self.token1.address),
+                                           pay_amount=Wad.from_number(100),
+                                           buy_asset=ERC20Asset(self.token2.address),
+                                           buy_amount=Wad.from_number(2.5), expiration=1763920792)
+
+        # when
+        order_hash = self.exchange.get_order_hash(order)
+
+        # then
+        assert self.exchange.domain_separator() == self.exchange._contract.functions.EIP712_DOMAIN_HASH().call()
+        assert order_hash == bytes_to_hexstring(self.exchange._get_order_info(order)[0][1])
+
     def test_sign_order(self):
         # given
         order = self.exchange.create_order(pay_asset=ERC20Asset(Address("0x0202020202020202020202020202020202020202")),
@@ -174,6 +193,37 @@ class TestZrxV2:
         # then
         assert self.exchange.get_unavailable_buy_amount(signed_order) == Wad.from_number(3.5)
 
+    def test_get_orders_info(self):
+        # given
+        self.exchange.approve([self.token1, self.token2], directly())
+        self.exchange.orders_info_batch_size = 2
+
+        # and
+        orders = []
+        for salt in range(3):
+            order = self.exchange.create_order(pay_asset=ERC20Asset(self.token1.address), pay_amount=Wad.from_number(10),
+                                               buy_asset=ERC20Asset(self.token2.address), buy_amount=Wad.from_number(4),
+                                               expiration=1763920792)
+            order.salt += salt
+            orders.append(self.exchange.sign_order(order))
+
+        # when
+        self.exchange.fill_order(orders[1], Wad.from_number(1)).transact()
+        self.exchange.cancel_order(orders[2]).transact()
+
+        # and
+        orders_info = self.exchange.get_orders_info(orders)
+
+        # then
+        assert [order_info.order for order_info in orders_info] == orders
+        assert [order_info.order_hash for order_info in orders_info] == list(map(self.exchange.get_order_hash, orders))
+        assert [order_info.status for order_info in orders_info] == [OrderInfo.FILLABLE, OrderInfo.FILLABLE,
+                                                                     OrderInfo.CANCELLED]
+        assert [order_info.remaining_buy_amount for order_info in orders_info] == [Wad.from_number(4),
+                                                                                   Wad.from_number(3),
+                                                                                   Wad(0)]
+        assert orders_info[1].remaining_sell_amount == Wad.from_number(7.5)
+
     def test_remaining_buy_amount_and_remaining_sell_amount(self):
         # given
         self.exchange.approve([self.token1, self.token2], directly())
@@ -249,6 +299,184 @@ class TestZrxV2:
         assert repr(self.exchange) == f"ZrxExchangeV2('{self.exchange.address}')"
 
 
+class TestOrderHash:
+    def setup_method(self):
+        Contract.lazy_verification = True
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+
+    def test_should_calculate_order_hash_without_calling_the_node(self):
+        # given
+        web3 = offline_web3()
+        exchange = ZrxExchangeV2(web3, Address("0x4f833a24e1f95d70f028921e27040ca56e09ab0b"))
+        order = Order(exchange=exchange,
+                      sender=Address("0x0000000000000000000000000000000000000000"),
+                      maker=Address("0x0046cac6668bef45b517a1b816a762f4f8add2a9"),
+                      taker=Address("0x0000000000000000000000000000000000000000"),
+                      maker_fee=Wad(0),
+                      taker_fee=Wad(5),
+                      pay_asset=ERC20Asset(Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4")),
+                      pay_amount=Wad(11000000000000000000),
+                      buy_asset=ERC20Asset(Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070")),
+                      buy_amount=Wad(30800000000000000),
+                      salt=50626048444772008084444062440502087868712695090943879708059561407114509847312,
+                      fee_recipient=Address("0xa258b39954cef5cb142fd567a46cddb31a670124"),
+                      expiration=1511988904,
+                      exchange_contract_address=Address("0x4f833a24e1f95d70f028921e27040ca56e09ab0b"),
+                      signature=None)
+
+        # and
+        # [`hashEIP712Message(hashOrder(order))` as in `LibEIP712` and `LibOrder`, encoded with eth_abi]
+        domain_separator = keccak(encode_abi(['bytes32', 'bytes32', 'bytes32', 'address'], [
+            keccak(text="EIP712Domain(string name,string version,address verifyingContract)"),
+            keccak(text="0x Protocol"), keccak(text="2"), exchange.address.address]))
+        struct_hash = keccak(encode_abi(['bytes32'] + ['address'] * 4 + ['uint256'] * 6 + ['bytes32'] * 2, [
+            ZrxExchangeV2.EIP712_ORDER_TYPEHASH, *ZrxExchangeV2._order_tuple(order)[:10],
+            keccak(hexstring_to_bytes(order.pay_asset.serialize())),
+            keccak(hexstring_to_bytes(order.buy_asset.serialize()))]))
+
+        # when
+        order_hash = exchange.get_order_hash(order)
+
+        # then
+        assert order_hash == bytes_to_hexstring(keccak(b"\x19\x01" + domain_separator + struct_hash))
+        assert web3.manager.request_blocking.call_count == 0
+
+
+class TestOrderSignatures:
+    def setup_method(self):
+        Contract.lazy_verification = True
+        self.account = Account.privateKeyToAccount("0x" + "42" * 32)
+        self.web3 = offline_web3()
+        self.web3.eth.account = Account
+        self.web3.eth.defaultAccount = self.account.address
+        self.web3.middleware_onion = Mock()
+        register_private_key(self.web3, self.account.key)
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+
+    def order(self, exchange, salt: int) -> Order:
+        return Order(exchange=exchange,
+                     sender=Address("0x0000000000000000000000000000000000000000"),
+                     maker=Address(self.account.address),
+                     taker=Address("0x0000000000000000000000000000000000000000"),
+                     maker_fee=Wad(0),
+                     taker_fee=Wad(0),
+                     pay_asset=ERC20Asset(Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4")),
+                     pay_amount=Wad(11000000000000000000),
+                     buy_asset=ERC20Asset(Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070")),
+                     buy_amount=Wad(30800000000000000),
+                     salt=salt,
+                     fee_recipient=Address("0x0000000000000000000000000000000000000000"),
+                     expiration=1763920792,
+                     exchange_contract_address=exchange.address,
+                     signature=None)
+
+    def test_should_sign_orders_in_batches(self):
+        # given
+        exchange = ZrxExchangeV2(self.web3, Address("0x4f833a24e1f95d70f028921e27040ca56e09ab0b"))
+        orders = [self.order(exchange, salt) for salt in range(40)]
+
+        # when
+        signed_orders = exchange.sign_orders(orders, processes=2)
+
+        # then
+        assert signed_orders == [exchange.sign_order(order) for order in orders]
+        assert all(order.signature is None for order in orders)
+        assert exchange.validate_signatures(signed_orders, processes=2) == [True] * 40
+
+    def test_should_reject_orders_with_invalid_signatures(self):
+        # given
+        exchange = ZrxExchangeV2(self.web3, Address("0x4f833a24e1f95d70f028921e27040ca56e09ab0b"))
+        signed_order = exchange.sign_order(self.order(exchange, 1))
+        other_order = copy.copy(signed_order)
+        other_order.salt = 2
+        truncated_order = copy.copy(signed_order)
+        truncated_order.signature = signed_order.signature[:-4] + "03"
+        wallet_order = copy.copy(signed_order)
+        wallet_order.signature = "0x04"
+        malformed_order = copy.copy(signed_order)
+        malformed_order.signature = "0x1b" + "00" * 64 + "03"
+
+        # when
+        results = exchange.validate_signatures([signed_order, other_order, truncated_order, wallet_order,
+                                                malformed_order, self.order(exchange, 3)])
+
+        # then
+        assert results == [True, False, False, None, False, False]
+
+
+class TestOrdersInfo:
+    def setup_method(self):
+        Contract.lazy_verification = True
+        self.web3 = offline_web3()
+        self.web3.eth.call = Mock(side_effect=self.call)
+        self.exchange = ZrxExchangeV2(self.web3, Address("0x4f833a24e1f95d70f028921e27040ca56e09ab0b"))
+        self.exchange.orders_info_batch_size = 3
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+
+    # [stands in for the exchange contract, the status and the filled amount are derived from the salt]
+    def call(self, transaction: dict) -> bytes:
+        assert transaction['to'] == self.exchange.address.address
+        data = hexstring_to_bytes(transaction['data'])
+        assert data[0:4] == function_selector(f"getOrdersInfo({ZrxExchangeV2.ORDER_INFO_TYPE}[])")
+
+        orders = abi_decode_single(f"({ZrxExchangeV2.ORDER_INFO_TYPE}[])", data[4:])[0]
+        return abi_encode_single("((uint8,bytes32,uint256)[])", [[self.order_info(order) for order in orders]])
+
+    def order_info(self, order_tuple: tuple) -> tuple:
+        order = self.order(order_tuple[9])
+        assert ZrxExchangeV2._order_tuple(order)[4:] == order_tuple[4:]
+        return order.salt, hexstring_to_bytes(self.exchange.get_order_hash(order)), order.salt * 250000000000000000
+
+    def order(self, salt: int) -> Order:
+        return Order(exchange=self.exchange,
+                     sender=Address("0x0000000000000000000000000000000000000000"),
+                     maker=Address("0x0046cac6668bef45b517a1b816a762f4f8add2a9"),
+                     taker=Address("0x0000000000000000000000000000000000000000"),
+                     maker_fee=Wad(0),
+                     taker_fee=Wad(0),
+                     pay_asset=ERC20Asset(Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4")),
+                     pay_amount=Wad.from_number(10),
+                     buy_asset=ERC20Asset(Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070")),
+                     buy_amount=Wad.from_number(4),
+                     salt=salt,
+                     fee_recipient=Address("0x0000000000000000000000000000000000000000"),
+                     expiration=1763920792,
+                     exchange_contract_address=self.exchange.address,
+                     signature=None)
+
+    def test_should_get_info_of_many_orders(self):
+        # given
+        orders = [self.order(salt) for salt in range(7)]
+
+        # when
+        orders_info = self.exchange.get_orders_info(orders)
+
+        # then
+        assert self.web3.eth.call.call_count == 3
+        assert [order_info.order for order_info in orders_info] == orders
+        assert [order_info.status for order_info in orders_info] == list(range(7))
+        assert [order_info.order_hash for order_info in orders_info] == list(map(self.exchange.get_order_hash, orders))
+        assert [order_info.is_fillable for order_info in orders_info] == [False, False, False, True, False, False, False]
+        assert [order_info.unavailable_buy_amount for order_info in orders_info] == [Wad.from_number(4)] * 3 + \
+               [Wad.from_number(0.75)] + [Wad.from_number(4)] * 3
+
+    def test_should_calculate_remaining_amounts(self):
+        # given
+        order_info = self.exchange.get_orders_info([self.order(3)])[0]
+
+        # expect
+        assert order_info.remaining_buy_amount == Wad.from_number(3.25)
+        assert order_info.remaining_sell_amount == Wad.from_number(8.125)
+        assert self.exchange.get_unavailable_buy_amount(self.order(3)) == Wad.from_number(0.75)
+        assert self.exchange.get_unavailable_buy_amount(self.order(5)) == Wad.from_number(4)
+
+
 class TestOrder:
     def test_should_be_comparable(self):
         # given
@@ -0,0 +1,228 @@
+# This file is part of Maker Keeper Framework.
+#
+# Copyright (C) 2020 reverendus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import copy
+from unittest.mock import Mock
+
+from eth_abi import encode_abi
+from eth_account import Account
+from eth_utils import keccak
+
+from pymaker import Address, Contract
+from pymaker.keys import register_private_key
+from pymaker.numeric import Wad
+from pymaker.util import bytes_to_hexstring, hexstring_to_bytes, function_selector, abi_encode_single, \
+    abi_decode_single
+from pymaker.zrxv3 import ZrxExchangeV3, Order, ERC20Asset
+from tests.helpers import offline_web3
+
+EXCHANGE = Address("0x61935cbdd02287b511119ddb11aeb42f1593b7ef")
+
+
+def domain_separator(chain_id: int) -> bytes:
+    return keccak(encode_abi(['bytes32', 'bytes32', 'bytes32', 'uint256', 'address'], [
+        keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"),
+        keccak(text="0x Protocol"), keccak(text="3.0.0"), chain_id, EXCHANGE.address]))
+
+
+class TestOrderHash:
+    def setup_method(self):
+        Contract.lazy_verification = True
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+
+    def order(self, exchange: ZrxExchangeV3) -> Order:
+        return Order(exchange=exchange,
+                     sender=Address("0x0000000000000000000000000000000000000000"),
+                     maker=Address("0x0046cac6668bef45b517a1b816a762f4f8add2a9"),
+                     taker=Address("0x0000000000000000000000000000000000000000"),
+                     maker_fee=Wad(0),
+                     taker_fee=Wad(5),
+                     pay_asset=ERC20Asset(Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4")),
+                     pay_amount=Wad(11000000000000000000),
+                     buy_asset=ERC20Asset(Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070")),
+                     buy_amount=Wad(30800000000000000),
+                     salt=1588000000000,
+                     fee_recipient=Address("0xa258b39954cef5cb142fd567a46cddb31a670124"),
+                     expiration=1763920792,
+                     exchange_contract_address=EXCHANGE,
+                     signature=None)
+
+    def test_should_calculate_order_hash_without_calling_the_node(self):
+        # given
+        web3 = offline_web3()
+        exchange = ZrxExchangeV3(web3, EXCHANGE, chain_id=1)
+        order = self.order(exchange)
+
+        # and
+        # [`_hashEIP712ExchangeMessage(getTypedDataHash(order))` as in `LibEIP712` and `LibOrder`, encoded with eth_abi]
+        struct_hash = keccak(encode_abi(['bytes32'] + ['address'] * 4 + ['uint256'] * 6 + ['bytes32'] * 4, [
+            ZrxExchangeV3.EIP712_ORDER_TYPEHASH, *ZrxExchangeV3._order_tuple(order)[:10],
+            *[keccak(data) for data in ZrxExchangeV3._order_tuple(order)[10:]]]))
+
+        # when
+        order_hash = exchange.get_order_hash(order)
+
+        # then
+        assert order_hash == bytes_to_hexstring(keccak(b"\x19\x01" + domain_separator(1) + struct_hash))
+        assert web3.manager.request_blocking.call_count == 0
+
+    def test_should_read_domain_separator_from_the_contract_only_once(self):
+        # given
+        exchange = ZrxExchangeV3(offline_web3(), EXCHANGE)
+        exchange._contract = Mock()
+        exchange._contract.functions.EIP712_EXCHANGE_DOMAIN_HASH.return_value.call.return_value = domain_separator(1337)
+
+        # when
+        exchange.get_order_hash(self.order(exchange))
+        exchange.get_order_hash(self.order(exchange))
+
+        # then
+        assert exchange.domain_separator() == domain_separator(1337)
+        assert exchange._contract.functions.EIP712_EXCHANGE_DOMAIN_HASH.return_value.call.call_count == 1
+
+
+class TestOrderSignatures:
+    def setup_method(self):
+        Contract.lazy_verification = True
+        self.account = Account.privateKeyToAccount("0x" + "42" * 32)
+        self.web3 = offline_web3()
+        self.web3.eth.account = Account
+        self.web3.eth.defaultAccount = self.account.address
+        self.web3.middleware_onion = Mock()
+        register_private_key(self.web3, self.account.key)
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+
+    def order(self, exchange, salt: int) -> Order:
+        return Order(exchange=exchange,
+                     sender=Address("0x0000000000000000000000000000000000000000"),
+                     maker=Address(self.account.address),
+                     taker=Address("0x0000000000000000000000000000000000000000"),
+                     maker_fee=Wad(0),
+                     taker_fee=Wad(0),
+                     pay_asset=ERC20Asset(Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4")),
+                     pay_amount=Wad(11000000000000000000),
+                     buy_asset=ERC20Asset(Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070")),
+                     buy_amount=Wad(30800000000000000),
+                     salt=salt,
+                     fee_recipient=Address("0x0000000000000000000000000000000000000000"),
+                     expiration=1763920792,
+                     exchange_contract_address=exchange.address,
+                     signature=None)
+
+    def test_should_sign_orders_in_batches(self):
+        # given
+        exchange = ZrxExchangeV3(self.web3, EXCHANGE, chain_id=1)
+        orders = [self.order(exchange, salt) for salt in range(40)]
+
+        # when
+        signed_orders = exchange.sign_orders(orders, processes=2)
+
+        # then
+        assert signed_orders == [exchange.sign_order(order) for order in orders]
+        assert all(order.signature is None for order in orders)
+        assert exchange.validate_signatures(signed_orders, processes=2) == [True] * 40
+
+    def test_should_reject_orders_with_invalid_signatures(self):
+        # given
+        exchange = ZrxExchangeV3(self.web3, EXCHANGE, chain_id=1)
+        signed_order = exchange.sign_order(self.order(exchange, 1))
+        other_order = copy.copy(signed_order)
+        other_order.salt = 2
+        truncated_order = copy.copy(signed_order)
+        truncated_order.signature = signed_order.signature[:-4] + "03"
+        wallet_order = copy.copy(signed_order)
+        wallet_order.signature = "0x04"
+        malformed_order = copy.copy(signed_order)
+        malformed_order.signature = "0x1b" + "00" * 64 + "03"
+
+        # when
+        results = exchange.validate_signatures([signed_order, other_order, truncated_order, wallet_order,
+                                                malformed_order, self.order(exchange, 3)])
+
+        # then
+        assert results == [True, False, False, None, False, False]
+
+
+class TestOrdersInfo:
+    def setup_method(self):
+        Contract.lazy_verification = True
+        self.web3 = offline_web3()
+        self.web3.eth.call = Mock(side_effect=self.call)
+        self.exchange = ZrxExchangeV3(self.web3, EXCHANGE, chain_id=1)
+
+    def teardown_method(self):
+        Contract.lazy_verification = False
+
+    # [stands in for the exchange contract, the status and the filled amount are derived from the salt]
+    def call(self, transaction: dict) -> bytes:
+        assert transaction['to'] == self.exchange.address.address
+        data = hexstring_to_bytes(transaction['data'])
+        assert data[0:4] == function_selector(f"getOrderInfo({ZrxExchangeV3.ORDER_INFO_TYPE})")
+
+        order_tuple = abi_decode_single(f"({ZrxExchangeV3.ORDER_INFO_TYPE})", data[4:])[0]
+        order = self.order(order_tuple[9])
+        assert ZrxExchangeV3._order_tuple(order)[4:] == order_tuple[4:]
+        return abi_encode_single("((uint8,bytes32,uint256))", [(order.salt,
+                                                                hexstring_to_bytes(self.exchange.get_order_hash(order)),
+                                                                order.salt * 250000000000000000)])
+
+    def order(self, salt: int) -> Order:
+        return Order(exchange=self.exchange,
+                     sender=Address("0x0000000000000000000000000000000000000000"),
+                     maker=Address("0x0046cac6668bef45b517a1b816a762f4f8add2a9"),
+                     taker=Address("0x0000000000000000000000000000000000000000"),
+                     maker_fee=Wad(0),
+                     taker_fee=Wad(0),
+                     pay_asset=ERC20Asset(Address("0x59adcf176ed2f6788a41b8ea4c4904518e62b6a4")),
+                     pay_amount=Wad.from_number(10),
+                     buy_asset=ERC20Asset(Address("0x2956356cd2a2bf3202f771f50d3d14a367b48070")),
+                     buy_amount=Wad.from_number(4),
+                     salt=salt,
+                     fee_recipient=Address("0x0000000000000000000000000000000000000000"),
+                     expiration=1763920792,
+                     exchange_contract_address=self.exchange.address,
+                     signature=None)
+
+    def test_should_get_info_of_many_orders(self):
+        # given
+        orders = [self.order(salt) for salt in range(7)]
+
+        # when
+        orders_info = self.exchange.get_orders_info(orders)
+
+        # then
+        assert self.web3.eth.call.call_count == 7
+        assert [order_info.order for order_info in orders_info] == orders
+        assert [order_info.status for order_info in orders_info] == list(range(7))
+        assert [order_info.order_hash for order_info in orders_info] == list(map(self.exchange.get_order_hash, orders))
+        assert [order_info.is_fillable for order_info in orders_info] == [False, False, False, True, False, False, False]
+        assert [order_info.unavailable_buy_amount for order_info in orders_info] == [Wad.from_number(4)] * 3 + \
+               [Wad.from_number(0.75)] + [Wad.from_number(4)] * 3
+
+    def test_should_calculate_remaining_amounts(self):
+        # given
+        order_info = self.exchange.get_orders_info([self.order(3)])[0]
+
+        # expect
+        assert order_info.remaining_buy_amount == Wad.from_number(3.25)
+        assert order_info.remaining_sell_amount == Wad.from_number(8.125)
+        assert self.exchange.get_unavailable_buy_amount(self.order(3)) == Wad.from_number(0.75)
+        assert self.exchange.get_unavailable_buy_amount(self.order(5)) == Wad.from_number(4)